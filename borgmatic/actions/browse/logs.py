@@ -15,7 +15,6 @@ class Rich_color_formatter(logging.Formatter):
     '''
 
     def __init__(self, *args, **kwargs):
-        self.prefix = None
         super().__init__(
             '{prefix}{message}',
             *args,
@@ -38,7 +37,7 @@ class Rich_color_formatter(logging.Formatter):
             logging.INFO: 'bright_green',
             logging.DEBUG: 'bright_cyan',
         }.get(record.levelno)
-        record.prefix = f'{self.prefix}: ' if self.prefix else ''
+        record.prefix = borgmatic.logger.format_log_prefix()
 
         return f'[{color}]{super().format(record)}[/{color}]'
 
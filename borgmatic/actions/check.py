@@ -20,6 +20,7 @@ import borgmatic.borg.environment
 import borgmatic.borg.extract
 import borgmatic.borg.list
 import borgmatic.borg.pattern
+import borgmatic.borg.plan
 import borgmatic.borg.repo_list
 import borgmatic.config.paths
 import borgmatic.execute
@@ -367,7 +368,39 @@ def collect_spot_check_source_paths(
     Borg would use in an actual create (but only include files). As part of this, include the
     bootstrap configuration paths, so that any configuration files included in the archive to
     support bootstrapping are also spot checked.
+
+    By default, perform a "borg create --dry-run" to collect the paths. But if the
+    "validate_paths_with_borg" option is set to false, collect them instead by walking the
+    filesystem natively and evaluating the patterns the way Borg would—unless the "exclude_nodump"
+    option is set, because the native walk doesn't know which files have the "nodump" flag.
     '''
+    working_directory = borgmatic.config.paths.get_working_directory(config)
+    patterns = borgmatic.actions.pattern.process_patterns(
+        borgmatic.actions.pattern.collect_patterns(config, working_directory)
+        + tuple(
+            borgmatic.borg.pattern.Pattern(
+                config_path,
+                source=borgmatic.borg.pattern.Pattern_source.INTERNAL,
+            )
+            for config_path in bootstrap_config_paths
+        ),
+        config,
+        working_directory,
+    )
+
+    if not config.get('validate_paths_with_borg', True) and not config.get('exclude_nodump'):
+        # Use dict.fromkeys() to deduplicate file paths, which get walked twice when there are
+        # overlapping source patterns.
+        return tuple(
+            dict.fromkeys(
+                planned_path.path
+                for planned_path in borgmatic.borg.plan.get_planned_paths(
+                    patterns, config, working_directory
+                )
+                if planned_path.regular_file
+            )
+        )
+
     stream_processes = any(
         borgmatic.hooks.dispatch.call_hooks(
             'use_streaming',
@@ -375,25 +408,12 @@ def collect_spot_check_source_paths(
             borgmatic.hooks.dispatch.Hook_type.DATA_SOURCE,
         ).values(),
     )
-    working_directory = borgmatic.config.paths.get_working_directory(config)
-
     (create_flags, create_positional_arguments, _) = borgmatic.borg.create.make_base_create_command(
         dry_run=True,
         repository_path=repository['path'],
         # Omit "progress" because it interferes with "list_details".
         config=dict(config, progress=False, list_details=True),
-        patterns=borgmatic.actions.pattern.process_patterns(
-            borgmatic.actions.pattern.collect_patterns(config, working_directory)
-            + tuple(
-                borgmatic.borg.pattern.Pattern(
-                    config_path,
-                    source=borgmatic.borg.pattern.Pattern_source.INTERNAL,
-                )
-                for config_path in bootstrap_config_paths
-            ),
-            config,
-            working_directory,
-        ),
+        patterns=patterns,
         local_borg_version=local_borg_version,
         global_arguments=global_arguments,
         borgmatic_runtime_directory=borgmatic_runtime_directory,
@@ -401,7 +421,6 @@ def collect_spot_check_source_paths(
         remote_path=remote_path,
         stream_processes=stream_processes,
     )
-    working_directory = borgmatic.config.paths.get_working_directory(config)
 
     path_lines = borgmatic.execute.execute_command_and_capture_output(
         create_flags + create_positional_arguments,
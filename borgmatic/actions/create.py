@@ -1,4 +1,10 @@
+import concurrent.futures
+import contextlib
+import contextvars
 import logging
+import os
+import shutil
+import stat
 
 import borgmatic.actions.dump
 import borgmatic.actions.json
@@ -7,12 +13,30 @@ import borgmatic.borg.feature
 import borgmatic.borg.rename
 import borgmatic.borg.repo_list
 import borgmatic.config.paths
+import borgmatic.execute
 import borgmatic.hooks.dispatch
+import borgmatic.logger
 from borgmatic.actions import pattern
 
 logger = logging.getLogger(__name__)
 
 
+def check_create_options(config, create_arguments):
+    '''
+    Given a configuration dict and create arguments as an argparse.Namespace instance, raise
+    ValueError if they contain options that can't be used together.
+    '''
+    if config.get('list_details') and config.get('progress'):
+        raise ValueError(
+            'With the create action, only one of --list/--files/list_details and --progress/progress can be used.',
+        )
+
+    if config.get('list_details') and create_arguments.json:
+        raise ValueError(
+            'With the create action, only one of --list/--files/list_details and --json can be used.',
+        )
+
+
 def run_create(
     config_filename,
     repository,
@@ -30,15 +54,7 @@ def run_create(
 
     If create_arguments.json is True, yield the JSON output from creating the archive.
     '''
-    if config.get('list_details') and config.get('progress'):
-        raise ValueError(
-            'With the create action, only one of --list/--files/list_details and --progress/progress can be used.',
-        )
-
-    if config.get('list_details') and create_arguments.json:
-        raise ValueError(
-            'With the create action, only one of --list/--files/list_details and --json can be used.',
-        )
+    check_create_options(config, create_arguments)
 
     logger.info(f'Creating archive{dry_run_label}')
     working_directory = borgmatic.config.paths.get_working_directory(config)
@@ -188,3 +204,269 @@ def rename_checkpoint_archive(
         local_path,
         remote_path,
     )
+
+
+def find_named_pipes(directory):
+    '''
+    Given a directory path, yield the path of each named pipe within it, recursively. Don't descend
+    into directories on other filesystems, like the filesystem snapshots that some data source
+    hooks mount within the borgmatic runtime directory.
+    '''
+    try:
+        device = os.stat(directory).st_dev
+    except FileNotFoundError:
+        return
+
+    for parent_path, subdirectory_names, file_names in os.walk(directory):
+        subdirectory_names[:] = [
+            subdirectory_name
+            for subdirectory_name in subdirectory_names
+            if os.stat(os.path.join(parent_path, subdirectory_name), follow_symlinks=False).st_dev
+            == device
+        ]
+
+        for file_name in file_names:
+            path = os.path.join(parent_path, file_name)
+
+            if stat.S_ISFIFO(os.stat(path, follow_symlinks=False).st_mode):
+                yield path
+
+
+SPOOL_FILE_SUFFIX = '.spool'
+
+
+def spool_named_pipe(pipe_path):
+    '''
+    Given the path of a named pipe, copy everything written to it into a regular file alongside it,
+    until the writer closes the pipe. Return the path of that spool file.
+    '''
+    spool_path = f'{pipe_path}{SPOOL_FILE_SUFFIX}'
+
+    with (
+        open(pipe_path, 'rb') as pipe,
+        open(spool_path, 'wb', opener=lambda path, flags: os.open(path, flags, 0o600)) as spool,
+    ):
+        shutil.copyfileobj(pipe, spool)
+
+    return spool_path
+
+
+def unblock_named_pipe(pipe_path):
+    '''
+    Given the path of a named pipe, briefly open it for writing without blocking, so that a reader
+    stuck waiting for a writer that's never going to show up sees the end of the pipe instead.
+    Ignore any error, e.g. because the pipe doesn't have a reader yet.
+    '''
+    with contextlib.suppress(OSError):
+        os.close(os.open(pipe_path, os.O_WRONLY | os.O_NONBLOCK))
+
+
+SPOOL_UNBLOCK_INTERVAL_SECONDS = 0.1
+
+
+def spool_data_source_dumps(stream_processes, borgmatic_runtime_directory):
+    '''
+    Given a sequence of subprocess.Popen instances for data source dump processes streaming to
+    named pipes within the given borgmatic runtime directory, read each named pipe into a regular
+    file and then replace the pipe with that file. That way, any number of Borg processes can back
+    up the same dumps, whereas a named pipe can only get read once.
+
+    Log the output of the dump processes, and raise subprocess.CalledProcessError if any of them
+    fail.
+    '''
+    if not stream_processes:
+        return
+
+    pipe_paths = tuple(find_named_pipes(borgmatic_runtime_directory))
+    logger.debug(f'Spooling {len(pipe_paths)} streamed data source dumps to files')
+
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=max(len(pipe_paths), 1), thread_name_prefix='borgmatic-spool'
+    )
+    spool_futures = {
+        pipe_path: executor.submit(contextvars.copy_context().run, spool_named_pipe, pipe_path)
+        for pipe_path in pipe_paths
+    }
+
+    try:
+        with borgmatic.logger.Log_prefix(None):  # Log command output without any prefix.
+            tuple(
+                borgmatic.execute.log_outputs(
+                    tuple(stream_processes),
+                    exclude_stdouts=(),
+                    output_log_level=logging.INFO,
+                    borg_local_path=None,
+                    borg_exit_codes=None,
+                    capture=False,
+                )
+            )
+    finally:
+        # The dump processes have all exited (or gotten killed), so nothing else is going to write
+        # to the pipes. Make sure that any spooling still waiting on a writer finishes.
+        while not all(future.done() for future in spool_futures.values()):
+            for pipe_path, future in spool_futures.items():
+                if not future.done():
+                    unblock_named_pipe(pipe_path)
+
+            concurrent.futures.wait(spool_futures.values(), timeout=SPOOL_UNBLOCK_INTERVAL_SECONDS)
+
+        executor.shutdown()
+
+    for pipe_path, future in spool_futures.items():
+        os.replace(future.result(), pipe_path)
+
+
+def create_repository_archive(
+    repository,
+    config,
+    patterns,
+    local_borg_version,
+    create_arguments,
+    global_arguments,
+    borgmatic_runtime_directory,
+    local_path,
+    remote_path,
+    base_create_flags,
+):
+    '''
+    Given a repository configuration dict, a configuration dict, a sequence of
+    borgmatic.borg.pattern.Pattern instances, the local Borg version, create arguments and global
+    arguments as argparse.Namespace instances, the borgmatic runtime directory, the local and remote
+    Borg paths, and base Borg create flags shared by all repositories, create an archive in the
+    repository. Return a tuple of the JSON output dict from doing so, if requested. Otherwise,
+    return an empty tuple.
+    '''
+    with borgmatic.logger.Log_prefix(repository.get('label', repository['path'])):
+        json_output = borgmatic.borg.create.create_archive(
+            global_arguments.dry_run,
+            repository['path'],
+            config,
+            patterns,
+            local_borg_version,
+            global_arguments,
+            borgmatic_runtime_directory,
+            local_path=local_path,
+            remote_path=remote_path,
+            json=create_arguments.json,
+            comment=create_arguments.comment,
+            base_create_flags=base_create_flags,
+        )
+
+    if not json_output:
+        return ()
+
+    return (borgmatic.actions.json.parse_json(json_output, repository.get('label')),)
+
+
+def run_fan_out_create(
+    repositories,
+    config,
+    config_paths,
+    local_borg_version,
+    create_arguments,
+    global_arguments,
+    dry_run_label,
+    local_path,
+    remote_path,
+):
+    '''
+    Run the "create" action for all of the given repository configuration dicts at once: Dump data
+    sources and plan the paths to back up only once, and then create an archive in each repository
+    concurrently.
+
+    Because a named pipe can only get read once, spool any streamed data source dumps into regular
+    files in the runtime directory before creating any archives.
+
+    Return a dict from repository path to a concurrent.futures.Future. Its result is a tuple of the
+    JSON output (if any) from creating the repository's archive. Or its exception is any error from
+    doing so.
+    '''
+    check_create_options(config, create_arguments)
+
+    logger.info(f'Creating archives in {len(repositories)} repositories{dry_run_label}')
+    working_directory = borgmatic.config.paths.get_working_directory(config)
+
+    with borgmatic.config.paths.Runtime_directory(config) as borgmatic_runtime_directory:
+        patterns = pattern.process_patterns(
+            pattern.collect_patterns(config, working_directory),
+            config,
+            working_directory,
+            borgmatic_runtime_directory,
+        )
+
+        original_patterns = list(patterns)
+
+        # Use the original patterns so as to disregard any modifications made by any data source
+        # hooks, e.g. via dump_data_sources() below.
+        with borgmatic.actions.dump.Dump_cleanup(
+            config, borgmatic_runtime_directory, original_patterns, global_arguments.dry_run
+        ):
+            active_dumps = borgmatic.hooks.dispatch.call_hooks(
+                'dump_data_sources',
+                config,
+                borgmatic.hooks.dispatch.Hook_type.DATA_SOURCE,
+                config_paths,
+                borgmatic_runtime_directory,
+                patterns,
+                global_arguments.dry_run,
+            )
+            spool_data_source_dumps(
+                [process for processes in active_dumps.values() for process in processes],
+                borgmatic_runtime_directory,
+            )
+
+            patterns = pattern.process_patterns(
+                patterns,
+                config,
+                working_directory,
+                borgmatic_runtime_directory,
+                skip_expand_paths=config_paths,
+            )
+
+            # Build the create flags (and validate the planned paths) once for all repositories.
+            (base_create_flags, _, patterns_file) = borgmatic.borg.create.make_base_create_command(
+                global_arguments.dry_run,
+                repositories[0]['path'],
+                config,
+                patterns,
+                local_borg_version,
+                global_arguments,
+                borgmatic_runtime_directory,
+                local_path=local_path,
+                remote_path=remote_path,
+                json=create_arguments.json,
+                comment=create_arguments.comment,
+            )
+
+            # Run the creates on their own pool rather than borgmatic's shared command pool, which
+            # is meant for short probes and shouldn't get tied up by long-running creates.
+            executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=len(repositories), thread_name_prefix='borgmatic-create'
+            )
+
+            try:
+                create_futures = {
+                    repository['path']: executor.submit(
+                        contextvars.copy_context().run,
+                        create_repository_archive,
+                        repository,
+                        config,
+                        patterns,
+                        local_borg_version,
+                        create_arguments,
+                        global_arguments,
+                        borgmatic_runtime_directory,
+                        local_path,
+                        remote_path,
+                        base_create_flags,
+                    )
+                    for repository in repositories
+                }
+            finally:
+                executor.shutdown()
+
+            # The patterns file only needs to stick around until all of the creates finish.
+            if patterns_file:
+                patterns_file.close()
+
+    return create_futures
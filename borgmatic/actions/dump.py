@@ -1,5 +1,13 @@
+import threading
+
+import borgmatic.config.paths
 import borgmatic.hooks.dispatch
 
+# Btrfs snapshots live at a fixed path within each snapshotted subvolume, so two concurrent runs
+# within this process dumping (and therefore snapshotting) the same subvolume at once would clobber
+# each other's snapshots. See Dump_cleanup below.
+BTRFS_SNAPSHOT_LOCK = threading.Lock()
+
 
 class Dump_cleanup:
     '''
@@ -8,6 +16,9 @@ class Dump_cleanup:
     prevent future dumping from working (in the case of filesystem snapshots) or cause Borg hangs
     (in the case of database dump named pipes).
 
+    If the Btrfs hook is configured and concurrency is enabled, then also hold a lock for the
+    duration, so that only one thread at a time has Btrfs snapshots in play.
+
     Example use as a context manager:
 
         with borgmatic.actions.dump.Dump_cleanup(
@@ -25,29 +36,48 @@ class Dump_cleanup:
         self.borgmatic_runtime_directory = borgmatic_runtime_directory
         self.patterns = patterns
         self.dry_run = dry_run
+        self.lock = (
+            BTRFS_SNAPSHOT_LOCK
+            if config.get('btrfs') is not None
+            and borgmatic.config.paths.concurrency_enabled(config)
+            else None
+        )
 
     def __enter__(self):
         '''
         Remove all data source dumps that exist prior to the wrapped code running.
         '''
-        borgmatic.hooks.dispatch.call_hooks_even_if_unconfigured(
-            'remove_data_source_dumps',
-            self.config,
-            borgmatic.hooks.dispatch.Hook_type.DATA_SOURCE,
-            self.borgmatic_runtime_directory,
-            self.patterns,
-            self.dry_run,
-        )
+        if self.lock:
+            self.lock.acquire()
+
+        try:
+            borgmatic.hooks.dispatch.call_hooks_even_if_unconfigured(
+                'remove_data_source_dumps',
+                self.config,
+                borgmatic.hooks.dispatch.Hook_type.DATA_SOURCE,
+                self.borgmatic_runtime_directory,
+                self.patterns,
+                self.dry_run,
+            )
+        except BaseException:
+            if self.lock:
+                self.lock.release()
+
+            raise
 
     def __exit__(self, exception_type, exception, traceback):
         '''
         Remove all data source dumps, including any created by the wrapped code.
         '''
-        borgmatic.hooks.dispatch.call_hooks_even_if_unconfigured(
-            'remove_data_source_dumps',
-            self.config,
-            borgmatic.hooks.dispatch.Hook_type.DATA_SOURCE,
-            self.borgmatic_runtime_directory,
-            self.patterns,
-            self.dry_run,
-        )
+        try:
+            borgmatic.hooks.dispatch.call_hooks_even_if_unconfigured(
+                'remove_data_source_dumps',
+                self.config,
+                borgmatic.hooks.dispatch.Hook_type.DATA_SOURCE,
+                self.borgmatic_runtime_directory,
+                self.patterns,
+                self.dry_run,
+            )
+        finally:
+            if self.lock:
+                self.lock.release()
@@ -1,10 +1,15 @@
+import collections
 import glob
+import hashlib
 import itertools
+import json
 import logging
 import os
 import pathlib
+import time
 
 import borgmatic.borg.pattern
+import borgmatic.config.paths
 
 logger = logging.getLogger(__name__)
 
@@ -43,9 +48,14 @@ def collect_patterns(config, working_directory):
     The idea is that Borg has all these different ways of specifying includes, excludes, source
     directories, etc., but we'd like to collapse them all down to one common format (patterns) for
     ease of manipulation within borgmatic.
+
+    Unless the "cache_patterns" option is false, read pattern files and expand their globs via a
+    Pattern_cache, so unchanged pattern files don't get reread.
     '''
+    pattern_cache = make_pattern_cache(config, working_directory)
+
     try:
-        return (
+        patterns = (
             tuple(
                 borgmatic.borg.pattern.Pattern(
                     source_directory,
@@ -69,8 +79,8 @@ def collect_patterns(config, working_directory):
             + tuple(
                 parse_pattern(pattern_line.strip())
                 for filename in config.get('patterns_from', ())
-                for expanded_path in expand_directory(filename, working_directory)
-                for pattern_line in open(expanded_path, encoding='utf-8')
+                for expanded_path in expand_directory(filename, working_directory, pattern_cache)
+                for pattern_line in read_pattern_file_lines(expanded_path, pattern_cache)
                 if not pattern_line.lstrip().startswith('#')
                 if pattern_line.strip()
             )
@@ -80,8 +90,8 @@ def collect_patterns(config, working_directory):
                     borgmatic.borg.pattern.Pattern_style.FNMATCH,
                 )
                 for filename in config.get('exclude_from', ())
-                for expanded_path in expand_directory(filename, working_directory)
-                for exclude_line in open(expanded_path, encoding='utf-8')
+                for expanded_path in expand_directory(filename, working_directory, pattern_cache)
+                for exclude_line in read_pattern_file_lines(expanded_path, pattern_cache)
                 if not exclude_line.lstrip().startswith('#')
                 if exclude_line.strip()
             )
@@ -91,20 +101,270 @@ def collect_patterns(config, working_directory):
 
         raise ValueError(f'Cannot read patterns_from/exclude_from file: {error.filename}')
 
+    if pattern_cache:
+        pattern_cache.save()
+
+    return patterns
+
+
+def read_pattern_file_lines(path, pattern_cache=None):
+    '''
+    Given the path of a pattern file and an optional Pattern_cache, return the lines of the file as
+    a list of strings. Raise OSError if the file can't be read.
+    '''
+    if pattern_cache:
+        return pattern_cache.read_lines(path)
+
+    with open(path, encoding='utf-8') as pattern_file:
+        return pattern_file.read().splitlines()
+
+
+# The options that determine which pattern files get read and which globs get expanded.
+PATTERN_OPTION_NAMES = (
+    'source_directories',
+    'patterns',
+    'exclude_patterns',
+    'patterns_from',
+    'exclude_from',
+)
+
+
+def make_pattern_cache_path(config, working_directory):
+    '''
+    Given a configuration dict and the working directory, return the path of the pattern cache for
+    the configuration's pattern options. It's located in the borgmatic state directory and named for
+    a hash of those options, so configuration files with differing patterns get separate caches.
+    '''
+    return os.path.join(
+        borgmatic.config.paths.get_borgmatic_state_directory(config),
+        'patterns',
+        hashlib.sha256(
+            json.dumps(
+                [working_directory]
+                + [config.get(option_name) for option_name in PATTERN_OPTION_NAMES]
+            ).encode('utf-8')
+        ).hexdigest()
+        + '.json',
+    )
+
+
+def make_pattern_cache(config, working_directory):
+    '''
+    Given a configuration dict and the working directory, return a Pattern_cache for them—or None if
+    the "cache_patterns" option is false.
+    '''
+    if not config.get('cache_patterns', True):
+        return None
+
+    return Pattern_cache(make_pattern_cache_path(config, working_directory))
+
+
+def read_pattern_cache(path):
+    '''
+    Return the dict stored in the pattern cache at the given path. Return an empty dict if the path
+    doesn't exist or can't be read or parsed.
+    '''
+    try:
+        with open(path, encoding='utf-8') as cache_file:
+            cache = json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+
+    return cache if isinstance(cache, dict) else {}
+
+
+def write_pattern_cache(path, cache):
+    '''
+    Write the given dict to the pattern cache at the given path, atomically. Log and otherwise
+    ignore any errors writing the file, as the cache is merely an optimization.
+    '''
+    try:
+        borgmatic.config.paths.write_file_atomically(path, json.dumps(cache, separators=(',', ':')))
+    except OSError as error:
+        logger.debug(f'Cannot write pattern cache at {path}: {error}')
+
+
+def get_directory_times(path):
+    '''
+    Given a directory path, return its modification and change times in nanoseconds as a list. Or
+    return None if the directory can't be stat()ed.
+    '''
+    try:
+        status = os.stat(path)
+    except OSError:
+        return None
+
+    return [status.st_mtime_ns, status.st_ctime_ns]
+
+
+def glob_cacheable(path):
+    '''
+    Given a path, return whether Pattern_cache can cache the results of globbing it: It has to be
+    absolute (so it doesn't depend on the current directory) and contain globs. And it can't contain
+    empty path components, which glob_with_directories() doesn't reproduce.
+    '''
+    return bool(
+        os.path.isabs(path) and glob.has_magic(path) and '//' not in path and not path.endswith('/')
+    )
+
+
+def glob_with_directories(path):
+    '''
+    Given an absolute path containing globs, expand it the way that glob.glob() does, but one path
+    component at a time so as to know which directories got looked in. Return a tuple of (the list
+    of matching paths, a dict from each directory path looked in to its times as per
+    get_directory_times()). If a directory can't be stat()ed along the way, return None instead of
+    the dict.
+    '''
+    components = path.split(os.path.sep)[1:]
+    directories = {}
+    current_paths = [os.path.sep]
+
+    for index, component in enumerate(components):
+        last_component = index == len(components) - 1
+        matching_paths = []
+
+        for directory in current_paths:
+            times = get_directory_times(directory)
+
+            if times is None:
+                return (glob.glob(path), None)
+
+            directories[directory] = times
+
+            # Only directories can have further components matched within them.
+            matching_paths.extend(
+                matching_path
+                for matching_path in glob.glob(os.path.join(glob.escape(directory), component))
+                if last_component or os.path.isdir(matching_path)
+            )
+
+        current_paths = matching_paths
+
+    return (current_paths, directories)
+
+
+# Don't cache a pattern file or glob whose file or directories changed this recently, because they
+# could change again within the same timestamp granularity without their timestamps changing.
+MINIMUM_CACHED_PATH_AGE_NANOSECONDS = 2_000_000_000
+
 
-def expand_directory(directory, working_directory):
+class Pattern_cache:
+    '''
+    A cache of the lines in each pattern file and the paths matched by each glob, stored in the
+    borgmatic state directory so that processing the same patterns again—for another repository,
+    another action like the spot check, or a subsequent borgmatic run—can skip redundant work.
+
+    A pattern file's cached lines are stamped with the file's modification time, change time, size,
+    and inode number, and the file gets reread if any of those differ. A glob's cached paths are
+    stamped with the modification and change times of every directory the glob looked in. Adding,
+    removing, or renaming an entry in a directory updates those times, so a glob only gets expanded
+    again if one of its directories has changed. Checking that costs a stat() per directory rather
+    than a listing.
+
+    Concurrent borgmatic threads may each use their own instance with the same cache file, as it's
+    written atomically.
+    '''
+
+    def __init__(self, path):
+        '''
+        Given the path of the cache file, load any previously stored cache from it.
+        '''
+        self.path = path
+        cache = read_pattern_cache(path)
+        self.pattern_files = dict(cache.get('pattern_files') or {})
+        self.globs = dict(cache.get('globs') or {})
+        self.changed = False
+        self.start_time_ns = time.time_ns()
+
+    def changed_too_recently(self, times):
+        '''
+        Given a sequence of times in nanoseconds, return whether any of them is too recent for the
+        cache to trust, because the corresponding file could change again within the same timestamp
+        granularity without its times changing.
+        '''
+        return self.start_time_ns - max(times) < MINIMUM_CACHED_PATH_AGE_NANOSECONDS
+
+    def read_lines(self, path):
+        '''
+        Given the path of a pattern file, return its lines as a list of strings, reading the file
+        only if it has changed since its lines were cached. Raise OSError if the file can't be read.
+        '''
+        full_path = os.path.abspath(path)
+        status = os.stat(full_path)
+        stamp = [status.st_mtime_ns, status.st_ctime_ns, status.st_size, status.st_ino]
+        record = self.pattern_files.get(full_path)
+
+        if record and record[:4] == stamp:
+            return record[4]
+
+        with open(path, encoding='utf-8') as pattern_file:
+            lines = pattern_file.read().splitlines()
+
+        if not self.changed_too_recently(stamp[:2]):
+            self.pattern_files[full_path] = [*stamp, lines]
+            self.changed = True
+
+        return lines
+
+    def glob(self, path):
+        '''
+        Given a path that may contain globs, return the list of paths matching it as per
+        glob.glob(), expanding the globs only if the directories they looked in have changed since
+        the matching paths were cached.
+        '''
+        if not glob_cacheable(path):
+            return glob.glob(path)
+
+        record = self.globs.get(path)
+
+        if record and all(
+            get_directory_times(directory) == times for directory, times in record[1].items()
+        ):
+            return list(record[0])
+
+        (paths, directories) = glob_with_directories(path)
+
+        if directories is not None and not any(
+            self.changed_too_recently(times) for times in directories.values()
+        ):
+            self.globs[path] = [paths, directories]
+            self.changed = True
+        elif record:
+            del self.globs[path]
+            self.changed = True
+
+        return paths
+
+    def save(self):
+        '''
+        Write the cache file, but only if anything has changed since it was loaded.
+        '''
+        if not self.changed:
+            return
+
+        write_pattern_cache(self.path, {'pattern_files': self.pattern_files, 'globs': self.globs})
+        self.changed = False
+
+
+def expand_directory(directory, working_directory, pattern_cache=None):
     '''
     Given a directory path, expand any tilde (representing a user's home directory) and any globs
     therein. Return a list of one or more resulting paths.
 
-    Take into account the given working directory so that relative paths are supported.
+    Take into account the given working directory so that relative paths are supported. And if a
+    Pattern_cache is given, expand globs via it.
     '''
     expanded_directory = os.path.expanduser(directory)
 
     # This would be a lot easier to do with glob(..., root_dir=working_directory), but root_dir is
     # only available in Python 3.10+.
     normalized_directory = os.path.join(working_directory or '', expanded_directory)
-    glob_paths = glob.glob(normalized_directory)
+    glob_paths = (
+        pattern_cache.glob(normalized_directory)
+        if pattern_cache
+        else glob.glob(normalized_directory)
+    )
 
     if not glob_paths:
         return [expanded_directory]
@@ -124,7 +384,7 @@ def expand_directory(directory, working_directory):
     ]
 
 
-def expand_patterns(patterns, working_directory=None, skip_paths=None):
+def expand_patterns(patterns, working_directory=None, skip_paths=None, pattern_cache=None):
     '''
     Given a sequence of borgmatic.borg.pattern.Pattern instances and an optional working directory,
     expand tildes and globs in each root pattern and expand just tildes in each non-root pattern.
@@ -133,7 +393,8 @@ def expand_patterns(patterns, working_directory=None, skip_paths=None):
 
     Return all the resulting patterns as a tuple.
 
-    If a set of paths are given to skip, then don't expand any patterns matching them.
+    If a set of paths are given to skip, then don't expand any patterns matching them. And if a
+    Pattern_cache is given, expand globs via it.
     '''
     if patterns is None:
         return ()
@@ -149,7 +410,9 @@ def expand_patterns(patterns, working_directory=None, skip_paths=None):
                         pattern.device,
                         pattern.source,
                     )
-                    for expanded_path in expand_directory(pattern.path, working_directory)
+                    for expanded_path in expand_directory(
+                        pattern.path, working_directory, pattern_cache
+                    )
                 )
                 if pattern.type == borgmatic.borg.pattern.Pattern_type.ROOT
                 and pattern.path not in (skip_paths or ())
@@ -168,29 +431,45 @@ def expand_patterns(patterns, working_directory=None, skip_paths=None):
     )
 
 
-def get_existent_path_or_parent(path):
+def get_path_device(path, devices):
     '''
-    Given a path, return it if it exists. Otherwise, return the longest parent directory of the path
-    that exists. Return None if none of these paths exist.
+    Given a path and a dict from path to device identifier for paths looked up so far, return the
+    device identifier of the path if it exists. Otherwise, return the device identifier of the
+    longest parent directory of the path that exists. Return None if none of these paths exist.
+
+    This is used below for finding the device of an existent path prefix of a pattern's path, which
+    is necessary if the path contain globs or other special characters that we don't want to try to
+    interpret (because we want to leave that responsibility to Borg).
 
-    This is used below for finding an existent path prefix of pattern's path, which is necessary if
-    the path contain globs or other special characters that we don't want to try to interpret
-    (because we want to leave that responsibility to Borg).
+    Record the result for the path and for any parents looked up along the way in the given dict.
+    That way, looking up many paths with parents in common only stats each parent once.
     '''
     if path.startswith('/e2e/'):
         return None
 
-    try:
-        return next(
-            candidate_path
-            for candidate_path in (
-                path,
-                *tuple(str(parent) for parent in pathlib.PurePath(path).parents),
-            )
-            if os.path.exists(candidate_path)
-        )
-    except StopIteration:
-        return None
+    looked_up_paths = []
+    device = None
+
+    for candidate_path in itertools.chain(
+        (path,), (str(parent) for parent in pathlib.PurePath(path).parents)
+    ):
+        if candidate_path in devices:
+            device = devices[candidate_path]
+            break
+
+        looked_up_paths.append(candidate_path)
+
+        try:
+            device = os.stat(candidate_path).st_dev
+        except (OSError, ValueError):
+            continue
+
+        break
+
+    for looked_up_path in looked_up_paths:
+        devices[looked_up_path] = device
+
+    return device
 
 
 def device_map_patterns(patterns, working_directory=None):
@@ -213,20 +492,20 @@ def device_map_patterns(patterns, working_directory=None):
     The one exception is that if a regular expression pattern path starts with "^", that will get
     stripped off for purposes of determining its device.
     '''
+    devices = {}
+
     return tuple(
         borgmatic.borg.pattern.Pattern(
             pattern.path,
             pattern.type,
             pattern.style,
-            device=pattern.device or (os.stat(existent_path).st_dev if existent_path else None),
+            device=pattern.device
+            or get_path_device(
+                os.path.join(working_directory or '', pattern.path.lstrip('^')), devices
+            ),
             source=pattern.source,
         )
         for pattern in patterns
-        for existent_path in (
-            get_existent_path_or_parent(
-                os.path.join(working_directory or '', pattern.path.lstrip('^')),
-            ),
-        )
     )
 
 
@@ -257,21 +536,37 @@ def deduplicate_runtime_directory_patterns(patterns, config, borgmatic_runtime_d
 
     And for the case of named pipes outside of the borgmatic runtime directory, there is code
     elsewhere (in the "create" action) that auto-excludes special files to prevent Borg hangs.
+
+    Because only root patterns containing the runtime directory can be duplicates, and all such
+    patterns lie along the runtime directory's chain of parents, index just those patterns by path.
+    Then each pattern only gets compared against the patterns at its own parent paths, so this
+    takes time linear in the number of patterns.
     '''
     if borgmatic_runtime_directory is None:
         return patterns
 
-    deduplicated = {}  # Use just the keys as an ordered set.
-    runtime_directory_parents = set(pathlib.PurePath(borgmatic_runtime_directory).parents).union(
-        {pathlib.PurePath(borgmatic_runtime_directory)}
-    )
+    runtime_directory_path = pathlib.PurePosixPath(borgmatic_runtime_directory)
+    runtime_directory_parents = {runtime_directory_path, *runtime_directory_path.parents}
+    containing_patterns = collections.defaultdict(list)
 
     for pattern in patterns:
         if pattern.type != borgmatic.borg.pattern.Pattern_type.ROOT:
-            deduplicated[pattern] = True
             continue
 
-        pattern_parents = pathlib.PurePath(pattern.path).parents
+        pattern_path = pathlib.PurePosixPath(pattern.path)
+
+        if pattern_path in runtime_directory_parents:
+            containing_patterns[pattern_path].append(pattern)
+
+    deduplicated = {}  # Use just the keys as an ordered set.
+    one_file_system = config.get('one_file_system') is True
+
+    for pattern in patterns:
+        pattern_path = (
+            pathlib.PurePosixPath(pattern.path)
+            if pattern.type == borgmatic.borg.pattern.Pattern_type.ROOT
+            else None
+        )
 
         # If:
         #
@@ -280,23 +575,18 @@ def deduplicate_runtime_directory_patterns(patterns, config, borgmatic_runtime_d
         #   3. and both patterns are on the same filesystem (or one_file_system is not set)
         #
         # ... then consider the current pattern as a duplicate.
-        for other_pattern in patterns:
-            if other_pattern.type != borgmatic.borg.pattern.Pattern_type.ROOT:
-                continue
-
-            device_matches = pattern.device is not None and (
-                other_pattern.device == pattern.device or config.get('one_file_system') is not True
+        if (
+            pattern_path in containing_patterns
+            and pattern.device is not None
+            and any(
+                not one_file_system or other_pattern.device == pattern.device
+                for parent_path in pattern_path.parents
+                for other_pattern in containing_patterns.get(parent_path, ())
             )
+        ):
+            continue
 
-            if (
-                pathlib.PurePath(other_pattern.path) in pattern_parents
-                and pathlib.PurePosixPath(other_pattern.path) in runtime_directory_parents
-                and pathlib.PurePosixPath(pattern.path) in runtime_directory_parents
-                and device_matches
-            ):
-                break
-        else:
-            deduplicated[pattern] = True
+        deduplicated[pattern] = True
 
     return tuple(deduplicated.keys())
 
@@ -312,19 +602,28 @@ def process_patterns(
     If the borgmatic runtime directory is None, then don't deduplicate patterns. Deduplication is
     really only necessary for the "create" action when the runtime directory might contain named
     pipes for database dumps.
+
+    Unless the "cache_patterns" option is false, expand globs via a Pattern_cache.
     '''
     skip_paths = set(skip_expand_paths or ())
+    pattern_cache = make_pattern_cache(config, working_directory)
 
-    return list(
+    processed_patterns = list(
         deduplicate_runtime_directory_patterns(
             device_map_patterns(
                 expand_patterns(
                     patterns,
                     working_directory=working_directory,
                     skip_paths=skip_paths,
+                    pattern_cache=pattern_cache,
                 ),
             ),
             config,
             borgmatic_runtime_directory,
         ),
     )
+
+    if pattern_cache:
+        pattern_cache.save()
+
+    return processed_patterns
@@ -1,3 +1,4 @@
+import itertools
 import logging
 import os
 import pathlib
@@ -6,6 +7,7 @@ import stat
 import textwrap
 
 import borgmatic.borg.pattern
+import borgmatic.borg.plan
 import borgmatic.config.paths
 import borgmatic.logger
 from borgmatic.borg import environment, feature, flags
@@ -45,30 +47,13 @@ def any_parent_directories(path, candidate_parents):
     return False
 
 
-def validate_planned_backup_paths(
-    dry_run,
-    create_command,
-    config,
-    patterns,
-    local_path,
-    working_directory,
-    borgmatic_runtime_directory,
-    find_special_files=False,
-):
+def get_borg_planned_paths(create_command, config, local_path, working_directory):
     '''
-    Given a dry-run flag, a Borg create command as a tuple, a configuration dict, a local Borg path,
-    a working directory, and the borgmatic runtime directory, perform a "borg create --dry-run" to
-    determine whether Borg's planned paths to include in a backup look good. Specifically, if the
-    given runtime directory exists, validate that it will be included in a backup and hasn't been
-    excluded.
-
-    If find special files is True, then return the subset of planned backup paths that are special
-    files. Otherwise, return an empty tuple.
-
-    Raise ValueError if the runtime directory has been excluded via "exclude_patterns" or similar,
-    because any features that rely on the runtime directory getting backed up will break. For
-    instance, without the runtime directory, Borg can't consume any database dumps and borgmatic may
-    hang waiting for them to be consumed.
+    Given a Borg create command as a tuple, a configuration dict, a local Borg path, and a working
+    directory, perform a "borg create --dry-run --list" and yield a
+    borgmatic.borg.plan.Planned_path for each individual file that Borg is planning to back up. Its
+    special and regular file values are always None, because Borg's output doesn't indicate the
+    type of a path.
     '''
     # Omit "--exclude-nodump" from the Borg dry run command, because that flag causes Borg to open
     # files including any named pipe we've created. And omit "--filter" because that can break the
@@ -92,14 +77,43 @@ def validate_planned_backup_paths(
         borg_exit_codes=config.get('borg_exit_codes'),
     )
 
-    # These are all the individual files that Borg is planning to backup as determined by the Borg
-    # create dry run above.
-    paths = (
-        path_line.split(' ', 1)[1]
+    return (
+        borgmatic.borg.plan.Planned_path(
+            path_line.split(' ', 1)[1], special=None, regular_file=None
+        )
         for path_line in path_lines
         if path_line and path_line.startswith(('- ', '+ '))
     )
 
+
+def validate_planned_backup_paths(
+    dry_run,
+    create_command,
+    config,
+    patterns,
+    local_path,
+    working_directory,
+    borgmatic_runtime_directory,
+    find_special_files=False,
+):
+    '''
+    Given a dry-run flag, a Borg create command as a tuple, a configuration dict, a local Borg path,
+    a working directory, and the borgmatic runtime directory, determine whether Borg's planned paths
+    to include in a backup look good. Specifically, if the given runtime directory exists, validate
+    that it will be included in a backup and hasn't been excluded.
+
+    By default, perform a "borg create --dry-run" to plan the paths. But if the
+    "validate_paths_with_borg" option is set to false, plan them instead by walking the filesystem
+    natively and evaluating the patterns the way Borg would (an experimental optimization).
+
+    If find special files is True, then return the subset of planned backup paths that are special
+    files. Otherwise, return an empty tuple.
+
+    Raise ValueError if the runtime directory has been excluded via "exclude_patterns" or similar,
+    because any features that rely on the runtime directory getting backed up will break. For
+    instance, without the runtime directory, Borg can't consume any database dumps and borgmatic may
+    hang waiting for them to be consumed.
+    '''
     include_pattern_paths = {
         pattern.path
         for pattern in patterns
@@ -123,27 +137,81 @@ def validate_planned_backup_paths(
     )
     runtime_directory_in_path = False
 
+    validate_with_borg = config.get('validate_paths_with_borg', True)
+    special_file_index = None
+
+    if validate_with_borg:
+        # These are all the individual files that Borg is planning to backup as determined by the
+        # Borg create dry run.
+        paths = get_borg_planned_paths(create_command, config, local_path, working_directory)
+    else:
+        special_file_index = (
+            borgmatic.borg.plan.Special_file_index(
+                borgmatic.borg.plan.make_special_file_index_path(
+                    config, patterns, working_directory
+                )
+            )
+            if find_special_files and config.get('cache_special_files', True)
+            else None
+        )
+
+        # Walk the runtime directory's root patterns separately from looking for special files,
+        # because a special file index means that not all planned paths get yielded by the latter.
+        paths = itertools.chain(
+            (
+                borgmatic.borg.plan.get_planned_paths(
+                    patterns,
+                    config,
+                    working_directory,
+                    root_paths={pattern.path for pattern in runtime_directory_root_patterns},
+                )
+                if validate_runtime_directory
+                else ()
+            ),
+            (
+                borgmatic.borg.plan.get_planned_paths(
+                    patterns,
+                    config,
+                    working_directory,
+                    special_file_index=special_file_index,
+                )
+                if find_special_files
+                else ()
+            ),
+        )
+
     # Do everything in this one loop because we only want to consume the paths generator once.
-    for path in paths:
+    for path, special, _ in paths:
         # If all root patterns in the runtime directory are missing from the paths Borg is planning
         # to backup, then they must've gotten excluded, e.g. by user-configured excludes. Warn
         # accordingly (below).
-        if validate_runtime_directory and any(
-            any_parent_directories(path, (pattern.path,))
-            for pattern in runtime_directory_root_patterns
+        if (
+            validate_runtime_directory
+            and not runtime_directory_in_path
+            and any(
+                any_parent_directories(path, (pattern.path,))
+                for pattern in runtime_directory_root_patterns
+            )
         ):
             runtime_directory_in_path = True
 
+            # There's no need to walk any further, but let a Borg dry run finish on its own.
+            if not find_special_files and not validate_with_borg:
+                break
+
         # Return the subset of output paths that are special files but *not* contained within the
         # borgmatic runtime directory. The intent is to skip runtime paths that borgmatic uses for its
         # own bookkeeping, instead focusing on user-configured paths.
         if (
             find_special_files
             and not any_parent_directories(path, (borgmatic_runtime_directory,))
-            and special_file(path, working_directory)
+            and (special_file(path, working_directory) if special is None else special)
         ):
             special_paths.append(path)
 
+    if special_file_index is not None:
+        special_file_index.save()
+
     if validate_runtime_directory and not runtime_directory_in_path:
         logger.warning(
             f'The runtime directory {os.path.normpath(borgmatic_runtime_directory)} overlaps with the configured excludes (or the snapshotted source directories are empty). Please ensure the runtime directory is not excluded.'
@@ -155,6 +223,26 @@ def validate_planned_backup_paths(
 MAX_SPECIAL_FILE_PATHS_LENGTH = 1000
 
 
+def make_create_positional_arguments(
+    repository_path, config, local_borg_version, archive_suffix=''
+):
+    '''
+    Given a local or remote repository path, a configuration dict, the local Borg version, and a
+    string suffix to add to the archive name, return the Borg create command positional arguments
+    (as a tuple) for the repository and archive.
+    '''
+    archive_name_format = (
+        config.get('archive_name_format', flags.get_default_archive_name_format(local_borg_version))
+        + archive_suffix
+    )
+
+    return flags.make_repository_archive_flags(
+        repository_path,
+        archive_name_format,
+        local_borg_version,
+    )
+
+
 def make_base_create_command(  # noqa: PLR0912
     dry_run,
     repository_path,
@@ -199,10 +287,6 @@ def make_base_create_command(  # noqa: PLR0912
     list_filter_flags = flags.make_list_filter_flags(local_borg_version, dry_run)
     files_changed = config.get('files_changed')
     files_cache = config.get('files_cache')
-    archive_name_format = (
-        config.get('archive_name_format', flags.get_default_archive_name_format(local_borg_version))
-        + archive_suffix
-    )
     extra_borg_options = config.get('extra_borg_options', {}).get('create', '')
 
     if feature.available(feature.Feature.ATIME, local_borg_version):
@@ -263,10 +347,8 @@ def make_base_create_command(  # noqa: PLR0912
         + (tuple(shlex.split(extra_borg_options)) if extra_borg_options else ())
     )
 
-    create_positional_arguments = flags.make_repository_archive_flags(
-        repository_path,
-        archive_name_format,
-        local_borg_version,
+    create_positional_arguments = make_create_positional_arguments(
+        repository_path, config, local_borg_version, archive_suffix
     )
     working_directory = borgmatic.config.paths.get_working_directory(config)
 
@@ -306,12 +388,15 @@ def make_base_create_command(  # noqa: PLR0912
         logger.warning(
             f'Excluding special files to prevent Borg from hanging: {truncated_special_file_paths}',
         )
+
+        # Exclude special files by full path ("pf:"). Borg looks those up in a dict rather than
+        # matching each one against every file, and they take precedence over other patterns.
         patterns_file = borgmatic.borg.pattern.write_patterns_file(
             tuple(
                 borgmatic.borg.pattern.Pattern(
                     special_file_path,
                     borgmatic.borg.pattern.Pattern_type.NO_RECURSE,
-                    borgmatic.borg.pattern.Pattern_style.FNMATCH,
+                    borgmatic.borg.pattern.Pattern_style.PATH_FULL_MATCH,
                     source=borgmatic.borg.pattern.Pattern_source.INTERNAL,
                 )
                 for special_file_path in special_file_paths
@@ -340,6 +425,7 @@ def create_archive(
     json=False,
     comment=None,
     stream_processes=None,
+    base_create_flags=None,
 ):
     '''
     Given verbosity/dry-run flags, a local or remote repository path, a configuration dict, a
@@ -351,26 +437,37 @@ def create_archive(
 
     If a sequence of stream processes is given (instances of subprocess.Popen), then execute the
     create command while also triggering the given processes to produce output.
+
+    If base create flags are given, as returned by make_base_create_command() for the same
+    arguments but a different repository, then use them instead of building them again. That skips
+    the pre-backup path validation as well, because the planned paths don't depend on the
+    repository. It's up to the caller to keep the flags' patterns file open meanwhile.
     '''
     borgmatic.logger.add_custom_log_levels()
 
     working_directory = borgmatic.config.paths.get_working_directory(config)
 
-    (create_flags, create_positional_arguments, _) = make_base_create_command(
-        dry_run,
-        repository_path,
-        config,
-        patterns,
-        local_borg_version,
-        global_arguments,
-        borgmatic_runtime_directory,
-        archive_suffix,
-        local_path,
-        remote_path,
-        json,
-        comment,
-        stream_processes,
-    )
+    if base_create_flags is None:
+        (create_flags, create_positional_arguments, _) = make_base_create_command(
+            dry_run,
+            repository_path,
+            config,
+            patterns,
+            local_borg_version,
+            global_arguments,
+            borgmatic_runtime_directory,
+            archive_suffix,
+            local_path,
+            remote_path,
+            json,
+            comment,
+            stream_processes,
+        )
+    else:
+        create_flags = base_create_flags
+        create_positional_arguments = make_create_positional_arguments(
+            repository_path, config, local_borg_version, archive_suffix
+        )
 
     if json:
         output_log_level = None
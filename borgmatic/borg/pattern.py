@@ -1,7 +1,10 @@
 import collections
 import enum
+import itertools
 import logging
 import os
+import pathlib
+import re
 import tempfile
 
 logger = logging.getLogger(__name__)
@@ -55,11 +58,146 @@ Pattern = collections.namedtuple(
 )
 
 
+# Characters that make an fnmatch pattern more than just a literal path.
+FNMATCH_SPECIAL_CHARACTERS = frozenset('*?[')
+
+# The fewest consecutive sibling excludes worth collapsing into a single regular expression pattern.
+MINIMUM_COLLAPSED_EXCLUDES = 2
+
+
+def get_excluded_prefix(pattern):
+    '''
+    Given a Pattern instance, if it's an exclude pattern that matches exactly one path and everything
+    within that path, return the path normalized the way Borg does it (without a leading path
+    separator). Otherwise, return None.
+    '''
+    if pattern.type not in (Pattern_type.EXCLUDE, Pattern_type.NO_RECURSE):
+        return None
+
+    if pattern.style == Pattern_style.FNMATCH:
+        if FNMATCH_SPECIAL_CHARACTERS.intersection(pattern.path) or pattern.path.endswith(
+            os.path.sep
+        ):
+            return None
+    elif pattern.style != Pattern_style.PATH_PREFIX:
+        return None
+
+    prefix = os.path.normpath(pattern.path).lstrip(os.path.sep)
+
+    return prefix if prefix not in ('', '.') else None
+
+
+def get_sibling_key(pattern):
+    '''
+    Given a Pattern instance, return a tuple of (pattern type, parent directory of the excluded path)
+    if it's an exclude pattern as per get_excluded_prefix(). Otherwise, return None.
+    '''
+    prefix = get_excluded_prefix(pattern)
+
+    if prefix is None:
+        return None
+
+    return (pattern.type, os.path.dirname(prefix))
+
+
+def collapse_sibling_excludes(patterns):
+    '''
+    Given a sequence of Pattern instances, collapse each run of consecutive exclude patterns with the
+    same type and for paths within the same parent directory into a single regular expression
+    pattern matching all of those paths and everything within them. Return the resulting patterns as
+    a list.
+
+    Borg uses the first pattern that matches, so a run of patterns with the same type matches the
+    same paths with the same outcome as one pattern matching any of them.
+    '''
+    collapsed_patterns = []
+
+    for sibling_key, sibling_group in itertools.groupby(patterns, key=get_sibling_key):
+        sibling_patterns = list(sibling_group)
+
+        if sibling_key is None or len(sibling_patterns) < MINIMUM_COLLAPSED_EXCLUDES:
+            collapsed_patterns.extend(sibling_patterns)
+            continue
+
+        (pattern_type, parent_path) = sibling_key
+        names = '|'.join(
+            re.escape(os.path.basename(get_excluded_prefix(pattern)))
+            for pattern in sibling_patterns
+        )
+        parent_expression = re.escape(os.path.join(parent_path, '')) if parent_path else ''
+
+        collapsed_patterns.append(
+            Pattern(
+                f'^{parent_expression}(?:{names})(?:/|\\Z)',
+                pattern_type,
+                Pattern_style.REGULAR_EXPRESSION,
+                source=sibling_patterns[0].source,
+            )
+        )
+
+    return collapsed_patterns
+
+
+def compact_patterns(patterns):
+    '''
+    Given a sequence of Pattern instances, return them as a list with redundant patterns removed and
+    runs of sibling excludes collapsed—without changing what Borg would back up. Specifically:
+
+      * Drop a pattern identical to an earlier one, unless its meaning depends on a preceding "P"
+        pattern setting the default style.
+      * Drop a full path ("pf:") pattern if a later one has the same path, as Borg only keeps the
+        last of them.
+      * Drop an exclude pattern for a path that an earlier exclude pattern (as per
+        get_excluded_prefix()) already matches, since Borg uses the first pattern that matches.
+      * Collapse sibling excludes as per collapse_sibling_excludes().
+
+    Borg evaluates every remaining non-full-path pattern against every file it comes across, so
+    fewer patterns means less matching work per file.
+    '''
+    last_full_path_indices = {
+        os.path.normpath(pattern.path).lstrip(os.path.sep): index
+        for index, pattern in enumerate(patterns)
+        if pattern.style == Pattern_style.PATH_FULL_MATCH
+    }
+    seen_patterns = set()
+    excluded_prefixes = set()
+    compacted_patterns = []
+
+    for index, pattern in enumerate(patterns):
+        if (
+            pattern.style == Pattern_style.PATH_FULL_MATCH
+            and last_full_path_indices[os.path.normpath(pattern.path).lstrip(os.path.sep)] != index
+        ):
+            continue
+
+        if pattern.style != Pattern_style.NONE or pattern.type == Pattern_type.ROOT:
+            pattern_key = (pattern.type, pattern.style, pattern.path)
+
+            if pattern_key in seen_patterns:
+                continue
+
+            seen_patterns.add(pattern_key)
+
+        prefix = get_excluded_prefix(pattern)
+
+        if prefix is not None:
+            prefix_path = pathlib.PurePosixPath(prefix)
+
+            if any(str(path) in excluded_prefixes for path in (prefix_path, *prefix_path.parents)):
+                continue
+
+            excluded_prefixes.add(prefix)
+
+        compacted_patterns.append(pattern)
+
+    return collapse_sibling_excludes(compacted_patterns)
+
+
 def write_patterns_file(patterns, borgmatic_runtime_directory, patterns_file=None):
     '''
-    Given a sequence of patterns as Pattern instances, write them to a named temporary file in the
-    given borgmatic runtime directory and return the file object so it can continue to exist on disk
-    as long as the caller needs it.
+    Given a sequence of patterns as Pattern instances, compact them as per compact_patterns() and
+    write them to a named temporary file in the given borgmatic runtime directory. Return the file
+    object so it can continue to exist on disk as long as the caller needs it.
 
     If an optional open pattern file is given, append to it instead of making a new temporary file.
     Return None if no patterns are provided.
@@ -67,6 +205,8 @@ def write_patterns_file(patterns, borgmatic_runtime_directory, patterns_file=Non
     if not patterns:
         return None
 
+    patterns = compact_patterns(patterns)
+
     if patterns_file is None:
         patterns_file = tempfile.NamedTemporaryFile(
             'w', dir=borgmatic_runtime_directory, encoding='utf-8'
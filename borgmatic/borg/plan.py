@@ -0,0 +1,788 @@
+import collections
+import concurrent.futures
+import contextvars
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import re
+import stat
+import time
+
+import borgmatic.borg.pattern
+import borgmatic.config.paths
+
+logger = logging.getLogger(__name__)
+
+
+CACHE_DIRECTORY_TAG_NAME = 'CACHEDIR.TAG'
+CACHE_DIRECTORY_TAG_SIGNATURE = b'Signature: 8a477f597d28d172789f06886806bc55'
+
+# Pattern styles where a match on a directory implies a match on everything within it, so a
+# directory excluded by such a pattern can be pruned from the walk entirely.
+PREFIX_MATCHING_PATTERN_STYLES = {
+    borgmatic.borg.pattern.Pattern_style.FNMATCH,
+    borgmatic.borg.pattern.Pattern_style.SHELL,
+    borgmatic.borg.pattern.Pattern_style.PATH_PREFIX,
+}
+
+# A path that Borg would include in a backup, along with whether it's a special file (character
+# device, block device, or named pipe / FIFO) and whether it's a regular file, both following
+# symlinks.
+Planned_path = collections.namedtuple(
+    'Planned_path', ('path', 'special', 'regular_file'), defaults=(False, False)
+)
+
+DEFAULT_DIRECTORY_WALK_WORKERS = 8
+
+
+def translate_character_class(pattern, index):
+    '''
+    Given a Borg shell-style pattern string and the index just past an opening "[" within it,
+    return a tuple of (the regular expression string for the character class starting there, the
+    index just past the end of the character class). If the class is never closed, treat the "[" as
+    a literal character.
+    '''
+    end_index = index
+
+    if end_index < len(pattern) and pattern[end_index] == '!':
+        end_index += 1
+    if end_index < len(pattern) and pattern[end_index] == ']':
+        end_index += 1
+    while end_index < len(pattern) and pattern[end_index] != ']':
+        end_index += 1
+
+    if end_index >= len(pattern):
+        return ('\\[', index)
+
+    character_class = pattern[index:end_index].replace('\\', '\\\\')
+
+    if character_class.startswith('!'):
+        character_class = f'^{character_class[1:]}'
+    elif character_class.startswith('^'):
+        character_class = f'\\{character_class}'
+
+    return (f'[{character_class}]', end_index + 1)
+
+
+def translate_shell_pattern(pattern):
+    '''
+    Given a Borg shell-style ("sh:") pattern string, translate it to a regular expression string
+    the same way that Borg does: "**/" matches zero or more directory levels, "*" matches any
+    characters except a path separator, "?" matches one character except a path separator, and
+    "[...]" matches a character class.
+    '''
+    separator = re.escape(os.path.sep)
+    index = 0
+    translated = ''
+
+    while index < len(pattern):
+        character = pattern[index]
+        index += 1
+
+        if character == '*' and pattern[index : index + 2] == f'*{os.path.sep}':
+            translated += f'(?:[^{separator}]*{separator})*'
+            index += 2
+        elif character == '*':
+            translated += f'[^{separator}]*'
+        elif character == '?':
+            translated += f'[^{separator}]'
+        elif character == '[':
+            (translated_class, index) = translate_character_class(pattern, index)
+            translated += translated_class
+        else:
+            translated += re.escape(character)
+
+    return f'(?ms){translated}\\Z'
+
+
+def make_path_matcher(pattern_path, pattern_style):
+    '''
+    Given a pattern path string and its borgmatic.borg.pattern.Pattern_style, return a function that
+    takes a normalized path without a leading path separator and returns whether the pattern
+    matches it, following Borg's semantics for that pattern style. Full path ("pf:") patterns aren't
+    supported here, because Path_matcher looks those up directly.
+
+    Raise ValueError if the pattern style isn't supported.
+    '''
+    separator = os.path.sep
+
+    if pattern_style == borgmatic.borg.pattern.Pattern_style.REGULAR_EXPRESSION:
+        regular_expression = re.compile(pattern_path)
+
+        return lambda path: regular_expression.search(path) is not None
+
+    normalized_path = os.path.normpath(pattern_path)
+
+    if pattern_style == borgmatic.borg.pattern.Pattern_style.PATH_PREFIX:
+        prefix = (normalized_path.rstrip(separator) + separator).lstrip(separator)
+
+        return lambda path: (path + separator).startswith(prefix)
+
+    if pattern_style == borgmatic.borg.pattern.Pattern_style.FNMATCH:
+        wildcard = f'*{separator}' if pattern_path.endswith(separator) else '*'
+        regular_expression = re.compile(
+            fnmatch.translate(
+                (normalized_path.rstrip(separator) + separator + wildcard).lstrip(separator)
+            )
+        )
+
+        return lambda path: regular_expression.match(path + separator) is not None
+
+    if pattern_style == borgmatic.borg.pattern.Pattern_style.SHELL:
+        regular_expression = re.compile(
+            translate_shell_pattern(
+                (normalized_path.rstrip(separator) + f'{separator}**{separator}').lstrip(separator)
+            )
+        )
+
+        return lambda path: regular_expression.match(path + separator) is not None
+
+    raise ValueError(f'Unsupported pattern style: {pattern_style.value}')
+
+
+class Path_matcher:
+    '''
+    Decides whether Borg would include a given path in a backup, according to a sequence of
+    borgmatic.borg.pattern.Pattern instances. Like Borg, full path ("pf:") patterns take precedence,
+    then the first matching pattern wins, and a path that matches no pattern gets included.
+    '''
+
+    def __init__(self, patterns):
+        '''
+        Given a sequence of borgmatic.borg.pattern.Pattern instances, compile their non-root
+        patterns for matching. As with a Borg patterns file, patterns without an explicit style use
+        the shell style unless a preceding "P" pattern says otherwise.
+        '''
+        default_style = borgmatic.borg.pattern.Pattern_style.SHELL
+        self.full_path_pattern_types = {}
+        self.matchers = []
+
+        for pattern in patterns:
+            if pattern.type == borgmatic.borg.pattern.Pattern_type.ROOT:
+                continue
+
+            if pattern.type == borgmatic.borg.pattern.Pattern_type.PATTERN_STYLE:
+                default_style = borgmatic.borg.pattern.Pattern_style(pattern.path)
+                continue
+
+            style = (
+                default_style
+                if pattern.style == borgmatic.borg.pattern.Pattern_style.NONE
+                else pattern.style
+            )
+
+            if style == borgmatic.borg.pattern.Pattern_style.PATH_FULL_MATCH:
+                self.full_path_pattern_types[os.path.normpath(pattern.path).lstrip(os.path.sep)] = (
+                    pattern.type
+                )
+                continue
+
+            self.matchers.append(
+                (
+                    make_path_matcher(pattern.path, style),
+                    pattern.type,
+                    style in PREFIX_MATCHING_PATTERN_STYLES,
+                )
+            )
+
+        self.include_patterns_present = any(
+            pattern.type == borgmatic.borg.pattern.Pattern_type.INCLUDE for pattern in patterns
+        )
+
+    def match(self, path):
+        '''
+        Given a normalized path, return a tuple of (whether Borg would include the path, whether
+        the path's contents need to get walked if it's a directory).
+
+        Borg still recurses into a directory excluded by a "-" pattern, in case an include pattern
+        matches something within it. But if there are no include patterns and the excluding pattern
+        also matches everything within the directory, then there's no need to walk it.
+        '''
+        relative_path = path.lstrip(os.path.sep)
+        pattern_type = self.full_path_pattern_types.get(relative_path)
+        prefix_matching = False
+
+        if pattern_type is None:
+            for matcher, candidate_type, candidate_prefix_matching in self.matchers:
+                if matcher(relative_path):
+                    (pattern_type, prefix_matching) = (candidate_type, candidate_prefix_matching)
+                    break
+            else:
+                return (True, True)
+
+        if pattern_type == borgmatic.borg.pattern.Pattern_type.INCLUDE:
+            return (True, True)
+
+        if pattern_type == borgmatic.borg.pattern.Pattern_type.NO_RECURSE:
+            return (False, False)
+
+        return (False, self.include_patterns_present or not prefix_matching)
+
+
+def special_mode(mode):
+    '''
+    Return whether the given file mode is for a special file (character device, block device, or
+    named pipe / FIFO).
+    '''
+    return stat.S_ISCHR(mode) or stat.S_ISBLK(mode) or stat.S_ISFIFO(mode)
+
+
+def special_entry(entry):
+    '''
+    Given an os.DirEntry, return whether it's a special file. Follow symlinks, because Borg does too
+    when reading special files. This only needs to stat entries that aren't regular files or
+    directories, which the directory listing alone is usually enough to rule out. And the entry
+    caches the stat of a symlink's target, so checking the entry's type again later is free.
+    '''
+    try:
+        if entry.is_file(follow_symlinks=False) or entry.is_dir(follow_symlinks=False):
+            return False
+
+        if entry.is_symlink():
+            return special_mode(entry.stat().st_mode)
+
+        return special_mode(entry.stat(follow_symlinks=False).st_mode)
+    except OSError:
+        return False
+
+
+def special_file_status(full_path, status):
+    '''
+    Given a path and its os.stat_result as returned without following symlinks, return whether the
+    path is a special file, following any symlink.
+    '''
+    if stat.S_ISLNK(status.st_mode):
+        try:
+            return special_mode(os.stat(full_path).st_mode)
+        except OSError:
+            return False
+
+    return special_mode(status.st_mode)
+
+
+def special_symlink_target(full_path):
+    '''
+    Given the path of a symlink, return whether its target is a special file.
+    '''
+    try:
+        return special_mode(os.stat(full_path).st_mode)
+    except OSError:
+        return False
+
+
+def cache_directory(full_path):
+    '''
+    Return whether the given directory contains a valid cache directory tag, per
+    https://bford.info/cachedir/
+    '''
+    try:
+        with open(os.path.join(full_path, CACHE_DIRECTORY_TAG_NAME), 'rb') as tag_file:
+            return (
+                tag_file.read(len(CACHE_DIRECTORY_TAG_SIGNATURE)) == CACHE_DIRECTORY_TAG_SIGNATURE
+            )
+    except OSError:
+        return False
+
+
+def tagged_directory(full_path, config):
+    '''
+    Given a directory path and a configuration dict, return whether Borg would skip the contents of
+    the directory due to the "exclude_caches" or "exclude_if_present" options.
+    '''
+    if config.get('exclude_caches') and cache_directory(full_path):
+        return True
+
+    return any(
+        os.path.exists(os.path.join(full_path, tag_name))
+        for tag_name in config.get('exclude_if_present', ())
+    )
+
+
+def entry_directory(entry):
+    '''
+    Given an os.DirEntry, return whether it's a directory, not following symlinks.
+    '''
+    try:
+        return entry.is_dir(follow_symlinks=False)
+    except OSError:
+        return False
+
+
+def entry_symlink(entry):
+    '''
+    Given an os.DirEntry, return whether it's a symlink.
+    '''
+    try:
+        return entry.is_symlink()
+    except OSError:
+        return False
+
+
+def entry_regular_file(entry):
+    '''
+    Given an os.DirEntry, return whether it's a regular file, following symlinks.
+    '''
+    try:
+        return entry.is_file()
+    except OSError:
+        return False
+
+
+def visit_directory(path, full_path, matcher, config, directories):
+    '''
+    Given a directory's path as Borg sees it, its full path on disk, a Path_matcher, a configuration
+    dict, and a list of (path, full path) tuples for directories still to walk, yield a
+    Planned_path if Borg would include the directory in a backup. And append the directory to the
+    given list if Borg would look at its contents.
+    '''
+    (included, recurse) = matcher.match(path)
+
+    if not included and not recurse:
+        return
+
+    tagged = tagged_directory(full_path, config)
+
+    if included and (config.get('keep_exclude_tags') or not tagged):
+        yield Planned_path(path)
+
+    if not tagged:
+        directories.append((path, full_path))
+
+
+def scan_directory(path, full_path, matcher, config, directories):
+    '''
+    Given a directory's path as Borg sees it, its full path on disk, a Path_matcher, a configuration
+    dict, and a list of (path, full path) tuples for directories still to walk, list the directory
+    and yield a Planned_path for each entry that Borg would include in a backup, queueing up any
+    subdirectories for walking.
+
+    Return a tuple of (the names of all subdirectories, the names of all special files other than
+    symlinks, the names of all other symlinks) within the directory, regardless of whether they're
+    included, suitable for storing in a Special_file_index. Or return None if the directory can't
+    be read.
+    '''
+    subdirectory_names = []
+    special_file_names = []
+    symlink_names = []
+
+    try:
+        entries = os.scandir(full_path)
+    except OSError as error:
+        logger.debug(f'Skipping unreadable directory {full_path}: {error}')
+        return None
+
+    with entries:
+        for entry in entries:
+            entry_path = os.path.join(path, entry.name)
+
+            if entry_directory(entry):
+                subdirectory_names.append(entry.name)
+                yield from visit_directory(entry_path, entry.path, matcher, config, directories)
+                continue
+
+            special = special_entry(entry)
+
+            # A symlink's target can change file type without the directory changing, so index
+            # symlinks separately for checking again on replay.
+            if entry_symlink(entry):
+                symlink_names.append(entry.name)
+            elif special:
+                special_file_names.append(entry.name)
+
+            if matcher.match(entry_path)[0]:
+                yield Planned_path(entry_path, special, entry_regular_file(entry))
+
+    return (subdirectory_names, special_file_names, symlink_names)
+
+
+def replay_directory(
+    path,
+    full_path,
+    matcher,
+    config,
+    directories,
+    subdirectory_names,
+    special_file_names,
+    symlink_names,
+):
+    '''
+    Given a directory's path as Borg sees it, its full path on disk, a Path_matcher, a configuration
+    dict, a list of (path, full path) tuples for directories still to walk, and the names of the
+    subdirectories, special files, and symlinks within the directory as previously indexed, yield a
+    Planned_path for each of those special files—plus each symlink whose target is currently a
+    special file—that Borg would include in a backup, and queue up the subdirectories for walking.
+    Unlike scan_directory(), this doesn't list the directory, and it doesn't yield regular files.
+    '''
+    for subdirectory_name in subdirectory_names:
+        yield from visit_directory(
+            os.path.join(path, subdirectory_name),
+            os.path.join(full_path, subdirectory_name),
+            matcher,
+            config,
+            directories,
+        )
+
+    for special_file_name in special_file_names:
+        special_file_path = os.path.join(path, special_file_name)
+
+        if matcher.match(special_file_path)[0]:
+            yield Planned_path(special_file_path, special=True)
+
+    for symlink_name in symlink_names:
+        symlink_path = os.path.join(path, symlink_name)
+
+        if matcher.match(symlink_path)[0] and special_symlink_target(
+            os.path.join(full_path, symlink_name)
+        ):
+            yield Planned_path(symlink_path, special=True)
+
+
+def visit_root(pattern, matcher, config, working_directory, directories):
+    '''
+    Given a root borgmatic.borg.pattern.Pattern instance, a Path_matcher, a configuration dict, the
+    working directory, and a list of (path, full path) tuples for directories still to walk, yield a
+    Planned_path for the root path if Borg would include it in a backup, and queue it up for walking
+    if it's a directory.
+
+    Return the device that the walk of the root path is limited to when the "one_file_system"
+    option is set, preferring the device already mapped onto the pattern. Otherwise, return None.
+    '''
+    path = os.path.normpath(pattern.path)
+    full_path = os.path.join(working_directory or '', path)
+
+    try:
+        root_status = os.stat(full_path, follow_symlinks=False)
+    except OSError:
+        return None
+
+    if not stat.S_ISDIR(root_status.st_mode):
+        if matcher.match(path)[0]:
+            yield Planned_path(
+                path,
+                special_file_status(full_path, root_status),
+                os.path.isfile(full_path),
+            )
+
+        return None
+
+    yield from visit_directory(path, full_path, matcher, config, directories)
+
+    if not config.get('one_file_system'):
+        return None
+
+    return root_status.st_dev if pattern.device is None else pattern.device
+
+
+def walk_directory(path, full_path, device, matcher, config, directories, special_file_index=None):
+    '''
+    Given a directory's path as Borg sees it, its full path on disk, the device to limit the walk
+    to (or None), a Path_matcher, a configuration dict, a list of (path, full path) tuples for
+    directories still to walk, and an optional Special_file_index, yield a Planned_path for each
+    entry in the directory that Borg would include in a backup, queueing up any subdirectories for
+    walking.
+
+    Like Borg, skip the directory if it's on a device other than the given one. And if a special
+    file index is given, then skip listing the directory if it's unchanged since it was indexed,
+    replaying its subdirectories and special files from the index instead.
+    '''
+    status = None
+
+    if device is not None or special_file_index is not None:
+        try:
+            status = os.stat(full_path, follow_symlinks=False)
+        except OSError:
+            return
+
+        if device is not None and status.st_dev != device:
+            return
+
+    indexed = special_file_index.get(full_path, status) if special_file_index is not None else None
+
+    if indexed is not None:
+        yield from replay_directory(path, full_path, matcher, config, directories, *indexed)
+        return
+
+    scanned = yield from scan_directory(path, full_path, matcher, config, directories)
+
+    if special_file_index is not None and scanned is not None:
+        special_file_index.set(full_path, status, *scanned)
+
+
+def walk_root(pattern, matcher, config, working_directory=None, special_file_index=None):
+    '''
+    Given a root borgmatic.borg.pattern.Pattern instance, a Path_matcher, a configuration dict, the
+    working directory, and an optional Special_file_index, walk the root path the way that "borg
+    create" would and yield a Planned_path for each path that Borg would include in a backup.
+
+    Prune the walk at directories that Borg wouldn't descend into: those excluded without the
+    possibility of anything within them getting included, those tagged for exclusion, and those on
+    other filesystems when the "one_file_system" option is set.
+
+    If a special file index is given, then skip listing any directory that's unchanged since it was
+    indexed, replaying its subdirectories and special files from the index instead. So regular files
+    in such directories don't get yielded.
+    '''
+    directories = []
+    device = yield from visit_root(pattern, matcher, config, working_directory, directories)
+
+    while directories:
+        (directory_path, directory_full_path) = directories.pop()
+
+        yield from walk_directory(
+            directory_path,
+            directory_full_path,
+            device,
+            matcher,
+            config,
+            directories,
+            special_file_index,
+        )
+
+
+def walk_directory_task(path, full_path, device, matcher, config, special_file_index):
+    '''
+    Given the same arguments as walk_directory() minus the list of directories still to walk, walk
+    the directory and return a tuple of (its Planned_path instances, (path, full path, device)
+    tuples for its subdirectories still to walk). This is intended to run in a worker thread.
+    '''
+    directories = []
+    planned_paths = tuple(
+        walk_directory(path, full_path, device, matcher, config, directories, special_file_index)
+    )
+
+    return (
+        planned_paths,
+        [
+            (directory_path, directory_full_path, device)
+            for (directory_path, directory_full_path) in directories
+        ],
+    )
+
+
+def walk_roots_in_parallel(
+    root_patterns, matcher, config, working_directory, special_file_index, workers
+):
+    '''
+    Given a sequence of root borgmatic.borg.pattern.Pattern instances, a Path_matcher, a
+    configuration dict, the working directory, an optional Special_file_index, and a number of
+    worker threads, walk all of the root paths the way walk_root() would, but list directories in
+    the worker threads so that the latency of one directory listing or stat() overlaps with others.
+    That matters most on network filesystems.
+
+    Yield each Planned_path as soon as its directory listing completes, so the order of yielded
+    paths isn't deterministic. If the caller stops consuming the generator early, cancel any
+    directory listings not yet started.
+    '''
+    directories = []
+
+    for pattern in root_patterns:
+        root_directories = []
+        device = yield from visit_root(
+            pattern, matcher, config, working_directory, root_directories
+        )
+        directories.extend((path, full_path, device) for (path, full_path) in root_directories)
+
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix='borgmatic-walk'
+    )
+    pending = set()
+
+    try:
+        while directories or pending:
+            # Keep a bounded number of listings in flight, so the frontier mostly stays in the
+            # directories list instead of piling up as futures.
+            while directories and len(pending) < workers * 2:
+                (path, full_path, device) = directories.pop()
+                pending.add(
+                    executor.submit(
+                        contextvars.copy_context().run,
+                        walk_directory_task,
+                        path,
+                        full_path,
+                        device,
+                        matcher,
+                        config,
+                        special_file_index,
+                    )
+                )
+
+            (done, pending) = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+
+            for future in done:
+                (planned_paths, subdirectories) = future.result()
+                directories.extend(subdirectories)
+
+                yield from planned_paths
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+# Don't index a directory that changed this recently, because it could change again within the
+# same timestamp granularity—right after getting scanned—without its timestamps changing.
+MINIMUM_INDEXED_DIRECTORY_AGE_NANOSECONDS = 2_000_000_000
+
+# Each indexed directory's record is a list of: modification time, change time, subdirectory names,
+# special file names, and symlink names. Records of any other length come from an older index
+# format, so they get ignored.
+INDEXED_DIRECTORY_RECORD_LENGTH = 5
+
+
+def make_special_file_index_path(config, patterns, working_directory=None):
+    '''
+    Given a configuration dict, a sequence of borgmatic.borg.pattern.Pattern instances, and the
+    working directory, return the path of the special file index for the patterns' root paths. It's
+    located in the borgmatic state directory and named for a hash of the root paths, so differing
+    sets of source directories get separate indices.
+    '''
+    root_paths = sorted(
+        pattern.path
+        for pattern in patterns
+        if pattern.type == borgmatic.borg.pattern.Pattern_type.ROOT
+    )
+
+    return os.path.join(
+        borgmatic.config.paths.get_borgmatic_state_directory(config),
+        'special_files',
+        hashlib.sha256(json.dumps([working_directory, root_paths]).encode('utf-8')).hexdigest()
+        + '.json',
+    )
+
+
+def read_special_file_index(path):
+    '''
+    Return the directories dict stored in the special file index at the given path. Return an empty
+    dict if the path doesn't exist or can't be read or parsed.
+    '''
+    try:
+        with open(path, encoding='utf-8') as index_file:
+            directories = json.load(index_file)
+    except (OSError, ValueError):
+        return {}
+
+    return directories if isinstance(directories, dict) else {}
+
+
+def write_special_file_index(path, directories):
+    '''
+    Write the given directories dict to the special file index at the given path, atomically. Log
+    and otherwise ignore any errors writing the file, as the index is merely an optimization.
+    '''
+    try:
+        borgmatic.config.paths.write_file_atomically(
+            path, json.dumps(directories, separators=(',', ':'))
+        )
+    except OSError as error:
+        logger.debug(f'Cannot write special file index at {path}: {error}')
+
+
+class Special_file_index:
+    '''
+    An index of the subdirectories, special files, and symlinks within each walked directory, keyed
+    by the directory's full path and stamped with its modification and change times. Adding,
+    removing, or renaming an entry in a directory updates those times, so a directory with unchanged
+    times can be replayed from the index rather than listed again. And the change time catches tools
+    that reset a directory's modification time after altering it.
+
+    A symlink's target can change file type without the directory changing, so the index records
+    all symlinks rather than trusting a symlink's file type from when it was indexed. Then replaying
+    a directory checks each symlink's target again.
+
+    Walker threads may call get() and set() concurrently, which is safe because each only looks up
+    or assigns a single dict key.
+    '''
+
+    def __init__(self, path):
+        '''
+        Given the path of the index file, load any previously stored index from it.
+        '''
+        self.path = path
+        self.previous_directories = read_special_file_index(path)
+        self.directories = {}
+        self.start_time_ns = time.time_ns()
+
+    def get(self, full_path, status):
+        '''
+        Given a directory's full path and its os.stat_result, return a tuple of (subdirectory
+        names, special file names, symlink names) for the directory if it's indexed and unchanged
+        since. Otherwise, return None.
+        '''
+        record = self.previous_directories.get(full_path)
+
+        if (
+            not isinstance(record, list)
+            or len(record) != INDEXED_DIRECTORY_RECORD_LENGTH
+            or record[:2] != [status.st_mtime_ns, status.st_ctime_ns]
+        ):
+            return None
+
+        self.directories[full_path] = record
+
+        return tuple(record[2:])
+
+    def set(self, full_path, status, subdirectory_names, special_file_names, symlink_names):
+        '''
+        Given a directory's full path, its os.stat_result, and the names of the subdirectories,
+        special files, and symlinks within it, add the directory to the index—unless it changed too
+        recently to be trusted.
+        '''
+        if (
+            self.start_time_ns - max(status.st_mtime_ns, status.st_ctime_ns)
+            < MINIMUM_INDEXED_DIRECTORY_AGE_NANOSECONDS
+        ):
+            return
+
+        self.directories[full_path] = [
+            status.st_mtime_ns,
+            status.st_ctime_ns,
+            subdirectory_names,
+            special_file_names,
+            symlink_names,
+        ]
+
+    def save(self):
+        '''
+        Write the directories indexed or reused during this walk to the index file, dropping any
+        directories that weren't walked this time.
+        '''
+        write_special_file_index(self.path, self.directories)
+
+
+def get_planned_paths(
+    patterns, config, working_directory=None, root_paths=None, special_file_index=None
+):
+    '''
+    Given a sequence of borgmatic.borg.pattern.Pattern instances, a configuration dict, the working
+    directory, an optional collection of root pattern paths to limit the walk to, and an optional
+    Special_file_index, walk each root pattern path the way that "borg create" would and yield a
+    Planned_path for each path that Borg would include in a backup.
+
+    This stands in for a "borg create --dry-run --list", but without Borg having to look at (and
+    list) every file, and without stat()ing files whose type the directory listing already reveals.
+    If a special file index is given, then directories unchanged since they were indexed don't even
+    get listed, and their regular files don't get yielded. So only use an index when looking for
+    special files.
+
+    Walk with the number of worker threads in the "directory_walk_workers" option. With a single
+    worker, walk in the calling thread instead, yielding paths in a deterministic order.
+    '''
+    matcher = Path_matcher(patterns)
+    root_patterns = tuple(
+        pattern
+        for pattern in patterns
+        if pattern.type == borgmatic.borg.pattern.Pattern_type.ROOT
+        if root_paths is None or pattern.path in root_paths
+    )
+    workers = config.get('directory_walk_workers', DEFAULT_DIRECTORY_WALK_WORKERS)
+
+    if workers > 1:
+        yield from walk_roots_in_parallel(
+            root_patterns, matcher, config, working_directory, special_file_index, workers
+        )
+        return
+
+    for pattern in root_patterns:
+        yield from walk_root(pattern, matcher, config, working_directory, special_file_index)
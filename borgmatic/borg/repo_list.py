@@ -6,7 +6,10 @@ import shlex
 import borgmatic.config.paths
 import borgmatic.logger
 from borgmatic.borg import environment, feature, flags
-from borgmatic.execute import execute_command_and_capture_output
+from borgmatic.execute import (
+    execute_command_and_capture_output,
+    execute_command_and_capture_raw_output,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -97,14 +100,12 @@ def get_latest_archive(
         *flags.make_repository_flags(repository_path, local_borg_version),
     )
 
-    json_output = '\n'.join(
-        execute_command_and_capture_output(
-            full_command,
-            environment=environment.make_environment(config),
-            working_directory=borgmatic.config.paths.get_working_directory(config),
-            borg_local_path=local_path,
-            borg_exit_codes=config.get('borg_exit_codes'),
-        )
+    json_output = execute_command_and_capture_raw_output(
+        full_command,
+        environment=environment.make_environment(config),
+        working_directory=borgmatic.config.paths.get_working_directory(config),
+        borg_local_path=local_path,
+        borg_exit_codes=config.get('borg_exit_codes'),
     )
 
     archives = json.loads(json_output)['archives']
@@ -227,15 +228,13 @@ def list_repository(
     borg_exit_codes = config.get('borg_exit_codes')
 
     if repo_list_arguments.json:
-        return '\n'.join(
-            execute_command_and_capture_output(
-                json_command,
-                environment=environment.make_environment(config),
-                working_directory=working_directory,
-                borg_local_path=local_path,
-                borg_exit_codes=borg_exit_codes,
-            )
-        )
+        return execute_command_and_capture_raw_output(
+            json_command,
+            environment=environment.make_environment(config),
+            working_directory=working_directory,
+            borg_local_path=local_path,
+            borg_exit_codes=borg_exit_codes,
+        ).decode()
 
     output_lines = tuple(
         execute_command_and_capture_output(
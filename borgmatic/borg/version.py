@@ -1,15 +1,88 @@
+import hashlib
 import logging
+import os
+import shutil
+import time
 
 import borgmatic.config.paths
 from borgmatic.borg import environment
-from borgmatic.execute import execute_command_and_capture_output
+from borgmatic.execute import execute_command_and_capture_raw_output
 
 logger = logging.getLogger(__name__)
 
+# How long a cached Borg version remains valid. The binary signature can't notice changes behind
+# a wrapper script (e.g. one that runs a different Borg binary), so expire cached versions
+# periodically regardless.
+MAXIMUM_CACHED_VERSION_AGE_SECONDS = 24 * 60 * 60
 
-def local_borg_version(config, local_path='borg'):
+
+def get_binary_signature(local_path):
     '''
-    Given a configuration dict and a local Borg executable path, return a version string for it.
+    Given a local Borg executable path, find the corresponding binary (searching the PATH if
+    necessary), and return a string identifying the binary's current state: its resolved path,
+    inode, size, and modification time. The idea is that if the binary gets upgraded or replaced,
+    its signature changes too.
+
+    Return None if the binary can't be found.
+    '''
+    binary_path = shutil.which(local_path)
+
+    if not binary_path:
+        return None
+
+    resolved_path = os.path.realpath(binary_path)
+
+    try:
+        binary_stat = os.stat(resolved_path)
+    except OSError:
+        return None
+
+    return f'{resolved_path}:{binary_stat.st_ino}:{binary_stat.st_size}:{binary_stat.st_mtime_ns}'
+
+
+def make_version_cache_path(config, binary_signature):
+    '''
+    Given a configuration dict and a Borg binary signature, return the path of the file for caching
+    that binary's version.
+    '''
+    return os.path.join(
+        borgmatic.config.paths.get_borgmatic_state_directory(config),
+        'borg',
+        'versions',
+        hashlib.sha256(binary_signature.encode()).hexdigest(),
+    )
+
+
+def read_cached_version(path):
+    '''
+    Return the Borg version cached at the given path. Return None if the path doesn't exist, can't
+    be read, or is older than the maximum cached version age.
+    '''
+    try:
+        if time.time() - os.stat(path).st_mtime > MAXIMUM_CACHED_VERSION_AGE_SECONDS:
+            return None
+
+        with open(path, encoding='utf-8') as cache_file:
+            return cache_file.read().strip() or None
+    except OSError:
+        return None
+
+
+def write_cached_version(path, version):
+    '''
+    Cache the given Borg version at the given path, atomically. Log and otherwise ignore any errors
+    writing the file, as the cache is merely an optimization.
+    '''
+    try:
+        borgmatic.config.paths.write_file_atomically(path, version)
+    except OSError as error:
+        logger.debug(f'Cannot cache Borg version at {path}: {error}')
+
+
+def probe_local_borg_version(config, local_path='borg'):
+    '''
+    Given a configuration dict and a local Borg executable path, run Borg to get its version string
+    and return it.
 
     Raise OSError or CalledProcessError if there is a problem running Borg.
     Raise ValueError if the version cannot be parsed.
@@ -21,17 +94,56 @@ def local_borg_version(config, local_path='borg'):
         + (('--debug', '--show-rc') if logger.isEnabledFor(logging.DEBUG) else ())
     )
 
-    output = '\n'.join(
-        execute_command_and_capture_output(
-            full_command,
-            environment=environment.make_environment(config),
-            working_directory=borgmatic.config.paths.get_working_directory(config),
-            borg_local_path=local_path,
-            borg_exit_codes=config.get('borg_exit_codes'),
-        )
-    )
+    output = execute_command_and_capture_raw_output(
+        full_command,
+        environment=environment.make_environment(config),
+        working_directory=borgmatic.config.paths.get_working_directory(config),
+        borg_local_path=local_path,
+        borg_exit_codes=config.get('borg_exit_codes'),
+    ).decode()
 
     try:
         return output.split(' ')[1].strip()
     except IndexError:
         raise ValueError('Could not parse Borg version string')
+
+
+# A map from Borg binary signature to its version, so the version gets probed at most once per
+# process for a particular binary.
+version_by_binary_signature = {}
+
+
+def local_borg_version(config, local_path='borg'):
+    '''
+    Given a configuration dict and a local Borg executable path, return a version string for it.
+
+    As a performance optimization, cache the version both in memory and in the borgmatic state
+    directory, keyed by the Borg binary's path, inode, size, and modification time. That way,
+    multiple configuration files and subsequent borgmatic runs don't have to run Borg again just to
+    get its version—at least until the binary changes or the cached version expires.
+
+    Raise OSError or CalledProcessError if there is a problem running Borg.
+    Raise ValueError if the version cannot be parsed.
+    '''
+    binary_signature = get_binary_signature(local_path)
+
+    if not binary_signature:
+        return probe_local_borg_version(config, local_path)
+
+    version = version_by_binary_signature.get(binary_signature)
+
+    if version:
+        return version
+
+    cache_path = make_version_cache_path(config, binary_signature)
+    version = read_cached_version(cache_path)
+
+    if version:
+        logger.debug(f'Using cached Borg version {version} from {cache_path}')
+    else:
+        version = probe_local_borg_version(config, local_path)
+        write_cached_version(cache_path, version)
+
+    version_by_binary_signature[binary_signature] = version
+
+    return version
@@ -37,6 +37,9 @@ ACTION_ALIASES = {
     'borg': [],
 }
 
+# The actions that run when no actions are given on the command-line.
+DEFAULT_ACTION_NAMES = ('create', 'prune', 'compact', 'check')
+
 
 def get_subaction_parsers(action_parser):
     '''
@@ -279,7 +282,7 @@ def parse_arguments_for_actions(unparsed_arguments, action_parsers, global_parse
 
     # If no actions were explicitly requested, assume defaults.
     if not arguments and not help_requested:
-        for default_action_name in ('create', 'prune', 'compact', 'check'):
+        for default_action_name in DEFAULT_ACTION_NAMES:
             default_action_parser = action_parsers[default_action_name]
             remaining_action_arguments.append(
                 parse_and_record_action_arguments(
@@ -426,12 +429,32 @@ def add_array_element_arguments(arguments_group, unparsed_arguments, flag_name):
             )
 
 
-def add_arguments_from_schema(arguments_group, schema, unparsed_arguments, names=None):  # noqa: PLR0912
+def get_requested_flag_names(unparsed_arguments):
+    '''
+    Given a sequence of unparsed argument strings, return the set of long flag names among them
+    (including leading dashes but excluding any "=value"), with any array indices replaced by "[0]"
+    so that they look like the flags that add_arguments_from_schema() makes.
+    '''
+    return {
+        re.sub(r'\[\d+\]', '[0]', argument.split('=', 1)[0])
+        for argument in unparsed_arguments
+        if argument.startswith('--')
+    }
+
+
+def add_arguments_from_schema(  # noqa: PLR0912
+    arguments_group, schema, unparsed_arguments, names=None, requested_flag_names=None
+):
     '''
     Given an argparse._ArgumentGroup instance, a configuration schema dict, and a sequence of
     unparsed argument strings, convert the entire schema into corresponding command-line flags and
     add them to the arguments group.
 
+    If a set of requested flag names is given (as per get_requested_flag_names()), then only add
+    flags for those, plus the "--verbosity" flag (whose short form could be combined with a value).
+    For every other option, just default its destination to None—which is what its flag would
+    default to anyway—rather than paying to construct a flag that won't get used.
+
     For instance, given a schema of:
 
         {
@@ -488,6 +511,7 @@ def add_arguments_from_schema(arguments_group, schema, unparsed_arguments, names
                     child,
                     unparsed_arguments,
                     (*names, name),
+                    requested_flag_names,
                 )
 
             return
@@ -505,6 +529,7 @@ def add_arguments_from_schema(arguments_group, schema, unparsed_arguments, names
                     child,
                     unparsed_arguments,
                     (*names[:-1], f'{names[-1]}[0]', name),
+                    requested_flag_names,
                 )
         # If there aren't any children, then this is an array of scalars. Recurse accordingly.
         else:
@@ -513,6 +538,7 @@ def add_arguments_from_schema(arguments_group, schema, unparsed_arguments, names
                 items,
                 unparsed_arguments,
                 (*names[:-1], f'{names[-1]}[0]'),
+                requested_flag_names,
             )
 
     flag_name = '.'.join(names).replace('_', '-')
@@ -522,6 +548,20 @@ def add_arguments_from_schema(arguments_group, schema, unparsed_arguments, names
     if not flag_name or flag_name in OMITTED_FLAG_NAMES:
         return
 
+    if names[-1].startswith('no_'):
+        no_flag_name = '.'.join((*names[:-1], names[-1][len('no_') :])).replace('_', '-')
+    else:
+        no_flag_name = '.'.join((*names[:-1], 'no-' + names[-1])).replace('_', '-')
+
+    if (
+        requested_flag_names is not None
+        and flag_name != 'verbosity'
+        and f'--{flag_name}' not in requested_flag_names
+        and (schema_type != 'boolean' or f'--{no_flag_name}' not in requested_flag_names)
+    ):
+        arguments_group.set_defaults(**{flag_name.replace('-', '_'): None})
+        return
+
     metavar = names[-1].upper()
     description = make_argument_description(schema, flag_name)
 
@@ -537,12 +577,6 @@ def add_arguments_from_schema(arguments_group, schema, unparsed_arguments, names
             default=None,
             help=description,
         )
-
-        if names[-1].startswith('no_'):
-            no_flag_name = '.'.join((*names[:-1], names[-1][len('no_') :])).replace('_', '-')
-        else:
-            no_flag_name = '.'.join((*names[:-1], 'no-' + names[-1])).replace('_', '-')
-
         arguments_group.add_argument(
             f'--{no_flag_name}',
             dest=flag_name.replace('-', '_'),
@@ -569,15 +603,40 @@ def add_arguments_from_schema(arguments_group, schema, unparsed_arguments, names
     add_array_element_arguments(arguments_group, unparsed_arguments, flag_name)
 
 
-def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
+def get_requested_action_names(unparsed_arguments):
     '''
-    Given a configuration schema dict and unparsed arguments as a sequence of strings, build a
-    global arguments parser, individual action parsers, and a combined parser containing both.
-    Return them as a tuple. The global parser is useful for parsing just global arguments while
-    ignoring actions, and the combined parser is handy for displaying help that includes everything:
-    global flags, a list of actions, etc.
+    Given a sequence of unparsed argument strings, return the set of action names that any of them
+    name (directly or via an alias), plus the default actions that run when no actions are given.
     '''
-    config_paths = collect.get_default_config_paths()
+    alias_to_action_name = {
+        alias: action_name
+        for action_name, aliases in ACTION_ALIASES.items()
+        for alias in (action_name, *aliases)
+    }
+
+    return set(DEFAULT_ACTION_NAMES) | {
+        alias_to_action_name[argument]
+        for argument in unparsed_arguments
+        if argument in alias_to_action_name
+    }
+
+
+def make_parsers(schema, unparsed_arguments, lazy=False):
+    '''
+    Given a configuration schema dict, unparsed arguments as a sequence of strings, and whether to
+    construct parsers lazily, build a global arguments parser, individual action parsers, and a
+    combined parser containing both. Return them as a tuple. The global parser is useful for parsing
+    just global arguments while ignoring actions, and the combined parser is handy for displaying
+    help that includes everything: global flags, a list of actions, etc.
+
+    Constructing the schema-derived flags and all the action parsers takes a noticeable chunk of
+    startup time. So if lazy is True, then only build parsers for the actions named in the unparsed
+    arguments (plus the default actions) and only build the schema-derived flags that appear in the
+    unparsed arguments. But build everything anyway if help is requested, because then it all gets
+    displayed.
+    '''
+    lazy = lazy and '--help' not in unparsed_arguments and '-h' not in unparsed_arguments
+    action_names = get_requested_action_names(unparsed_arguments) if lazy else set(ACTION_ALIASES)
 
     # Using allow_abbrev=False here prevents the global parser from erroring about "ambiguous"
     # options like --encryption. Such options are intended for an action parser rather than the
@@ -631,7 +690,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
         action='store_true',
         help='Display installed version number of borgmatic and exit',
     )
-    add_arguments_from_schema(global_group, schema, unparsed_arguments)
+    add_arguments_from_schema(
+        global_group,
+        schema,
+        unparsed_arguments,
+        requested_flag_names=get_requested_flag_names(unparsed_arguments) if lazy else None,
+    )
 
     global_plus_action_parser = ArgumentParser(
         description='''
@@ -646,6 +710,19 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
         metavar='',
         help='Specify zero or more actions. Defaults to create, prune, compact, and check. Use --help with action for details:',
     )
+
+    for action_name, make_action_parser in ACTION_PARSER_MAKERS.items():
+        if action_name in action_names:
+            make_action_parser(action_parsers)
+
+    return global_parser, action_parsers, global_plus_action_parser
+
+
+def make_repo_create_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "repo-create" action parser to it.
+    '''
     repo_create_parser = action_parsers.add_parser(
         'repo-create',
         aliases=ACTION_ALIASES['repo-create'],
@@ -715,6 +792,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
         help='Show this help message and exit',
     )
 
+
+def make_transfer_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "transfer" action parser to it.
+    '''
     transfer_parser = action_parsers.add_parser(
         'transfer',
         aliases=ACTION_ALIASES['transfer'],
@@ -800,6 +883,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
         help='Show this help message and exit',
     )
 
+
+def make_prune_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "prune" action parser to it.
+    '''
     prune_parser = action_parsers.add_parser(
         'prune',
         aliases=ACTION_ALIASES['prune'],
@@ -862,6 +951,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
     )
     prune_group.add_argument('-h', '--help', action='help', help='Show this help message and exit')
 
+
+def make_compact_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "compact" action parser to it.
+    '''
     compact_parser = action_parsers.add_parser(
         'compact',
         aliases=ACTION_ALIASES['compact'],
@@ -900,6 +995,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
         help='Show this help message and exit',
     )
 
+
+def make_create_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "create" action parser to it.
+    '''
     create_parser = action_parsers.add_parser(
         'create',
         aliases=ACTION_ALIASES['create'],
@@ -954,6 +1055,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
     )
     create_group.add_argument('-h', '--help', action='help', help='Show this help message and exit')
 
+
+def make_check_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "check" action parser to it.
+    '''
     check_parser = action_parsers.add_parser(
         'check',
         aliases=ACTION_ALIASES['check'],
@@ -1007,6 +1114,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
     )
     check_group.add_argument('-h', '--help', action='help', help='Show this help message and exit')
 
+
+def make_delete_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "delete" action parser to it.
+    '''
     delete_parser = action_parsers.add_parser(
         'delete',
         aliases=ACTION_ALIASES['delete'],
@@ -1107,6 +1220,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
     )
     delete_group.add_argument('-h', '--help', action='help', help='Show this help message and exit')
 
+
+def make_extract_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "extract" action parser to it.
+    '''
     extract_parser = action_parsers.add_parser(
         'extract',
         aliases=ACTION_ALIASES['extract'],
@@ -1157,6 +1276,14 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
         help='Show this help message and exit',
     )
 
+
+def make_config_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "config" action parser to it.
+    '''
+    config_paths = collect.get_default_config_paths()
+
     config_parser = action_parsers.add_parser(
         'config',
         aliases=ACTION_ALIASES['config'],
@@ -1321,6 +1448,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
         help='Show this help message and exit',
     )
 
+
+def make_export_tar_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "export-tar" action parser to it.
+    '''
     export_tar_parser = action_parsers.add_parser(
         'export-tar',
         aliases=ACTION_ALIASES['export-tar'],
@@ -1378,6 +1511,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
         help='Show this help message and exit',
     )
 
+
+def make_mount_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "mount" action parser to it.
+    '''
     mount_parser = action_parsers.add_parser(
         'mount',
         aliases=ACTION_ALIASES['mount'],
@@ -1448,6 +1587,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
     mount_group.add_argument('--options', dest='options', help='Extra Borg mount options')
     mount_group.add_argument('-h', '--help', action='help', help='Show this help message and exit')
 
+
+def make_umount_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "umount" action parser to it.
+    '''
     umount_parser = action_parsers.add_parser(
         'umount',
         aliases=ACTION_ALIASES['umount'],
@@ -1465,6 +1610,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
     )
     umount_group.add_argument('-h', '--help', action='help', help='Show this help message and exit')
 
+
+def make_repo_delete_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "repo-delete" action parser to it.
+    '''
     repo_delete_parser = action_parsers.add_parser(
         'repo-delete',
         aliases=ACTION_ALIASES['repo-delete'],
@@ -1506,6 +1657,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
         help='Show this help message and exit',
     )
 
+
+def make_restore_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "restore" action parser to it.
+    '''
     restore_parser = action_parsers.add_parser(
         'restore',
         aliases=ACTION_ALIASES['restore'],
@@ -1590,6 +1747,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
         help='Show this help message and exit',
     )
 
+
+def make_repo_list_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "repo-list" action parser to it.
+    '''
     repo_list_parser = action_parsers.add_parser(
         'repo-list',
         aliases=ACTION_ALIASES['repo-list'],
@@ -1675,6 +1838,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
         help='Show this help message and exit',
     )
 
+
+def make_list_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "list" action parser to it.
+    '''
     list_parser = action_parsers.add_parser(
         'list',
         aliases=ACTION_ALIASES['list'],
@@ -1764,6 +1933,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
     )
     list_group.add_argument('-h', '--help', action='help', help='Show this help message and exit')
 
+
+def make_repo_info_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "repo-info" action parser to it.
+    '''
     repo_info_parser = action_parsers.add_parser(
         'repo-info',
         aliases=ACTION_ALIASES['repo-info'],
@@ -1790,6 +1965,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
         help='Show this help message and exit',
     )
 
+
+def make_info_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "info" action parser to it.
+    '''
     info_parser = action_parsers.add_parser(
         'info',
         aliases=ACTION_ALIASES['info'],
@@ -1862,6 +2043,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
     )
     info_group.add_argument('-h', '--help', action='help', help='Show this help message and exit')
 
+
+def make_break_lock_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "break-lock" action parser to it.
+    '''
     break_lock_parser = action_parsers.add_parser(
         'break-lock',
         aliases=ACTION_ALIASES['break-lock'],
@@ -1881,6 +2068,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
         help='Show this help message and exit',
     )
 
+
+def make_key_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "key" action parser to it.
+    '''
     key_parser = action_parsers.add_parser(
         'key',
         aliases=ACTION_ALIASES['key'],
@@ -1977,6 +2170,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
         help='Show this help message and exit',
     )
 
+
+def make_recreate_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "recreate" action parser to it.
+    '''
     recreate_parser = action_parsers.add_parser(
         'recreate',
         aliases=ACTION_ALIASES['recreate'],
@@ -2030,6 +2229,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
         help='Show this help message and exit',
     )
 
+
+def make_diff_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "diff" action parser to it.
+    '''
     diff_parser = action_parsers.add_parser(
         'diff',
         aliases=ACTION_ALIASES['diff'],
@@ -2074,6 +2279,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
     )
     diff_group.add_argument('-h', '--help', action='help', help='Show this help message and exit')
 
+
+def make_browse_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "browse" action parser to it.
+    '''
     browse_parser = action_parsers.add_parser(
         'browse',
         aliases=ACTION_ALIASES['browse'],
@@ -2084,6 +2295,12 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
     browse_group = browse_parser.add_argument_group('browse arguments')
     browse_group.add_argument('-h', '--help', action='help', help='Show this help message and exit')
 
+
+def make_borg_parser(action_parsers):
+    '''
+    Given an action parsers object as returned by ArgumentParser.add_subparsers(), add the
+    "borg" action parser to it.
+    '''
     borg_parser = action_parsers.add_parser(
         'borg',
         aliases=ACTION_ALIASES['borg'],
@@ -2109,7 +2326,35 @@ def make_parsers(schema, unparsed_arguments):  # noqa: PLR0915
     )
     borg_group.add_argument('-h', '--help', action='help', help='Show this help message and exit')
 
-    return global_parser, action_parsers, global_plus_action_parser
+
+# A map from action name to a function that adds its action parser, in the order that the actions
+# get displayed in help.
+ACTION_PARSER_MAKERS = {
+    'repo-create': make_repo_create_parser,
+    'transfer': make_transfer_parser,
+    'prune': make_prune_parser,
+    'compact': make_compact_parser,
+    'create': make_create_parser,
+    'check': make_check_parser,
+    'delete': make_delete_parser,
+    'extract': make_extract_parser,
+    'config': make_config_parser,
+    'export-tar': make_export_tar_parser,
+    'mount': make_mount_parser,
+    'umount': make_umount_parser,
+    'repo-delete': make_repo_delete_parser,
+    'restore': make_restore_parser,
+    'repo-list': make_repo_list_parser,
+    'list': make_list_parser,
+    'repo-info': make_repo_info_parser,
+    'info': make_info_parser,
+    'break-lock': make_break_lock_parser,
+    'key': make_key_parser,
+    'recreate': make_recreate_parser,
+    'diff': make_diff_parser,
+    'browse': make_browse_parser,
+    'borg': make_borg_parser,
+}
 
 
 HIGHLANDER_ACTION_ARGUMENTS_COUNT = 2  # 1 for "global" + 1 for the action
@@ -2127,6 +2372,7 @@ def parse_arguments(schema, *unparsed_arguments):
     global_parser, action_parsers, global_plus_action_parser = make_parsers(
         schema,
         unparsed_arguments,
+        lazy=True,
     )
     arguments, remaining_action_arguments = parse_arguments_for_actions(
         unparsed_arguments,
@@ -2150,7 +2396,8 @@ def parse_arguments(schema, *unparsed_arguments):
             global_plus_action_parser.print_help()
             sys.exit(0)
 
-        global_plus_action_parser.print_usage()
+        # Usage should show every flag and action, so build them all.
+        make_parsers(schema, unparsed_arguments)[2].print_usage()
         raise ValueError(
             f"Unrecognized argument{'s' if len(unknown_arguments) > 1 else ''}: {' '.join(unknown_arguments)}",
         )
@@ -1,5 +1,10 @@
 import collections
+import concurrent.futures
+import contextlib
+import contextvars
+import heapq
 import importlib.metadata
+import itertools
 import json
 import logging
 import os
@@ -8,8 +13,6 @@ import time
 from queue import Queue
 from subprocess import CalledProcessError
 
-import ruamel.yaml
-
 import borgmatic.actions.borg
 import borgmatic.actions.break_lock
 import borgmatic.actions.browse.run
@@ -40,8 +43,10 @@ import borgmatic.actions.restore
 import borgmatic.actions.transfer
 import borgmatic.commands.completion.bash
 import borgmatic.commands.completion.fish
-import borgmatic.config.load
 import borgmatic.config.paths
+import borgmatic.execute
+import borgmatic.hooks.monitoring.logs
+import borgmatic.lock
 from borgmatic.borg import umount as borg_umount
 from borgmatic.borg import version as borg_version
 from borgmatic.commands.arguments import parse_arguments
@@ -107,43 +112,61 @@ class Monitoring_hooks:
 
     def __enter__(self):
         '''
-        If monitoring hooks are enabled and a primary action is in use, initialize monitoring hooks
-        and ping them for the "start" state.
+        If monitoring hooks are enabled and a primary action is in use, start a new monitoring run
+        (so that monitoring logs only include this configuration file's logs), initialize monitoring
+        hooks, and ping them for the "start" state.
         '''
         if not self.monitoring_hooks_are_activated:
             return
 
-        dispatch.call_hooks(
-            'initialize_monitor',
-            self.config,
-            dispatch.Hook_type.MONITORING,
-            self.config_filename,
-            self.monitoring_log_level,
-            self.dry_run,
-        )
+        self.original_monitoring_run = borgmatic.hooks.monitoring.logs.MONITORING_RUN.get()
+        borgmatic.hooks.monitoring.logs.MONITORING_RUN.set(object())
 
         try:
             dispatch.call_hooks(
-                'ping_monitor',
+                'initialize_monitor',
                 self.config,
                 dispatch.Hook_type.MONITORING,
                 self.config_filename,
-                monitor.State.START,
                 self.monitoring_log_level,
                 self.dry_run,
             )
-        except (OSError, CalledProcessError) as error:
-            raise ValueError(f'Error pinging monitor: {error}')
+
+            try:
+                dispatch.call_hooks(
+                    'ping_monitor',
+                    self.config,
+                    dispatch.Hook_type.MONITORING,
+                    self.config_filename,
+                    monitor.State.START,
+                    self.monitoring_log_level,
+                    self.dry_run,
+                )
+            except (OSError, CalledProcessError) as error:
+                raise ValueError(f'Error pinging monitor: {error}')
+        except BaseException:
+            borgmatic.hooks.monitoring.logs.MONITORING_RUN.set(self.original_monitoring_run)
+            raise
 
     def __exit__(self, exception_type, exception, traceback):
         '''
         If monitoring hooks are enabled and a primary action is in use, ping monitoring hooks for
         the "log" state and also the "finish" or "fail" states (depending on whether there's an
-        exception). Lastly, destroy monitoring hooks.
+        exception). Lastly, destroy monitoring hooks and end the monitoring run.
         '''
         if not self.monitoring_hooks_are_activated:
             return
 
+        try:
+            self.finish_monitoring(exception)
+        finally:
+            borgmatic.hooks.monitoring.logs.MONITORING_RUN.set(self.original_monitoring_run)
+
+    def finish_monitoring(self, exception):
+        '''
+        Given the exception raised by the wrapped code (if any), ping monitoring hooks for the "log"
+        state and also the "finish" or "fail" states, and destroy monitoring hooks.
+        '''
         # Send logs irrespective of error.
         try:
             dispatch.call_hooks(
@@ -185,6 +208,260 @@ class Monitoring_hooks:
         )
 
 
+def get_requested_repository(arguments):
+    '''
+    Given command-line arguments as a dict from subparser name to a namespace of parsed arguments,
+    return the repository requested via any action's "--repository" flag. Return None if there
+    isn't one.
+    '''
+    return next(
+        (
+            repository
+            for action_arguments in arguments.values()
+            for repository in (getattr(action_arguments, 'repository', None),)
+            if repository is not None
+        ),
+        None,
+    )
+
+
+def run_fan_out_create(
+    config_filename, config, config_paths, arguments, local_borg_version, local_path, remote_path
+):
+    '''
+    Given a config filename, the corresponding parsed config dict, a sequence of loaded
+    configuration paths, command-line arguments as a dict from subparser name to a namespace of
+    parsed arguments, the local Borg version, and the local and remote Borg paths, run the create
+    action for all repositories at once if the "fan_out_create" option is set and there are multiple
+    repositories to create archives in. Wrap that in the create action's command hooks, which
+    therefore run once rather than once per repository, and hold borgmatic's own lock on each of
+    those repositories (if enabled) for the duration.
+
+    Return a dict from repository path to a concurrent.futures.Future for the outcome of creating
+    that repository's archive, as per borgmatic.actions.create.run_fan_out_create(). If the create
+    action fails before getting that far, for instance because a data source dump fails, then use
+    that error as the outcome for every repository. And if the create action isn't getting fanned
+    out, return an empty dict.
+
+    Skip fanning out if the "progress" option is set, because concurrent progress output would
+    garble the terminal. Also skip it if another requested action comes before create or there are
+    any "before: repository" command hooks, because fanning out would run create ahead of them.
+    '''
+    create_arguments = arguments.get('create')
+    skip_actions = get_skip_actions(config, arguments)
+
+    if (
+        not config.get('fan_out_create')
+        or create_arguments is None
+        or config.get('progress')
+        or 'create' in skip_actions
+    ):
+        return {}
+
+    action_names = [
+        action_name
+        for action_name in arguments
+        if action_name != 'global' and action_name not in skip_actions
+    ]
+
+    if action_names[0] != 'create' or command.filter_hooks(
+        config.get('commands'), before='repository', action_names=arguments.keys()
+    ):
+        logger.debug(
+            'Not fanning out create, as other actions or "before: repository" command hooks must run before it'
+        )
+        return {}
+
+    requested_repository = get_requested_repository(arguments)
+    repositories = [
+        repository
+        for repository in config['repositories']
+        if not requested_repository
+        or borgmatic.config.validate.repositories_match(repository, requested_repository)
+    ]
+
+    if len(repositories) <= 1:
+        return {}
+
+    global_arguments = arguments['global']
+
+    try:
+        with (
+            borgmatic.hooks.command.Before_after_hooks(
+                command_hooks=config.get('commands'),
+                before_after='action',
+                umask=config.get('umask'),
+                working_directory=borgmatic.config.paths.get_working_directory(config),
+                dry_run=global_arguments.dry_run,
+                action_names=('create',),
+                configuration_filename=config_filename,
+                log_file=config.get('log_file', ''),
+            ),
+            borgmatic.execute.Command_timeouts(
+                **config.get('command_timeouts', {}).get('actions', {}).get('create', {})
+            ),
+            contextlib.ExitStack() as repository_locks,
+        ):
+            # Take the locks in a consistent order, so that fanned out runs can't deadlock.
+            for repository_lock in sorted(
+                (
+                    borgmatic.lock.Repository_lock(config, repository, config_filename)
+                    for repository in repositories
+                ),
+                key=lambda repository_lock: repository_lock.lock_path or '',
+            ):
+                repository_locks.enter_context(repository_lock)
+
+            return borgmatic.actions.create.run_fan_out_create(
+                repositories,
+                config,
+                config_paths,
+                local_borg_version,
+                create_arguments,
+                global_arguments,
+                ' (dry run; not making any changes)' if global_arguments.dry_run else '',
+                local_path,
+                remote_path,
+            )
+    except (OSError, CalledProcessError, ValueError) as error:
+        create_future = concurrent.futures.Future()
+        create_future.set_exception(error)
+
+        return {repository['path']: create_future for repository in repositories}
+
+
+def log_repository_retry(error, retry_num, retries):
+    '''
+    Given an error from running actions for a repository, the number of the attempt that just
+    failed (zero for the first), and the total number of configured retries, log the error as a
+    warning along with the upcoming retry attempt.
+    '''
+    tuple(  # Consume the generator so as to trigger logging.
+        log_error_records(
+            'Error running actions for repository',
+            error,
+            levelno=logging.WARNING,
+            log_command_error_output=True,
+        ),
+    )
+    logger.warning(f'Retrying... attempt {retry_num + 1}/{retries}')
+
+
+def run_repository_actions(repository, **run_actions_arguments):
+    '''
+    Given a repository config dict and keyword arguments for run_actions(), run the actions for
+    that repository with its log prefix. This is intended to run on a worker thread, so collect
+    results rather than yielding them.
+
+    Return a tuple of (results tuple, error), where the error is None if the actions all succeeded.
+    Any results from actions that completed before an error are still included.
+    '''
+    results = []
+
+    with Log_prefix(repository.get('label', repository['path'])):
+        logger.debug('Running actions for repository')
+
+        try:
+            for result in run_actions(repository=repository, **run_actions_arguments):
+                results.append(result)  # noqa: PERF402
+        except (OSError, CalledProcessError, ValueError) as error:
+            return (tuple(results), error)
+
+    return (tuple(results), None)
+
+
+def run_repositories_concurrently(
+    repositories, concurrency, retries, retry_wait, create_futures, **run_actions_arguments
+):
+    '''
+    Given a sequence of repository config dicts, the maximum number of repositories to run actions
+    for at once, the number of retries and the retry wait in seconds, a dict from repository path
+    to concurrent.futures.Future for any fanned out create (as per run_fan_out_create()), and
+    keyword arguments for run_actions(), run the actions for each repository on a pool of worker
+    threads.
+
+    A failing repository with retries left gets scheduled to run again once its retry wait has
+    elapsed, without holding up any other repository in the meantime. Repositories become ready in
+    configuration order, but results get yielded in the order that repositories finish.
+
+    Yield a combination of JSON output strings from the actions and logging.LogRecord instances
+    for any errors, the same as run_configuration(). Return a tuple of (error, repository config
+    dict) for the last repository that failed, or (None, None) if none did.
+    '''
+    encountered_error = None
+    error_repository = None
+
+    # A heap of (ready time, sequence number, repository, retry number) tuples for repositories
+    # waiting to run. The sequence number breaks ties so that repositories run in order.
+    sequence = itertools.count()
+    waiting = [(0, next(sequence), repository, 0) for repository in repositories]
+    running = {}
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix='borgmatic-repository'
+    )
+
+    try:
+        while waiting or running:
+            now = time.monotonic()
+
+            while waiting and waiting[0][0] <= now and len(running) < concurrency:
+                _, _, repository, retry_num = heapq.heappop(waiting)
+                future = executor.submit(
+                    contextvars.copy_context().run,
+                    run_repository_actions,
+                    repository,
+                    create_future=create_futures.pop(repository['path'], None),
+                    **run_actions_arguments,
+                )
+                running[future] = (repository, retry_num)
+
+            if not running:
+                time.sleep(waiting[0][0] - now)
+                continue
+
+            done, _ = concurrent.futures.wait(
+                running,
+                # Wake up when the next waiting repository is ready, but only if there's a free
+                # worker to run it on.
+                timeout=waiting[0][0] - now if waiting and len(running) < concurrency else None,
+                return_when=concurrent.futures.FIRST_COMPLETED,
+            )
+
+            for future in done:
+                repository, retry_num = running.pop(future)
+                results, error = future.result()
+                yield from results
+
+                if error is None:
+                    continue
+
+                with Log_prefix(repository.get('label', repository['path'])):
+                    if retry_num < retries:
+                        log_repository_retry(error, retry_num, retries)
+                        delay = (retry_num + 1) * retry_wait
+
+                        if delay:
+                            logger.warning(f'Waiting {delay}s before next retry')
+
+                        heapq.heappush(
+                            waiting,
+                            (time.monotonic() + delay, next(sequence), repository, retry_num + 1),
+                        )
+                        continue
+
+                    if command.considered_soft_failure(error):
+                        continue
+
+                    yield from log_error_records('Error running actions for repository', error)
+
+                encountered_error = error
+                error_repository = repository
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    return (encountered_error, error_repository)
+
+
 def run_configuration(config_filename, config, config_paths, arguments):  # noqa: PLR0912, PLR0915
     '''
     Given a config filename, the corresponding parsed config dict, a sequence of loaded
@@ -214,6 +491,12 @@ def run_configuration(config_filename, config, config_paths, arguments):  # noqa
 
     try:
         with (
+            borgmatic.execute.Command_usage_report(config_filename, config),
+            borgmatic.execute.Error_output_line_count(config.get('error_output_lines')),
+            borgmatic.execute.Command_timeouts(
+                config.get('command_timeouts', {}).get('soft'),
+                config.get('command_timeouts', {}).get('hard'),
+            ),
             Monitoring_hooks(config_filename, config, arguments, global_arguments),
             borgmatic.hooks.command.Before_after_hooks(
                 command_hooks=config.get('commands'),
@@ -236,10 +519,44 @@ def run_configuration(config_filename, config, config_paths, arguments):  # noqa
                 )
                 raise
 
-            for repo in config['repositories']:
-                repo_queue.put(
-                    (repo, 0),
+            # Any repository whose create already ran as part of a fan out gets its outcome from here
+            # instead. But if that create fails, a retry runs the create for the repository alone.
+            create_futures = run_fan_out_create(
+                config_filename,
+                config,
+                config_paths,
+                arguments,
+                local_borg_version,
+                local_path,
+                remote_path,
+            )
+
+            repository_concurrency = config.get('repository_concurrency', 1)
+
+            if (
+                repository_concurrency > 1
+                and len(config['repositories']) > 1
+                and not config.get('progress')
+            ):
+                encountered_error, error_repository = yield from run_repositories_concurrently(
+                    config['repositories'],
+                    repository_concurrency,
+                    retries,
+                    retry_wait,
+                    create_futures,
+                    arguments=arguments,
+                    config_filename=config_filename,
+                    config=config,
+                    config_paths=config_paths,
+                    local_path=local_path,
+                    remote_path=remote_path,
+                    local_borg_version=local_borg_version,
                 )
+            else:
+                for repo in config['repositories']:
+                    repo_queue.put(
+                        (repo, 0),
+                    )
 
             while not repo_queue.empty():
                 repository, retry_num = repo_queue.get()
@@ -262,21 +579,14 @@ def run_configuration(config_filename, config, config_paths, arguments):  # noqa
                             remote_path=remote_path,
                             local_borg_version=local_borg_version,
                             repository=repository,
+                            create_future=create_futures.pop(repository['path'], None),
                         )
                     except (OSError, CalledProcessError, ValueError) as error:
                         if retry_num < retries:
                             repo_queue.put(
                                 (repository, retry_num + 1),
                             )
-                            tuple(  # Consume the generator so as to trigger logging.
-                                log_error_records(
-                                    'Error running actions for repository',
-                                    error,
-                                    levelno=logging.WARNING,
-                                    log_command_error_output=True,
-                                ),
-                            )
-                            logger.warning(f'Retrying... attempt {retry_num + 1}/{retries}')
+                            log_repository_retry(error, retry_num, retries)
                             continue
 
                         if command.considered_soft_failure(error):
@@ -339,6 +649,7 @@ def run_actions(  # noqa: PLR0912, PLR0915
     remote_path,
     local_borg_version,
     repository,
+    create_future=None,
 ):
     '''
     Given parsed command-line arguments as an argparse.ArgumentParser instance, the configuration
@@ -346,6 +657,9 @@ def run_actions(  # noqa: PLR0912, PLR0915
     to Borg, a local Borg version string, and a repository dict, run all actions from the
     command-line arguments on the given repository.
 
+    If a concurrent.futures.Future is given for the outcome of a create action that already ran for
+    this repository, then use that outcome rather than running the create action again.
+
     Yield JSON output strings from executing any actions that produce JSON.
 
     Raise OSError or subprocess.CalledProcessError if an error occurs running a command for an
@@ -365,15 +679,7 @@ def run_actions(  # noqa: PLR0912, PLR0915
         'repository': repository_path,
     }
     skip_actions = set(get_skip_actions(config, arguments))
-    requested_repository = next(
-        (
-            repository
-            for action_arguments in arguments.values()
-            for repository in (getattr(action_arguments, 'repository', None),)
-            if repository is not None
-        ),
-        None,
-    )
+    requested_repository = get_requested_repository(arguments)
 
     if requested_repository and not borgmatic.config.validate.repositories_match(
         repository,
@@ -382,27 +688,39 @@ def run_actions(  # noqa: PLR0912, PLR0915
         logger.debug('Skipping actions because the requested --repository does not match')
         return
 
-    with borgmatic.hooks.command.Before_after_hooks(
-        command_hooks=config.get('commands'),
-        before_after='repository',
-        umask=config.get('umask'),
-        working_directory=borgmatic.config.paths.get_working_directory(config),
-        dry_run=global_arguments.dry_run,
-        action_names=arguments.keys(),
-        **hook_context,
+    with (
+        borgmatic.lock.Repository_lock(config, repository, config_filename),
+        borgmatic.hooks.command.Before_after_hooks(
+            command_hooks=config.get('commands'),
+            before_after='repository',
+            umask=config.get('umask'),
+            working_directory=borgmatic.config.paths.get_working_directory(config),
+            dry_run=global_arguments.dry_run,
+            action_names=arguments.keys(),
+            **hook_context,
+        ),
     ):
         for action_name, action_arguments in arguments.items():
             if action_name == 'global' or action_name in skip_actions:
                 continue
 
-            with borgmatic.hooks.command.Before_after_hooks(
-                command_hooks=config.get('commands'),
-                before_after='action',
-                umask=config.get('umask'),
-                working_directory=borgmatic.config.paths.get_working_directory(config),
-                dry_run=global_arguments.dry_run,
-                action_names=(action_name,),
-                **hook_context,
+            if action_name == 'create' and create_future is not None:
+                yield from create_future.result()
+                continue
+
+            with (
+                borgmatic.hooks.command.Before_after_hooks(
+                    command_hooks=config.get('commands'),
+                    before_after='action',
+                    umask=config.get('umask'),
+                    working_directory=borgmatic.config.paths.get_working_directory(config),
+                    dry_run=global_arguments.dry_run,
+                    action_names=(action_name,),
+                    **hook_context,
+                ),
+                borgmatic.execute.Command_timeouts(
+                    **config.get('command_timeouts', {}).get('actions', {}).get(action_name, {})
+                ),
             ):
                 if action_name == 'repo-create':
                     borgmatic.actions.repo_create.run_repo_create(
@@ -920,12 +1238,120 @@ def collect_highlander_action_summary_logs(configs, arguments, configuration_par
         yield from log_error_records(error)
 
 
-def collect_configuration_run_summary_logs(configs, config_paths, arguments, log_file_path):  # noqa: PLR0912
+def get_configuration_hosts(config):
+    '''
+    Given a parsed configuration dict, return the set of remote hosts that its repositories are on.
+    Local repositories don't contribute a host.
+    '''
+    return {
+        host
+        for repository in config.get('repositories', ())
+        for host in (borgmatic.config.validate.get_repository_host(repository['path']),)
+        if host
+    }
+
+
+def run_configuration_for_results(config_filename, config, config_paths, arguments):
+    '''
+    Given a config filename, the corresponding parsed config dict, a sequence of loaded
+    configuration paths, and command-line arguments as a dict from subparser name to a namespace of
+    parsed arguments, run the configuration file with its log prefix and return a list of its
+    results as per run_configuration().
+    '''
+    with Log_prefix(config_filename):
+        return list(run_configuration(config_filename, config, config_paths, arguments))
+
+
+def run_configurations(
+    configs, config_paths, arguments, configuration_concurrency=1, host_concurrency=1
+):
+    '''
+    Given a dict of configuration filename to corresponding parsed configuration, a sequence of
+    loaded configuration paths, command-line arguments as a dict from subparser name to a namespace
+    of parsed arguments, the maximum number of configuration files to run at once, and the maximum
+    number of configuration files with repositories on the same remote host to run at once, run
+    each configuration file. Yield a list of each configuration file's results (as per
+    run_configuration()) in the same order as the configuration files.
+
+    With a configuration concurrency above one, run configuration files on a pool of worker
+    threads. In that case, a configuration file only starts once all of the remote hosts for its
+    repositories are below the host concurrency limit, so that configuration files backing up to
+    the same host don't contend with each other.
+    '''
+    if configuration_concurrency <= 1 or len(configs) <= 1:
+        for config_filename, config in configs.items():
+            yield run_configuration_for_results(config_filename, config, config_paths, arguments)
+
+        return
+
+    config_hosts = {
+        config_filename: get_configuration_hosts(config)
+        for config_filename, config in configs.items()
+    }
+    waiting = list(configs)
+    unyielded = collections.deque(configs)
+    running = {}
+    finished = {}
+    running_host_counts = collections.Counter()
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=configuration_concurrency, thread_name_prefix='borgmatic-configuration'
+    )
+
+    try:
+        while waiting or running:
+            # Start as many waiting configuration files as the limits allow, in order. Something
+            # can always start when nothing's running, as then no host is at its limit.
+            for config_filename in tuple(waiting):
+                if len(running) >= configuration_concurrency:
+                    break
+
+                hosts = config_hosts[config_filename]
+
+                if any(running_host_counts[host] >= host_concurrency for host in hosts):
+                    continue
+
+                waiting.remove(config_filename)
+                running_host_counts.update(hosts)
+                future = executor.submit(
+                    contextvars.copy_context().run,
+                    run_configuration_for_results,
+                    config_filename,
+                    configs[config_filename],
+                    config_paths,
+                    arguments,
+                )
+                running[future] = config_filename
+
+            done, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+
+            for future in done:
+                config_filename = running.pop(future)
+                running_host_counts.subtract(config_hosts[config_filename])
+                finished[config_filename] = future.result()
+
+            while unyielded and unyielded[0] in finished:
+                yield finished.pop(unyielded.popleft())
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def collect_configuration_run_summary_logs(  # noqa: PLR0912
+    configs,
+    config_paths,
+    arguments,
+    log_file_path,
+    configuration_concurrency=1,
+    host_concurrency=1,
+):
     '''
     Given a dict of configuration filename to corresponding parsed configuration, a sequence of
     loaded configuration paths, parsed command-line arguments as a dict from subparser name to a
-    parsed namespace of arguments, and the path of a log file (if any), run each configuration file
-    and yield a series of logging.LogRecord instances containing summary information about each run.
+    parsed namespace of arguments, the path of a log file (if any), the maximum number of
+    configuration files to run at once, and the maximum number of configuration files with
+    repositories on the same remote host to run at once, run each configuration file and yield a
+    series of logging.LogRecord instances containing summary information about each run.
 
     As a side effect of running through these configuration files, output their JSON results, if
     any, to stdout.
@@ -982,10 +1408,13 @@ def collect_configuration_run_summary_logs(configs, config_paths, arguments, log
     json_results = []
     encountered_error = False
 
-    for config_filename, config in configs.items():
+    for config_filename, results in zip(
+        configs,
+        run_configurations(
+            configs, config_paths, arguments, configuration_concurrency, host_concurrency
+        ),
+    ):
         with Log_prefix(config_filename):
-            results = list(run_configuration(config_filename, config, config_paths, arguments))
-
             error_logs = tuple(
                 result for result in results if isinstance(result, logging.LogRecord)
             )
@@ -1124,8 +1553,8 @@ def main(extra_summary_logs=()):  # pragma: no cover
     schema_filename = validate.schema_filename()
 
     try:
-        schema = borgmatic.config.load.load_configuration(schema_filename)
-    except (ruamel.yaml.error.YAMLError, RecursionError) as error:
+        schema = validate.load_schema(schema_filename)
+    except validate.Validation_error as error:
         configure_logging(logging.CRITICAL)
         logger.critical(error)
         exit_with_help_link()
@@ -1177,6 +1606,8 @@ def main(extra_summary_logs=()):  # pragma: no cover
     )
     log_file_path = get_singular_option_value(configs, 'log_file')
     log_json = get_singular_option_value(configs, 'log_json')
+    configuration_concurrency = get_singular_option_value(configs, 'configuration_concurrency')
+    host_concurrency = get_singular_option_value(configs, 'host_concurrency')
 
     try:
         configure_logging(
@@ -1211,6 +1642,8 @@ def main(extra_summary_logs=()):  # pragma: no cover
                     config_paths,
                     arguments,
                     log_file_path,
+                    configuration_concurrency or 1,
+                    host_concurrency or 1,
                 ),
             )
         )
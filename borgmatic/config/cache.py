@@ -0,0 +1,200 @@
+import hashlib
+import importlib.metadata
+import json
+import logging
+import os
+import time
+
+import borgmatic.config.paths
+from borgmatic.config import environment
+
+logger = logging.getLogger(__name__)
+
+
+# A configuration file must be at least this old before its parsed configuration gets cached, so
+# that a file changing in the midst of loading it can't slip past the content hashes stored in the
+# cache.
+MINIMUM_CACHED_FILE_AGE_NANOSECONDS = 2_000_000_000
+
+
+def hash_file(path):
+    '''
+    Given the path of a file, return a SHA-256 hex digest of its contents.
+
+    Raise OSError if the file can't be read.
+    '''
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def hash_environment_variables(names):
+    '''
+    Given a sequence of environment variable names, return a dict from each name to a SHA-256 hex
+    digest of its value in the environment, or None if it's not set.
+    '''
+    return {
+        name: (
+            hashlib.sha256(os.environ[name].encode('utf-8')).hexdigest()
+            if name in os.environ
+            else None
+        )
+        for name in names
+    }
+
+
+def get_referenced_variable_names(texts):
+    '''
+    Given a sequence of strings, return the set of names of any environment variables that they
+    reference in the form of "${NAME}".
+    '''
+    return {
+        match.group('name')
+        for text in texts
+        for match in environment.VARIABLE_PATTERN.finditer(text)
+    }
+
+
+class Configuration_cache:
+    '''
+    A cache of loaded, normalized, and validated configuration, stored in the borgmatic state
+    directory so that a subsequent borgmatic run can skip all that work for an unchanged
+    configuration file.
+
+    Each cache entry is keyed by the configuration filename, along with everything else that goes
+    into the resulting configuration besides the contents of files: command-line arguments and
+    overrides, whether environment variables get resolved, the working directory and home directory
+    (used to find includes), and the borgmatic version. An entry stores the content hash of the
+    configuration file and of every file it includes, plus hashes of the values of any environment
+    variables those files reference. The entry only gets used if all of those hashes still match.
+
+    Because the location of the cache must be known before loading any configuration, it always
+    lives in the default borgmatic state directory, regardless of the "user_state_directory"
+    option.
+    '''
+
+    def __init__(self, config_filename, prepared_arguments, overrides, resolve_env):
+        '''
+        Given a configuration filename, a sequence of (keys, value) tuples for command-line
+        arguments that apply to the configuration (as per
+        borgmatic.config.arguments.prepare_arguments_for_config()), a sequence of configuration file
+        override strings, and whether to resolve environment variables, determine the path of the
+        cache entry for them.
+        '''
+        self.config_filename = config_filename
+        self.key = json.dumps(
+            [
+                os.path.abspath(config_filename),
+                os.getcwd(),
+                os.path.expanduser('~'),
+                importlib.metadata.version('borgmatic'),
+                prepared_arguments,
+                overrides,
+                resolve_env,
+            ],
+            default=str,
+        )
+        self.path = os.path.join(
+            borgmatic.config.paths.get_borgmatic_state_directory({}),
+            'configuration',
+            hashlib.sha256(self.key.encode('utf-8')).hexdigest() + '.json',
+        )
+        self.start_time_ns = time.time_ns()
+
+    def load(self):
+        '''
+        Return the cached configuration as a tuple of: the configuration dict, the set of loaded
+        configuration paths, and a sequence of logging.LogRecord instances from loading it—as per
+        borgmatic.config.validate.parse_configuration(). Return None if there's no cache entry, it
+        can't be read, or any of the files or environment variables it depends on have changed.
+        '''
+        try:
+            with open(self.path, encoding='utf-8') as cache_file:
+                cache = json.load(cache_file)
+
+            file_hashes = cache['file_hashes']
+            environment_hashes = cache['environment_hashes']
+
+            for path, file_hash in file_hashes.items():
+                if hash_file(path) != file_hash:
+                    return None
+
+            if hash_environment_variables(environment_hashes) != environment_hashes:
+                return None
+
+            return (
+                cache['config'],
+                set(file_hashes),
+                tuple(
+                    logging.makeLogRecord(record)
+                    for record in (
+                        *cache['logs'],
+                        dict(
+                            levelno=logging.DEBUG,
+                            levelname='DEBUG',
+                            msg=f'{self.config_filename}: Using cached configuration from {self.path}',
+                        ),
+                    )
+                ),
+            )
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    def save(self, config, config_paths, logs):
+        '''
+        Given a configuration dict, the set of configuration paths loaded to produce it, and a
+        sequence of logging.LogRecord instances from loading it, store them in the cache. Don't
+        bother if any of the configuration files changed too recently to trust its content hash.
+
+        Write the cache entry atomically, so concurrent borgmatic runs never see a partially written
+        one. The file is only readable by its owner, as the configuration may contain secrets. Log
+        and otherwise ignore any errors, as the cache is merely an optimization.
+        '''
+        try:
+            file_contents = {}
+
+            for path in config_paths:
+                if (
+                    self.start_time_ns - os.stat(path).st_mtime_ns
+                    < MINIMUM_CACHED_FILE_AGE_NANOSECONDS
+                ):
+                    return
+
+                with open(path, 'rb') as file:
+                    file_contents[path] = file.read()
+
+            cache = json.dumps(
+                {
+                    'file_hashes': {
+                        path: hashlib.sha256(contents).hexdigest()
+                        for path, contents in file_contents.items()
+                    },
+                    'environment_hashes': hash_environment_variables(
+                        sorted(
+                            get_referenced_variable_names(
+                                (
+                                    self.key,
+                                    *(
+                                        contents.decode('utf-8', errors='replace')
+                                        for contents in file_contents.values()
+                                    ),
+                                )
+                            )
+                        )
+                    ),
+                    'config': config,
+                    'logs': [
+                        dict(levelno=log.levelno, levelname=log.levelname, msg=log.getMessage())
+                        for log in logs
+                    ],
+                },
+                separators=(',', ':'),
+            )
+
+            # Some YAML values (like non-string mapping keys) don't survive a trip through JSON
+            # unchanged, so don't cache a configuration containing them.
+            if json.loads(cache)['config'] != config:
+                return
+
+            borgmatic.config.paths.write_file_atomically(self.path, cache)
+        except (OSError, TypeError, ValueError) as error:
+            logger.debug(f'Cannot write configuration cache at {self.path}: {error}')
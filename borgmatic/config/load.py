@@ -1,3 +1,4 @@
+import copy
 import functools
 import itertools
 import logging
@@ -9,6 +10,47 @@ import ruamel.yaml
 logger = logging.getLogger(__name__)
 
 
+@functools.cache
+def parse_included_configuration(absolute_filename, stat_signature):
+    '''
+    Given the absolute path of a configuration file to include and a tuple of its stat() details,
+    load the file and return a tuple of: its loaded configuration and a frozenset of the paths of it
+    and any files it includes in turn.
+
+    The stat() details are unused here except as part of the cache key, so that a file that changes
+    gets loaded again. Because many configuration files tend to include the same common files,
+    this caches each loaded include for the life of the process. Callers must not modify the
+    returned configuration.
+    '''
+    included_paths = set()
+
+    return (load_configuration(absolute_filename, included_paths), frozenset(included_paths))
+
+
+def load_included_configuration(filename, config_paths):
+    '''
+    Given a filename to include and a set of configuration paths, load the file (or get it from the
+    include cache) and return a copy of the loaded configuration, which the caller is free to
+    modify. Add the filename to the given configuration paths, and also add any filenames it
+    includes in turn.
+    '''
+    absolute_filename = os.path.abspath(filename)
+
+    try:
+        status = os.stat(absolute_filename)
+    except OSError:
+        # Let load_configuration() raise an appropriate error.
+        return load_configuration(filename, config_paths)
+
+    configuration, included_paths = parse_included_configuration(
+        absolute_filename,
+        (status.st_dev, status.st_ino, status.st_size, status.st_mtime_ns, status.st_ctime_ns),
+    )
+    config_paths.update(included_paths)
+
+    return copy.deepcopy(configuration)
+
+
 def probe_and_include_file(filename, include_directories, config_paths):
     '''
     Given a filename to include, a list of include directories to search for matching files, and a
@@ -20,7 +62,7 @@ def probe_and_include_file(filename, include_directories, config_paths):
     expanded_filename = os.path.expanduser(filename)
 
     if os.path.isabs(expanded_filename):
-        return load_configuration(expanded_filename, config_paths)
+        return load_included_configuration(expanded_filename, config_paths)
 
     candidate_filenames = {
         os.path.join(directory, expanded_filename) for directory in include_directories
@@ -28,7 +70,7 @@ def probe_and_include_file(filename, include_directories, config_paths):
 
     for candidate_filename in candidate_filenames:
         if os.path.exists(candidate_filename):
-            return load_configuration(candidate_filename, config_paths)
+            return load_included_configuration(candidate_filename, config_paths)
 
     raise FileNotFoundError(
         f'Could not find include {filename} at {" or ".join(candidate_filenames)}',
@@ -2,6 +2,7 @@ import contextlib
 import logging
 import os
 import tempfile
+import threading
 from enum import Enum
 
 logger = logging.getLogger(__name__)
@@ -84,6 +85,106 @@ def replace_temporary_subdirectory_with_glob(
     )
 
 
+def concurrency_enabled(config):
+    '''
+    Given a configuration dict, return whether borgmatic may run more than one configuration file or
+    repository at once, as per the "configuration_concurrency" and "repository_concurrency" options.
+    '''
+    return (
+        config.get('configuration_concurrency', 1) > 1
+        or config.get('repository_concurrency', 1) > 1
+    )
+
+
+# The names of the temporary directories for the Runtime_directory instances currently in use
+# within this process, guarded by a lock because concurrent runs add and remove them from separate
+# threads. See Runtime_directory below.
+ACTIVE_TEMPORARY_DIRECTORY_NAMES = set()
+ACTIVE_TEMPORARY_DIRECTORY_NAMES_LOCK = threading.Lock()
+
+
+def get_temporary_directory_name(path):
+    '''
+    Given a path, return the name of its first subdirectory starting with the temporary directory
+    prefix, e.g. "borgmatic-1234-aet8kn93" for "/tmp/borgmatic-1234-aet8kn93/./borgmatic". Return
+    None if there isn't one.
+    '''
+    return next(
+        (
+            subdirectory
+            for subdirectory in path.split(os.path.sep)
+            if subdirectory.startswith(TEMPORARY_DIRECTORY_PREFIX)
+        ),
+        None,
+    )
+
+
+def get_temporary_directory_process_id(name):
+    '''
+    Given the name of a borgmatic temporary directory (or of something named after one), return the
+    process ID included in it by a Runtime_directory created with concurrency enabled, e.g. 1234 for
+    "borgmatic-1234-aet8kn93". Return None if the name doesn't include a process ID.
+    '''
+    (process_id, separator, _) = name[len(TEMPORARY_DIRECTORY_PREFIX) :].partition('-')
+
+    if not separator or not process_id.isdigit():
+        return None
+
+    return int(process_id)
+
+
+def get_run_scoped_temporary_directory_name(path):
+    '''
+    Given a path within a borgmatic temporary directory, return the name of that temporary directory
+    if it includes a process ID (meaning concurrency is enabled), so that things like snapshots can
+    get named after it. Otherwise, return None.
+    '''
+    name = get_temporary_directory_name(path)
+
+    if name is None or get_temporary_directory_process_id(name) is None:
+        return None
+
+    return name
+
+
+def temporary_directory_in_use_elsewhere(path, borgmatic_runtime_directory):
+    '''
+    Given a path within a borgmatic temporary directory (or just the name of such a directory or of
+    something named after one, like a snapshot) and the current borgmatic runtime directory, return
+    whether a different borgmatic run is still using that temporary directory: either another thread
+    of this process or another process that's still alive. This allows cleaning up leftovers from
+    prior runs without pulling the rug out from under concurrent runs.
+
+    This only applies when the current run has concurrency enabled (and so its runtime directory
+    includes a process ID). Otherwise, nothing is considered in use, so cleanup removes all
+    leftovers as it always has. Similarly, a path without a temporary directory is never considered
+    in use, nor is one without a process ID.
+    '''
+    current_name = get_run_scoped_temporary_directory_name(borgmatic_runtime_directory)
+    name = get_temporary_directory_name(path)
+
+    if current_name is None or name is None or name == current_name:
+        return False
+
+    process_id = get_temporary_directory_process_id(name)
+
+    if process_id is None:
+        return False
+
+    if process_id == os.getpid():
+        with ACTIVE_TEMPORARY_DIRECTORY_NAMES_LOCK:
+            return name in ACTIVE_TEMPORARY_DIRECTORY_NAMES
+
+    try:
+        os.kill(process_id, 0)
+    except (ProcessLookupError, OverflowError):
+        return False
+    except PermissionError:
+        return True
+
+    return True
+
+
 class Runtime_directory:
     '''
     A Python context manager for creating and cleaning up the borgmatic runtime directory used for
@@ -105,7 +206,9 @@ class Runtime_directory:
         or $RUNTIME_DIRECTORY/borgmatic-[random]/./borgmatic or
         $TMPDIR/borgmatic-[random]/./borgmatic or $TEMP/borgmatic-[random]/./borgmatic or
         /tmp/borgmatic-[random]/./borgmatic where "[random]" is a randomly generated string intended
-        to avoid path collisions.
+        to avoid path collisions. If concurrency is enabled, then "[random]" also starts with the
+        process ID, which lets cleanup code tell whether the directory is still in use; see
+        temporary_directory_in_use_elsewhere().
 
         If XDG_RUNTIME_DIR or RUNTIME_DIRECTORY is set and already ends in "/borgmatic", then don't
         tack on a second "/borgmatic" path component.
@@ -134,10 +237,21 @@ class Runtime_directory:
                 raise ValueError('The temporary directory must be an absolute path')
 
         os.makedirs(base_directory, mode=0o700, exist_ok=True)
+        self.run_scoped = concurrency_enabled(config)
         self.temporary_directory = tempfile.TemporaryDirectory(
-            prefix=TEMPORARY_DIRECTORY_PREFIX,
+            prefix=(
+                f'{TEMPORARY_DIRECTORY_PREFIX}{os.getpid()}-'
+                if self.run_scoped
+                else TEMPORARY_DIRECTORY_PREFIX
+            ),
             dir=base_directory,
         )
+        self.temporary_directory_name = os.path.basename(self.temporary_directory.name)
+
+        if self.run_scoped:
+            with ACTIVE_TEMPORARY_DIRECTORY_NAMES_LOCK:
+                ACTIVE_TEMPORARY_DIRECTORY_NAMES.add(self.temporary_directory_name)
+
         self.runtime_path = expand_user_in_path(
             os.path.join(
                 self.temporary_directory.name,
@@ -165,6 +279,10 @@ class Runtime_directory:
         with contextlib.suppress(OSError):
             self.temporary_directory.cleanup()
 
+        if self.run_scoped:
+            with ACTIVE_TEMPORARY_DIRECTORY_NAMES_LOCK:
+                ACTIVE_TEMPORARY_DIRECTORY_NAMES.discard(self.temporary_directory_name)
+
 
 def make_runtime_directory_glob(borgmatic_runtime_directory):
     '''
@@ -197,3 +315,32 @@ def get_borgmatic_state_directory(config):
             'borgmatic',
         ),
     )
+
+
+def write_file_atomically(path, contents):
+    '''
+    Given a file path and a string of contents, write the contents to the path, creating any missing
+    parent directories. Write to a temporary file first and then rename it into place, so concurrent
+    borgmatic runs and threads never see a partially written file. The file is only readable by its
+    owner.
+
+    Raise OSError if the file can't be written, after removing any temporary file.
+    '''
+    temporary_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+    try:
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+
+        with open(
+            os.open(temporary_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600),
+            'w',
+            encoding='utf-8',
+        ) as output_file:
+            output_file.write(contents)
+
+        os.replace(temporary_path, path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.remove(temporary_path)
+
+        raise
@@ -1,11 +1,15 @@
 import fnmatch
+import functools
+import hashlib
+import json
 import os
+import urllib.parse
 
 import jsonschema
 import ruamel.yaml
 
 import borgmatic.config.arguments
-from borgmatic.config import constants, environment, load, normalize, override
+from borgmatic.config import cache, constants, environment, load, normalize, override
 
 
 def schema_filename():
@@ -21,18 +25,100 @@ def schema_filename():
         return schema_path
 
 
-def load_schema(schema_path):  # pragma: no cover
+def precompiled_schema_filename(schema_path):
     '''
-    Given a schema filename path, load the schema and return it as a dict.
+    Given a schema filename path, return the path of its precompiled counterpart: a JSON file
+    alongside it.
+    '''
+    return f'{os.path.splitext(schema_path)[0]}.json'
+
+
+def hash_schema(schema_path):
+    '''
+    Given a schema filename path, return a hex digest of the schema file's contents.
+    '''
+    with open(schema_path, 'rb') as schema_file:
+        return hashlib.sha256(schema_file.read()).hexdigest()
+
+
+def precompile_schema(schema_path):
+    '''
+    Given a schema filename path, load the schema and write it as JSON to its precompiled
+    counterpart, along with a hash of the schema file. Return the path of the precompiled schema.
+
+    This is intended to run at build time, so that borgmatic can start up without having to parse
+    the schema's YAML.
+    '''
+    precompiled_path = precompiled_schema_filename(schema_path)
+    schema_hash = hash_schema(schema_path)
+    schema = load.load_configuration(schema_path)
+
+    with open(precompiled_path, 'w', encoding='utf-8') as precompiled_file:
+        json.dump({'schema_sha256': schema_hash, 'schema': schema}, precompiled_file)
+
+    return precompiled_path
 
-    Raise Validation_error if the schema could not be parsed.
+
+def load_precompiled_schema(schema_path):
+    '''
+    Given a schema filename path, load the schema from its precompiled counterpart and return it as
+    a dict. Return None if there's no readable precompiled schema or if it's stale, i.e. it was
+    precompiled from a schema file with different contents.
+    '''
+    try:
+        with open(precompiled_schema_filename(schema_path), encoding='utf-8') as precompiled_file:
+            precompiled = json.load(precompiled_file)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(precompiled, dict) or precompiled.get('schema_sha256') != hash_schema(
+        schema_path
+    ):
+        return None
+
+    return precompiled.get('schema')
+
+
+@functools.cache
+def load_schema(schema_path):
+    '''
+    Given a schema filename path, load the schema and return it as a dict. Prefer loading a
+    precompiled schema if there's an up-to-date one, as that's much faster than parsing YAML.
+
+    The schema only gets loaded once per process for a given path, and all callers share the
+    returned dict. So don't modify it.
+
+    Raise FileNotFoundError if the schema does not exist or Validation_error if the schema could not
+    be parsed.
     '''
+    precompiled_schema = load_precompiled_schema(schema_path)
+
+    if precompiled_schema is not None:
+        return precompiled_schema
+
     try:
         return load.load_configuration(schema_path)
     except (ruamel.yaml.error.YAMLError, RecursionError) as error:
         raise Validation_error(schema_path, (str(error),))
 
 
+@functools.cache
+def get_schema_validator(schema_path):
+    '''
+    Given a schema filename path, return a JSON Schema validator for the schema. The validator only
+    gets constructed once per process for a given path.
+
+    Raise FileNotFoundError if the schema does not exist or Validation_error if the schema could not
+    be parsed.
+    '''
+    schema = load_schema(schema_path)
+
+    try:
+        return jsonschema.Draft7Validator(schema)
+    except AttributeError:  # pragma: no cover
+        return jsonschema.Draft4Validator(schema)
+
+
 def format_json_error_path_element(path_element):
     '''
     Given a path element into a JSON data structure, format it for display as a string.
@@ -127,10 +213,35 @@ def parse_configuration(
     applying the given arguments to it. This is useful for the "bootstrap" action, for which
     configuration may not yet exist.
 
+    If a previous call stored the resulting configuration in the configuration cache (see
+    borgmatic.config.cache.Configuration_cache) and nothing it depends on has changed since, then
+    return the cached configuration instead of loading and validating it again. After loading a
+    configuration with the "cache_configuration" option enabled, store it in that cache.
+
     Raise FileNotFoundError if the file does not exist, PermissionError if the user does not
     have permissions to read the file, or Validation_error if the config does not match the schema.
     '''
     config_paths = set()
+    schema = load_schema(schema_filename)
+    configuration_cache = None
+
+    if config_filename:
+        configuration_cache = cache.Configuration_cache(
+            config_filename,
+            tuple(
+                prepared_argument
+                for action_arguments in arguments.values()
+                for prepared_argument in borgmatic.config.arguments.prepare_arguments_for_config(
+                    action_arguments, schema
+                )
+            ),
+            overrides,
+            resolve_env,
+        )
+        cached_configuration = configuration_cache.load()
+
+        if cached_configuration:
+            return cached_configuration
 
     try:
         config = (
@@ -138,7 +249,6 @@ def parse_configuration(
             if config_filename
             else {'repositories': []}
         )
-        schema = load.load_configuration(schema_filename)
     except (ruamel.yaml.error.YAMLError, RecursionError) as error:
         raise Validation_error(config_filename, (str(error),))
 
@@ -151,12 +261,7 @@ def parse_configuration(
 
     logs = normalize.normalize(config_filename, config)
 
-    try:
-        validator = jsonschema.Draft7Validator(schema)
-    except AttributeError:  # pragma: no cover
-        validator = jsonschema.Draft4Validator(schema)
-
-    validation_errors = tuple(validator.iter_errors(config))
+    validation_errors = tuple(get_schema_validator(schema_filename).iter_errors(config))
 
     if validation_errors:
         raise Validation_error(
@@ -166,6 +271,9 @@ def parse_configuration(
 
     apply_logical_validation(config_filename, config)
 
+    if configuration_cache and config.get('cache_configuration'):
+        configuration_cache.save(config, config_paths, logs)
+
     return config, config_paths, logs
 
 
@@ -190,6 +298,21 @@ def normalize_repository_path(repository, base=None):
     return repository
 
 
+def get_repository_host(repository_path):
+    '''
+    Given a repository path, return the name of the remote host that the repository is on, or None
+    for a local repository. This supports both URL-style paths like "ssh://user@host:22/./repo" and
+    scp-style paths like "user@host:repo".
+    '''
+    if ':' not in repository_path or repository_path.startswith('file://'):
+        return None
+
+    if '://' in repository_path:
+        return urllib.parse.urlsplit(repository_path).hostname
+
+    return repository_path.partition(':')[0].rpartition('@')[-1]
+
+
 def glob_match(first, second):
     '''
     Given two strings, return whether the first matches the second. Globs are
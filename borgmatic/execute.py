@@ -1,16 +1,33 @@
 import collections
+import concurrent.futures
 import contextlib
+import contextvars
 import enum
+import fcntl
+import functools
+import hashlib
 import json
 import locale
 import logging
 import os
-import select
+import re
+import selectors
+import signal
 import subprocess
+import sys
 import textwrap
 import time
 
+import borgmatic.config.paths
 import borgmatic.logger
+import borgmatic.signals
+
+try:  # pragma: no cover
+    import orjson
+
+    load_json = orjson.loads
+except ImportError:  # pragma: no cover
+    load_json = json.loads
 
 logger = logging.getLogger(__name__)
 
@@ -123,16 +140,33 @@ def output_buffers_for_process(process, exclude_stdouts):
     '''
     Given a process as an instance of subprocess.Popen and a sequence of stdouts to exclude, return
     the process stdout and stderr as a tuple—but exclude the stdout if it's in the given stdouts to
-    exclude.
+    exclude. Also exclude any buffer that's None, for instance because stderr got redirected to
+    stdout.
     '''
     return tuple(
-        buffer for buffer in (process.stdout, process.stderr) if buffer not in exclude_stdouts
+        buffer
+        for buffer in (process.stdout, process.stderr)
+        if buffer is not None and buffer not in exclude_stdouts
     )
 
 
 BORG_LOG_LEVEL_ELEVATION_THRESHOLD = 10
 
 
+def elevate_borg_log_level(borg_log_level, log_level):
+    '''
+    Given the log level from a Borg log entry and a requested log level, return the log level to use
+    for that entry. That's the requested log level if it's just a little bit higher than Borg's, or
+    Borg's log level otherwise.
+    '''
+    log_level_delta = 0 if log_level is None else log_level - borg_log_level
+
+    if log_level_delta > 0 and log_level_delta < BORG_LOG_LEVEL_ELEVATION_THRESHOLD:
+        return log_level
+
+    return borg_log_level
+
+
 def borg_json_log_line_to_record(line, log_level):
     '''
     Given a single Borg "--log-json"-style log line and a log level, return the line converted to a
@@ -142,34 +176,29 @@ def borg_json_log_line_to_record(line, log_level):
     provide a log level—or the log level given to this function is just a little bit higher than
     Borg's—elevate to that level. This supports use cases like elevating Borg's INFO level logs to
     borgmatic's custom ANSWER level so that requested data shows up even at the default verbosity.
+
+    If orjson is installed, use it to parse the JSON, as it's considerably faster than the standard
+    library.
     '''
     with contextlib.suppress(json.JSONDecodeError, TypeError, KeyError, AttributeError):
-        log_data = json.loads(line)
+        log_data = load_json(line)
         log_type = log_data.get('type')
 
         if log_type == 'log_message':
             borg_log_level = logging._nameToLevel.get(log_data.get('levelname'))
-            log_level_delta = 0 if log_level is None else log_level - borg_log_level
-
-            if log_level_delta > 0 and log_level_delta < BORG_LOG_LEVEL_ELEVATION_THRESHOLD:
-                return logging.makeLogRecord(
-                    dict(
-                        levelno=log_level,
-                        created=log_data.get('time'),
-                        msg=log_data.get('message'),
-                        msgid=log_data.get('msgid'),
-                        levelname=logging.getLevelName(log_level),
-                        name=log_data.get('name'),
-                    )
-                )
+            elevated_log_level = elevate_borg_log_level(borg_log_level, log_level)
 
             return logging.makeLogRecord(
                 dict(
-                    levelno=borg_log_level,
+                    levelno=elevated_log_level,
                     created=log_data.get('time'),
                     msg=log_data.get('message'),
                     msgid=log_data.get('msgid'),
-                    levelname=log_data.get('levelname'),
+                    levelname=(
+                        log_data.get('levelname')
+                        if elevated_log_level == borg_log_level
+                        else logging.getLevelName(elevated_log_level)
+                    ),
                     name=log_data.get('name'),
                 )
             )
@@ -189,6 +218,82 @@ def borg_json_log_line_to_record(line, log_level):
     return None
 
 
+BORG_JSON_FILE_STATUS_TYPE = '"type": "file_status"'
+BORG_JSON_LOG_MESSAGE_TYPE = '"type": "log_message"'
+BORG_JSON_LEVEL_NAME_PATTERN = re.compile(r'"levelname": "([A-Z]+)"')
+
+
+def peek_borg_json_log_line_level(line, log_level):
+    '''
+    Given a single Borg "--log-json"-style log line and a log level, cheaply peek at the line's
+    "type" and "levelname" fields without actually parsing the JSON, and return the log level that
+    borg_json_log_line_to_record() would give the line's record. Return None if the log level can't
+    be determined this way.
+
+    Matching on raw substrings is safe here because any quotes within JSON string values are
+    escaped, so a value can't masquerade as a "type" or "levelname" field.
+    '''
+    if not line.startswith('{'):
+        return None
+
+    if BORG_JSON_FILE_STATUS_TYPE in line:
+        return log_level
+
+    if BORG_JSON_LOG_MESSAGE_TYPE not in line:
+        return None
+
+    match = BORG_JSON_LEVEL_NAME_PATTERN.search(line)
+    borg_log_level = logging._nameToLevel.get(match.group(1)) if match else None
+
+    if borg_log_level is None:
+        return None
+
+    return elevate_borg_log_level(borg_log_level, log_level)
+
+
+def discard_borg_json_log_line(line, log_level, borg_local_path, command, capture):
+    '''
+    Given a raw output line from an external program, a log level, the Borg local path, the command
+    as a sequence, and whether the command's output is getting captured, return whether the line
+    can be discarded without even parsing it. That's the case when the command is Borg, the line is
+    Borg JSON log data, no log handler would accept a record at its log level, and the line
+    wouldn't get captured either.
+
+    This is purely an optimization for commands like "borg create --list" that can produce millions
+    of log lines, most of which may end up filtered out anyway. Callers should still keep a
+    discarded line in the process' error output window as an Unparsed_borg_json_log_line, so that
+    it isn't missing from any raised exception.
+    '''
+    if not command_is_borg(command, borg_local_path):
+        return False
+
+    record_log_level = peek_borg_json_log_line_level(line, log_level)
+
+    if record_log_level is None or (capture and record_log_level == log_level):
+        return False
+
+    return not logger.isEnabledFor(record_log_level)
+
+
+class Unparsed_borg_json_log_line:
+    '''
+    A Borg JSON log line that got discarded without parsing (see discard_borg_json_log_line()), as
+    kept in a process' error output window. Only parse the line if it's actually needed for error
+    output—which is when it gets converted to a string.
+    '''
+
+    __slots__ = ('line', 'log_level')
+
+    def __init__(self, line, log_level):
+        self.line = line
+        self.log_level = log_level
+
+    def __str__(self):
+        log_record = borg_json_log_line_to_record(self.line, self.log_level)
+
+        return self.line if log_record is None else log_record.getMessage()
+
+
 def log_line_to_record(line, log_level):
     '''
     Given a log data dict for a single Borg log entry and a log level, return it converted to a
@@ -230,20 +335,16 @@ def parse_log_line(line, log_level, elevate_stderr, borg_local_path, command):
     return log_line_to_record(line, log_level)
 
 
-def handle_log_record(log_record, last_lines=None):
+def handle_log_record(log_record, process_metadata=None):
     '''
-    Given a log record to be logged and a rolling list of last lines, append the record's message to
-    the last lines (if given). Then (if the log level is not None), log the record.
+    Given a log record to be logged and a Process_metadata instance for the process that produced
+    it, append the record's message to the process' last lines (if given). Then (if the log level
+    is not None), log the record.
 
     Return the log record.
     '''
-    log_message = log_record.getMessage()
-
-    if last_lines is not None:
-        last_lines.append(log_message)
-
-        if len(last_lines) > ERROR_OUTPUT_MAX_LINE_COUNT:
-            last_lines.pop(0)
+    if process_metadata is not None:
+        process_metadata.append_line(log_record.getMessage())
 
     if log_record.levelno is not None:
         logger.handle(log_record)
@@ -254,91 +355,680 @@ def handle_log_record(log_record, last_lines=None):
 READ_CHUNK_SIZE = 4096
 
 
-def read_lines(buffer, process, line_separator='\n'):
+def get_pipe_capacity(buffer):
+    '''
+    Given a Python buffer (like stdout) for a pipe, return the pipe's capacity in bytes. Fall back to
+    READ_CHUNK_SIZE if the capacity can't be determined, for instance on platforms without
+    F_GETPIPE_SZ support or if the buffer isn't actually a pipe.
+    '''
+    try:
+        return max(fcntl.fcntl(buffer.fileno(), fcntl.F_GETPIPE_SZ), READ_CHUNK_SIZE)
+    except (AttributeError, OSError):
+        return READ_CHUNK_SIZE
+
+
+def read_lines(buffer, process, line_separator='\n', usage=None):
     '''
-    Given a Python buffer (like stdout) ready for reading, its process, and a line separator,
-    repeatedly yield a tuple of (decoded) lines from the buffer until the process has exited.
+    Given a Python buffer (like stdout) ready for reading, its process, a line separator, and an
+    optional Command_usage instance to count bytes read, repeatedly yield a tuple of (decoded) lines
+    from the buffer until the process has exited.
 
     It is assumed that this function's generator is used in conjunction with an external select()
     call to know when to read more lines. Otherwise, the generator will busywait if it's called in a
     tight loop.
+
+    Whenever a read fills an entire chunk, the process is likely producing output faster than it's
+    getting drained. So in that case, double the chunk size for subsequent reads, up to the capacity
+    of the pipe.
     '''
-    data = b''
+    data = bytearray()
     encoded_separator = line_separator.encode()
     separator_size = len(encoded_separator)
     encoding = locale.getpreferredencoding()
+    chunk_size = READ_CHUNK_SIZE
+    max_chunk_size = get_pipe_capacity(buffer)
 
     while True:
-        chunk = os.read(buffer.fileno(), READ_CHUNK_SIZE)
+        chunk = os.read(buffer.fileno(), chunk_size)
 
         if not chunk:  # EOF
-            # The process is still running, so we keep running too.
-            if process.poll() is None:  # pragma: no cover
-                continue
-
             break
 
+        if usage is not None:
+            usage.add_bytes_read(len(chunk), stderr=buffer == process.stderr)
+
+        if len(chunk) == chunk_size:
+            chunk_size = min(chunk_size * 2, max_chunk_size)
+
+        # Any data held back from the previous chunk contains no complete separator, so only search
+        # from where a separator could start to straddle the chunk boundary.
+        search_start = max(len(data) - separator_size + 1, 0)
         data += chunk
-        lines = []
 
-        # Split the data into lines, holding back anything leftover that might
-        # be a partial line.
-        while True:
-            separator_position = data.find(encoded_separator)
+        # Split all complete lines in one pass, holding back anything leftover that might be a
+        # partial line. Deleting from the front of a bytearray doesn't copy the remaining data.
+        last_separator_position = data.rfind(encoded_separator, search_start)
 
-            if separator_position == -1:
-                break
+        if last_separator_position == -1:
+            yield ()
+            continue
 
-            lines.append(data[:separator_position].decode(encoding))
-            data = data[separator_position + separator_size :]
+        lines = data[:last_separator_position].split(encoded_separator)
+        del data[: last_separator_position + separator_size]
 
-        yield tuple(lines)
+        yield tuple(line.decode(encoding) for line in lines)
 
     # Yield any leftover data from the end of the buffer.
     if data:
         yield (data.decode(encoding).rstrip(),)
 
 
+def read_raw_output(buffer, process, capture_buffer, usage=None):
+    '''
+    Given a Python buffer (like stdout) ready for reading, its process, a bytearray to capture into,
+    and an optional Command_usage instance to count bytes read, repeatedly read raw data from the
+    buffer and append it to the capture buffer until the process has exited. Yield an empty tuple
+    of lines after each read, so that this function's generator can stand in for read_lines()
+    without any line splitting or decoding.
+
+    Like read_lines(), it is assumed that this function's generator is used in conjunction with an
+    external select() call to know when to read more data.
+    '''
+    chunk_size = get_pipe_capacity(buffer)
+
+    while True:
+        chunk = os.read(buffer.fileno(), chunk_size)
+
+        if not chunk:  # EOF
+            break
+
+        if usage is not None:
+            usage.add_bytes_read(len(chunk), stderr=buffer == process.stderr)
+
+        capture_buffer.extend(chunk)
+
+        yield ()
+
+
 Buffer_reader = collections.namedtuple(
     'Buffer_reader',
     ('lines', 'process'),
 )
 
 
-Process_metadata = collections.namedtuple(
-    'Process_metadata',
-    ('last_lines', 'capture'),
-)
+# How long to wait for output before re-checking for exited processes, used only on platforms
+# without pidfd support.
+EXIT_POLL_INTERVAL_SECONDS = 0.1
+
+
+class Output_selector:
+    '''
+    An event engine for waiting on process output buffers and process exits, built on
+    selectors.DefaultSelector (epoll on Linux). Each output buffer gets registered once and then
+    unregistered upon EOF. Where supported, a pidfd for each process gets registered as well, so that
+    a process exit wakes up the engine without having to poll every process on every turn. That
+    also allows reaping each exited process with os.wait4() to collect its resource usage.
+    '''
+
+    def __init__(self, processes):
+        self.selector = selectors.DefaultSelector()
+        self.process_to_pidfd = {}
+        self.process_to_rusage = {}
+        self.pidfds_supported = True
+
+        for process in processes:
+            self.register_process(process)
+
+    def register_process(self, process):
+        '''
+        Open and register a pidfd for the given subprocess.Popen instance. If pidfds aren't supported
+        on this platform, then fall back to polling for process exits instead.
+        '''
+        try:
+            pidfd = os.pidfd_open(process.pid)
+        except (AttributeError, OSError):
+            self.pidfds_supported = False
+            return
+
+        self.process_to_pidfd[process] = pidfd
+        self.selector.register(pidfd, selectors.EVENT_READ, data=process)
+
+    def register_buffer(self, buffer):
+        '''
+        Register the given output buffer for reading.
+        '''
+        self.selector.register(buffer, selectors.EVENT_READ)
+
+    def unregister_buffer(self, buffer):
+        '''
+        Unregister the given output buffer, for instance because it has hit EOF. Do nothing if it's
+        not registered.
+        '''
+        with contextlib.suppress(KeyError, ValueError):
+            self.selector.unregister(buffer)
+
+    def select(self, timeout=None):
+        '''
+        Wait until at least one registered buffer is ready for reading or a registered process has
+        exited, and return a tuple of the ready buffers. Record any exited processes so that
+        process_exited() knows about them. If a timeout in seconds is given, wait no longer than
+        that.
+
+        Without pidfd support, only wait a short interval, so callers get a chance to poll for
+        process exits even when no output arrives.
+        '''
+        # With nothing registered, there's nothing that could ever end the wait.
+        if not self.selector.get_map():
+            return ()
+
+        ready_buffers = []
+        select_timeout = None if self.pidfds_supported else EXIT_POLL_INTERVAL_SECONDS
+
+        if timeout is not None:
+            select_timeout = timeout if select_timeout is None else min(select_timeout, timeout)
+
+        for key, _ in self.selector.select(select_timeout):
+            if key.data is None:
+                ready_buffers.append(key.fileobj)
+                continue
+
+            # A pidfd became readable, meaning its process has exited.
+            self.selector.unregister(key.fileobj)
+            os.close(self.process_to_pidfd.pop(key.data))
+            self.reap_process(key.data)
+
+        return tuple(ready_buffers)
+
+    def reap_process(self, process):
+        '''
+        Given a subprocess.Popen instance for a process that has exited, reap it with os.wait4() to
+        collect its resource usage, and record its exit code on the Popen instance so subprocess
+        knows that it's been reaped. Do nothing if the process has already been reaped elsewhere.
+        '''
+        try:
+            pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+        except ChildProcessError:
+            return
+
+        if not pid:
+            return
+
+        process.returncode = os.waitstatus_to_exitcode(status)
+        self.process_to_rusage[process] = rusage
+
+    def process_exited(self, process):
+        '''
+        Given a subprocess.Popen instance, return whether it has exited, reaping it if so. If the
+        process' pidfd hasn't signaled an exit yet, skip polling the process altogether.
+        '''
+        if process in self.process_to_pidfd:
+            return False
+
+        return process.poll() is not None
+
+    def close(self):
+        '''
+        Close the underlying selector along with any still-open pidfds.
+        '''
+        for pidfd in self.process_to_pidfd.values():
+            os.close(pidfd)
+
+        self.process_to_pidfd.clear()
+        self.selector.close()
+
+
+# Whether subprocess.Popen() supports starting a process in its own process group.
+PROCESS_GROUP_SUPPORTED = sys.version_info >= (3, 11)
+
+
+def make_process_group_options(shell, input_file=None, do_not_capture=False):
+    '''
+    Given whether a command runs within a shell, its input file (if any), and whether its output is
+    intentionally not captured, return a dict of extra keyword arguments for subprocess.Popen() to
+    start the command in its own process group. That way, the command and any processes it spawns
+    (like the pipeline of a shell command) can get torn down together.
+
+    Only shell commands get their own process group, and only when they're not interacting with a
+    terminal. That's because a process outside of the terminal's foreground process group gets
+    stopped as soon as it tries to read from the terminal.
+    '''
+    if not PROCESS_GROUP_SUPPORTED or not shell or do_not_capture:
+        return {}
+
+    if input_file is None and sys.stdin is not None and sys.stdin.isatty():
+        return {}
+
+    return {'process_group': 0}
+
+
+def register_process_group(process, process_group_options):
+    '''
+    Given a subprocess.Popen instance and the process group options it was started with, record
+    whether the process leads its own process group. That way, signals sent to borgmatic get
+    forwarded to the process group, and the process group can get torn down as a whole.
+    '''
+    if process_group_options:
+        borgmatic.signals.child_process_groups.add(process)
+
+
+def unregister_process_groups(processes):
+    '''
+    Given a sequence of subprocess.Popen instances, forget about the process groups of any that
+    have exited and been reaped. (Once reaped, a process' ID can get reused.)
+    '''
+    for process in processes:
+        if process.returncode is not None:
+            borgmatic.signals.child_process_groups.discard(process)
+
+
+def send_signal_to_process(process, signal_number):
+    '''
+    Given a subprocess.Popen instance and a signal number, send the signal to the process. But if
+    the process leads its own process group, send the signal to the whole process group instead, so
+    any processes it spawned get the signal as well.
+    '''
+    if process not in borgmatic.signals.child_process_groups:
+        process.send_signal(signal_number)
+        return
+
+    with contextlib.suppress(ProcessLookupError):
+        os.killpg(process.pid, signal_number)
+
+
+def kill_process(process):
+    '''
+    Given a subprocess.Popen instance, kill it along with its process group (if any).
+    '''
+    if process not in borgmatic.signals.child_process_groups:
+        process.kill()
+        return
+
+    send_signal_to_process(process, signal.SIGKILL)
+
+
+# The soft and hard timeouts in seconds for commands run in the current context. See
+# Command_timeouts below.
+COMMAND_TIMEOUTS = contextvars.ContextVar('command_timeouts', default=(None, None))
+
+
+class Command_timeouts:
+    '''
+    A Python context manager for setting soft and hard timeouts (in seconds) for any commands
+    executed within it. Once a command exceeds its soft timeout, it gets terminated. And if it's
+    still running once it exceeds its hard timeout, it gets killed. A timeout of None means to use
+    any timeout from an outer context manager, if any.
+
+    Example use as a context manager:
+
+       with borgmatic.execute.Command_timeouts(soft=3600, hard=3900):
+           do_something_that_executes_commands()
+    '''
+
+    def __init__(self, soft=None, hard=None):
+        self.soft = soft
+        self.hard = hard
+
+    def __enter__(self):
+        self.original_timeouts = COMMAND_TIMEOUTS.get()
+        original_soft, original_hard = self.original_timeouts
+
+        COMMAND_TIMEOUTS.set(
+            (
+                original_soft if self.soft is None else self.soft,
+                original_hard if self.hard is None else self.hard,
+            )
+        )
+
+    def __exit__(self, exception_type, exception, traceback):
+        COMMAND_TIMEOUTS.set(self.original_timeouts)
+
+
+class Command_deadline:
+    '''
+    Soft and hard deadlines for a set of running processes, measured from when the deadlines get
+    created. Once the soft timeout elapses, terminate any processes still running. Then once the
+    hard timeout elapses, kill any processes that are still running anyway.
+    '''
+
+    def __init__(self, processes, soft_timeout=None, hard_timeout=None):
+        self.processes = processes
+        self.soft_timeout = soft_timeout
+        self.hard_timeout = hard_timeout
+        self.start_time = time.monotonic()
+        self.terminated = soft_timeout is None
+        self.killed = hard_timeout is None
+
+    def seconds_remaining(self):
+        '''
+        Return the number of seconds until the next deadline that has yet to be enforced, or None
+        if there isn't one.
+        '''
+        timeouts = (
+            *(() if self.terminated else (self.soft_timeout,)),
+            *(() if self.killed else (self.hard_timeout,)),
+        )
+
+        if not timeouts:
+            return None
+
+        return max(self.start_time + min(timeouts) - time.monotonic(), 0)
+
+    def enforce(self):
+        '''
+        If a deadline has passed, then terminate or kill (as appropriate) any processes still
+        running, logging the time they've spent.
+        '''
+        elapsed_seconds = time.monotonic() - self.start_time
+
+        if not self.killed and elapsed_seconds >= self.hard_timeout:
+            self.terminated = self.killed = True
+            stop = kill_process
+            description = f'hard timeout of {self.hard_timeout} seconds'
+        elif not self.terminated and elapsed_seconds >= self.soft_timeout:
+            self.terminated = True
+            stop = functools.partial(send_signal_to_process, signal_number=signal.SIGTERM)
+            description = f'soft timeout of {self.soft_timeout} seconds'
+        else:
+            return
+
+        for process in self.processes:
+            if process.poll() is not None:
+                continue
+
+            logger.warning(
+                f'{command_for_process(process)}: Stopping command after {elapsed_seconds:.1f} seconds due to exceeding its {description}'
+            )
+            stop(process)
+
+
+class Command_usage:
+    '''
+    Resource usage for an executed command: its wall time, user and system CPU time, peak resident
+    set size, the number of bytes read from its stdout and stderr, and its exit code. The wall time
+    is measured from when borgmatic starts supervising the command's output.
+
+    The CPU times and peak resident set size are only available for processes reaped by an
+    Output_selector, which requires pidfd support. Otherwise, they're None.
+    '''
+
+    __slots__ = (
+        'command',
+        'exit_code',
+        'peak_rss_bytes',
+        'start_time',
+        'stderr_bytes',
+        'stdout_bytes',
+        'system_cpu_seconds',
+        'user_cpu_seconds',
+        'wall_seconds',
+    )
+
+    def __init__(self, command):
+        self.command = command
+        self.start_time = time.monotonic()
+        self.wall_seconds = None
+        self.user_cpu_seconds = None
+        self.system_cpu_seconds = None
+        self.peak_rss_bytes = None
+        self.stdout_bytes = 0
+        self.stderr_bytes = 0
+        self.exit_code = None
+
+    def add_bytes_read(self, byte_count, stderr=False):
+        '''
+        Count the given number of bytes as read from the command's stdout, or stderr if requested.
+        '''
+        if stderr:
+            self.stderr_bytes += byte_count
+        else:
+            self.stdout_bytes += byte_count
+
+    def finish(self, exit_code, rusage=None):
+        '''
+        Given the command's exit code (or None if it's still running) and its resource usage as an
+        os.wait4() rusage value (if available), record the command as finished.
+        '''
+        self.wall_seconds = time.monotonic() - self.start_time
+        self.exit_code = exit_code
+
+        if rusage is None:
+            return
+
+        self.user_cpu_seconds = rusage.ru_utime
+        self.system_cpu_seconds = rusage.ru_stime
+
+        # The maximum resident set size is in kilobytes on Linux but in bytes on macOS.
+        self.peak_rss_bytes = rusage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+    def to_dict(self):
+        '''
+        Return the usage as a dict suitable for serializing to JSON, masking any secrets in the
+        command.
+        '''
+        return {
+            'command': textwrap.shorten(
+                (
+                    self.command
+                    if isinstance(self.command, str)
+                    else ' '.join(mask_command_secrets(self.command))
+                ),
+                width=MAX_LOGGED_COMMAND_LENGTH,
+                placeholder=' ...',
+            ),
+            'wall_seconds': self.wall_seconds,
+            'user_cpu_seconds': self.user_cpu_seconds,
+            'system_cpu_seconds': self.system_cpu_seconds,
+            'peak_rss_bytes': self.peak_rss_bytes,
+            'stdout_bytes': self.stdout_bytes,
+            'stderr_bytes': self.stderr_bytes,
+            'exit_code': self.exit_code,
+        }
+
+
+# A list of Command_usage instances for the commands executed in the current context, if any. See
+# Command_usage_report below.
+COMMAND_USAGES = contextvars.ContextVar('command_usages', default=None)
+
+
+def record_command_usage(usage):
+    '''
+    Given a Command_usage instance for a finished command, record it for the current
+    Command_usage_report context (if any).
+    '''
+    usages = COMMAND_USAGES.get()
+
+    if usages is not None:
+        usages.append(usage)
+
+
+def log_command_usage_summary(usages):
+    '''
+    Given a sequence of Command_usage instances, log a summary of them: how many commands ran, for
+    how long in total, and which command took the longest.
+    '''
+    if not usages:
+        return
+
+    total_wall_seconds = sum(usage.wall_seconds or 0 for usage in usages)
+    total_cpu_seconds = sum(
+        (usage.user_cpu_seconds or 0) + (usage.system_cpu_seconds or 0) for usage in usages
+    )
+    longest_usage = max(usages, key=lambda usage: usage.wall_seconds or 0)
+
+    logger.info(
+        f'Ran {len(usages)} command{"s" if len(usages) > 1 else ""} in {total_wall_seconds:.1f} seconds ({total_cpu_seconds:.1f} seconds of CPU time); the longest was {textwrap.shorten(longest_usage.to_dict()["command"], width=60, placeholder=" ...")} at {longest_usage.wall_seconds or 0:.1f} seconds'
+    )
+
+
+def make_command_usage_report_path(config_filename, config):
+    '''
+    Given a configuration filename and its configuration dict, return the path of the JSON report of
+    command usage for that configuration file within the borgmatic state directory.
+    '''
+    return os.path.join(
+        borgmatic.config.paths.get_borgmatic_state_directory(config),
+        'command_usage',
+        f'{hashlib.sha256(config_filename.encode()).hexdigest()}.json',
+    )
+
+
+def write_command_usage_report(path, config_filename, usages):
+    '''
+    Given a report path, a configuration filename, and a sequence of Command_usage instances for the
+    commands run for that configuration file, write a JSON report of the usage to the path,
+    atomically. Log and otherwise ignore any errors writing the file, as the report is merely
+    informational.
+    '''
+    try:
+        borgmatic.config.paths.write_file_atomically(
+            path,
+            json.dumps(
+                {
+                    'configuration_filename': config_filename,
+                    'finished_time': time.time(),
+                    'commands': [usage.to_dict() for usage in usages],
+                },
+                indent=4,
+            ),
+        )
+    except OSError as error:
+        logger.debug(f'Cannot write command usage report to {path}: {error}')
+
+
+class Command_usage_report:
+    '''
+    A Python context manager for collecting the resource usage of each command executed within it.
+    Upon exit, log a summary of the usage and write a JSON report of it to the borgmatic state
+    directory.
+
+    Example use as a context manager:
+
+       with borgmatic.execute.Command_usage_report(config_filename, config):
+           do_something_that_executes_commands()
+    '''
+
+    def __init__(self, config_filename, config):
+        self.config_filename = config_filename
+        self.config = config
+
+    def __enter__(self):
+        self.usages = []
+        self.original_usages = COMMAND_USAGES.get()
+        COMMAND_USAGES.set(self.usages)
+
+    def __exit__(self, exception_type, exception, traceback):
+        COMMAND_USAGES.set(self.original_usages)
+
+        if not self.usages:
+            return
+
+        log_command_usage_summary(self.usages)
+        write_command_usage_report(
+            make_command_usage_report_path(self.config_filename, self.config),
+            self.config_filename,
+            self.usages,
+        )
+
+
+# The maximum number of output lines from the current configuration to keep for each command. See
+# Error_output_line_count below.
+ERROR_OUTPUT_LINE_COUNT = contextvars.ContextVar('error_output_line_count', default=None)
+
+
+class Error_output_line_count:
+    '''
+    A Python context manager for setting the maximum number of output lines to keep for each
+    executed command, so that they can be included in the error raised if the command fails. A line
+    count of None means to use the default of ERROR_OUTPUT_MAX_LINE_COUNT.
+
+    Example use as a context manager:
+
+       with borgmatic.execute.Error_output_line_count(200):
+            execute_command(...)
+
+    Afterwards, the line count gets restored to whatever it was prior to the context manager.
+    '''
+
+    def __init__(self, line_count):
+        self.line_count = line_count
+        self.original_line_count = None
+
+    def __enter__(self):
+        self.original_line_count = ERROR_OUTPUT_LINE_COUNT.get()
+        ERROR_OUTPUT_LINE_COUNT.set(self.line_count)
+
+    def __exit__(self, exception_type, exception, traceback):
+        ERROR_OUTPUT_LINE_COUNT.set(self.original_line_count)
+
+
+class Process_metadata:
+    '''
+    Metadata about an executed process: A bounded window of its last lines of output (for
+    including in any error raised), whether any earlier lines fell out of that window, and whether
+    the process' output is getting captured.
+
+    The window holds at most the given maximum line count, defaulting to the line count set by
+    Error_output_line_count or, failing that, ERROR_OUTPUT_MAX_LINE_COUNT.
+    '''
+
+    __slots__ = ('capture', 'last_lines', 'truncated')
+
+    def __init__(self, last_lines=(), capture=False, max_line_count=None):
+        if max_line_count is None:
+            max_line_count = ERROR_OUTPUT_LINE_COUNT.get()
+
+        if max_line_count is None:
+            max_line_count = ERROR_OUTPUT_MAX_LINE_COUNT
+
+        self.capture = capture
+        self.last_lines = collections.deque(last_lines, maxlen=max_line_count)
+        self.truncated = False
+
+    def append_line(self, line):
+        '''
+        Append the given line to the last lines, discarding the oldest line if the window is full.
+        '''
+        if len(self.last_lines) == self.last_lines.maxlen:
+            self.truncated = True
+
+        self.last_lines.append(line)
 
 
 def log_buffer_lines(
-    buffer_readers, process_metadatas, output_log_level, borg_local_path, capture_stderr=False
+    selector,
+    buffer_readers,
+    process_metadatas,
+    output_log_level,
+    borg_local_path,
+    capture_stderr=False,
+    timeout=None,
 ):
     '''
-    Given a dict from buffer object to Buffer_reader, a dict from subprocess.Popen() instance to
-    Process_metadata instance, a requested output log level for stdout, Borg's local path, and
-    whether to capture stderr, read and log any ready output lines from the buffers. Additionally,
-    for any log records with a log level the same as the output log level, yield those log messages
-    for capture.
+    Given an Output_selector, a dict from buffer object to Buffer_reader, a dict from
+    subprocess.Popen() instance to Process_metadata instance, a requested output log level for
+    stdout, Borg's local path, whether to capture stderr, and a timeout in seconds (if any), wait
+    for and then read and log any ready output lines from the buffers. Additionally, for any log
+    records with a log level the same as the output log level, yield those log messages for capture.
 
     This function just does one "turn of the crank" of logging buffer output. It is intended to be
     called repeatedly to continue to process buffers.
     '''
     if not buffer_readers:
+        # There's no output to read, but wait for a process to exit anyway, so that the selector gets
+        # a chance to reap it.
+        selector.select(timeout)
         return
 
-    (ready_buffers, _, _) = select.select(buffer_readers.keys(), [], [])
-
-    for ready_buffer in ready_buffers:
+    for ready_buffer in selector.select(timeout):
         reader = buffer_readers[ready_buffer]
 
         # The "ready" process has exited, but it might be a pipe destination with other
         # processes (pipe sources) waiting to be read from. So as a measure to prevent
         # hangs, vent all processes when one exits.
-        if reader.process and reader.process.poll() is not None:
+        if reader.process and selector.process_exited(reader.process):
             for other_process in process_metadatas:
                 if (
-                    other_process.poll() is None
+                    not selector.process_exited(other_process)
                     and other_process.stdout
                     and other_process.stdout not in buffer_readers
                 ):
@@ -346,16 +1036,31 @@ def log_buffer_lines(
                     buffer_readers[other_process.stdout] = Buffer_reader(
                         read_lines(other_process.stdout, other_process), other_process
                     )
+                    selector.register_buffer(other_process.stdout)
 
         try:
             lines = next(reader.lines)
         except StopIteration:
+            # EOF, so there's no point in waiting on this buffer any longer.
+            selector.unregister_buffer(ready_buffer)
             continue
 
         for line in lines:
             if not line or not reader.process:
                 continue
 
+            if discard_borg_json_log_line(
+                line,
+                output_log_level,
+                borg_local_path,
+                reader.process.args,
+                process_metadatas[reader.process].capture,
+            ):
+                process_metadatas[reader.process].append_line(
+                    Unparsed_borg_json_log_line(line, output_log_level)
+                )
+                continue
+
             # Keep the last few lines of output in case the process errors and we need the
             # output for the exception below.
             log_record = handle_log_record(
@@ -366,7 +1071,7 @@ def log_buffer_lines(
                     borg_local_path=borg_local_path,
                     command=reader.process.args,
                 ),
-                last_lines=process_metadatas[reader.process].last_lines,
+                process_metadata=process_metadatas[reader.process],
             )
 
             if (
@@ -382,19 +1087,33 @@ def raise_for_process_errors(
     borg_local_path,
     borg_exit_codes,
     capture_stderr=False,
+    selector=None,
+    deadline=None,
 ):
     '''
     Given a dict from buffer object to Buffer_reader, a dict from subprocess.Popen() instance to
     Process_metadata instance, a requested output log level for stdout, Borg's local path, a
-    sequence of exit code configuration dicts, and whether to capture stderr, check the given
-    processes for error or warning exit codes. If found, vent or kill any running processes and
-    drain any remaining buffer lines. In the case of an error exit code, raise.  In the case of
-    warning, return Exit_status.WARNING. Otherwise, return None.
+    sequence of exit code configuration dicts, whether to capture stderr, an optional
+    Output_selector, and an optional Command_deadline, check the given processes for error or
+    warning exit codes. If found, vent or kill any running processes and drain any remaining buffer
+    lines. In the case of an error exit code, raise.  In the case of warning, return
+    Exit_status.WARNING. Otherwise, return None.
+
+    If an Output_selector is given, use it to skip checking processes that haven't exited yet. If a
+    Command_deadline is given, don't wait on a process past the next deadline.
     '''
     result_status = None
 
     for process in process_metadatas:
-        exit_code = process.poll() if buffer_readers else process.wait()
+        if not buffer_readers:
+            try:
+                exit_code = process.wait(timeout=deadline.seconds_remaining() if deadline else None)
+            except subprocess.TimeoutExpired:
+                continue
+        elif selector and not selector.process_exited(process):
+            continue
+        else:
+            exit_code = process.poll()
 
         if exit_code is None:
             continue
@@ -409,7 +1128,7 @@ def raise_for_process_errors(
         for other_process in process_metadatas:
             if other_process.poll() is None:
                 other_process.stdout.read(0)
-                other_process.kill()
+                kill_process(other_process)
 
         if exit_status == Exit_status.WARNING:
             result_status = Exit_status.WARNING
@@ -422,17 +1141,17 @@ def raise_for_process_errors(
                 buffer_readers, process_metadatas, output_log_level, borg_local_path, capture_stderr
             )
         )
-        last_lines = process_metadatas[process].last_lines
+        process_metadata = process_metadatas[process]
 
         # If an error occurs, include its output in the raised exception so that we don't
         # inadvertently hide error output.
-        if len(last_lines) >= ERROR_OUTPUT_MAX_LINE_COUNT:
-            last_lines.insert(0, '...')
-
         raise subprocess.CalledProcessError(
             exit_code,
             command_for_process(process),
-            '\n'.join(last_lines),
+            '\n'.join(
+                (('...',) if process_metadata.truncated else ())
+                + tuple(str(line) for line in process_metadata.last_lines)
+            ),
         )
 
     return result_status
@@ -457,6 +1176,18 @@ def log_remaining_buffer_lines(
 
         for lines in reader.lines:
             for line in lines:
+                if discard_borg_json_log_line(
+                    line,
+                    output_log_level,
+                    borg_local_path,
+                    reader.process.args,
+                    process_metadatas[reader.process].capture,
+                ):
+                    process_metadatas[reader.process].append_line(
+                        Unparsed_borg_json_log_line(line.rstrip(), output_log_level)
+                    )
+                    continue
+
                 log_record = handle_log_record(
                     parse_log_line(
                         line=line.rstrip(),
@@ -467,7 +1198,7 @@ def log_remaining_buffer_lines(
                         borg_local_path=borg_local_path,
                         command=reader.process.args,
                     ),
-                    last_lines=process_metadatas[reader.process].last_lines,
+                    process_metadata=process_metadatas[reader.process],
                 )
 
                 if (
@@ -483,6 +1214,8 @@ def log_outputs(
     borg_local_path,
     borg_exit_codes,
     capture_stderr=False,
+    capture=True,
+    capture_buffer=None,
 ):
     '''
     Given a sequence of subprocess.Popen() instances for multiple processes, log the outputs (stderr
@@ -492,7 +1225,12 @@ def log_outputs(
 
     If the output log level is None, then instead of logging, capture the output for the last
     process given and yield it one line at a time. This includes stderr if capture stderr is set.
-    But if the output log level is not None, don't yield anything.
+    But if the output log level is not None, don't yield anything. And if capture is False, then
+    don't capture any output at all, for instance because the caller is going to discard it anyway.
+    That allows Borg log lines that no log handler would accept to get skipped cheaply.
+
+    If a capture buffer (a bytearray) is given, then append the raw stdout of the last process to it
+    as-is, without splitting it into lines, decoding it, or logging it.
 
     This yielding means that this function is a generator, and must be consumed in order to execute.
 
@@ -500,48 +1238,86 @@ def log_outputs(
     warning. If any stdouts are given to exclude, then for any matching processes, ignore those
     buffers. Also note that stdout for a process can be None if output is intentionally not
     captured, in which case it won't be logged.
+
+    Enforce any soft and hard timeouts from the current Command_timeouts context on the processes,
+    measured from when this function starts. And record the resource usage of each process for the
+    current Command_usage_report context (if any).
     '''
     # Map from output buffer to Process_metadata instance. By convention, the last process is the
     # process to capture.
     process_metadatas = {
-        process: Process_metadata(last_lines=[], capture=bool(process == processes[-1]))
+        process: Process_metadata(capture=bool(capture and process == processes[-1]))
         for process in processes
     }
+    process_usages = {process: Command_usage(process.args) for process in processes}
 
     # Map from buffer to Buffer_reader instance.
     buffer_readers = {
-        buffer: Buffer_reader(read_lines(buffer, process), process)
+        buffer: Buffer_reader(
+            (
+                read_raw_output(buffer, process, capture_buffer, process_usages[process])
+                if capture_buffer is not None
+                and process == processes[-1]
+                and buffer == process.stdout
+                else read_lines(buffer, process, usage=process_usages[process])
+            ),
+            process,
+        )
         for process in processes
         if process.stdout or process.stderr
         for buffer in output_buffers_for_process(process, exclude_stdouts)
     }
 
-    # Log output lines for each process until they all exit or one errors.
-    while True:
-        yield from log_buffer_lines(
-            buffer_readers, process_metadatas, output_log_level, borg_local_path, capture_stderr
-        )
+    selector = Output_selector(processes)
+    deadline = Command_deadline(processes, *COMMAND_TIMEOUTS.get())
 
-        if (
-            raise_for_process_errors(
+    try:
+        for buffer in buffer_readers:
+            selector.register_buffer(buffer)
+
+        # Log output lines for each process until they all exit or one errors.
+        while True:
+            deadline.enforce()
+
+            yield from log_buffer_lines(
+                selector,
                 buffer_readers,
                 process_metadatas,
                 output_log_level,
                 borg_local_path,
-                borg_exit_codes,
                 capture_stderr,
+                deadline.seconds_remaining(),
             )
-            == Exit_status.WARNING
-        ):
-            break
 
-        if all(process.poll() is not None for process in processes):
-            break
+            if (
+                raise_for_process_errors(
+                    buffer_readers,
+                    process_metadatas,
+                    output_log_level,
+                    borg_local_path,
+                    borg_exit_codes,
+                    capture_stderr,
+                    selector,
+                    deadline,
+                )
+                == Exit_status.WARNING
+            ):
+                break
 
-    # Now that all processes have exited, drain and consume any last output.
-    yield from log_remaining_buffer_lines(
-        buffer_readers, process_metadatas, output_log_level, borg_local_path, capture_stderr
-    )
+            if all(selector.process_exited(process) for process in processes):
+                break
+
+        # Now that all processes have exited, drain and consume any last output.
+        yield from log_remaining_buffer_lines(
+            buffer_readers, process_metadatas, output_log_level, borg_local_path, capture_stderr
+        )
+    finally:
+        selector.close()
+        unregister_process_groups(processes)
+
+        for process, usage in process_usages.items():
+            usage.finish(process.returncode, selector.process_to_rusage.get(process))
+            record_command_usage(usage)
 
 
 SECRET_COMMAND_FLAG_NAMES = {'--password'}
@@ -612,6 +1388,7 @@ def execute_command(
     borg_exit_codes=None,
     run_to_completion=True,
     close_fds=False,  # Necessary for passing credentials via anonymous pipe.
+    umask=None,
 ):
     '''
     Execute the given command (a sequence of command/argument strings) and log its stdout output at
@@ -623,13 +1400,16 @@ def execute_command(
     (regardless of arguments), treat exit code 1 as a warning instead of an error. But if Borg exit
     codes are given as a sequence of exit code configuration dicts, then use that configuration to
     decide what's an error and what's a warning. If run to completion is False, then return the
-    process for the command without executing it to completion.
+    process for the command without executing it to completion. If an integer umask is given, run
+    the command with it—without touching borgmatic's own process-wide umask, which other threads
+    may depend on.
 
     Raise subprocesses.CalledProcessError if an error occurs while running the command.
     '''
     log_command(full_command, input_file, output_file, environment)
     do_not_capture = bool(output_file is DO_NOT_CAPTURE)
     command = ' '.join(full_command) if shell else full_command
+    process_group_options = make_process_group_options(shell, input_file, do_not_capture)
 
     process = subprocess.Popen(  # noqa: S603
         command,
@@ -640,7 +1420,11 @@ def execute_command(
         env=environment,
         cwd=working_directory,
         close_fds=close_fds,
+        **process_group_options,
+        **({} if umask is None else {'umask': umask}),
     )
+    register_process_group(process, process_group_options)
+
     if not run_to_completion:
         return process
 
@@ -652,6 +1436,7 @@ def execute_command(
                 output_log_level,
                 borg_local_path,
                 borg_exit_codes,
+                capture=False,
             )
         )
 
@@ -689,6 +1474,7 @@ def execute_command_and_capture_output(
     '''
     log_command(full_command, input_file, environment=environment)
     command = ' '.join(full_command) if shell else full_command
+    process_group_options = make_process_group_options(shell, input_file)
 
     try:
         process = subprocess.Popen(  # noqa: S603
@@ -702,6 +1488,7 @@ def execute_command_and_capture_output(
             env=environment,
             cwd=working_directory,
             close_fds=close_fds,
+            **process_group_options,
         )
     except subprocess.CalledProcessError as error:
         if (
@@ -715,6 +1502,8 @@ def execute_command_and_capture_output(
 
         return
 
+    register_process_group(process, process_group_options)
+
     with borgmatic.logger.Log_prefix(None):  # Log command output without any prefix.
         yield from log_outputs(
             (process,),
@@ -726,6 +1515,97 @@ def execute_command_and_capture_output(
         )
 
 
+def execute_command_and_capture_raw_output(
+    full_command,
+    input_file=None,
+    shell=False,
+    environment=None,
+    working_directory=None,
+    borg_local_path=None,
+    borg_exit_codes=None,
+    close_fds=False,  # Necessary for passing credentials via anonymous pipe.
+):
+    '''
+    Execute the given command (a sequence of command/argument strings), capturing and returning its
+    raw output (stdout) as a bytearray. Unlike execute_command_and_capture_output(), the output
+    doesn't get split into lines, decoded, and then joined back together, so this is a better fit
+    for commands with large output that's going to get parsed anyway, like JSON. (json.loads()
+    accepts a bytearray directly.) Any stderr gets logged as usual.
+
+    If an input file descriptor is given, then pipe it to the command's stdin. If shell is True,
+    execute the command within a shell. If an environment variables dict is given, then pass it into
+    the command. If a working directory is given, use that as the present working directory when
+    running the command. If a Borg local path is given, and the command matches it (regardless of
+    arguments), treat exit code 1 as a warning instead of an error. But if Borg exit codes are given
+    as a sequence of exit code configuration dicts, then use that configuration to decide what's an
+    error and what's a warning.
+
+    Raise subprocesses.CalledProcessError if an error occurs while running the command.
+    '''
+    log_command(full_command, input_file, environment=environment)
+    command = ' '.join(full_command) if shell else full_command
+    process_group_options = make_process_group_options(shell, input_file)
+
+    process = subprocess.Popen(  # noqa: S603
+        command,
+        stdin=input_file,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE if command_is_borg(command, borg_local_path) else None,
+        shell=shell,
+        env=environment,
+        cwd=working_directory,
+        close_fds=close_fds,
+        **process_group_options,
+    )
+    register_process_group(process, process_group_options)
+    output = bytearray()
+
+    with borgmatic.logger.Log_prefix(None):  # Log command output without any prefix.
+        tuple(
+            log_outputs(
+                (process,),
+                (input_file,),
+                None,
+                borg_local_path,
+                borg_exit_codes,
+                capture=False,
+                capture_buffer=output,
+            )
+        )
+
+    return output
+
+
+# The maximum number of commands to run concurrently on the command pool.
+COMMAND_POOL_MAX_WORKERS = 8
+
+
+@functools.cache
+def get_command_pool():
+    '''
+    Return a process-wide thread pool for running independent commands concurrently, creating it
+    upon first use. The pool has a bounded number of worker threads, so submitting lots of commands
+    at once doesn't spawn lots of processes at once.
+    '''
+    return concurrent.futures.ThreadPoolExecutor(
+        max_workers=COMMAND_POOL_MAX_WORKERS,
+        thread_name_prefix='borgmatic-command',
+    )
+
+
+def submit(function, *args, **kwargs):
+    '''
+    Given a function that executes one or more commands (like a probe for some information about
+    the system) along with any arguments to pass to it, run it on the command pool and return a
+    concurrent.futures.Future for its return value. This is useful for running independent commands
+    concurrently instead of serially.
+
+    The current log prefix carries over into the function's thread. Note that the function must not
+    itself wait on other futures from the command pool, as that could deadlock.
+    '''
+    return get_command_pool().submit(contextvars.copy_context().run, function, *args, **kwargs)
+
+
 def execute_command_with_processes(
     full_command,
     processes,
@@ -764,6 +1644,7 @@ def execute_command_with_processes(
     log_command(full_command, input_file, output_file, environment)
     do_not_capture = bool(output_file is DO_NOT_CAPTURE)
     command = ' '.join(full_command) if shell else full_command
+    process_group_options = make_process_group_options(shell, input_file, do_not_capture)
 
     try:
         command_process = subprocess.Popen(  # noqa: S603
@@ -775,6 +1656,7 @@ def execute_command_with_processes(
             env=environment,
             cwd=working_directory,
             close_fds=close_fds,
+            **process_group_options,
         )
     except (subprocess.CalledProcessError, OSError):
         # Something has gone wrong. So vent each process' output buffer to prevent it from hanging.
@@ -782,10 +1664,12 @@ def execute_command_with_processes(
         for process in processes:
             if process.poll() is None:
                 process.stdout.read(0)
-                process.kill()
+                kill_process(process)
 
         raise
 
+    register_process_group(command_process, process_group_options)
+
     with borgmatic.logger.Log_prefix(None):  # Log command output without any prefix.
         yield from log_outputs(
             (*processes, command_process),
@@ -793,4 +1677,5 @@ def execute_command_with_processes(
             output_log_level,
             borg_local_path,
             borg_exit_codes,
+            capture=output_log_level is None,
         )
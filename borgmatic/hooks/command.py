@@ -118,7 +118,7 @@ def filter_hooks(command_hooks, before=None, after=None, action_names=None, stat
     )
 
 
-def execute_hooks(command_hooks, umask, working_directory, dry_run, **context):  # noqa: PLR0912
+def execute_hooks(command_hooks, umask, working_directory, dry_run, **context):
     '''
     Given a sequence of command hook dicts from configuration, a umask to execute with (or None), a
     working directory to execute with, and whether this is a dry run, run the commands for each
@@ -162,15 +162,17 @@ def execute_hooks(command_hooks, umask, working_directory, dry_run, **context):
         if umask:
             parsed_umask = int(str(umask), 8)
             logger.debug(f'Setting hook umask to {oct(parsed_umask)}')
-            original_umask = os.umask(parsed_umask)
         else:
-            original_umask = None
+            parsed_umask = None
 
-        try:
+        with borgmatic.execute.Command_timeouts(**hook_config.get('timeouts', {})):
             for command in commands:
                 if dry_run:
                     continue
 
+                # Rather than changing borgmatic's process-wide umask, which would race with any
+                # other configurations running concurrently in threads, only set it for the hook
+                # command itself.
                 borgmatic.execute.execute_command(  # noqa: S604
                     [command],
                     output_log_level=(
@@ -180,10 +182,8 @@ def execute_hooks(command_hooks, umask, working_directory, dry_run, **context):
                     environment=make_environment(os.environ),
                     working_directory=working_directory,
                     close_fds=True,
+                    umask=parsed_umask,
                 )
-        finally:
-            if original_umask:
-                os.umask(original_umask)
 
 
 class Before_after_hooks:
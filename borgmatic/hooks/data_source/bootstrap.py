@@ -116,8 +116,9 @@ def dump_data_sources(
 def remove_data_source_dumps(hook_config, config, borgmatic_runtime_directory, patterns, dry_run):
     '''
     Given a bootstrap configuration dict, a configuration dict, the borgmatic runtime directory, the
-    configured patterns, and whether this is a dry run, then remove the manifest file created above.
-    If this is a dry run, then don't actually remove anything.
+    configured patterns, and whether this is a dry run, then remove the manifest file created above,
+    along with any leftover from a previous borgmatic run that's no longer in progress. If this is a
+    dry run, then don't actually remove anything.
     '''
     dry_run_label = ' (dry run; not actually removing anything)' if dry_run else ''
 
@@ -132,6 +133,11 @@ def remove_data_source_dumps(hook_config, config, borgmatic_runtime_directory, p
     )
 
     for manifest_directory in glob.glob(manifest_glob):
+        if borgmatic.config.paths.temporary_directory_in_use_elsewhere(
+            manifest_directory, borgmatic_runtime_directory
+        ):
+            continue
+
         manifest_file_path = os.path.join(manifest_directory, 'manifest.json')
         logger.debug(f'Removing bootstrap manifest at {manifest_file_path}{dry_run_label}')
 
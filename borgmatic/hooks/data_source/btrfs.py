@@ -118,15 +118,23 @@ def get_all_subvolume_paths(btrfs_command, patterns):
     '''
     Given a btrfs command and a sequence of patterns, get the sorted paths for all Btrfs subvolumes
     containing those patterns.
+
+    As a performance optimization, probe for the subvolume containing each pattern concurrently, as
+    each probe may need to run the btrfs command.
     '''
+    subvolume_path_futures = tuple(
+        borgmatic.execute.submit(get_containing_subvolume_path, btrfs_command, pattern.path)
+        for pattern in patterns
+        if pattern.type == borgmatic.borg.pattern.Pattern_type.ROOT
+        if pattern.source == borgmatic.borg.pattern.Pattern_source.CONFIG
+    )
+
     return tuple(
         sorted(
             {
                 subvolume_path
-                for pattern in patterns
-                if pattern.type == borgmatic.borg.pattern.Pattern_type.ROOT
-                if pattern.source == borgmatic.borg.pattern.Pattern_source.CONFIG
-                for subvolume_path in (get_containing_subvolume_path(btrfs_command, pattern.path),)
+                for future in subvolume_path_futures
+                for subvolume_path in (future.result(),)
                 if subvolume_path
             }
         ),
@@ -104,8 +104,9 @@ def create_named_pipe_for_dump(dump_path):
 def remove_data_source_dumps(dump_path, data_source_type_name, dry_run):
     '''
     Remove all data source dumps in the given dump directory path (including the directory itself).
-    Also remove any dumps that look like they're leftover from a previous borgmatic run. If this is
-    a dry run, then don't actually remove anything.
+    Also remove any dumps that look like they're leftover from a previous borgmatic run, but not
+    those of any borgmatic run still in progress. If this is a dry run, then don't actually remove
+    anything.
     '''
     dry_run_label = ' (dry run; not actually removing anything)' if dry_run else ''
 
@@ -116,6 +117,9 @@ def remove_data_source_dumps(dump_path, data_source_type_name, dry_run):
     )
 
     for path in glob.glob(dump_paths_glob):
+        if borgmatic.config.paths.temporary_directory_in_use_elsewhere(path, dump_path):
+            continue
+
         if not dry_run:
             shutil.rmtree(path, ignore_errors=True)
 
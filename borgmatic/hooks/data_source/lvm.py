@@ -44,19 +44,17 @@ def get_logical_volumes(lsblk_command, patterns=None):
     '''
     try:
         devices_info = json.loads(
-            '\n'.join(
-                borgmatic.execute.execute_command_and_capture_output(
-                    # Use lsblk instead of lvs here because lvs can't show active mounts.
-                    (
-                        *lsblk_command.split(' '),
-                        '--output',
-                        'name,path,mountpoint,type',
-                        '--json',
-                        '--list',
-                    ),
-                    close_fds=True,
+            borgmatic.execute.execute_command_and_capture_raw_output(
+                # Use lsblk instead of lvs here because lvs can't show active mounts.
+                (
+                    *lsblk_command.split(' '),
+                    '--output',
+                    'name,path,mountpoint,type',
+                    '--json',
+                    '--list',
                 ),
-            )
+                close_fds=True,
+            ),
         )
     except json.JSONDecodeError as error:
         raise ValueError(f'Invalid {lsblk_command} JSON output: {error}')
@@ -217,7 +215,12 @@ def dump_data_sources(
     requested_logical_volumes = get_logical_volumes(lsblk_command, patterns)
 
     # Snapshot each logical volume, rewriting source directories to use the snapshot paths.
-    snapshot_suffix = f'{BORGMATIC_SNAPSHOT_PREFIX}{os.getpid()}'
+    # With concurrency enabled, name the snapshots after the runtime directory, so that cleanup can
+    # tell whether they belong to a borgmatic run that's still in progress.
+    snapshot_suffix = (
+        borgmatic.config.paths.get_run_scoped_temporary_directory_name(borgmatic_runtime_directory)
+        or f'{BORGMATIC_SNAPSHOT_PREFIX}{os.getpid()}'
+    )
     normalized_runtime_directory = os.path.normpath(borgmatic_runtime_directory)
 
     if not requested_logical_volumes:
@@ -323,21 +326,19 @@ def get_snapshots(lvs_command, snapshot_name=None):
     '''
     try:
         snapshot_info = json.loads(
-            '\n'.join(
-                borgmatic.execute.execute_command_and_capture_output(
-                    # Use lvs instead of lsblk here because lsblk can't filter to just snapshots.
-                    (
-                        *lvs_command.split(' '),
-                        '--report-format',
-                        'json',
-                        '--options',
-                        'lv_name,lv_path',
-                        '--select',
-                        'lv_attr =~ ^s',  # Filter to just snapshots.
-                    ),
-                    close_fds=True,
+            borgmatic.execute.execute_command_and_capture_raw_output(
+                # Use lvs instead of lsblk here because lsblk can't filter to just snapshots.
+                (
+                    *lvs_command.split(' '),
+                    '--report-format',
+                    'json',
+                    '--options',
+                    'lv_name,lv_path',
+                    '--select',
+                    'lv_attr =~ ^s',  # Filter to just snapshots.
                 ),
-            )
+                close_fds=True,
+            ),
         )
     except json.JSONDecodeError as error:
         raise ValueError(f'Invalid {lvs_command} JSON output: {error}')
@@ -354,12 +355,13 @@ def get_snapshots(lvs_command, snapshot_name=None):
         raise ValueError(f'Invalid {lvs_command} output: Missing key "{error}"')
 
 
-def remove_data_source_dumps(hook_config, config, borgmatic_runtime_directory, patterns, dry_run):  # noqa: PLR0912
+def remove_data_source_dumps(hook_config, config, borgmatic_runtime_directory, patterns, dry_run):  # noqa: PLR0912, PLR0915
     '''
     Given an LVM configuration dict, a configuration dict, the borgmatic runtime directory, the
     configured patterns, and whether this is a dry run, unmount and delete any LVM snapshots created
-    by borgmatic. If this is a dry run or LVM isn't configured in borgmatic's configuration, then
-    don't actually remove anything.
+    by borgmatic—except for those belonging to other borgmatic runs still in progress. If this is a
+    dry run or LVM isn't configured in borgmatic's configuration, then don't actually remove
+    anything.
     '''
     if hook_config is None:
         return
@@ -390,6 +392,12 @@ def remove_data_source_dumps(hook_config, config, borgmatic_runtime_directory, p
         if not os.path.isdir(snapshots_directory):
             continue
 
+        # Leave alone the snapshot mounts of another borgmatic run that's still in progress.
+        if borgmatic.config.paths.temporary_directory_in_use_elsewhere(
+            snapshots_directory, borgmatic_runtime_directory
+        ):
+            continue
+
         for logical_volume in logical_volumes:
             snapshot_mount_path = os.path.join(
                 snapshots_directory,
@@ -441,8 +449,16 @@ def remove_data_source_dumps(hook_config, config, borgmatic_runtime_directory, p
         return
 
     for snapshot in snapshots:
+        (_, separator, snapshot_suffix) = snapshot.name.rpartition(f'_{BORGMATIC_SNAPSHOT_PREFIX}')
+
         # Only delete snapshots that borgmatic actually created!
-        if not snapshot.name.split('_')[-1].startswith(BORGMATIC_SNAPSHOT_PREFIX):
+        if not separator:
+            continue
+
+        # And don't delete them out from under another borgmatic run that's still in progress.
+        if borgmatic.config.paths.temporary_directory_in_use_elsewhere(
+            f'{BORGMATIC_SNAPSHOT_PREFIX}{snapshot_suffix}', borgmatic_runtime_directory
+        ):
             continue
 
         logger.debug(f'Deleting LVM snapshot {snapshot.name}{dry_run_label}')
@@ -267,7 +267,12 @@ def dump_data_sources(
     requested_datasets = get_datasets_to_backup(zfs_command, patterns)
 
     # Snapshot each dataset, rewriting patterns to use the snapshot paths.
-    snapshot_name = f'{BORGMATIC_SNAPSHOT_PREFIX}{os.getpid()}'
+    # With concurrency enabled, name the snapshots after the runtime directory, so that cleanup can
+    # tell whether they belong to a borgmatic run that's still in progress.
+    snapshot_name = (
+        borgmatic.config.paths.get_run_scoped_temporary_directory_name(borgmatic_runtime_directory)
+        or f'{BORGMATIC_SNAPSHOT_PREFIX}{os.getpid()}'
+    )
     normalized_runtime_directory = os.path.normpath(borgmatic_runtime_directory)
 
     if not requested_datasets:
@@ -366,12 +371,13 @@ def get_all_snapshots(zfs_command):
     return tuple(line.rstrip() for line in list_lines)
 
 
-def remove_data_source_dumps(hook_config, config, borgmatic_runtime_directory, patterns, dry_run):  # noqa: PLR0912
+def remove_data_source_dumps(hook_config, config, borgmatic_runtime_directory, patterns, dry_run):  # noqa: PLR0912, PLR0915
     '''
     Given a ZFS configuration dict, a configuration dict, the borgmatic runtime directory, the
     configured patterns, and whether this is a dry run, unmount and destroy any ZFS snapshots
-    created by borgmatic. If this is a dry run or ZFS isn't configured in borgmatic's configuration,
-    then don't actually remove anything.
+    created by borgmatic—except for those belonging to other borgmatic runs still in progress. If
+    this is a dry run or ZFS isn't configured in borgmatic's configuration, then don't actually
+    remove anything.
     '''
     if hook_config is None:
         return
@@ -416,6 +422,12 @@ def remove_data_source_dumps(hook_config, config, borgmatic_runtime_directory, p
         if not os.path.isdir(snapshots_directory):
             continue
 
+        # Leave alone the snapshot mounts of another borgmatic run that's still in progress.
+        if borgmatic.config.paths.temporary_directory_in_use_elsewhere(
+            snapshots_directory, borgmatic_runtime_directory
+        ):
+            continue
+
         # Get the dataset and mount point corresponding to the hash found in this snapshot directory
         # path. If none is found, bail.
         try:
@@ -460,8 +472,16 @@ def remove_data_source_dumps(hook_config, config, borgmatic_runtime_directory, p
 
     # Destroy snapshots.
     for full_snapshot_name in full_snapshot_names:
+        snapshot_name = full_snapshot_name.split('@')[-1]
+
         # Only destroy snapshots that borgmatic actually created!
-        if not full_snapshot_name.split('@')[-1].startswith(BORGMATIC_SNAPSHOT_PREFIX):
+        if not snapshot_name.startswith(BORGMATIC_SNAPSHOT_PREFIX):
+            continue
+
+        # And don't destroy them out from under another borgmatic run that's still in progress.
+        if borgmatic.config.paths.temporary_directory_in_use_elsewhere(
+            snapshot_name, borgmatic_runtime_directory
+        ):
             continue
 
         logger.debug(f'Destroying ZFS snapshot {full_snapshot_name}{dry_run_label}')
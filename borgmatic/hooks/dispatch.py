@@ -1,12 +1,9 @@
 import enum
+import functools
 import importlib
 import logging
 import pkgutil
 
-import borgmatic.hooks.credential
-import borgmatic.hooks.data_source
-import borgmatic.hooks.monitoring
-
 logger = logging.getLogger(__name__)
 
 
@@ -23,6 +20,56 @@ def get_submodule_names(parent_module):  # pragma: no cover
     return tuple(module_info.name for module_info in pkgutil.iter_modules(parent_module.__path__))
 
 
+@functools.cache
+def get_hook_names(hook_type, function_name=None):
+    '''
+    Given a Hook_type and an optional function name, return the names of the submodules of the
+    corresponding hook package as a tuple of strings. If a function name is given, then only return
+    the names of actual hooks (not helper modules) that implement that function, importing each
+    hook module in order to find out.
+
+    Each hook package is only scanned once per process, so subsequent hook calls don't have to hit
+    the filesystem again.
+    '''
+    if function_name is None:
+        return get_submodule_names(importlib.import_module(f'borgmatic.hooks.{hook_type.value}'))
+
+    return tuple(
+        hook_name
+        for hook_name in get_hook_names(hook_type)
+        if hasattr(get_hook_module(hook_type, hook_name), function_name)
+    )
+
+
+@functools.cache
+def get_hook_type(module_name):
+    '''
+    Given the name of a hook module, return the Hook_type of the hook package containing it. If
+    several hook packages contain a module with that name, the first one in Hook_type order wins.
+
+    Raise ValueError if no hook package contains the module.
+    '''
+    for hook_type in Hook_type:
+        if module_name in get_hook_names(hook_type):
+            return hook_type
+
+    raise ValueError(f'Unknown hook name: {module_name}')
+
+
+@functools.cache
+def get_hook_module(hook_type, module_name):
+    '''
+    Given a Hook_type and the name of a module within the corresponding hook package, import and
+    return that module. But if the module is explicitly flagged as not a hook, return None instead.
+    '''
+    module = importlib.import_module(f'borgmatic.hooks.{hook_type.value}.{module_name}')
+
+    if not getattr(module, 'IS_A_HOOK', True):
+        return None
+
+    return module
+
+
 def call_hook(function_name, config, hook_name, *args, **kwargs):
     '''
     Given a configuration dict, call the requested function of the Python module corresponding to
@@ -41,24 +88,11 @@ def call_hook(function_name, config, hook_name, *args, **kwargs):
 
     module_name = hook_name.split('_databases')[0]
 
-    # Probe for a data source or monitoring hook module corresponding to the hook name.
-    for parent_module in (
-        borgmatic.hooks.credential,
-        borgmatic.hooks.data_source,
-        borgmatic.hooks.monitoring,
-    ):
-        if module_name not in get_submodule_names(parent_module):
-            continue
-
-        module = importlib.import_module(f'{parent_module.__name__}.{module_name}')
-
-        # If this module is explicitly flagged as not a hook, bail.
-        if not getattr(module, 'IS_A_HOOK', True):
-            return None
+    module = get_hook_module(get_hook_type(module_name), module_name)
 
-        break
-    else:
-        raise ValueError(f'Unknown hook name: {hook_name}')
+    # If this module is explicitly flagged as not a hook, bail.
+    if module is None:
+        return None
 
     logger.debug(f'Calling {hook_name} hook function {function_name}')
 
@@ -84,9 +118,7 @@ def call_hooks(function_name, config, hook_type, *args, **kwargs):
     '''
     return {
         hook_name: call_hook(function_name, config, hook_name, *args, **kwargs)
-        for hook_name in get_submodule_names(
-            importlib.import_module(f'borgmatic.hooks.{hook_type.value}'),
-        )
+        for hook_name in get_hook_names(hook_type)
         if hook_name in config or f'{hook_name}_databases' in config
     }
 
@@ -98,12 +130,11 @@ def call_hooks_even_if_unconfigured(function_name, config, hook_type, *args, **k
     call with the configuration for that hook and any given args and kwargs. Collect any return
     values into a dict from hook name to return value.
 
-    Raise AttributeError if the function name is not found in the module.
+    Skip any hooks that don't implement the requested function.
+
     Raise anything else that a called function raises. An error stops calls to subsequent functions.
     '''
     return {
         hook_name: call_hook(function_name, config, hook_name, *args, **kwargs)
-        for hook_name in get_submodule_names(
-            importlib.import_module(f'borgmatic.hooks.{hook_type.value}'),
-        )
+        for hook_name in get_hook_names(hook_type, function_name)
     }
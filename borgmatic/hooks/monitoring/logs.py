@@ -1,9 +1,16 @@
 import contextlib
+import contextvars
 import logging
 
 IS_A_HOOK = False
 PAYLOAD_TRUNCATION_INDICATOR = '...\n'
 
+# An opaque token identifying the monitoring run for the current configuration file. Because
+# configuration files can run concurrently in separate threads (each with its own context), this
+# lets each buffering handler collect only the logs for its own configuration file, even though all
+# handlers hang off the same root logger.
+MONITORING_RUN = contextvars.ContextVar('monitoring_run', default=None)
+
 
 class Forgetful_buffering_handler(logging.Handler):
     '''
@@ -12,7 +19,9 @@ class Forgetful_buffering_handler(logging.Handler):
     don't throw away any messages.
 
     The given identifier is used to distinguish the instance of this handler used for one monitoring
-    hook from those instances used for other monitoring hooks.
+    hook from those instances used for other monitoring hooks. And the current monitoring run (as
+    per MONITORING_RUN) distinguishes it from instances for the same monitoring hook used by other
+    configuration files, so the handler only buffers records logged within its own run.
     '''
 
     def __init__(self, identifier, byte_capacity, log_level):
@@ -23,8 +32,15 @@ class Forgetful_buffering_handler(logging.Handler):
         self.byte_count = 0
         self.buffer = []
         self.forgot = False
+        self.run = MONITORING_RUN.get()
         self.setLevel(log_level)
 
+    def filter(self, record):
+        if MONITORING_RUN.get() is not self.run:
+            return False
+
+        return super().filter(record)
+
     def emit(self, record):
         message = record.getMessage() + '\n'
         self.byte_count += len(message)
@@ -50,15 +66,20 @@ def add_handler(handler):
 
 def get_handler(identifier):
     '''
-    Given the identifier for an existing Forgetful_buffering_handler instance, return the handler.
+    Given the identifier for an existing Forgetful_buffering_handler instance in the current
+    monitoring run, return the handler.
 
     Raise ValueError if the handler isn't found.
     '''
+    run = MONITORING_RUN.get()
+
     try:
         return next(
             handler
             for handler in logging.getLogger().handlers
-            if isinstance(handler, Forgetful_buffering_handler) and handler.identifier == identifier
+            if isinstance(handler, Forgetful_buffering_handler)
+            and handler.identifier == identifier
+            and handler.run is run
         )
     except StopIteration:
         raise ValueError(f'A buffering handler for {identifier} was not found')
@@ -85,7 +106,8 @@ def format_buffered_logs_for_payload(identifier):
 
 def remove_handler(identifier):
     '''
-    Given the identifier for an existing Forgetful_buffering_handler instance, remove it.
+    Given the identifier for an existing Forgetful_buffering_handler instance in the current
+    monitoring run, remove it.
     '''
     logger = logging.getLogger()
 
@@ -0,0 +1,226 @@
+import contextlib
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+import borgmatic.config.paths
+import borgmatic.config.validate
+
+logger = logging.getLogger(__name__)
+
+
+LOCK_POLL_INTERVAL_SECONDS = 0.5
+QUEUE_DIRECTORY_SUFFIX = '.queue'
+UNQUEUED_TICKET_SUFFIX = '.tmp'
+
+
+def make_lock_path(config, repository_path):
+    '''
+    Given a configuration dict and a repository path, return the path of the lock file for that
+    repository within the borgmatic state directory. The lock file is keyed by the normalized
+    repository path, so that different spellings of the same local repository share a lock.
+    '''
+    normalized_path = borgmatic.config.validate.normalize_repository_path(
+        repository_path, borgmatic.config.paths.get_working_directory(config)
+    )
+
+    return os.path.join(
+        borgmatic.config.paths.get_borgmatic_state_directory(config),
+        'locks',
+        f'{hashlib.sha256(normalized_path.encode()).hexdigest()}.lock',
+    )
+
+
+def file_locked_by_someone_else(path):
+    '''
+    Given the path of a file, return whether some other open file (in this process or any other)
+    holds an exclusive flock() on it. Return False if the file doesn't exist.
+    '''
+    try:
+        probe_descriptor = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return False
+
+    try:
+        fcntl.flock(probe_descriptor, fcntl.LOCK_SH | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(probe_descriptor)
+
+    return False
+
+
+def read_lock_holder(lock_path):
+    '''
+    Given the path of a lock file, return a dict describing the current holder of the lock as
+    recorded within it, or None if that can't be read.
+    '''
+    try:
+        with open(lock_path, encoding='utf-8') as lock_file:
+            return json.load(lock_file)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def describe_lock_holder(holder):
+    '''
+    Given a dict describing a lock holder as per read_lock_holder() (or None), return a
+    human-readable description of it.
+    '''
+    if not holder:
+        return 'another borgmatic run'
+
+    acquired_time = time.strftime(
+        '%Y-%m-%d %H:%M:%S', time.localtime(holder.get('acquired_time', 0))
+    )
+
+    return f'{holder.get("configuration_filename")} (process {holder.get("pid")} on {holder.get("hostname")}) since {acquired_time}'
+
+
+class Repository_lock:
+    '''
+    A Python context manager for holding borgmatic's own advisory lock on a repository, so that
+    multiple borgmatic runs (or multiple configuration files within one run) using the same
+    repository take turns instead of contending for Borg's repository lock.
+
+    Example use as a context manager:
+
+        with borgmatic.lock.Repository_lock(config, repository, config_filename):
+            do_something_with_the_repository()
+
+    Waiters queue up in the order that they started waiting, each with a ticket file in a queue
+    directory alongside the lock file. Only the waiter at the front of the queue tries to take the
+    lock, and a ticket whose owner has died (and therefore no longer holds an flock() on it) gets
+    cleaned up by the other waiters. While held, the lock file contains JSON describing its holder,
+    so there's visibility into which borgmatic run holds which repository.
+
+    If the "repository_locks" option isn't enabled, then do nothing.
+    '''
+
+    def __init__(self, config, repository, config_filename):
+        '''
+        Given a configuration dict, a repository dict, and the configuration filename, determine
+        the lock file path for the repository.
+        '''
+        self.enabled = bool(config.get('repository_locks'))
+        self.timeout = config.get('repository_lock_timeout')
+        self.repository_path = repository['path']
+        self.config_filename = config_filename
+        self.lock_path = make_lock_path(config, repository['path']) if self.enabled else None
+        self.lock_descriptor = None
+
+    def __enter__(self):
+        '''
+        Wait for our turn and then acquire the lock. Raise ValueError if the configured timeout
+        elapses first.
+        '''
+        if not self.enabled:
+            return
+
+        queue_path = f'{self.lock_path}{QUEUE_DIRECTORY_SUFFIX}'
+        os.makedirs(queue_path, mode=0o700, exist_ok=True)
+        ticket_name = f'{time.time_ns():020d}-{os.getpid()}-{threading.get_ident()}'
+        ticket_path = os.path.join(queue_path, ticket_name)
+
+        # Lock the ticket before moving it into the queue, so other waiters never mistake it for a
+        # stale ticket.
+        ticket_descriptor = os.open(
+            f'{ticket_path}{UNQUEUED_TICKET_SUFFIX}', os.O_WRONLY | os.O_CREAT, 0o600
+        )
+        fcntl.flock(ticket_descriptor, fcntl.LOCK_EX)
+        os.rename(f'{ticket_path}{UNQUEUED_TICKET_SUFFIX}', ticket_path)
+        self.lock_descriptor = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+
+        try:
+            self.wait_for_turn(queue_path, ticket_name)
+        except BaseException:
+            os.close(self.lock_descriptor)
+            self.lock_descriptor = None
+            raise
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(ticket_path)
+
+            os.close(ticket_descriptor)
+
+        os.ftruncate(self.lock_descriptor, 0)
+        os.write(
+            self.lock_descriptor,
+            json.dumps(
+                {
+                    'repository': self.repository_path,
+                    'configuration_filename': self.config_filename,
+                    'pid': os.getpid(),
+                    'hostname': socket.gethostname(),
+                    'acquired_time': time.time(),
+                }
+            ).encode(),
+        )
+
+    def wait_for_turn(self, queue_path, ticket_name):
+        '''
+        Given the path of the queue directory and the name of our ticket within it, wait until our
+        ticket is at the front of the queue and then take the lock.
+        '''
+        deadline = time.monotonic() + self.timeout if self.timeout else None
+        logged_waiting = False
+
+        while True:
+            earlier_tickets = sorted(
+                name
+                for name in os.listdir(queue_path)
+                if name < ticket_name and not name.endswith(UNQUEUED_TICKET_SUFFIX)
+            )
+            ahead_in_queue = False
+
+            for name in earlier_tickets:
+                earlier_ticket_path = os.path.join(queue_path, name)
+
+                if file_locked_by_someone_else(earlier_ticket_path):
+                    ahead_in_queue = True
+                    break
+
+                # The ticket's owner is gone without having cleaned up after itself.
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(earlier_ticket_path)
+
+            if not ahead_in_queue:
+                try:
+                    fcntl.flock(self.lock_descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    pass
+                else:
+                    return
+
+            if not logged_waiting:
+                logger.info(
+                    f'Waiting for repository lock held by {describe_lock_holder(read_lock_holder(self.lock_path))}'
+                )
+                logged_waiting = True
+
+            if deadline is not None and time.monotonic() >= deadline:
+                raise ValueError(
+                    f'Timed out after {self.timeout} seconds waiting for repository lock'
+                )
+
+            time.sleep(LOCK_POLL_INTERVAL_SECONDS)
+
+    def __exit__(self, exception_type, exception, traceback):
+        '''
+        Release the lock, clearing out the description of its holder first.
+        '''
+        if self.lock_descriptor is None:
+            return
+
+        with contextlib.suppress(OSError):
+            os.ftruncate(self.lock_descriptor, 0)
+
+        fcntl.flock(self.lock_descriptor, fcntl.LOCK_UN)
+        os.close(self.lock_descriptor)
+        self.lock_descriptor = None
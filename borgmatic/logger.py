@@ -1,3 +1,4 @@
+import contextvars
 import enum
 import json
 import logging
@@ -140,12 +141,10 @@ class JournaldHandler(logging.Handler):
 
 class Log_prefix_formatter(logging.Formatter):
     def __init__(self, fmt='{prefix}{message}', *args, style='{', **kwargs):
-        self.prefix = None
-
         super().__init__(*args, fmt=fmt, style=style, **kwargs)
 
     def format(self, record):  # pragma: no cover
-        record.prefix = f'{self.prefix}: ' if self.prefix else ''
+        record.prefix = format_log_prefix()
 
         return super().format(record)
 
@@ -187,7 +186,6 @@ class Color(enum.Enum):
 
 class Console_color_formatter(logging.Formatter):
     def __init__(self, *args, **kwargs):
-        self.prefix = None
         super().__init__(
             '{prefix}{message}',
             *args,
@@ -206,7 +204,7 @@ class Console_color_formatter(logging.Formatter):
             logging.INFO: Color.GREEN,
             logging.DEBUG: Color.CYAN,
         }.get(record.levelno).value
-        record.prefix = f'{self.prefix}: ' if self.prefix else ''
+        record.prefix = format_log_prefix()
 
         return color_text(color, super().format(record))
 
@@ -269,34 +267,35 @@ def add_custom_log_levels():  # pragma: no cover
     add_logging_level('DISABLED', DISABLED)
 
 
+# The current log prefix. This is a context variable rather than a global so that each thread (for
+# instance, one running commands concurrently with other threads) gets its own prefix.
+LOG_PREFIX = contextvars.ContextVar('log_prefix', default=None)
+
+
 def get_log_prefix():
     '''
     Return the current log prefix set by set_log_prefix(). Return None if no such prefix exists.
-
-    It would be a whole lot easier to use logger.Formatter(defaults=...) instead, but that argument
-    doesn't exist until Python 3.10+.
     '''
-    try:
-        formatter = next(
-            handler.formatter
-            for handler in logging.getLogger().handlers
-            if handler.formatter
-            if hasattr(handler.formatter, 'prefix')
-        )
-    except StopIteration:
-        return None
-
-    return formatter.prefix
+    return LOG_PREFIX.get()
 
 
 def set_log_prefix(prefix):
     '''
-    Given a log prefix as a string, set it into the each handler's formatter so that it can inject
-    the prefix into each logged record.
+    Given a log prefix as a string, set it as the current log prefix so that each logging formatter
+    can inject the prefix into each logged record. The prefix only applies to the current thread's
+    context.
     '''
-    for handler in logging.getLogger().handlers:
-        if handler.formatter and hasattr(handler.formatter, 'prefix'):
-            handler.formatter.prefix = prefix
+    LOG_PREFIX.set(prefix)
+
+
+def format_log_prefix():
+    '''
+    Return the current log prefix formatted for inclusion at the start of a log message, or an empty
+    string if there's no prefix.
+    '''
+    prefix = get_log_prefix()
+
+    return f'{prefix}: ' if prefix else ''
 
 
 class Log_prefix:
@@ -325,9 +324,8 @@ class Log_prefix:
 
     def __enter__(self):
         '''
-        Set the prefix onto the formatter defaults for every logging handler so that the prefix ends
-        up in every log message. But first, save off any original prefix so that it can be restored
-        below.
+        Set the prefix as the current log prefix so that the prefix ends up in every log message.
+        But first, save off any original prefix so that it can be restored below.
         '''
         self.original_prefix = get_log_prefix()
         set_log_prefix(self.prefix)
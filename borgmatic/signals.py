@@ -1,3 +1,4 @@
+import contextlib
 import logging
 import os
 import signal
@@ -8,6 +9,20 @@ logger = logging.getLogger(__name__)
 
 EXIT_CODE_FROM_SIGNAL = 128
 
+# Child processes (as subprocess.Popen instances) that lead their own process groups rather than
+# running in borgmatic's process group. Signals get forwarded to these process groups as well.
+child_process_groups = set()
+
+
+def forward_signal_to_child_process_groups(signal_number):
+    '''
+    Send the signal to the process groups of any child processes that lead their own process groups.
+    '''
+    # Copy the set first, as another thread could be modifying it.
+    for process in child_process_groups.copy():
+        with contextlib.suppress(ProcessLookupError):
+            os.killpg(process.pid, signal_number)
+
 
 def handle_signal(signal_number, frame):
     '''
@@ -19,6 +34,7 @@ def handle_signal(signal_number, frame):
         return
 
     os.killpg(os.getpgrp(), signal_number)
+    forward_signal_to_child_process_groups(signal_number)
 
     if signal_number == signal.SIGTERM:
         logger.critical('Exiting due to TERM signal')
@@ -26,6 +42,7 @@ def handle_signal(signal_number, frame):
     elif signal_number == signal.SIGINT:
         # Borg doesn't always exit on a SIGINT, so give it a little encouragement.
         os.killpg(os.getpgrp(), signal.SIGTERM)
+        forward_signal_to_child_process_groups(signal.SIGTERM)
 
         raise KeyboardInterrupt()
 
@@ -0,0 +1,99 @@
+import concurrent.futures
+import glob
+import os
+import stat
+import subprocess
+import threading
+
+from flexmock import flexmock
+
+from borgmatic.actions import create as module
+
+
+def test_spool_data_source_dumps_replaces_named_pipes_with_dumped_files(tmp_path):
+    dump_directory = tmp_path / 'postgresql_databases' / 'localhost'
+    dump_directory.mkdir(parents=True)
+    pipe_path = dump_directory / 'test'
+    os.mkfifo(pipe_path)
+    process = subprocess.Popen(
+        ('sh', '-c', f'printf "dump contents" > {pipe_path}'),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+
+    module.spool_data_source_dumps((process,), str(tmp_path))
+
+    assert stat.S_ISREG(os.stat(pipe_path).st_mode)
+    assert pipe_path.read_text() == 'dump contents'
+    assert not list(dump_directory.glob(f'*{module.SPOOL_FILE_SUFFIX}'))
+
+
+def test_run_create_for_concurrent_repositories_keeps_each_others_database_dumps(tmp_path):
+    runtime_base_directory = tmp_path / 'run'
+    leftover_dump_directory = (
+        runtime_base_directory / 'borgmatic-leftover' / 'borgmatic' / 'sqlite_databases'
+    )
+    leftover_dump_directory.mkdir(parents=True)
+    config = {
+        'sqlite_databases': [{'name': 'test', 'path': str(tmp_path / 'test.db')}],
+        'user_runtime_directory': str(runtime_base_directory),
+        'repository_concurrency': 2,
+    }
+    both_dumping = threading.Barrier(2, timeout=30)
+    second_finished = threading.Event()
+    dumped = {}
+
+    def create_archive(dry_run, repository_path, config, patterns, *args, **kwargs):
+        (dump_path,) = (
+            path
+            for path in glob.glob(os.path.join(args[2], 'sqlite_databases', '**'), recursive=True)
+            if stat.S_ISFIFO(os.stat(path).st_mode)
+        )
+        both_dumping.wait()
+
+        # While the first repository's create is still in progress, the second one finishes and
+        # cleans up after itself.
+        if repository_path == 'first':
+            second_finished.wait(timeout=30)
+
+        with open(dump_path, encoding='utf-8') as dump_file:
+            dumped[repository_path] = dump_file.read()
+
+        # Reap the dump process, like Borg's create would.
+        for process in kwargs['stream_processes']:
+            process.wait()
+
+        module.borgmatic.execute.unregister_process_groups(kwargs['stream_processes'])
+
+    flexmock(module.borgmatic.borg.create).should_receive('create_archive').replace_with(
+        create_archive
+    )
+    flexmock(module).should_receive('rename_checkpoint_archive')
+
+    def run_create(repository_path):
+        tuple(
+            module.run_create(
+                config_filename='test.yaml',
+                repository={'path': repository_path},
+                config=config,
+                config_paths=['test.yaml'],
+                local_borg_version='1.4.0',
+                create_arguments=flexmock(json=False, comment=None),
+                global_arguments=flexmock(dry_run=False),
+                dry_run_label='',
+                local_path='borg',
+                remote_path=None,
+            )
+        )
+
+        if repository_path == 'second':
+            second_finished.set()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        for future in [executor.submit(run_create, path) for path in ('first', 'second')]:
+            future.result(timeout=60)
+
+    assert 'CREATE TABLE' in dumped['first'] or 'BEGIN TRANSACTION' in dumped['first']
+    assert dumped['second'] == dumped['first']
+    assert not leftover_dump_directory.exists()
+    assert os.listdir(runtime_base_directory) == ['borgmatic-leftover']
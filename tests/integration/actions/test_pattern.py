@@ -0,0 +1,61 @@
+import os
+
+from flexmock import flexmock
+
+from borgmatic.actions import pattern as module
+from borgmatic.borg.pattern import Pattern, Pattern_source
+
+
+def test_collect_and_process_patterns_with_pattern_cache_picks_up_changes(tmp_path):
+    flexmock(module, MINIMUM_CACHED_PATH_AGE_NANOSECONDS=-(10**12))
+    (tmp_path / 'source' / 'one' / 'data').mkdir(parents=True)
+    (tmp_path / 'source' / 'two').mkdir()
+    patterns_file = tmp_path / 'patterns.txt'
+    patterns_file.write_text(f'R {tmp_path}/source/*/data\n')
+    config = {
+        'patterns_from': [str(patterns_file)],
+        'user_state_directory': str(tmp_path / 'state'),
+    }
+
+    def expanded_paths():
+        return sorted(
+            pattern.path
+            for pattern in module.process_patterns(
+                module.collect_patterns(config, None), config, None
+            )
+        )
+
+    assert expanded_paths() == [f'{tmp_path}/source/one/data']
+    assert os.listdir(tmp_path / 'state' / 'borgmatic' / 'patterns')
+
+    (tmp_path / 'source' / 'two' / 'data').mkdir()
+
+    assert expanded_paths() == [
+        f'{tmp_path}/source/one/data',
+        f'{tmp_path}/source/two/data',
+    ]
+
+    patterns_file.write_text(f'R {tmp_path}/source/t*/data\n')
+
+    assert expanded_paths() == [f'{tmp_path}/source/two/data']
+
+
+def test_pattern_cache_replays_unchanged_glob_without_listing_directories(tmp_path):
+    flexmock(module, MINIMUM_CACHED_PATH_AGE_NANOSECONDS=-(10**12))
+    (tmp_path / 'source' / 'one').mkdir(parents=True)
+    # Create the cache's directory up front, so writing the cache doesn't change the globbed tree.
+    (tmp_path / 'state').mkdir()
+    cache_path = str(tmp_path / 'state' / 'cache.json')
+    glob_path = f'{tmp_path}/source/*'
+
+    pattern_cache = module.Pattern_cache(cache_path)
+    assert pattern_cache.glob(glob_path) == [f'{tmp_path}/source/one']
+    pattern_cache.save()
+
+    flexmock(module.glob).should_receive('glob').never()
+    pattern_cache = module.Pattern_cache(cache_path)
+
+    assert pattern_cache.glob(glob_path) == [f'{tmp_path}/source/one']
+    assert module.expand_patterns(
+        (Pattern(glob_path, source=Pattern_source.CONFIG),), pattern_cache=pattern_cache
+    ) == (Pattern(f'{tmp_path}/source/one', source=Pattern_source.CONFIG),)
@@ -0,0 +1,52 @@
+import pytest
+
+from borgmatic.borg import pattern as module
+from borgmatic.borg import plan
+from borgmatic.borg.pattern import Pattern, Pattern_style, Pattern_type
+
+PATTERNS = (
+    Pattern('/src'),
+    Pattern('/src'),
+    Pattern('/src/keep', Pattern_type.INCLUDE, Pattern_style.FNMATCH),
+    Pattern('/src/cache', Pattern_type.EXCLUDE, Pattern_style.PATH_PREFIX),
+    Pattern('/src/cache/thumbnails', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH),
+    Pattern('/src/overlay/one/fifo', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH),
+    Pattern('/src/overlay/one/fi.fo', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH),
+    Pattern('/src/overlay/one/fifo', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH),
+    Pattern('/src/overlay/one/sock (1)', Pattern_type.NO_RECURSE, Pattern_style.PATH_PREFIX),
+    Pattern('/src/overlay/two/fifo', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH),
+    Pattern('/src/*.tmp', Pattern_type.EXCLUDE, Pattern_style.FNMATCH),
+    Pattern('/src/keep/pipe', Pattern_type.NO_RECURSE, Pattern_style.PATH_FULL_MATCH),
+    Pattern('/src/keep/pipe', Pattern_type.NO_RECURSE, Pattern_style.PATH_FULL_MATCH),
+)
+
+
+@pytest.mark.parametrize(
+    'path',
+    (
+        'src',
+        'src/keep',
+        'src/keep/pipe',
+        'src/keep/file',
+        'src/cache',
+        'src/cache/thumbnails',
+        'src/cache/thumbnails/a',
+        'src/overlay/one',
+        'src/overlay/one/fifo',
+        'src/overlay/one/fifo/x',
+        'src/overlay/one/fi.fo',
+        'src/overlay/one/fixfo',
+        'src/overlay/one/fifo2',
+        'src/overlay/one/sock (1)',
+        'src/overlay/two/fifo',
+        'src/overlay/two/other',
+        'src/file.tmp',
+    ),
+)
+def test_compact_patterns_matches_same_paths_as_original_patterns(path):
+    compacted_patterns = module.compact_patterns(PATTERNS)
+
+    assert len(compacted_patterns) < len(PATTERNS)
+    assert plan.Path_matcher(compacted_patterns).match(path) == plan.Path_matcher(PATTERNS).match(
+        path
+    )
@@ -0,0 +1,163 @@
+import os
+
+import pytest
+from flexmock import flexmock
+
+from borgmatic.borg import plan as module
+from borgmatic.borg.pattern import Pattern, Pattern_style, Pattern_type
+
+
+def make_source_tree(tmp_path):
+    (tmp_path / 'foo' / 'bar').mkdir(parents=True)
+    (tmp_path / 'foo' / 'bar' / 'file.txt').write_text('hi')
+    (tmp_path / 'foo' / 'file.tmp').write_text('hi')
+    os.mkfifo(tmp_path / 'foo' / 'pipe')
+    os.symlink('pipe', tmp_path / 'foo' / 'link')
+    os.symlink('bar/file.txt', tmp_path / 'foo' / 'file_link')
+    (tmp_path / 'foo' / 'cache').mkdir()
+    (tmp_path / 'foo' / 'cache' / 'big').write_text('hi')
+    (tmp_path / 'foo' / 'tagged').mkdir()
+    (tmp_path / 'foo' / 'tagged' / '.nobackup').write_text('')
+    os.mkfifo(tmp_path / 'foo' / 'tagged' / 'pipe')
+
+
+@pytest.mark.parametrize('workers', (1, 4))
+def test_get_planned_paths_walks_tree_and_finds_special_files(tmp_path, workers):
+    make_source_tree(tmp_path)
+
+    planned_paths = sorted(
+        module.get_planned_paths(
+            (
+                Pattern('foo'),
+                Pattern('foo/cache', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH),
+                Pattern('**/*.tmp', Pattern_type.EXCLUDE),
+            ),
+            {'exclude_if_present': ['.nobackup'], 'directory_walk_workers': workers},
+            working_directory=str(tmp_path),
+        )
+    )
+
+    assert planned_paths == [
+        module.Planned_path('foo', special=False, regular_file=False),
+        module.Planned_path('foo/bar', special=False, regular_file=False),
+        module.Planned_path('foo/bar/file.txt', special=False, regular_file=True),
+        module.Planned_path('foo/file_link', special=False, regular_file=True),
+        module.Planned_path('foo/link', special=True, regular_file=False),
+        module.Planned_path('foo/pipe', special=True, regular_file=False),
+    ]
+
+
+def test_get_planned_paths_with_include_pattern_finds_included_paths_in_excluded_directory(
+    tmp_path,
+):
+    make_source_tree(tmp_path)
+
+    planned_paths = tuple(
+        module.get_planned_paths(
+            (
+                Pattern(str(tmp_path / 'foo')),
+                Pattern(
+                    str(tmp_path / 'foo' / 'bar' / 'file.txt'),
+                    Pattern_type.INCLUDE,
+                    Pattern_style.PATH_FULL_MATCH,
+                ),
+                Pattern(str(tmp_path / 'foo'), Pattern_type.EXCLUDE, Pattern_style.PATH_PREFIX),
+            ),
+            {},
+        )
+    )
+
+    assert planned_paths == (
+        module.Planned_path(str(tmp_path / 'foo' / 'bar' / 'file.txt'), False, True),
+    )
+
+
+def test_get_planned_paths_with_one_file_system_and_mismatched_pattern_device_walks_only_root(
+    tmp_path,
+):
+    make_source_tree(tmp_path)
+    device = os.stat(tmp_path).st_dev
+
+    planned_paths = {
+        planned_path.path
+        for planned_path in module.get_planned_paths(
+            (Pattern('foo', device=device + 1),),
+            {'one_file_system': True},
+            working_directory=str(tmp_path),
+        )
+    }
+
+    assert planned_paths == {'foo'}
+
+
+@pytest.mark.parametrize('workers', (1, 4))
+def test_get_planned_paths_with_special_file_index_rescans_only_changed_directories(
+    tmp_path, workers
+):
+    make_source_tree(tmp_path)
+    flexmock(module, MINIMUM_INDEXED_DIRECTORY_AGE_NANOSECONDS=-(10**12))
+    index_path = str(tmp_path / 'state' / 'index.json')
+    patterns = (Pattern('foo'),)
+    config = {'exclude_if_present': ['.nobackup'], 'directory_walk_workers': workers}
+
+    special_file_index = module.Special_file_index(index_path)
+    first_paths = {
+        planned_path.path: planned_path.special
+        for planned_path in module.get_planned_paths(
+            patterns, config, str(tmp_path), special_file_index=special_file_index
+        )
+    }
+    special_file_index.save()
+
+    os.mkfifo(tmp_path / 'foo' / 'bar' / 'new_pipe')
+
+    special_file_index = module.Special_file_index(index_path)
+    second_paths = {
+        planned_path.path: planned_path.special
+        for planned_path in module.get_planned_paths(
+            patterns, config, str(tmp_path), special_file_index=special_file_index
+        )
+    }
+
+    assert {path for path, special in first_paths.items() if special} == {'foo/pipe', 'foo/link'}
+    assert {path for path, special in second_paths.items() if special} == {
+        'foo/pipe',
+        'foo/link',
+        'foo/bar/new_pipe',
+    }
+    # The changed directory got listed again, while the unchanged one got replayed from the index.
+    assert 'foo/bar/file.txt' in second_paths
+    assert 'foo/file.tmp' not in second_paths
+
+
+def test_get_planned_paths_with_special_file_index_notices_symlink_target_becoming_special_file(
+    tmp_path,
+):
+    make_source_tree(tmp_path)
+    flexmock(module, MINIMUM_INDEXED_DIRECTORY_AGE_NANOSECONDS=-(10**12))
+    index_path = str(tmp_path / 'state' / 'index.json')
+    patterns = (Pattern('foo'),)
+    config = {'exclude_if_present': ['.nobackup'], 'directory_walk_workers': 1}
+
+    special_file_index = module.Special_file_index(index_path)
+    tuple(
+        module.get_planned_paths(
+            patterns, config, str(tmp_path), special_file_index=special_file_index
+        )
+    )
+    special_file_index.save()
+
+    # Replace the symlink's target with a named pipe, which doesn't change the symlink's directory.
+    os.remove(tmp_path / 'foo' / 'bar' / 'file.txt')
+    os.mkfifo(tmp_path / 'foo' / 'bar' / 'file.txt')
+
+    special_file_index = module.Special_file_index(index_path)
+    special_paths = {
+        planned_path.path
+        for planned_path in module.get_planned_paths(
+            patterns, config, str(tmp_path), special_file_index=special_file_index
+        )
+        if planned_path.special
+    }
+
+    assert special_paths == {'foo/pipe', 'foo/link', 'foo/file_link', 'foo/bar/file.txt'}
@@ -733,3 +733,73 @@ def test_parse_arguments_with_argument_from_schema_does_not_raise():
         '--foo.bar',
         '3',
     )
+
+
+def test_make_parsers_with_lazy_only_builds_requested_action_parsers():
+    flexmock(module.collect).should_receive('get_default_config_paths').and_return(['default'])
+
+    action_parsers = module.make_parsers(schema={}, unparsed_arguments=('list',), lazy=True)[1]
+
+    assert set(action_parsers.choices) == {
+        'create',
+        'prune',
+        'compact',
+        'check',
+        'list',
+        *module.ACTION_ALIASES['create'],
+        *module.ACTION_ALIASES['prune'],
+        *module.ACTION_ALIASES['compact'],
+        *module.ACTION_ALIASES['check'],
+        *module.ACTION_ALIASES['list'],
+    }
+
+
+def test_make_parsers_with_lazy_and_help_builds_all_action_parsers():
+    flexmock(module.collect).should_receive('get_default_config_paths').and_return(['default'])
+
+    action_parsers = module.make_parsers(
+        schema={}, unparsed_arguments=('list', '--help'), lazy=True
+    )[1]
+
+    assert set(module.ACTION_ALIASES) <= set(action_parsers.choices)
+
+
+def test_make_parsers_without_lazy_builds_all_action_parsers():
+    flexmock(module.collect).should_receive('get_default_config_paths').and_return(['default'])
+
+    action_parsers = module.make_parsers(schema={}, unparsed_arguments=('list',))[1]
+
+    assert set(module.ACTION_ALIASES) <= set(action_parsers.choices)
+
+
+def test_parse_arguments_with_unrequested_argument_from_schema_defaults_it_to_none():
+    flexmock(module.collect).should_receive('get_default_config_paths').and_return(['default'])
+
+    arguments = module.parse_arguments(
+        {
+            'type': 'object',
+            'properties': {
+                'foo': {'type': 'object', 'properties': {'bar': {'type': 'integer'}}},
+                'baz': {'type': 'string'},
+            },
+        },
+        '--foo.bar',
+        '3',
+    )
+
+    assert getattr(arguments['global'], 'foo.bar') == 3
+    assert arguments['global'].baz is None
+
+
+def test_parse_arguments_with_invalid_argument_shows_usage_for_all_flags(capsys):
+    flexmock(module.collect).should_receive('get_default_config_paths').and_return(['default'])
+
+    with pytest.raises(ValueError):
+        module.parse_arguments(
+            {'type': 'object', 'properties': {'baz': {'type': 'string'}}},
+            'list',
+            '--posix-me-harder',
+        )
+
+    captured = capsys.readouterr()
+    assert '--baz' in captured.out
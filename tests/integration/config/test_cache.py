@@ -0,0 +1,48 @@
+import os
+
+from flexmock import flexmock
+
+from borgmatic.config import cache as module
+
+
+def test_configuration_cache_round_trips_configuration_until_something_changes(tmp_path):
+    flexmock(module, MINIMUM_CACHED_FILE_AGE_NANOSECONDS=-(10**12))
+    flexmock(module.borgmatic.config.paths).should_receive(
+        'get_borgmatic_state_directory'
+    ).and_return(str(tmp_path / 'state'))
+    config_path = tmp_path / 'config.yaml'
+    config_path.write_text('repositories:\n    - path: ${REPOSITORY_PATH}\n')
+    common_path = tmp_path / 'common.yaml'
+    common_path.write_text('keep_daily: 7\n')
+    config_paths = {str(config_path), str(common_path)}
+    flexmock(module.os, environ={'REPOSITORY_PATH': '/repo'})
+
+    configuration_cache = module.Configuration_cache(str(config_path), (), None, resolve_env=True)
+    assert configuration_cache.load() is None
+
+    configuration_cache.save({'repositories': [{'path': '/repo'}]}, config_paths, ())
+    assert oct(os.stat(configuration_cache.path).st_mode & 0o777) == '0o600'
+
+    config, loaded_config_paths, _ = module.Configuration_cache(
+        str(config_path), (), None, resolve_env=True
+    ).load()
+    assert config == {'repositories': [{'path': '/repo'}]}
+    assert loaded_config_paths == config_paths
+
+    flexmock(module.os, environ={'REPOSITORY_PATH': '/other'})
+    assert module.Configuration_cache(str(config_path), (), None, resolve_env=True).load() is None
+
+    flexmock(module.os, environ={'REPOSITORY_PATH': '/repo'})
+    common_path.write_text('keep_daily: 8\n')
+    assert module.Configuration_cache(str(config_path), (), None, resolve_env=True).load() is None
+
+
+def test_configuration_cache_with_different_overrides_uses_different_cache_entry(tmp_path):
+    flexmock(module.borgmatic.config.paths).should_receive(
+        'get_borgmatic_state_directory'
+    ).and_return(str(tmp_path / 'state'))
+
+    assert (
+        module.Configuration_cache('config.yaml', (), ['keep_daily=1'], resolve_env=True).path
+        != module.Configuration_cache('config.yaml', (), ['keep_daily=2'], resolve_env=True).path
+    )
@@ -60,6 +60,7 @@ def test_load_configuration_inlines_include_relative_to_config_parent_directory(
     flexmock(module.os.path).should_receive('isabs').with_args('/etc').and_return(True)
     flexmock(module.os.path).should_receive('isabs').with_args('/etc/config.yaml').and_return(True)
     flexmock(module.os.path).should_receive('isabs').with_args('include.yaml').and_return(False)
+    flexmock(module.os.path).should_receive('isabs').with_args('/etc/include.yaml').and_return(True)
     flexmock(module.os.path).should_receive('exists').with_args('/tmp/include.yaml').and_return(
         False,
     )
@@ -1267,3 +1268,37 @@ def test_deep_merge_nodes_skips_sequence_values_tagged_with_omit():
     assert len(options) == 1
     assert options[0][0].value == 'before_backup'
     assert [item.value for item in options[0][1].value] == ['echo 1', 'echo 3']
+
+
+def test_load_configuration_parses_include_shared_by_multiple_files_once(tmp_path):
+    module.parse_included_configuration.cache_clear()
+    (tmp_path / 'common.yaml').write_text('keep_daily: 7\n')
+    (tmp_path / 'first.yaml').write_text('<<: !include common.yaml\nsource_directories: [/a]\n')
+    (tmp_path / 'second.yaml').write_text('<<: !include common.yaml\nsource_directories: [/b]\n')
+    original_load_configuration = module.load_configuration
+    loaded_filenames = []
+
+    def load_configuration(filename, config_paths=None):
+        loaded_filenames.append(filename)
+        return original_load_configuration(filename, config_paths)
+
+    flexmock(module).should_receive('load_configuration').replace_with(load_configuration)
+    first_config_paths = set()
+    second_config_paths = set()
+
+    first_config = module.load_configuration(str(tmp_path / 'first.yaml'), first_config_paths)
+    second_config = module.load_configuration(str(tmp_path / 'second.yaml'), second_config_paths)
+
+    assert first_config == {'keep_daily': 7, 'source_directories': ['/a']}
+    assert second_config == {'keep_daily': 7, 'source_directories': ['/b']}
+    assert first_config_paths == {str(tmp_path / 'first.yaml'), str(tmp_path / 'common.yaml')}
+    assert second_config_paths == {str(tmp_path / 'second.yaml'), str(tmp_path / 'common.yaml')}
+    assert loaded_filenames.count(str(tmp_path / 'common.yaml')) == 1
+
+    (tmp_path / 'common.yaml').write_text('keep_daily: 14\nkeep_weekly: 4\n')
+
+    assert module.load_configuration(str(tmp_path / 'first.yaml')) == {
+        'keep_daily': 14,
+        'keep_weekly': 4,
+        'source_directories': ['/a'],
+    }
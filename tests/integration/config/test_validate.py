@@ -1,3 +1,4 @@
+import argparse
 import io
 import os
 import string
@@ -33,6 +34,14 @@ def mock_config_and_schema(config_yaml=None, schema_yaml=None):
         schema_stream = io.StringIO(schema_yaml)
         schema_stream.name = 'schema.yaml'
 
+    # The schema gets cached per process, so clear it out to pick up the mocked schema.
+    module.load_schema.cache_clear()
+    module.get_schema_validator.cache_clear()
+    flexmock(module).should_receive('load_precompiled_schema').and_return(None)
+    flexmock(module.cache).should_receive('Configuration_cache').and_return(
+        flexmock(load=lambda: None, save=lambda config, config_paths, logs: None)
+    )
+
     builtins = flexmock(sys.modules['builtins'])
     flexmock(module.os).should_receive('getcwd').and_return('/tmp')
     flexmock(module.os.path).should_receive('isabs').and_return(False)
@@ -84,6 +93,55 @@ def test_parse_configuration_transforms_file_into_mapping():
     assert logs == []
 
 
+def test_parse_configuration_with_cached_configuration_returns_it_without_loading():
+    mock_config_and_schema()
+    cached_configuration = ({'repositories': []}, {'/tmp/config.yaml'}, ())
+    flexmock(module.cache).should_receive('Configuration_cache').replace_with(
+        lambda config_filename, prepared_arguments, overrides, resolve_env: flexmock(
+            load=lambda: (
+                cached_configuration if prepared_arguments == ((('keep_daily',), 3),) else None
+            )
+        )
+    )
+
+    assert (
+        module.parse_configuration(
+            '/tmp/config.yaml',
+            '/tmp/schema.yaml',
+            arguments={'global': argparse.Namespace(keep_daily=3)},
+        )
+        == cached_configuration
+    )
+
+
+def test_parse_configuration_with_cache_configuration_option_saves_to_cache():
+    mock_config_and_schema(
+        '''
+        repositories:
+            - path: hostname.borg
+
+        cache_configuration: true
+        ''',
+    )
+    configuration_cache = flexmock(load=lambda: None)
+    configuration_cache.should_receive('save').with_args(
+        {
+            'repositories': [{'path': 'hostname.borg'}],
+            'cache_configuration': True,
+            'bootstrap': {},
+        },
+        {'/tmp/config.yaml'},
+        [],
+    ).once()
+    flexmock(module.cache).should_receive('Configuration_cache').and_return(configuration_cache)
+
+    module.parse_configuration(
+        '/tmp/config.yaml',
+        '/tmp/schema.yaml',
+        arguments={'global': flexmock()},
+    )
+
+
 def test_parse_configuration_with_none_config_filename_creates_configuration_from_whole_cloth():
     mock_config_and_schema()
 
@@ -357,3 +415,42 @@ def test_parse_configuration_applies_normalization_after_environment_variable_in
     }
     assert config_paths == {'/tmp/config.yaml'}
     assert logs
+
+
+def test_parse_configuration_loads_and_compiles_schema_once():
+    mock_config_and_schema()
+    config_yaml = '''
+        source_directories:
+            - /home
+
+        repositories:
+            - path: hostname.borg
+        '''
+    builtins = flexmock(sys.modules['builtins'])
+    builtins.should_receive('open').with_args('/tmp/config.yaml', encoding='utf-8').and_return(
+        io.StringIO(config_yaml)
+    ).and_return(io.StringIO(config_yaml))
+    flexmock(module.load).should_call('load_configuration').with_args(
+        '/tmp/config.yaml', set
+    ).twice()
+    flexmock(module.load).should_call('load_configuration').with_args('/tmp/schema.yaml').once()
+    flexmock(module.jsonschema).should_call('Draft7Validator').once()
+
+    for _ in range(2):
+        config, _, _ = module.parse_configuration(
+            '/tmp/config.yaml',
+            '/tmp/schema.yaml',
+            arguments={'global': flexmock()},
+        )
+
+        assert config['source_directories'] == ['/home']
+
+
+def test_precompiled_schema_matches_schema_loaded_from_yaml(tmp_path):
+    schema_path = tmp_path / 'schema.yaml'
+    schema_path.write_bytes(open(module.schema_filename(), 'rb').read())
+    module.precompile_schema(str(schema_path))
+
+    assert module.load_precompiled_schema(str(schema_path)) == module.load.load_configuration(
+        str(schema_path)
+    )
@@ -19,6 +19,8 @@ def test_read_lines_yields_single_line_longer_than_chunk_size():
         ['echo', 'this line is longer than the chunk size'], stdout=subprocess.PIPE
     )
 
+    flexmock(module).should_receive('get_pipe_capacity').and_return(16)
+
     assert tuple(flexmock(module, READ_CHUNK_SIZE=16).read_lines(process.stdout, process)) == (
         (),
         (),
@@ -31,6 +33,8 @@ def test_read_lines_yields_single_line_with_multibyte_unicode_character_spanning
     # so it straddles the chunk boundary.
     process = subprocess.Popen(['echo', 'aññññññññññññññññññññññññññññññ'], stdout=subprocess.PIPE)
 
+    flexmock(module).should_receive('get_pipe_capacity').and_return(16)
+
     assert tuple(flexmock(module, READ_CHUNK_SIZE=16).read_lines(process.stdout, process)) == (
         (),
         (),
@@ -39,12 +43,53 @@ def test_read_lines_yields_single_line_with_multibyte_unicode_character_spanning
     )
 
 
+def test_read_lines_with_full_chunks_grows_chunk_size():
+    process = subprocess.Popen(
+        ['echo', 'this line is longer than the chunk size'], stdout=subprocess.PIPE
+    )
+
+    assert tuple(flexmock(module, READ_CHUNK_SIZE=16).read_lines(process.stdout, process)) == (
+        (),
+        ('this line is longer than the chunk size',),
+    )
+
+
+def test_get_pipe_capacity_returns_capacity_of_pipe():
+    process = subprocess.Popen(['true'], stdout=subprocess.PIPE)
+
+    assert module.get_pipe_capacity(process.stdout) >= module.READ_CHUNK_SIZE
+
+    process.wait()
+
+
+def test_get_pipe_capacity_with_non_pipe_falls_back_to_read_chunk_size(tmp_path):
+    with open(tmp_path / 'file', 'w') as non_pipe:
+        assert module.get_pipe_capacity(non_pipe) == module.READ_CHUNK_SIZE
+
+
+def test_read_lines_with_multibyte_separator_spanning_chunk_boundary_yields_lines():
+    process = subprocess.Popen(['printf', 'hi\r\nthere'], stdout=subprocess.PIPE)
+    flexmock(module).should_receive('get_pipe_capacity').and_return(3)
+
+    assert tuple(
+        flexmock(module, READ_CHUNK_SIZE=3).read_lines(
+            process.stdout, process, line_separator='\r\n'
+        )
+    ) == ((), ('hi',), (), ('there',))
+
+
 def test_read_lines_yields_multiple_lines():
     process = subprocess.Popen(['echo', 'hi\nthere'], stdout=subprocess.PIPE)
 
     assert tuple(module.read_lines(process.stdout, process)) == (('hi', 'there'),)
 
 
+def test_read_lines_yields_empty_lines():
+    process = subprocess.Popen(['echo', 'hi\n\nthere\n'], stdout=subprocess.PIPE)
+
+    assert tuple(module.read_lines(process.stdout, process)) == (('hi', '', 'there', ''),)
+
+
 def test_read_lines_yields_multiple_lines_plus_partial_line():
     process = subprocess.Popen(['echo', '-n', 'hi\nthere\npartial'], stdout=subprocess.PIPE)
 
@@ -70,6 +115,28 @@ def test_read_lines_yields_nothing():
     assert tuple(module.read_lines(process.stdout, process)) == ()
 
 
+def test_read_raw_output_captures_output_without_splitting_lines():
+    process = subprocess.Popen(['printf', 'hi\nthere\npartial'], stdout=subprocess.PIPE)
+    capture_buffer = bytearray()
+
+    for lines in module.read_raw_output(process.stdout, process, capture_buffer):
+        assert lines == ()
+
+    assert capture_buffer == b'hi\nthere\npartial'
+
+
+def test_read_raw_output_with_longer_running_process_captures_all_output():
+    flexmock(module).should_receive('get_pipe_capacity').and_return(16)
+    process = subprocess.Popen(
+        [sys.executable, '-c', "print('x' * 100000)"], stdout=subprocess.PIPE
+    )
+    capture_buffer = bytearray()
+
+    tuple(module.read_raw_output(process.stdout, process, capture_buffer))
+
+    assert capture_buffer == b'x' * 100000 + b'\n'
+
+
 def test_log_outputs_logs_each_line_separately():
     hi_record = flexmock(
         msg='hi',
@@ -217,6 +284,109 @@ def test_log_outputs_returns_output_without_logging_for_output_log_level_none():
     assert output_lines == ('there',)
 
 
+def test_log_outputs_without_capture_returns_no_output():
+    flexmock(module.logger).should_receive('log').never()
+    flexmock(module).should_receive('interpret_exit_code').and_return(module.Exit_status.SUCCESS)
+
+    process = subprocess.Popen(['echo', 'hi'], stdout=subprocess.PIPE)
+    flexmock(module).should_receive('output_buffers_for_process').and_return((process.stdout,))
+
+    assert (
+        tuple(
+            module.log_outputs(
+                (process,),
+                exclude_stdouts=(),
+                output_log_level=None,
+                borg_local_path='borg',
+                borg_exit_codes=None,
+                capture=False,
+            )
+        )
+        == ()
+    )
+
+
+def test_log_outputs_with_capture_buffer_captures_raw_output_of_last_process():
+    flexmock(module.logger).should_receive('log').never()
+    flexmock(module).should_receive('interpret_exit_code').and_return(module.Exit_status.SUCCESS)
+
+    hi_process = subprocess.Popen(['echo', 'hi'], stdout=subprocess.PIPE)
+    flexmock(module).should_receive('output_buffers_for_process').with_args(
+        hi_process,
+        (),
+    ).and_return((hi_process.stdout,))
+
+    there_process = subprocess.Popen(['printf', '{"there":\n1}\n'], stdout=subprocess.PIPE)
+    flexmock(module).should_receive('output_buffers_for_process').with_args(
+        there_process,
+        (),
+    ).and_return((there_process.stdout,))
+    capture_buffer = bytearray()
+
+    assert (
+        tuple(
+            module.log_outputs(
+                (hi_process, there_process),
+                exclude_stdouts=(),
+                output_log_level=None,
+                borg_local_path='borg',
+                borg_exit_codes=None,
+                capture=False,
+                capture_buffer=capture_buffer,
+            )
+        )
+        == ()
+    )
+    assert capture_buffer == b'{"there":\n1}\n'
+
+
+def test_execute_command_and_capture_raw_output_returns_raw_stdout():
+    assert module.execute_command_and_capture_raw_output(
+        [sys.executable, '-c', "print('{\"a\": 1}')"]
+    ) == bytearray(b'{"a": 1}\n')
+
+
+def test_log_outputs_discards_borg_json_log_lines_below_enabled_log_level():
+    flexmock(module.logger).should_receive('isEnabledFor').with_args(logging.DEBUG).and_return(
+        False
+    )
+    flexmock(module.logger).should_receive('isEnabledFor').with_args(logging.ERROR).and_return(True)
+    flexmock(module).should_receive('load_json').with_args(
+        '{"type": "log_message", "levelname": "DEBUG", "message": "debug"}'
+    ).never()
+    flexmock(module).should_call('load_json').with_args(
+        '{"type": "log_message", "levelname": "ERROR", "message": "error"}'
+    ).once()
+    flexmock(module.logger).should_receive('handle').once()
+    flexmock(module).should_receive('interpret_exit_code').and_return(module.Exit_status.SUCCESS)
+
+    process = subprocess.Popen(
+        [
+            'printf',
+            (
+                '{"type": "log_message", "levelname": "DEBUG", "message": "debug"}\\n'
+                '{"type": "log_message", "levelname": "ERROR", "message": "error"}\\n'
+            ),
+        ],
+        stdout=subprocess.PIPE,
+    )
+    flexmock(module).should_receive('output_buffers_for_process').and_return((process.stdout,))
+
+    assert (
+        tuple(
+            module.log_outputs(
+                (process,),
+                exclude_stdouts=(),
+                output_log_level=logging.INFO,
+                borg_local_path='printf',
+                borg_exit_codes=None,
+                capture=False,
+            )
+        )
+        == ()
+    )
+
+
 def test_log_outputs_includes_error_output_in_exception():
     flexmock(module.logger).should_receive('log')
     flexmock(module).should_receive('interpret_exit_code').and_return(module.Exit_status.ERROR)
@@ -239,6 +409,39 @@ def test_log_outputs_includes_error_output_in_exception():
     assert error.value.output
 
 
+def test_log_outputs_includes_discarded_borg_json_log_lines_in_error_output():
+    flexmock(module.logger).should_receive('isEnabledFor').and_return(False)
+    flexmock(module.logger).should_receive('handle')
+    flexmock(module).should_receive('interpret_exit_code').and_return(module.Exit_status.ERROR)
+    flexmock(module).should_receive('command_for_process').and_return('printf')
+
+    process = subprocess.Popen(
+        [
+            'printf',
+            (
+                '{"type": "log_message", "levelname": "DEBUG", "message": "leading up"}\\n'
+                '{"type": "log_message", "levelname": "DEBUG", "message": "to failure"}\\n'
+            ),
+        ],
+        stdout=subprocess.PIPE,
+    )
+    flexmock(module).should_receive('output_buffers_for_process').and_return((process.stdout,))
+
+    with pytest.raises(subprocess.CalledProcessError) as error:
+        tuple(
+            module.log_outputs(
+                (process,),
+                exclude_stdouts=(),
+                output_log_level=logging.INFO,
+                borg_local_path='printf',
+                borg_exit_codes=None,
+                capture=False,
+            )
+        )
+
+    assert error.value.output == 'leading up\nto failure'
+
+
 def test_log_outputs_logs_multiline_error_output():
     '''
     Make sure that all error output lines get logged, not just (for instance) the first few lines
@@ -401,7 +604,7 @@ def test_log_outputs_vents_other_processes_when_one_exits():
         [
             sys.executable,
             '-c',
-            "import random, string; print(''.join(random.choice(string.ascii_letters) for _ in range(40000)))",
+            "import random, string; print(''.join(random.choice(string.ascii_letters) for _ in range(100000)))",
         ],
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
@@ -499,9 +702,12 @@ def test_log_outputs_truncates_long_error_output():
     ).and_return(module.Exit_status.ERROR)
     flexmock(module).should_receive('output_buffers_for_process').and_return((process.stdout,))
 
-    with pytest.raises(subprocess.CalledProcessError) as error:
+    with (
+        pytest.raises(subprocess.CalledProcessError) as error,
+        module.Error_output_line_count(0),
+    ):
         tuple(
-            flexmock(module, ERROR_OUTPUT_MAX_LINE_COUNT=0).log_outputs(
+            module.log_outputs(
                 (process,),
                 exclude_stdouts=(),
                 output_log_level=logging.INFO,
@@ -514,6 +720,109 @@ def test_log_outputs_truncates_long_error_output():
     assert error.value.output.startswith('...')
 
 
+def test_log_outputs_with_soft_timeout_terminates_command():
+    flexmock(module.logger).should_receive('log')
+    process = subprocess.Popen(['sleep', '30'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    with (
+        pytest.raises(subprocess.CalledProcessError) as error,
+        module.Command_timeouts(soft=0.1),
+    ):
+        tuple(
+            module.log_outputs(
+                (process,),
+                exclude_stdouts=(),
+                output_log_level=logging.INFO,
+                borg_local_path='borg',
+                borg_exit_codes=None,
+            )
+        )
+
+    assert error.value.returncode == -module.signal.SIGTERM
+
+
+def test_execute_command_with_hard_timeout_kills_shell_command_process_group():
+    flexmock(module.logger).should_receive('log')
+    flexmock(module).PROCESS_GROUP_SUPPORTED = True
+    flexmock(module.sys).should_receive('stdin').and_return(None)
+    start_time = module.time.monotonic()
+
+    # If only the shell got killed, then the backgrounded sleep would hold the output pipe open and
+    # this would hang until the sleep finished.
+    with (
+        pytest.raises(subprocess.CalledProcessError) as error,
+        module.Command_timeouts(hard=0.1),
+    ):
+        module.execute_command(['trap "" TERM; sleep 30 & wait'], shell=True)
+
+    assert error.value.returncode == -module.signal.SIGKILL
+    assert module.time.monotonic() - start_time < 10
+    assert not module.borgmatic.signals.child_process_groups
+
+
+def test_execute_command_without_output_and_with_soft_timeout_terminates_command():
+    flexmock(module.logger).should_receive('log')
+
+    with (
+        pytest.raises(subprocess.CalledProcessError) as error,
+        module.Command_timeouts(soft=0.1),
+    ):
+        module.execute_command(['sleep', '30'], output_file=module.DO_NOT_CAPTURE)
+
+    assert error.value.returncode == -module.signal.SIGTERM
+
+
+def test_log_outputs_records_command_usage():
+    flexmock(module.logger).should_receive('log')
+    process = subprocess.Popen(
+        [sys.executable, '-c', "import sys; print('hi'); print('there', file=sys.stderr)"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    usages = []
+    module.COMMAND_USAGES.set(usages)
+
+    try:
+        tuple(
+            module.log_outputs(
+                (process,),
+                exclude_stdouts=(),
+                output_log_level=logging.INFO,
+                borg_local_path='borg',
+                borg_exit_codes=None,
+            )
+        )
+    finally:
+        module.COMMAND_USAGES.set(None)
+
+    (usage,) = usages
+    assert usage.command == process.args
+    assert usage.exit_code == 0
+    assert usage.stdout_bytes == len('hi\n')
+    assert usage.stderr_bytes == len('there\n')
+    assert usage.wall_seconds > 0
+
+    if hasattr(module.os, 'pidfd_open'):
+        assert usage.user_cpu_seconds is not None
+        assert usage.system_cpu_seconds is not None
+        assert usage.peak_rss_bytes > 0
+
+
+def test_execute_command_and_capture_raw_output_records_stdout_bytes():
+    usages = []
+    module.COMMAND_USAGES.set(usages)
+
+    try:
+        output = module.execute_command_and_capture_raw_output(
+            [sys.executable, '-c', "print('hi')"]
+        )
+    finally:
+        module.COMMAND_USAGES.set(None)
+
+    assert output == b'hi\n'
+    assert usages[0].stdout_bytes == len(b'hi\n')
+
+
 def test_log_outputs_with_no_output_logs_nothing():
     flexmock(module.logger).should_receive('log').never()
     flexmock(module).should_receive('interpret_exit_code').and_return(module.Exit_status.SUCCESS)
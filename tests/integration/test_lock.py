@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+from flexmock import flexmock
+
+from borgmatic import lock as module
+
+
+@pytest.fixture
+def config(tmp_path):
+    flexmock(module, LOCK_POLL_INTERVAL_SECONDS=0.01)
+
+    return {'repository_locks': True, 'user_state_directory': str(tmp_path)}
+
+
+def test_repository_lock_records_holder_while_held_and_clears_it_after(config):
+    repository_lock = module.Repository_lock(config, {'path': '/repo'}, 'test.yaml')
+
+    with repository_lock:
+        holder = module.read_lock_holder(repository_lock.lock_path)
+
+        assert holder['repository'] == '/repo'
+        assert holder['configuration_filename'] == 'test.yaml'
+        assert holder['pid'] == os.getpid()
+        assert module.file_locked_by_someone_else(repository_lock.lock_path)
+
+    assert module.read_lock_holder(repository_lock.lock_path) is None
+    assert not module.file_locked_by_someone_else(repository_lock.lock_path)
+    assert os.listdir(f'{repository_lock.lock_path}{module.QUEUE_DIRECTORY_SUFFIX}') == []
+
+
+def test_repository_lock_keys_lock_by_normalized_repository_path(config, tmp_path):
+    config['working_directory'] = str(tmp_path)
+
+    assert (
+        module.Repository_lock(config, {'path': 'repo'}, 'test.yaml').lock_path
+        == module.Repository_lock(config, {'path': f'{tmp_path}/repo'}, 'test.yaml').lock_path
+    )
+    assert (
+        module.Repository_lock(config, {'path': 'repo'}, 'test.yaml').lock_path
+        != module.Repository_lock(config, {'path': 'other'}, 'test.yaml').lock_path
+    )
+
+
+def test_repository_lock_lets_waiters_take_turns_in_order(config):
+    acquired_order = []
+    waiting_threads = []
+
+    def hold_lock(name):
+        with module.Repository_lock(config, {'path': '/repo'}, f'{name}.yaml'):
+            acquired_order.append(name)
+
+    with module.Repository_lock(config, {'path': '/repo'}, 'first.yaml') as repository_lock:
+        queue_path = f'{module.make_lock_path(config, "/repo")}{module.QUEUE_DIRECTORY_SUFFIX}'
+
+        for name in ('second', 'third', 'fourth'):
+            waiting_thread = threading.Thread(target=hold_lock, args=(name,))
+            waiting_thread.start()
+            waiting_threads.append(waiting_thread)
+
+            # Wait until this thread has queued up before starting the next one.
+            while len(os.listdir(queue_path)) < len(waiting_threads):
+                time.sleep(0.01)
+
+        assert repository_lock is None
+        assert acquired_order == []
+
+    for waiting_thread in waiting_threads:
+        waiting_thread.join(timeout=5)
+
+    assert acquired_order == ['second', 'third', 'fourth']
+
+
+def test_repository_lock_with_timeout_errors_and_leaves_queue(config):
+    config['repository_lock_timeout'] = 1
+    flexmock(module.time).should_receive('monotonic').and_return(0).and_return(0).and_return(5)
+
+    with module.Repository_lock(config, {'path': '/repo'}, 'first.yaml'):
+        timing_out_lock = module.Repository_lock(config, {'path': '/repo'}, 'second.yaml')
+
+        with pytest.raises(ValueError), timing_out_lock:
+            pass  # pragma: no cover
+
+        assert timing_out_lock.lock_descriptor is None
+        assert os.listdir(f'{timing_out_lock.lock_path}{module.QUEUE_DIRECTORY_SUFFIX}') == []
+
+
+def test_repository_lock_cleans_up_stale_ticket_of_dead_waiter(config):
+    lock_path = module.make_lock_path(config, '/repo')
+    queue_path = f'{lock_path}{module.QUEUE_DIRECTORY_SUFFIX}'
+    os.makedirs(queue_path)
+    stale_ticket_path = os.path.join(queue_path, f'{0:020d}-99999-1')
+
+    with open(stale_ticket_path, 'w'):
+        pass
+
+    with open(lock_path, 'w') as lock_file:
+        json.dump({'pid': 99999}, lock_file)
+
+    with module.Repository_lock(config, {'path': '/repo'}, 'test.yaml'):
+        assert not os.path.exists(stale_ticket_path)
@@ -18,8 +18,8 @@ def test_rich_color_formatter_format_colors_log_record_based_on_level():
 
 
 def test_rich_color_formatter_format_includes_prefix():
+    flexmock(module.borgmatic.logger).should_receive('format_log_prefix').and_return('sup: ')
     formatter = module.Rich_color_formatter()
-    formatter.prefix = 'sup'
     formatted = formatter.format(
         module.logging.makeLogRecord(
             dict(
@@ -628,7 +628,7 @@ def test_collect_spot_check_source_paths_parses_borg_output_and_includes_bootstr
 
     assert module.collect_spot_check_source_paths(
         repository={'path': 'repo'},
-        config={'working_directory': '/'},
+        config={'working_directory': '/', 'validate_paths_with_borg': True},
         local_borg_version=flexmock(),
         global_arguments=flexmock(),
         local_path=flexmock(),
@@ -654,7 +654,12 @@ def test_collect_spot_check_source_paths_omits_progress_from_create_dry_run_comm
     flexmock(module.borgmatic.borg.create).should_receive('make_base_create_command').with_args(
         dry_run=True,
         repository_path='repo',
-        config={'working_directory': '/', 'progress': False, 'list_details': True},
+        config={
+            'working_directory': '/',
+            'validate_paths_with_borg': True,
+            'progress': False,
+            'list_details': True,
+        },
         patterns=[Pattern('foo'), Pattern('bar')],
         local_borg_version=object,
         global_arguments=object,
@@ -679,7 +684,7 @@ def test_collect_spot_check_source_paths_omits_progress_from_create_dry_run_comm
 
     assert module.collect_spot_check_source_paths(
         repository={'path': 'repo'},
-        config={'working_directory': '/', 'progress': True},
+        config={'working_directory': '/', 'validate_paths_with_borg': True, 'progress': True},
         local_borg_version=flexmock(),
         global_arguments=flexmock(),
         local_path=flexmock(),
@@ -730,7 +735,7 @@ def test_collect_spot_check_source_paths_passes_through_stream_processes_false()
 
     assert module.collect_spot_check_source_paths(
         repository={'path': 'repo'},
-        config={'working_directory': '/'},
+        config={'working_directory': '/', 'validate_paths_with_borg': True},
         local_borg_version=flexmock(),
         global_arguments=flexmock(),
         local_path=flexmock(),
@@ -781,7 +786,7 @@ def test_collect_spot_check_source_paths_without_working_directory_parses_borg_o
 
     assert module.collect_spot_check_source_paths(
         repository={'path': 'repo'},
-        config={},
+        config={'validate_paths_with_borg': True},
         local_borg_version=flexmock(),
         global_arguments=flexmock(),
         local_path=flexmock(),
@@ -834,7 +839,7 @@ def test_collect_spot_check_source_paths_skips_directories():
     assert (
         module.collect_spot_check_source_paths(
             repository={'path': 'repo'},
-            config={'working_directory': '/'},
+            config={'working_directory': '/', 'validate_paths_with_borg': True},
             local_borg_version=flexmock(),
             global_arguments=flexmock(),
             local_path=flexmock(),
@@ -948,7 +953,12 @@ def test_collect_spot_check_source_paths_uses_working_directory():
     flexmock(module.borgmatic.borg.create).should_receive('make_base_create_command').with_args(
         dry_run=True,
         repository_path='repo',
-        config={'working_directory': '/working/dir', 'progress': False, 'list_details': True},
+        config={
+            'working_directory': '/working/dir',
+            'validate_paths_with_borg': True,
+            'progress': False,
+            'list_details': True,
+        },
         patterns=[Pattern('foo'), Pattern('bar')],
         local_borg_version=object,
         global_arguments=object,
@@ -976,7 +986,7 @@ def test_collect_spot_check_source_paths_uses_working_directory():
 
     assert module.collect_spot_check_source_paths(
         repository={'path': 'repo'},
-        config={'working_directory': '/working/dir'},
+        config={'working_directory': '/working/dir', 'validate_paths_with_borg': True},
         local_borg_version=flexmock(),
         global_arguments=flexmock(),
         local_path=flexmock(),
@@ -1035,7 +1045,7 @@ def test_collect_spot_check_source_paths_deduplicates_borg_output_paths():
 
     assert module.collect_spot_check_source_paths(
         repository={'path': 'repo'},
-        config={'working_directory': '/'},
+        config={'working_directory': '/', 'validate_paths_with_borg': True},
         local_borg_version=flexmock(),
         global_arguments=flexmock(),
         local_path=flexmock(),
@@ -1045,6 +1055,106 @@ def test_collect_spot_check_source_paths_deduplicates_borg_output_paths():
     ) == ('/etc/path', '/etc/other')
 
 
+def test_collect_spot_check_source_paths_without_borg_walks_patterns_and_includes_bootstrap_config_paths():
+    flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(
+        '/working/dir'
+    )
+    flexmock(module.borgmatic.actions.pattern).should_receive('collect_patterns').and_return(
+        (Pattern('collected'),),
+    )
+    flexmock(module.borgmatic.actions.pattern).should_receive('process_patterns').with_args(
+        (
+            Pattern('collected', source=module.borgmatic.borg.pattern.Pattern_source.HOOK),
+            Pattern('extra.yaml', source=module.borgmatic.borg.pattern.Pattern_source.INTERNAL),
+        ),
+        config=object,
+        working_directory='/working/dir',
+    ).and_return(
+        [Pattern('foo'), Pattern('bar')],
+    )
+    flexmock(module.borgmatic.hooks.dispatch).should_receive('call_hooks').never()
+    flexmock(module.borgmatic.borg.create).should_receive('make_base_create_command').never()
+    flexmock(module.borgmatic.execute).should_receive('execute_command_and_capture_output').never()
+    flexmock(module.borgmatic.borg.plan).should_receive('get_planned_paths').with_args(
+        [Pattern('foo'), Pattern('bar')], {'validate_paths_with_borg': False}, '/working/dir'
+    ).and_return(
+        iter(
+            (
+                module.borgmatic.borg.plan.Planned_path('foo'),
+                module.borgmatic.borg.plan.Planned_path('foo/file', regular_file=True),
+                module.borgmatic.borg.plan.Planned_path('foo/pipe', special=True),
+                module.borgmatic.borg.plan.Planned_path('bar', regular_file=True),
+                module.borgmatic.borg.plan.Planned_path('foo/file', regular_file=True),
+            )
+        )
+    )
+    flexmock(module.os.path).should_receive('isfile').never()
+
+    assert module.collect_spot_check_source_paths(
+        repository={'path': 'repo'},
+        config={'validate_paths_with_borg': False},
+        local_borg_version=flexmock(),
+        global_arguments=flexmock(),
+        local_path=flexmock(),
+        remote_path=flexmock(),
+        borgmatic_runtime_directory='/run/borgmatic',
+        bootstrap_config_paths=('extra.yaml',),
+    ) == ('foo/file', 'bar')
+
+
+def test_collect_spot_check_source_paths_with_exclude_nodump_parses_borg_output_instead_of_walking():
+    flexmock(module.borgmatic.hooks.dispatch).should_receive('call_hooks').and_return(
+        {'hook1': False},
+    )
+    flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(None)
+    flexmock(module.borgmatic.actions.pattern).should_receive('collect_patterns').and_return(
+        (Pattern('collected'),),
+    )
+    flexmock(module.borgmatic.actions.pattern).should_receive('process_patterns').and_return(
+        [Pattern('foo')],
+    )
+    flexmock(module.borgmatic.borg.plan).should_receive('get_planned_paths').never()
+    flexmock(module.borgmatic.borg.create).should_receive('make_base_create_command').with_args(
+        dry_run=True,
+        repository_path='repo',
+        config={'exclude_nodump': True, 'progress': False, 'list_details': True},
+        patterns=[Pattern('foo')],
+        local_borg_version=object,
+        global_arguments=object,
+        borgmatic_runtime_directory='/run/borgmatic',
+        local_path=object,
+        remote_path=object,
+        stream_processes=False,
+    ).and_return((('borg', 'create', '--exclude-nodump'), ('repo::archive',), flexmock()))
+    flexmock(module.borgmatic.borg.environment).should_receive('make_environment').and_return(
+        flexmock(),
+    )
+    flexmock(module.borgmatic.execute).should_receive(
+        'execute_command_and_capture_output',
+    ).with_args(
+        ('borg', 'create', '--exclude-nodump', 'repo::archive'),
+        capture_stderr=True,
+        environment=object,
+        working_directory=None,
+        borg_local_path=object,
+        borg_exit_codes=None,
+    ).and_yield(
+        '- /etc/path',
+    )
+    flexmock(module.os.path).should_receive('isfile').and_return(True)
+
+    assert module.collect_spot_check_source_paths(
+        repository={'path': 'repo'},
+        config={'exclude_nodump': True},
+        local_borg_version=flexmock(),
+        global_arguments=flexmock(),
+        local_path=flexmock(),
+        remote_path=flexmock(),
+        borgmatic_runtime_directory='/run/borgmatic',
+        bootstrap_config_paths=(),
+    ) == ('/etc/path',)
+
+
 def test_compare_spot_check_hashes_returns_paths_having_failing_hashes():
     flexmock(module.random).should_receive('SystemRandom').and_return(
         flexmock(sample=lambda population, count: population[:count]),
@@ -1,6 +1,8 @@
 import contextlib
 import json
 import os
+import subprocess
+import threading
 
 import pytest
 from flexmock import flexmock
@@ -447,3 +449,340 @@ def test_rename_checkpoint_archive_checks_suffix():
             local_path=None,
             remote_path=None,
         )
+
+
+def test_find_named_pipes_yields_named_pipes_recursively(tmp_path):
+    (tmp_path / 'postgresql_databases' / 'localhost').mkdir(parents=True)
+    os.mkfifo(tmp_path / 'postgresql_databases' / 'localhost' / 'foo')
+    (tmp_path / 'postgresql_databases' / 'localhost' / 'bar').write_text('dump')
+    os.mkfifo(tmp_path / 'baz')
+
+    assert sorted(module.find_named_pipes(str(tmp_path))) == [
+        str(tmp_path / 'baz'),
+        str(tmp_path / 'postgresql_databases' / 'localhost' / 'foo'),
+    ]
+
+
+def test_find_named_pipes_skips_directories_on_other_devices():
+    flexmock(module.os).should_receive('stat').with_args('/run/borgmatic').and_return(
+        flexmock(st_dev=1)
+    )
+    flexmock(module.os).should_receive('stat').with_args(
+        '/run/borgmatic/dumps', follow_symlinks=False
+    ).and_return(flexmock(st_dev=1))
+    flexmock(module.os).should_receive('stat').with_args(
+        '/run/borgmatic/snapshot', follow_symlinks=False
+    ).and_return(flexmock(st_dev=2))
+    flexmock(module.os).should_receive('stat').with_args(
+        '/run/borgmatic/dumps/pipe', follow_symlinks=False
+    ).and_return(flexmock(st_mode=module.stat.S_IFIFO))
+    flexmock(module.os).should_receive('stat').with_args(
+        '/run/borgmatic/dumps/file', follow_symlinks=False
+    ).and_return(flexmock(st_mode=module.stat.S_IFREG))
+    walked_subdirectory_names = []
+
+    def walk(directory):
+        subdirectory_names = ['dumps', 'snapshot']
+        yield ('/run/borgmatic', subdirectory_names, [])
+        walked_subdirectory_names.extend(subdirectory_names)
+        yield ('/run/borgmatic/dumps', [], ['pipe', 'file'])
+
+    flexmock(module.os).should_receive('walk').replace_with(walk)
+
+    assert tuple(module.find_named_pipes('/run/borgmatic')) == ('/run/borgmatic/dumps/pipe',)
+    assert walked_subdirectory_names == ['dumps']
+
+
+def test_find_named_pipes_with_missing_directory_yields_nothing(tmp_path):
+    assert tuple(module.find_named_pipes(str(tmp_path / 'missing'))) == ()
+
+
+def test_spool_named_pipe_copies_pipe_contents_into_spool_file(tmp_path):
+    pipe_path = tmp_path / 'dump'
+    pipe_path.write_bytes(b'dump contents')
+
+    spool_path = module.spool_named_pipe(str(pipe_path))
+
+    assert spool_path == f'{pipe_path}.spool'
+    with open(spool_path, 'rb') as spool_file:
+        assert spool_file.read() == b'dump contents'
+    assert os.stat(spool_path).st_mode & 0o777 == 0o600
+
+
+def test_unblock_named_pipe_opens_and_closes_pipe_for_writing():
+    flexmock(module.os).should_receive('open').with_args(
+        '/run/borgmatic/dump', module.os.O_WRONLY | module.os.O_NONBLOCK
+    ).and_return(3).once()
+    flexmock(module.os).should_receive('close').with_args(3).once()
+
+    module.unblock_named_pipe('/run/borgmatic/dump')
+
+
+def test_unblock_named_pipe_without_reader_ignores_error():
+    flexmock(module.os).should_receive('open').and_raise(OSError)
+    flexmock(module.os).should_receive('close').never()
+
+    module.unblock_named_pipe('/run/borgmatic/dump')
+
+
+def test_spool_data_source_dumps_without_stream_processes_bails():
+    flexmock(module).should_receive('find_named_pipes').never()
+    flexmock(module.borgmatic.execute).should_receive('log_outputs').never()
+
+    module.spool_data_source_dumps([], '/run/borgmatic')
+
+
+def test_spool_data_source_dumps_spools_named_pipes_and_replaces_them_with_spool_files():
+    processes = (flexmock(), flexmock())
+    flexmock(module).should_receive('find_named_pipes').and_return(
+        ('/run/borgmatic/foo', '/run/borgmatic/bar')
+    )
+    flexmock(module).should_receive('spool_named_pipe').replace_with(
+        lambda pipe_path: f'{pipe_path}.spool'
+    )
+    flexmock(module.borgmatic.execute).should_receive('log_outputs').with_args(
+        processes,
+        exclude_stdouts=(),
+        output_log_level=module.logging.INFO,
+        borg_local_path=None,
+        borg_exit_codes=None,
+        capture=False,
+    ).and_return(iter(())).once()
+    flexmock(module).should_receive('unblock_named_pipe')
+    flexmock(module.os).should_receive('replace').with_args(
+        '/run/borgmatic/foo.spool', '/run/borgmatic/foo'
+    ).once()
+    flexmock(module.os).should_receive('replace').with_args(
+        '/run/borgmatic/bar.spool', '/run/borgmatic/bar'
+    ).once()
+
+    module.spool_data_source_dumps(list(processes), '/run/borgmatic')
+
+
+def test_spool_data_source_dumps_with_dump_process_error_unblocks_waiting_spooling_and_raises():
+    flexmock(module).should_receive('find_named_pipes').and_return(('/run/borgmatic/foo',))
+    unblocked = threading.Event()
+
+    def spool_named_pipe(pipe_path):
+        unblocked.wait()
+
+        return f'{pipe_path}.spool'
+
+    flexmock(module).should_receive('spool_named_pipe').replace_with(spool_named_pipe)
+    flexmock(module).should_receive('unblock_named_pipe').with_args(
+        '/run/borgmatic/foo'
+    ).replace_with(lambda pipe_path: unblocked.set())
+    flexmock(module.borgmatic.execute).should_receive('log_outputs').and_raise(
+        subprocess.CalledProcessError(1, 'pg_dump')
+    )
+    flexmock(module.os).should_receive('replace').never()
+
+    with pytest.raises(subprocess.CalledProcessError):
+        module.spool_data_source_dumps([flexmock()], '/run/borgmatic')
+
+    assert unblocked.is_set()
+
+
+def test_spool_data_source_dumps_with_spool_error_raises():
+    flexmock(module).should_receive('find_named_pipes').and_return(('/run/borgmatic/foo',))
+    flexmock(module).should_receive('spool_named_pipe').and_raise(OSError)
+    flexmock(module).should_receive('unblock_named_pipe')
+    flexmock(module.borgmatic.execute).should_receive('log_outputs').and_return(iter(()))
+    flexmock(module.os).should_receive('replace').never()
+
+    with pytest.raises(OSError):
+        module.spool_data_source_dumps([flexmock()], '/run/borgmatic')
+
+
+def test_create_repository_archive_creates_archive_with_base_create_flags():
+    flexmock(module.borgmatic.logger).should_receive('Log_prefix').with_args('repo').and_return(
+        flexmock()
+    )
+    patterns = [borgmatic.borg.pattern.Pattern('foo')]
+    base_create_flags = ('borg', 'create', '--patterns-from', 'patterns')
+    flexmock(module.borgmatic.borg.create).should_receive('create_archive').with_args(
+        False,
+        'repo',
+        {},
+        patterns,
+        '1.2.3',
+        object,
+        '/run/borgmatic',
+        local_path='borg',
+        remote_path=None,
+        json=False,
+        comment='comment',
+        base_create_flags=base_create_flags,
+    ).and_return(None).once()
+    flexmock(module.borgmatic.actions.json).should_receive('parse_json').never()
+
+    assert (
+        module.create_repository_archive(
+            repository={'path': 'repo'},
+            config={},
+            patterns=patterns,
+            local_borg_version='1.2.3',
+            create_arguments=flexmock(json=False, comment='comment'),
+            global_arguments=flexmock(dry_run=False),
+            borgmatic_runtime_directory='/run/borgmatic',
+            local_path='borg',
+            remote_path=None,
+            base_create_flags=base_create_flags,
+        )
+        == ()
+    )
+
+
+def test_create_repository_archive_with_json_output_parses_it():
+    flexmock(module.borgmatic.logger).should_receive('Log_prefix').with_args('my repo').and_return(
+        flexmock()
+    )
+    flexmock(module.borgmatic.borg.create).should_receive('create_archive').and_return(
+        '{"archive": {}}'
+    )
+    parsed_json = {'archive': {}, 'repository': {'label': 'my repo'}}
+    flexmock(module.borgmatic.actions.json).should_receive('parse_json').with_args(
+        '{"archive": {}}', 'my repo'
+    ).and_return(parsed_json)
+
+    assert module.create_repository_archive(
+        repository={'path': 'repo', 'label': 'my repo'},
+        config={},
+        patterns=[],
+        local_borg_version='1.2.3',
+        create_arguments=flexmock(json=True, comment=None),
+        global_arguments=flexmock(dry_run=False),
+        borgmatic_runtime_directory='/run/borgmatic',
+        local_path='borg',
+        remote_path=None,
+        base_create_flags=('borg', 'create'),
+    ) == (parsed_json,)
+
+
+def test_run_fan_out_create_dumps_once_and_creates_archives_in_all_repositories():
+    flexmock(module.borgmatic.config.paths).should_receive('Runtime_directory').and_return(
+        flexmock(),
+    )
+    flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(None)
+    flexmock(module.borgmatic.actions.pattern).should_receive('collect_patterns').and_return(())
+    flexmock(module.borgmatic.actions.pattern).should_receive('process_patterns').and_return(
+        [borgmatic.borg.pattern.Pattern('foo')]
+    )
+    flexmock(module.borgmatic.actions.dump).should_receive('Dump_cleanup').and_return(flexmock())
+    process = flexmock()
+    flexmock(module.borgmatic.hooks.dispatch).should_receive('call_hooks').with_args(
+        'dump_data_sources',
+        object,
+        module.borgmatic.hooks.dispatch.Hook_type.DATA_SOURCE,
+        object,
+        object,
+        object,
+        False,
+    ).and_return({'postgresql_databases': [process]}).once()
+    flexmock(module).should_receive('spool_data_source_dumps').with_args([process], object).once()
+    patterns_file = flexmock()
+    patterns_file.should_receive('close').once()
+    flexmock(module.borgmatic.borg.create).should_receive('make_base_create_command').with_args(
+        False,
+        'repo1',
+        object,
+        object,
+        '1.2.3',
+        object,
+        object,
+        local_path='borg',
+        remote_path=None,
+        json=False,
+        comment=None,
+    ).and_return((('borg', 'create'), ('repo1::archive',), patterns_file)).once()
+    flexmock(module).should_receive('create_repository_archive').with_args(
+        {'path': 'repo1'},
+        object,
+        object,
+        '1.2.3',
+        object,
+        object,
+        object,
+        'borg',
+        None,
+        ('borg', 'create'),
+    ).and_return(('first',)).once()
+    flexmock(module).should_receive('create_repository_archive').with_args(
+        {'path': 'repo2'},
+        object,
+        object,
+        '1.2.3',
+        object,
+        object,
+        object,
+        'borg',
+        None,
+        ('borg', 'create'),
+    ).and_return(('second',)).once()
+
+    create_futures = module.run_fan_out_create(
+        repositories=[{'path': 'repo1'}, {'path': 'repo2'}],
+        config={},
+        config_paths=['/tmp/test.yaml'],
+        local_borg_version='1.2.3',
+        create_arguments=flexmock(json=False, comment=None),
+        global_arguments=flexmock(dry_run=False),
+        dry_run_label='',
+        local_path='borg',
+        remote_path=None,
+    )
+
+    assert {path: future.result() for path, future in create_futures.items()} == {
+        'repo1': ('first',),
+        'repo2': ('second',),
+    }
+
+
+def test_run_fan_out_create_without_patterns_file_skips_closing_it():
+    flexmock(module.borgmatic.config.paths).should_receive('Runtime_directory').and_return(
+        flexmock(),
+    )
+    flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(None)
+    flexmock(module.borgmatic.actions.pattern).should_receive('collect_patterns').and_return(())
+    flexmock(module.borgmatic.actions.pattern).should_receive('process_patterns').and_return([])
+    flexmock(module.borgmatic.actions.dump).should_receive('Dump_cleanup').and_return(flexmock())
+    flexmock(module.borgmatic.hooks.dispatch).should_receive('call_hooks').and_return({})
+    flexmock(module).should_receive('spool_data_source_dumps')
+    flexmock(module.borgmatic.borg.create).should_receive('make_base_create_command').and_return(
+        (('borg', 'create'), ('repo1::archive',), None)
+    )
+    flexmock(module).should_receive('create_repository_archive').and_return(())
+
+    create_futures = module.run_fan_out_create(
+        repositories=[{'path': 'repo1'}, {'path': 'repo2'}],
+        config={},
+        config_paths=['/tmp/test.yaml'],
+        local_borg_version='1.2.3',
+        create_arguments=flexmock(json=False, comment=None),
+        global_arguments=flexmock(dry_run=False),
+        dry_run_label='',
+        local_path='borg',
+        remote_path=None,
+    )
+
+    assert {path: future.result() for path, future in create_futures.items()} == {
+        'repo1': (),
+        'repo2': (),
+    }
+
+
+def test_run_fan_out_create_with_both_list_and_json_errors():
+    flexmock(module.borgmatic.config.paths).should_receive('Runtime_directory').never()
+
+    with pytest.raises(ValueError):
+        module.run_fan_out_create(
+            repositories=[{'path': 'repo1'}, {'path': 'repo2'}],
+            config={'list_details': True},
+            config_paths=['/tmp/test.yaml'],
+            local_borg_version='1.2.3',
+            create_arguments=flexmock(json=True, comment=None),
+            global_arguments=flexmock(dry_run=False),
+            dry_run_label='',
+            local_path='borg',
+            remote_path=None,
+        )
@@ -1,3 +1,4 @@
+import pytest
 from flexmock import flexmock
 
 from borgmatic.actions import dump as module
@@ -9,9 +10,77 @@ def test_dump_cleanup_removes_data_source_dumps():
     ).with_args('remove_data_source_dumps', object, object, object, object, object).twice()
 
     with module.Dump_cleanup(
-        config=flexmock(),
+        config={},
         borgmatic_runtime_directory=flexmock(),
         patterns=flexmock(),
         dry_run=flexmock(),
+    ):
+        assert not module.BTRFS_SNAPSHOT_LOCK.locked()
+
+
+def test_dump_cleanup_with_btrfs_but_without_concurrency_skips_lock():
+    flexmock(module.borgmatic.hooks.dispatch).should_receive(
+        'call_hooks_even_if_unconfigured'
+    ).twice()
+
+    with module.Dump_cleanup(
+        config={'btrfs': {}},
+        borgmatic_runtime_directory=flexmock(),
+        patterns=flexmock(),
+        dry_run=flexmock(),
+    ):
+        assert not module.BTRFS_SNAPSHOT_LOCK.locked()
+
+
+def test_dump_cleanup_with_btrfs_and_concurrency_holds_lock_while_dumps_are_in_play():
+    flexmock(module.borgmatic.hooks.dispatch).should_receive(
+        'call_hooks_even_if_unconfigured'
+    ).twice()
+
+    with module.Dump_cleanup(
+        config={'btrfs': {}, 'repository_concurrency': 2},
+        borgmatic_runtime_directory=flexmock(),
+        patterns=flexmock(),
+        dry_run=flexmock(),
+    ):
+        assert module.BTRFS_SNAPSHOT_LOCK.locked()
+
+    assert not module.BTRFS_SNAPSHOT_LOCK.locked()
+
+
+def test_dump_cleanup_with_btrfs_and_error_removing_dumps_upon_entry_releases_lock():
+    flexmock(module.borgmatic.hooks.dispatch).should_receive(
+        'call_hooks_even_if_unconfigured'
+    ).and_raise(OSError).once()
+
+    with (
+        pytest.raises(OSError),
+        module.Dump_cleanup(
+            config={'btrfs': {}, 'repository_concurrency': 2},
+            borgmatic_runtime_directory=flexmock(),
+            patterns=flexmock(),
+            dry_run=flexmock(),
+        ),
     ):
         pass
+
+    assert not module.BTRFS_SNAPSHOT_LOCK.locked()
+
+
+def test_dump_cleanup_with_btrfs_and_error_removing_dumps_upon_exit_releases_lock():
+    flexmock(module.borgmatic.hooks.dispatch).should_receive(
+        'call_hooks_even_if_unconfigured'
+    ).and_return(None).and_raise(OSError)
+
+    with (
+        pytest.raises(OSError),
+        module.Dump_cleanup(
+            config={'btrfs': {}, 'repository_concurrency': 2},
+            borgmatic_runtime_directory=flexmock(),
+            patterns=flexmock(),
+            dry_run=flexmock(),
+        ),
+    ):
+        pass
+
+    assert not module.BTRFS_SNAPSHOT_LOCK.locked()
@@ -1,4 +1,5 @@
 import io
+import os
 import sys
 
 import pytest
@@ -35,6 +36,7 @@ def test_parse_pattern_with_invalid_pattern_line_errors():
 
 
 def test_collect_patterns_converts_source_directories():
+    flexmock(module).should_receive('make_pattern_cache').and_return(None)
     assert module.collect_patterns({'source_directories': ['/foo', '/bar']}, '/working') == (
         Pattern('/foo', source=Pattern_source.CONFIG),
         Pattern('/bar', source=Pattern_source.CONFIG),
@@ -42,6 +44,7 @@ def test_collect_patterns_converts_source_directories():
 
 
 def test_collect_patterns_parses_config_patterns():
+    flexmock(module).should_receive('make_pattern_cache').and_return(None)
     flexmock(module).should_receive('parse_pattern').with_args('R /foo').and_return(Pattern('/foo'))
     flexmock(module).should_receive('parse_pattern').with_args('# comment').never()
     flexmock(module).should_receive('parse_pattern').with_args('').never()
@@ -57,6 +60,7 @@ def test_collect_patterns_parses_config_patterns():
 
 
 def test_collect_patterns_converts_exclude_patterns():
+    flexmock(module).should_receive('make_pattern_cache').and_return(None)
     assert module.collect_patterns(
         {'exclude_patterns': ['/foo', '/bar', 'sh:**/baz']}, '/working'
     ) == (
@@ -82,11 +86,12 @@ def test_collect_patterns_converts_exclude_patterns():
 
 
 def test_collect_patterns_reads_config_patterns_from_file():
+    flexmock(module).should_receive('make_pattern_cache').and_return(None)
     flexmock(module).should_receive('expand_directory').with_args(
-        'file1.txt', '/working'
+        'file1.txt', '/working', None
     ).and_return(['file1.txt'])
     flexmock(module).should_receive('expand_directory').with_args(
-        'file2.txt', '/working'
+        'file2.txt', '/working', None
     ).and_return(['file2.txt'])
     builtins = flexmock(sys.modules['builtins'])
     builtins.should_receive('open').with_args('file1.txt', encoding='utf-8').and_return(
@@ -110,9 +115,10 @@ def test_collect_patterns_reads_config_patterns_from_file():
 
 
 def test_collect_patterns_errors_on_missing_config_patterns_from_file():
+    flexmock(module).should_receive('make_pattern_cache').and_return(None)
     builtins = flexmock(sys.modules['builtins'])
     flexmock(module).should_receive('expand_directory').with_args(
-        'file1.txt', '/working'
+        'file1.txt', '/working', None
     ).and_return(['file1.txt'])
     builtins.should_receive('open').with_args('file1.txt', encoding='utf-8').and_raise(
         FileNotFoundError
@@ -123,12 +129,42 @@ def test_collect_patterns_errors_on_missing_config_patterns_from_file():
         module.collect_patterns({'patterns_from': ['file1.txt', 'file2.txt']}, '/working')
 
 
+def test_collect_patterns_with_pattern_cache_reads_pattern_files_via_it_and_saves_it():
+    pattern_cache = flexmock()
+    flexmock(module).should_receive('make_pattern_cache').with_args(
+        {'patterns_from': ['file1.txt'], 'exclude_from': ['file2.txt']}, '/working'
+    ).and_return(pattern_cache)
+    flexmock(module).should_receive('expand_directory').with_args(
+        'file1.txt', '/working', pattern_cache
+    ).and_return(['file1.txt'])
+    flexmock(module).should_receive('expand_directory').with_args(
+        'file2.txt', '/working', pattern_cache
+    ).and_return(['file2.txt'])
+    flexmock(module).should_receive('read_pattern_file_lines').with_args(
+        'file1.txt', pattern_cache
+    ).and_return(['R /foo'])
+    flexmock(module).should_receive('read_pattern_file_lines').with_args(
+        'file2.txt', pattern_cache
+    ).and_return(['/bar'])
+    pattern_cache.should_receive('save').once()
+
+    assert module.collect_patterns(
+        {'patterns_from': ['file1.txt'], 'exclude_from': ['file2.txt']}, '/working'
+    ) == (
+        Pattern('/foo', source=Pattern_source.CONFIG),
+        Pattern(
+            '/bar', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH, source=Pattern_source.CONFIG
+        ),
+    )
+
+
 def test_collect_patterns_reads_config_exclude_from_file():
+    flexmock(module).should_receive('make_pattern_cache').and_return(None)
     flexmock(module).should_receive('expand_directory').with_args(
-        'file1.txt', '/working'
+        'file1.txt', '/working', None
     ).and_return(['file1.txt'])
     flexmock(module).should_receive('expand_directory').with_args(
-        'file2.txt', '/working'
+        'file2.txt', '/working', None
     ).and_return(['file2.txt'])
     builtins = flexmock(sys.modules['builtins'])
     builtins.should_receive('open').with_args('file1.txt', encoding='utf-8').and_return(
@@ -161,8 +197,9 @@ def test_collect_patterns_reads_config_exclude_from_file():
 
 
 def test_collect_patterns_errors_on_missing_config_exclude_from_file():
+    flexmock(module).should_receive('make_pattern_cache').and_return(None)
     flexmock(module).should_receive('expand_directory').with_args(
-        'file1.txt', '/working'
+        'file1.txt', '/working', None
     ).and_return(['file1.txt'])
     builtins = flexmock(sys.modules['builtins'])
     builtins.should_receive('open').with_args('file1.txt', encoding='utf-8').and_raise(OSError)
@@ -172,6 +209,340 @@ def test_collect_patterns_errors_on_missing_config_exclude_from_file():
         module.collect_patterns({'exclude_from': ['file1.txt', 'file2.txt']}, '/working')
 
 
+def test_read_pattern_file_lines_without_pattern_cache_reads_file():
+    builtins = flexmock(sys.modules['builtins'])
+    builtins.should_receive('open').with_args('file.txt', encoding='utf-8').and_return(
+        io.StringIO('R /foo\nR /bar\n')
+    )
+
+    assert module.read_pattern_file_lines('file.txt') == ['R /foo', 'R /bar']
+
+
+def test_read_pattern_file_lines_with_pattern_cache_reads_via_it():
+    builtins = flexmock(sys.modules['builtins'])
+    builtins.should_receive('open').never()
+    pattern_cache = flexmock()
+    pattern_cache.should_receive('read_lines').with_args('file.txt').and_return(['R /foo'])
+
+    assert module.read_pattern_file_lines('file.txt', pattern_cache) == ['R /foo']
+
+
+def test_make_pattern_cache_path_hashes_working_directory_and_pattern_options():
+    flexmock(module.borgmatic.config.paths).should_receive(
+        'get_borgmatic_state_directory'
+    ).and_return('/state')
+
+    path = module.make_pattern_cache_path({'source_directories': ['/foo']}, '/working')
+
+    assert path.startswith('/state/patterns/')
+    assert path.endswith('.json')
+    assert path == module.make_pattern_cache_path(
+        {'source_directories': ['/foo'], 'compression': 'lz4'}, '/working'
+    )
+    assert path != module.make_pattern_cache_path({'source_directories': ['/bar']}, '/working')
+    assert path != module.make_pattern_cache_path({'source_directories': ['/foo']}, '/other')
+
+
+def test_make_pattern_cache_returns_pattern_cache():
+    flexmock(module).should_receive('make_pattern_cache_path').and_return('/state/patterns/x.json')
+    pattern_cache = flexmock()
+    flexmock(module).should_receive('Pattern_cache').with_args('/state/patterns/x.json').and_return(
+        pattern_cache
+    )
+
+    assert module.make_pattern_cache({}, '/working') == pattern_cache
+
+
+def test_make_pattern_cache_with_cache_patterns_false_returns_none():
+    flexmock(module).should_receive('Pattern_cache').never()
+
+    assert module.make_pattern_cache({'cache_patterns': False}, '/working') is None
+
+
+def test_read_pattern_cache_returns_stored_dict(tmp_path):
+    path = tmp_path / 'cache.json'
+    path.write_text('{"globs": {}}')
+
+    assert module.read_pattern_cache(str(path)) == {'globs': {}}
+
+
+@pytest.mark.parametrize('contents', (None, 'not json', '[]'))
+def test_read_pattern_cache_with_missing_or_invalid_file_returns_empty_dict(tmp_path, contents):
+    path = tmp_path / 'cache.json'
+
+    if contents is not None:
+        path.write_text(contents)
+
+    assert module.read_pattern_cache(str(path)) == {}
+
+
+def test_write_pattern_cache_writes_file_atomically(tmp_path):
+    path = tmp_path / 'patterns' / 'cache.json'
+
+    module.write_pattern_cache(str(path), {'globs': {}})
+
+    assert module.read_pattern_cache(str(path)) == {'globs': {}}
+    assert os.listdir(tmp_path / 'patterns') == ['cache.json']
+
+
+def test_write_pattern_cache_with_error_removes_temporary_file(tmp_path):
+    path = tmp_path / 'patterns' / 'cache.json'
+    flexmock(module.os).should_receive('replace').and_raise(OSError)
+
+    module.write_pattern_cache(str(path), {'globs': {}})
+
+    assert os.listdir(tmp_path / 'patterns') == []
+
+
+def test_get_directory_times_returns_modification_and_change_times():
+    flexmock(module.os).should_receive('stat').with_args('/foo').and_return(
+        flexmock(st_mtime_ns=1, st_ctime_ns=2)
+    )
+
+    assert module.get_directory_times('/foo') == [1, 2]
+
+
+def test_get_directory_times_with_stat_error_returns_none():
+    flexmock(module.os).should_receive('stat').with_args('/foo').and_raise(FileNotFoundError)
+
+    assert module.get_directory_times('/foo') is None
+
+
+@pytest.mark.parametrize(
+    'path,expected_result',
+    (
+        ('/foo/*/bar', True),
+        ('/foo/b[ae]r', True),
+        ('/foo/bar', False),
+        ('foo/*', False),
+        ('/foo//*', False),
+        ('/foo/*/', False),
+    ),
+)
+def test_glob_cacheable_requires_absolute_path_with_globs(path, expected_result):
+    assert module.glob_cacheable(path) == expected_result
+
+
+def test_glob_with_directories_globs_one_component_at_a_time():
+    flexmock(module).should_receive('get_directory_times').replace_with(
+        lambda directory: [len(directory), 0]
+    )
+    flexmock(module.glob).should_receive('glob').with_args('/foo').and_return(['/foo'])
+    flexmock(module.glob).should_receive('glob').with_args('/foo/*').and_return(
+        ['/foo/bar', '/foo/baz', '/foo/file']
+    )
+    flexmock(module.os.path).should_receive('isdir').with_args('/foo').and_return(True)
+    flexmock(module.os.path).should_receive('isdir').with_args('/foo/bar').and_return(True)
+    flexmock(module.os.path).should_receive('isdir').with_args('/foo/baz').and_return(True)
+    flexmock(module.os.path).should_receive('isdir').with_args('/foo/file').and_return(False)
+    flexmock(module.glob).should_receive('glob').with_args('/foo/bar/data').and_return(
+        ['/foo/bar/data']
+    )
+    flexmock(module.glob).should_receive('glob').with_args('/foo/baz/data').and_return([])
+
+    assert module.glob_with_directories('/foo/*/data') == (
+        ['/foo/bar/data'],
+        {'/': [1, 0], '/foo': [4, 0], '/foo/bar': [8, 0], '/foo/baz': [8, 0]},
+    )
+
+
+def test_glob_with_directories_escapes_globs_in_matched_directory_names():
+    flexmock(module).should_receive('get_directory_times').and_return([1, 2])
+    flexmock(module.glob).should_receive('glob').with_args('/*').and_return(['/f[o]o'])
+    flexmock(module.glob).should_receive('glob').with_args('/f[[]o]o/bar').and_return(
+        ['/f[o]o/bar']
+    )
+    flexmock(module.os.path).should_receive('isdir').and_return(True)
+
+    assert module.glob_with_directories('/*/bar') == (
+        ['/f[o]o/bar'],
+        {'/': [1, 2], '/f[o]o': [1, 2]},
+    )
+
+
+def test_glob_with_directories_with_directory_stat_error_falls_back_to_glob():
+    flexmock(module).should_receive('get_directory_times').with_args('/').and_return([1, 2])
+    flexmock(module).should_receive('get_directory_times').with_args('/foo').and_return(None)
+    flexmock(module.glob).should_receive('glob').with_args('/foo').and_return(['/foo'])
+    flexmock(module.os.path).should_receive('isdir').and_return(True)
+    flexmock(module.glob).should_receive('glob').with_args('/foo/*').and_return(['/foo/bar'])
+
+    assert module.glob_with_directories('/foo/*') == (['/foo/bar'], None)
+
+
+def make_pattern_cache(cache):
+    flexmock(module).should_receive('read_pattern_cache').with_args('/cache.json').and_return(cache)
+    flexmock(module.time).should_receive('time_ns').and_return(10_000_000_000)
+
+    return module.Pattern_cache('/cache.json')
+
+
+def test_pattern_cache_loads_previous_cache():
+    pattern_cache = make_pattern_cache({'pattern_files': {'/a': []}, 'globs': {'/b*': []}})
+
+    assert pattern_cache.pattern_files == {'/a': []}
+    assert pattern_cache.globs == {'/b*': []}
+    assert not pattern_cache.changed
+
+
+def test_pattern_cache_with_empty_previous_cache_starts_empty():
+    pattern_cache = make_pattern_cache({})
+
+    assert pattern_cache.pattern_files == {}
+    assert pattern_cache.globs == {}
+
+
+@pytest.mark.parametrize(
+    'times,expected_result',
+    (
+        ((1, 1_000_000_000), False),
+        ((1, 9_000_000_000), True),
+    ),
+)
+def test_pattern_cache_changed_too_recently_compares_latest_time_against_start_time(
+    times, expected_result
+):
+    pattern_cache = make_pattern_cache({})
+
+    assert pattern_cache.changed_too_recently(times) == expected_result
+
+
+def make_status(mtime_ns=1, ctime_ns=2, size=3, ino=4):
+    return flexmock(st_mtime_ns=mtime_ns, st_ctime_ns=ctime_ns, st_size=size, st_ino=ino)
+
+
+def test_pattern_cache_read_lines_with_unchanged_file_returns_cached_lines():
+    pattern_cache = make_pattern_cache({'pattern_files': {'/foo.txt': [1, 2, 3, 4, ['R /foo']]}})
+    flexmock(module.os).should_receive('stat').with_args('/foo.txt').and_return(make_status())
+    builtins = flexmock(sys.modules['builtins'])
+    builtins.should_receive('open').never()
+
+    assert pattern_cache.read_lines('/foo.txt') == ['R /foo']
+    assert not pattern_cache.changed
+
+
+def test_pattern_cache_read_lines_with_changed_file_reads_and_caches_lines():
+    pattern_cache = make_pattern_cache({'pattern_files': {'/foo.txt': [1, 2, 3, 4, ['R /foo']]}})
+    flexmock(module.os).should_receive('stat').with_args('/foo.txt').and_return(make_status(size=5))
+    builtins = flexmock(sys.modules['builtins'])
+    builtins.should_receive('open').with_args('/foo.txt', encoding='utf-8').and_return(
+        io.StringIO('R /foo\nR /bar')
+    )
+
+    assert pattern_cache.read_lines('/foo.txt') == ['R /foo', 'R /bar']
+    assert pattern_cache.pattern_files == {'/foo.txt': [1, 2, 5, 4, ['R /foo', 'R /bar']]}
+    assert pattern_cache.changed
+
+
+def test_pattern_cache_read_lines_with_recently_changed_file_does_not_cache_lines():
+    pattern_cache = make_pattern_cache({})
+    flexmock(module.os).should_receive('stat').with_args('/foo.txt').and_return(
+        make_status(mtime_ns=9_000_000_000)
+    )
+    builtins = flexmock(sys.modules['builtins'])
+    builtins.should_receive('open').with_args('/foo.txt', encoding='utf-8').and_return(
+        io.StringIO('R /foo')
+    )
+
+    assert pattern_cache.read_lines('/foo.txt') == ['R /foo']
+    assert pattern_cache.pattern_files == {}
+    assert not pattern_cache.changed
+
+
+def test_pattern_cache_read_lines_with_missing_file_raises():
+    pattern_cache = make_pattern_cache({})
+    flexmock(module.os).should_receive('stat').with_args('/foo.txt').and_raise(FileNotFoundError)
+
+    with pytest.raises(FileNotFoundError):
+        pattern_cache.read_lines('/foo.txt')
+
+
+def test_pattern_cache_glob_with_uncacheable_path_globs_directly():
+    pattern_cache = make_pattern_cache({})
+    flexmock(module).should_receive('glob_cacheable').and_return(False)
+    flexmock(module.glob).should_receive('glob').with_args('foo*').and_return(['food'])
+    flexmock(module).should_receive('glob_with_directories').never()
+
+    assert pattern_cache.glob('foo*') == ['food']
+    assert not pattern_cache.changed
+
+
+def test_pattern_cache_glob_with_unchanged_directories_returns_cached_paths():
+    pattern_cache = make_pattern_cache({'globs': {'/foo/*': [['/foo/bar'], {'/foo': [1, 2]}]}})
+    flexmock(module).should_receive('get_directory_times').with_args('/foo').and_return([1, 2])
+    flexmock(module).should_receive('glob_with_directories').never()
+
+    assert pattern_cache.glob('/foo/*') == ['/foo/bar']
+    assert not pattern_cache.changed
+
+
+def test_pattern_cache_glob_with_changed_directory_globs_and_caches_paths():
+    pattern_cache = make_pattern_cache({'globs': {'/foo/*': [['/foo/bar'], {'/foo': [1, 2]}]}})
+    flexmock(module).should_receive('get_directory_times').with_args('/foo').and_return([3, 4])
+    flexmock(module).should_receive('glob_with_directories').with_args('/foo/*').and_return(
+        (['/foo/bar', '/foo/baz'], {'/foo': [3, 4]})
+    )
+
+    assert pattern_cache.glob('/foo/*') == ['/foo/bar', '/foo/baz']
+    assert pattern_cache.globs == {'/foo/*': [['/foo/bar', '/foo/baz'], {'/foo': [3, 4]}]}
+    assert pattern_cache.changed
+
+
+def test_pattern_cache_glob_with_recently_changed_directory_drops_cached_paths():
+    pattern_cache = make_pattern_cache({'globs': {'/foo/*': [['/foo/bar'], {'/foo': [1, 2]}]}})
+    flexmock(module).should_receive('get_directory_times').with_args('/foo').and_return(
+        [9_000_000_000, 2]
+    )
+    flexmock(module).should_receive('glob_with_directories').with_args('/foo/*').and_return(
+        (['/foo/bar', '/foo/baz'], {'/foo': [9_000_000_000, 2]})
+    )
+
+    assert pattern_cache.glob('/foo/*') == ['/foo/bar', '/foo/baz']
+    assert pattern_cache.globs == {}
+    assert pattern_cache.changed
+
+
+def test_pattern_cache_glob_with_unstattable_directory_does_not_cache_paths():
+    pattern_cache = make_pattern_cache({})
+    flexmock(module).should_receive('glob_with_directories').with_args('/foo/*').and_return(
+        (['/foo/bar'], None)
+    )
+
+    assert pattern_cache.glob('/foo/*') == ['/foo/bar']
+    assert pattern_cache.globs == {}
+    assert not pattern_cache.changed
+
+
+def test_pattern_cache_save_writes_changed_cache():
+    pattern_cache = make_pattern_cache({'pattern_files': {'/a': []}})
+    pattern_cache.changed = True
+    flexmock(module).should_receive('write_pattern_cache').with_args(
+        '/cache.json', {'pattern_files': {'/a': []}, 'globs': {}}
+    ).once()
+
+    pattern_cache.save()
+
+    assert not pattern_cache.changed
+
+
+def test_pattern_cache_save_with_unchanged_cache_does_not_write():
+    pattern_cache = make_pattern_cache({'pattern_files': {'/a': []}})
+    flexmock(module).should_receive('write_pattern_cache').never()
+
+    pattern_cache.save()
+
+
+def test_expand_directory_with_pattern_cache_globs_via_it():
+    flexmock(module.os.path).should_receive('expanduser').and_return('/foo*')
+    flexmock(module.glob).should_receive('glob').never()
+    pattern_cache = flexmock()
+    pattern_cache.should_receive('glob').with_args('/foo*').and_return(['/foo', '/food'])
+
+    paths = module.expand_directory('/foo*', None, pattern_cache)
+
+    assert paths == ['/foo', '/food']
+
+
 def test_expand_directory_with_basic_path_passes_it_through():
     flexmock(module.os.path).should_receive('expanduser').and_return('foo')
     flexmock(module.glob).should_receive('glob').and_return([])
@@ -233,10 +604,10 @@ def test_expand_directory_with_working_directory_matching_start_of_directory_doe
 
 
 def test_expand_patterns_flattens_expanded_directories():
-    flexmock(module).should_receive('expand_directory').with_args('~/foo', None).and_return(
+    flexmock(module).should_receive('expand_directory').with_args('~/foo', None, None).and_return(
         ['/root/foo'],
     )
-    flexmock(module).should_receive('expand_directory').with_args('bar*', None).and_return(
+    flexmock(module).should_receive('expand_directory').with_args('bar*', None, None).and_return(
         ['bar', 'barf'],
     )
 
@@ -246,7 +617,9 @@ def test_expand_patterns_flattens_expanded_directories():
 
 
 def test_expand_patterns_with_working_directory_passes_it_through():
-    flexmock(module).should_receive('expand_directory').with_args('foo', '/working/dir').and_return(
+    flexmock(module).should_receive('expand_directory').with_args(
+        'foo', '/working/dir', None
+    ).and_return(
         ['/working/dir/foo'],
     )
 
@@ -256,14 +629,27 @@ def test_expand_patterns_with_working_directory_passes_it_through():
 
 
 def test_expand_patterns_does_not_expand_skip_paths():
-    flexmock(module).should_receive('expand_directory').with_args('/foo', None).and_return(['/foo'])
-    flexmock(module).should_receive('expand_directory').with_args('/bar*', None).never()
+    flexmock(module).should_receive('expand_directory').with_args('/foo', None, None).and_return(
+        ['/foo']
+    )
+    flexmock(module).should_receive('expand_directory').with_args('/bar*', None, None).never()
 
     patterns = module.expand_patterns((Pattern('/foo'), Pattern('/bar*')), skip_paths=('/bar*',))
 
     assert patterns == (Pattern('/foo'), Pattern('/bar*'))
 
 
+def test_expand_patterns_passes_through_pattern_cache():
+    pattern_cache = flexmock()
+    flexmock(module).should_receive('expand_directory').with_args(
+        '/foo*', None, pattern_cache
+    ).and_return(['/food'])
+
+    patterns = module.expand_patterns((Pattern('/foo*'),), pattern_cache=pattern_cache)
+
+    assert patterns == (Pattern('/food'),)
+
+
 def test_expand_patterns_considers_none_as_no_patterns():
     assert module.expand_patterns(None) == ()
 
@@ -288,46 +674,74 @@ def test_expand_patterns_expands_only_tildes_in_non_root_patterns():
     assert paths == (Pattern('/root/bar/*', Pattern_type.INCLUDE),)
 
 
-def test_get_existent_path_or_parent_passes_through_existent_path():
-    flexmock(module.os.path).should_receive('exists').and_return(True)
+def test_get_path_device_returns_device_of_existent_path():
+    flexmock(module.os).should_receive('stat').with_args('/foo/bar/baz').and_return(
+        flexmock(st_dev=55)
+    )
+    devices = {}
+
+    assert module.get_path_device('/foo/bar/baz', devices) == 55
+    assert devices == {'/foo/bar/baz': 55}
+
+
+def test_get_path_device_with_non_existent_path_returns_none():
+    flexmock(module.os).should_receive('stat').and_raise(FileNotFoundError)
+    devices = {}
+
+    assert module.get_path_device('/foo/bar/baz', devices) is None
+    assert devices == {'/foo/bar/baz': None, '/foo/bar': None, '/foo': None, '/': None}
+
 
-    assert module.get_existent_path_or_parent('/foo/bar/baz') == '/foo/bar/baz'
+def test_get_path_device_with_non_existent_path_returns_device_of_existent_parent():
+    flexmock(module.os).should_receive('stat').with_args('/foo/bar/baz*').and_raise(
+        FileNotFoundError
+    )
+    flexmock(module.os).should_receive('stat').with_args('/foo/bar').and_return(flexmock(st_dev=55))
+    flexmock(module.os).should_receive('stat').with_args('/foo').never()
+    flexmock(module.os).should_receive('stat').with_args('/').never()
+    devices = {}
 
+    assert module.get_path_device('/foo/bar/baz*', devices) == 55
+    assert devices == {'/foo/bar/baz*': 55, '/foo/bar': 55}
 
-def test_get_existent_path_or_parent_with_non_existent_path_returns_none():
-    flexmock(module.os.path).should_receive('exists').and_return(False)
 
-    assert module.get_existent_path_or_parent('/foo/bar/baz') is None
+def test_get_path_device_with_non_existent_path_returns_device_of_existent_grandparent():
+    flexmock(module.os).should_receive('stat').with_args('/foo/bar/baz*').and_raise(
+        FileNotFoundError
+    )
+    flexmock(module.os).should_receive('stat').with_args('/foo/bar').and_raise(ValueError)
+    flexmock(module.os).should_receive('stat').with_args('/foo').and_return(flexmock(st_dev=55))
+    flexmock(module.os).should_receive('stat').with_args('/').never()
+
+    assert module.get_path_device('/foo/bar/baz*', {}) == 55
 
 
-def test_get_existent_path_or_parent_with_non_existent_path_returns_existent_parent():
-    flexmock(module.os.path).should_receive('exists').with_args('/foo/bar/baz*').and_return(False)
-    flexmock(module.os.path).should_receive('exists').with_args('/foo/bar').and_return(True)
-    flexmock(module.os.path).should_receive('exists').with_args('/foo').never()
-    flexmock(module.os.path).should_receive('exists').with_args('/').never()
+def test_get_path_device_with_parent_already_looked_up_uses_recorded_device():
+    flexmock(module.os).should_receive('stat').with_args('/foo/bar/baz*').and_raise(
+        FileNotFoundError
+    )
+    flexmock(module.os).should_receive('stat').with_args('/foo/bar').never()
+    devices = {'/foo/bar': 55}
 
-    assert module.get_existent_path_or_parent('/foo/bar/baz*') == '/foo/bar'
+    assert module.get_path_device('/foo/bar/baz*', devices) == 55
+    assert devices == {'/foo/bar/baz*': 55, '/foo/bar': 55}
 
 
-def test_get_existent_path_or_parent_with_non_existent_path_returns_existent_grandparent():
-    flexmock(module.os.path).should_receive('exists').with_args('/foo/bar/baz*').and_return(False)
-    flexmock(module.os.path).should_receive('exists').with_args('/foo/bar').and_return(False)
-    flexmock(module.os.path).should_receive('exists').with_args('/foo').and_return(True)
-    flexmock(module.os.path).should_receive('exists').with_args('/').never()
+def test_get_path_device_with_path_already_looked_up_does_not_stat():
+    flexmock(module.os).should_receive('stat').never()
 
-    assert module.get_existent_path_or_parent('/foo/bar/baz*') == '/foo'
+    assert module.get_path_device('/foo', {'/foo': None}) is None
 
 
-def test_get_existent_path_or_parent_with_end_to_end_test_prefix_returns_none():
-    flexmock(module.os.path).should_receive('exists').never()
+def test_get_path_device_with_end_to_end_test_prefix_returns_none():
+    flexmock(module.os).should_receive('stat').never()
 
-    assert module.get_existent_path_or_parent('/e2e/foo/bar/baz') is None
+    assert module.get_path_device('/e2e/foo/bar/baz', {}) is None
 
 
 def test_device_map_patterns_gives_device_id_per_path():
-    flexmock(module).should_receive('get_existent_path_or_parent').replace_with(lambda path: path)
-    flexmock(module.os).should_receive('stat').with_args('/foo').and_return(flexmock(st_dev=55))
-    flexmock(module.os).should_receive('stat').with_args('/bar').and_return(flexmock(st_dev=66))
+    flexmock(module).should_receive('get_path_device').with_args('/foo', dict).and_return(55)
+    flexmock(module).should_receive('get_path_device').with_args('/bar', dict).and_return(66)
 
     device_map = module.device_map_patterns(
         (
@@ -348,14 +762,8 @@ def test_device_map_patterns_gives_device_id_per_path():
 
 
 def test_device_map_patterns_with_missing_path_does_not_error():
-    flexmock(module).should_receive('get_existent_path_or_parent').with_args('/foo').and_return(
-        '/foo',
-    )
-    flexmock(module).should_receive('get_existent_path_or_parent').with_args('/bar').and_return(
-        None,
-    )
-    flexmock(module.os).should_receive('stat').with_args('/foo').and_return(flexmock(st_dev=55))
-    flexmock(module.os).should_receive('stat').with_args('/bar').never()
+    flexmock(module).should_receive('get_path_device').with_args('/foo', dict).and_return(55)
+    flexmock(module).should_receive('get_path_device').with_args('/bar', dict).and_return(None)
 
     device_map = module.device_map_patterns((Pattern('/foo'), Pattern('/bar')))
 
@@ -366,11 +774,10 @@ def test_device_map_patterns_with_missing_path_does_not_error():
 
 
 def test_device_map_patterns_uses_working_directory_to_construct_path():
-    flexmock(module).should_receive('get_existent_path_or_parent').replace_with(lambda path: path)
-    flexmock(module.os).should_receive('stat').with_args('/foo').and_return(flexmock(st_dev=55))
-    flexmock(module.os).should_receive('stat').with_args('/working/dir/bar').and_return(
-        flexmock(st_dev=66),
-    )
+    flexmock(module).should_receive('get_path_device').with_args('/foo', dict).and_return(55)
+    flexmock(module).should_receive('get_path_device').with_args(
+        '/working/dir/bar', dict
+    ).and_return(66)
 
     device_map = module.device_map_patterns(
         (Pattern('/foo'), Pattern('bar')),
@@ -384,9 +791,8 @@ def test_device_map_patterns_uses_working_directory_to_construct_path():
 
 
 def test_device_map_patterns_with_existing_device_id_does_not_overwrite_it():
-    flexmock(module).should_receive('get_existent_path_or_parent').replace_with(lambda path: path)
-    flexmock(module.os).should_receive('stat').with_args('/foo').and_return(flexmock(st_dev=55))
-    flexmock(module.os).should_receive('stat').with_args('/bar').and_return(flexmock(st_dev=100))
+    flexmock(module).should_receive('get_path_device').with_args('/foo', dict).and_return(55)
+    flexmock(module).should_receive('get_path_device').with_args('/bar', dict).never()
 
     device_map = module.device_map_patterns((Pattern('/foo'), Pattern('/bar', device=66)))
 
@@ -396,6 +802,22 @@ def test_device_map_patterns_with_existing_device_id_does_not_overwrite_it():
     )
 
 
+def test_device_map_patterns_shares_looked_up_devices_across_patterns():
+    looked_up_devices = []
+
+    def get_path_device(path, devices):
+        looked_up_devices.append(devices)
+
+        return 55
+
+    flexmock(module).should_receive('get_path_device').replace_with(get_path_device)
+
+    module.device_map_patterns((Pattern('/foo'), Pattern('/bar')))
+
+    assert len(looked_up_devices) == 2
+    assert looked_up_devices[0] is looked_up_devices[1]
+
+
 @pytest.mark.parametrize(
     'patterns,borgmatic_runtime_directory,expected_patterns,one_file_system',
     (
@@ -687,6 +1109,32 @@ def test_device_map_patterns_with_existing_device_id_does_not_overwrite_it():
             (Pattern('/root', Pattern_type.INCLUDE, device=1), Pattern('/', device=1)),
             True,
         ),
+        # A child pattern with an unknown device doesn't get deduplicated.
+        (
+            (Pattern('/', device=1), Pattern('/root')),
+            '/root',
+            (Pattern('/', device=1), Pattern('/root')),
+            False,
+        ),
+        # With multiple patterns at the same parent path, any of them on the same device will do.
+        (
+            (Pattern('/', device=2), Pattern('/', device=1), Pattern('/root/foo', device=1)),
+            '/root/foo',
+            (Pattern('/', device=2), Pattern('/', device=1)),
+            True,
+        ),
+        (
+            (Pattern('/', device=1), Pattern('/root', device=1), Pattern('/root/foo', device=1)),
+            '/root/foo/bar',
+            (Pattern('/', device=1),),
+            False,
+        ),
+        (
+            (Pattern('root', device=1), Pattern('root/foo', device=1)),
+            '/root/foo',
+            (Pattern('root', device=1), Pattern('root/foo', device=1)),
+            False,
+        ),
     ),
 )
 def test_deduplicate_runtime_directory_patterns_omits_child_paths_based_on_device_and_one_file_system(
@@ -704,6 +1152,7 @@ def test_deduplicate_runtime_directory_patterns_omits_child_paths_based_on_devic
 
 
 def test_process_patterns_includes_patterns():
+    flexmock(module).should_receive('make_pattern_cache').and_return(None)
     flexmock(module).should_receive('deduplicate_runtime_directory_patterns').and_return(
         (Pattern('foo'), Pattern('bar')),
     )
@@ -712,6 +1161,7 @@ def test_process_patterns_includes_patterns():
         (Pattern('foo'), Pattern('bar')),
         working_directory='/working',
         skip_paths=set(),
+        pattern_cache=None,
     ).and_return(()).once()
 
     assert module.process_patterns(
@@ -722,6 +1172,7 @@ def test_process_patterns_includes_patterns():
 
 
 def test_process_patterns_skips_expand_for_requested_paths():
+    flexmock(module).should_receive('make_pattern_cache').and_return(None)
     skip_paths = {flexmock()}
     flexmock(module).should_receive('deduplicate_runtime_directory_patterns').and_return(
         (Pattern('foo'), Pattern('bar')),
@@ -731,6 +1182,7 @@ def test_process_patterns_skips_expand_for_requested_paths():
         (Pattern('foo'), Pattern('bar')),
         working_directory='/working',
         skip_paths=skip_paths,
+        pattern_cache=None,
     ).and_return(()).once()
 
     assert module.process_patterns(
@@ -739,3 +1191,27 @@ def test_process_patterns_skips_expand_for_requested_paths():
         working_directory='/working',
         skip_expand_paths=skip_paths,
     ) == [Pattern('foo'), Pattern('bar')]
+
+
+def test_process_patterns_with_pattern_cache_expands_via_it_and_saves_it():
+    pattern_cache = flexmock()
+    flexmock(module).should_receive('make_pattern_cache').with_args({}, '/working').and_return(
+        pattern_cache
+    )
+    flexmock(module).should_receive('deduplicate_runtime_directory_patterns').and_return(
+        (Pattern('foo'),),
+    )
+    flexmock(module).should_receive('device_map_patterns').and_return({})
+    flexmock(module).should_receive('expand_patterns').with_args(
+        (Pattern('foo'),),
+        working_directory='/working',
+        skip_paths=set(),
+        pattern_cache=pattern_cache,
+    ).and_return(()).once()
+    pattern_cache.should_receive('save').once()
+
+    assert module.process_patterns(
+        (Pattern('foo'),),
+        config={},
+        working_directory='/working',
+    ) == [Pattern('foo')]
@@ -85,7 +85,7 @@ def test_validate_planned_backup_paths_parses_borg_dry_run_file_list():
         module.validate_planned_backup_paths(
             dry_run=False,
             create_command=('borg', 'create'),
-            config={},
+            config={'validate_paths_with_borg': True},
             patterns=(
                 module.borgmatic.borg.pattern.Pattern('/foo'),
                 module.borgmatic.borg.pattern.Pattern('/bar'),
@@ -124,7 +124,7 @@ def test_validate_planned_backup_paths_skips_borgmatic_runtime_directory():
         module.validate_planned_backup_paths(
             dry_run=False,
             create_command=('borg', 'create'),
-            config={},
+            config={'validate_paths_with_borg': True},
             patterns=(
                 module.borgmatic.borg.pattern.Pattern('/foo'),
                 module.borgmatic.borg.pattern.Pattern(
@@ -166,7 +166,7 @@ def test_validate_planned_backup_paths_with_borgmatic_runtime_directory_missing_
         module.validate_planned_backup_paths(
             dry_run=False,
             create_command=('borg', 'create'),
-            config={},
+            config={'validate_paths_with_borg': True},
             patterns=(
                 module.borgmatic.borg.pattern.Pattern('/foo'),
                 module.borgmatic.borg.pattern.Pattern(
@@ -211,7 +211,7 @@ def test_validate_planned_backup_paths_with_borgmatic_runtime_directory_partiall
         module.validate_planned_backup_paths(
             dry_run=False,
             create_command=('borg', 'create'),
-            config={},
+            config={'validate_paths_with_borg': True},
             patterns=(
                 module.borgmatic.borg.pattern.Pattern('/foo'),
                 module.borgmatic.borg.pattern.Pattern(
@@ -256,7 +256,7 @@ def test_validate_planned_backup_paths_with_borgmatic_runtime_directory_with_cor
         module.validate_planned_backup_paths(
             dry_run=False,
             create_command=('borg', 'create'),
-            config={},
+            config={'validate_paths_with_borg': True},
             patterns=(
                 module.borgmatic.borg.pattern.Pattern('/foo'),
                 module.borgmatic.borg.pattern.Pattern(
@@ -299,7 +299,7 @@ def test_validate_planned_backup_paths_with_borgmatic_runtime_directory_missing_
         module.validate_planned_backup_paths(
             dry_run=False,
             create_command=('borg', 'create'),
-            config={},
+            config={'validate_paths_with_borg': True},
             patterns=(
                 module.borgmatic.borg.pattern.Pattern('/foo'),
                 module.borgmatic.borg.pattern.Pattern('/baz'),
@@ -337,7 +337,7 @@ def test_validate_planned_backup_paths_with_dry_run_and_borgmatic_runtime_direct
         module.validate_planned_backup_paths(
             dry_run=True,
             create_command=('borg', 'create'),
-            config={},
+            config={'validate_paths_with_borg': True},
             patterns=(
                 module.borgmatic.borg.pattern.Pattern('/foo'),
                 module.borgmatic.borg.pattern.Pattern(
@@ -357,6 +357,28 @@ DEFAULT_ARCHIVE_NAME = '{hostname}-{now:%Y-%m-%dT%H:%M:%S.%f}'
 REPO_ARCHIVE = (f'repo::{DEFAULT_ARCHIVE_NAME}',)
 
 
+def test_make_create_positional_arguments_appends_archive_suffix_to_archive_name_format():
+    flexmock(module.flags).should_receive('make_repository_archive_flags').with_args(
+        'repo', 'archive-{now}.checkpoint', '1.2.3'
+    ).and_return(REPO_ARCHIVE)
+
+    assert (
+        module.make_create_positional_arguments(
+            'repo', {'archive_name_format': 'archive-{now}'}, '1.2.3', '.checkpoint'
+        )
+        == REPO_ARCHIVE
+    )
+
+
+def test_make_create_positional_arguments_defaults_archive_name_format():
+    flexmock(module.flags).should_receive('get_default_archive_name_format').and_return('{default}')
+    flexmock(module.flags).should_receive('make_repository_archive_flags').with_args(
+        'repo', '{default}', '1.2.3'
+    ).and_return(REPO_ARCHIVE)
+
+    assert module.make_create_positional_arguments('repo', {}, '1.2.3') == REPO_ARCHIVE
+
+
 def test_make_base_create_command_checks_root_patterns_exist_and_produces_borg_command():
     flexmock(module.borgmatic.borg.pattern).should_receive('check_all_root_patterns_exist').once()
     flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(None)
@@ -829,7 +851,7 @@ def test_make_base_create_command_with_stream_processes_ignores_read_special_fal
             Pattern(
                 '/dev/null',
                 Pattern_type.NO_RECURSE,
-                Pattern_style.FNMATCH,
+                Pattern_style.PATH_FULL_MATCH,
                 source=Pattern_source.INTERNAL,
             ),
         ),
@@ -889,7 +911,7 @@ def test_make_base_create_command_without_patterns_and_with_stream_processes_ign
             Pattern(
                 '/dev/null',
                 Pattern_type.NO_RECURSE,
-                Pattern_style.FNMATCH,
+                Pattern_style.PATH_FULL_MATCH,
                 source=Pattern_source.INTERNAL,
             ),
         ),
@@ -1317,6 +1339,42 @@ def test_create_archive_calls_borg_with_environment():
     )
 
 
+def test_create_archive_with_base_create_flags_uses_them_instead_of_making_base_create_command():
+    flexmock(module.borgmatic.logger).should_receive('add_custom_log_levels')
+    flexmock(module.logging).ANSWER = module.borgmatic.logger.ANSWER
+    flexmock(module).should_receive('make_base_create_command').never()
+    flexmock(module).should_receive('make_create_positional_arguments').with_args(
+        'repo', object, '1.2.3', ''
+    ).and_return(REPO_ARCHIVE)
+    flexmock(module.environment).should_receive('make_environment')
+    flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(None)
+    flexmock(module).should_receive('execute_command').with_args(
+        ('borg', 'create', '--patterns-from', 'patterns', *REPO_ARCHIVE),
+        output_log_level=logging.INFO,
+        output_file=None,
+        borg_local_path='borg',
+        borg_exit_codes=None,
+        working_directory=None,
+        environment=None,
+    ).once()
+    insert_logging_mock(logging.WARNING)
+
+    module.create_archive(
+        dry_run=False,
+        repository_path='repo',
+        config={
+            'source_directories': ['foo', 'bar'],
+            'repositories': ['repo'],
+            'exclude_patterns': None,
+        },
+        patterns=[Pattern('foo'), Pattern('bar')],
+        local_borg_version='1.2.3',
+        global_arguments=flexmock(),
+        borgmatic_runtime_directory='/borgmatic/run',
+        base_create_flags=('borg', 'create', '--patterns-from', 'patterns'),
+    )
+
+
 def test_create_archive_with_log_info_calls_borg_with_info_flag():
     flexmock(module.borgmatic.logger).should_receive('add_custom_log_levels')
     flexmock(module.logging).ANSWER = module.borgmatic.logger.ANSWER
@@ -2000,7 +2058,7 @@ def test_validate_planned_backup_paths_returns_special_files():
     assert module.validate_planned_backup_paths(
         dry_run=False,
         create_command=('borg', 'create'),
-        config={},
+        config={'validate_paths_with_borg': True},
         patterns=(
             module.borgmatic.borg.pattern.Pattern('/dev/foo'),
             module.borgmatic.borg.pattern.Pattern(
@@ -2039,7 +2097,7 @@ def test_validate_planned_backup_paths_without_find_special_files_ignores_specia
         module.validate_planned_backup_paths(
             dry_run=False,
             create_command=('borg', 'create'),
-            config={},
+            config={'validate_paths_with_borg': True},
             patterns=(
                 module.borgmatic.borg.pattern.Pattern('/dev/foo'),
                 module.borgmatic.borg.pattern.Pattern(
@@ -2054,3 +2112,195 @@ def test_validate_planned_backup_paths_without_find_special_files_ignores_specia
         )
         == ()
     )
+
+
+def test_validate_planned_backup_paths_without_borg_walks_runtime_directory_root_patterns_only():
+    flexmock(module).should_receive('execute_command_and_capture_output').never()
+    flexmock(module.os.path).should_receive('exists').and_return(True)
+    flexmock(module.borgmatic.borg.plan).should_receive('get_planned_paths').with_args(
+        tuple,
+        {'validate_paths_with_borg': False},
+        None,
+        root_paths={'/run/borgmatic/bar'},
+    ).and_return(
+        iter(
+            (
+                ('/run/borgmatic/bar', False, False),
+                ('/run/borgmatic/bar/baz', False, False),
+                ('/run/borgmatic/bar/quux', False, False),
+            )
+        )
+    ).once()
+    flexmock(module).should_receive('special_file').never()
+    flexmock(module.logger).should_receive('warning').never()
+
+    assert (
+        module.validate_planned_backup_paths(
+            dry_run=False,
+            create_command=('borg', 'create'),
+            config={'validate_paths_with_borg': False},
+            patterns=(
+                module.borgmatic.borg.pattern.Pattern('/foo'),
+                module.borgmatic.borg.pattern.Pattern(
+                    '/run/borgmatic/bar', module.borgmatic.borg.pattern.Pattern_type.ROOT
+                ),
+            ),
+            local_path=None,
+            working_directory=None,
+            borgmatic_runtime_directory='/run/borgmatic',
+        )
+        == ()
+    )
+
+
+def test_validate_planned_backup_paths_without_borg_and_with_runtime_directory_missing_from_planned_paths_warns():
+    flexmock(module).should_receive('execute_command_and_capture_output').never()
+    flexmock(module.os.path).should_receive('exists').and_return(True)
+    flexmock(module.borgmatic.borg.plan).should_receive('get_planned_paths').and_return(iter(()))
+    flexmock(module.logger).should_receive('warning').once()
+
+    assert (
+        module.validate_planned_backup_paths(
+            dry_run=False,
+            create_command=('borg', 'create'),
+            config={'validate_paths_with_borg': False},
+            patterns=(
+                module.borgmatic.borg.pattern.Pattern('/foo'),
+                module.borgmatic.borg.pattern.Pattern(
+                    '/run/borgmatic/bar', module.borgmatic.borg.pattern.Pattern_type.ROOT
+                ),
+            ),
+            local_path=None,
+            working_directory=None,
+            borgmatic_runtime_directory='/run/borgmatic',
+        )
+        == ()
+    )
+
+
+def test_validate_planned_backup_paths_without_borg_returns_special_files_from_planned_paths():
+    flexmock(module).should_receive('execute_command_and_capture_output').never()
+    flexmock(module.os.path).should_receive('exists').and_return(True)
+    flexmock(module.borgmatic.borg.plan).should_receive('make_special_file_index_path').and_return(
+        '/state/index.json'
+    )
+    special_file_index = flexmock()
+    flexmock(module.borgmatic.borg.plan).should_receive('Special_file_index').with_args(
+        '/state/index.json'
+    ).and_return(special_file_index)
+    special_file_index.should_receive('save').once()
+    flexmock(module.borgmatic.borg.plan).should_receive('get_planned_paths').with_args(
+        tuple,
+        {'validate_paths_with_borg': False},
+        None,
+        root_paths={'/run/borgmatic/bar'},
+    ).and_return(iter((('/run/borgmatic/bar/dump', False, False),)))
+    flexmock(module.borgmatic.borg.plan).should_receive('get_planned_paths').with_args(
+        tuple,
+        {'validate_paths_with_borg': False},
+        None,
+        special_file_index=special_file_index,
+    ).and_return(
+        iter(
+            (
+                ('/dev', False, False),
+                ('/dev/foo', True, False),
+                ('/run/borgmatic/bar', False, False),
+                ('/run/borgmatic/bar/pipe', True, False),
+                ('/dev/baz', True, False),
+                ('/quux', False, False),
+            )
+        )
+    )
+    flexmock(module).should_receive('special_file').never()
+    flexmock(module.logger).should_receive('warning').never()
+
+    assert module.validate_planned_backup_paths(
+        dry_run=False,
+        create_command=('borg', 'create'),
+        config={'validate_paths_with_borg': False},
+        patterns=(
+            module.borgmatic.borg.pattern.Pattern('/dev'),
+            module.borgmatic.borg.pattern.Pattern(
+                '/run/borgmatic/bar', module.borgmatic.borg.pattern.Pattern_type.ROOT
+            ),
+            module.borgmatic.borg.pattern.Pattern('/quux'),
+        ),
+        local_path=None,
+        working_directory=None,
+        borgmatic_runtime_directory='/run/borgmatic',
+        find_special_files=True,
+    ) == ('/dev/foo', '/dev/baz')
+
+
+def test_validate_planned_backup_paths_without_borg_and_with_special_file_cache_disabled_skips_index():
+    flexmock(module).should_receive('execute_command_and_capture_output').never()
+    flexmock(module.os.path).should_receive('exists').and_return(True)
+    flexmock(module.borgmatic.borg.plan).should_receive('Special_file_index').never()
+    flexmock(module.borgmatic.borg.plan).should_receive('get_planned_paths').with_args(
+        tuple,
+        {'validate_paths_with_borg': False, 'cache_special_files': False},
+        None,
+        root_paths={'/run/borgmatic/bar'},
+    ).and_return(iter((('/run/borgmatic/bar/dump', False, False),)))
+    flexmock(module.borgmatic.borg.plan).should_receive('get_planned_paths').with_args(
+        tuple,
+        {'validate_paths_with_borg': False, 'cache_special_files': False},
+        None,
+        special_file_index=None,
+    ).and_return(
+        iter(
+            (
+                ('/dev', False, False),
+                ('/dev/foo', True, False),
+                ('/run/borgmatic/bar', False, False),
+                ('/run/borgmatic/bar/pipe', True, False),
+                ('/dev/baz', True, False),
+                ('/quux', False, False),
+            )
+        )
+    )
+    flexmock(module).should_receive('special_file').never()
+    flexmock(module.logger).should_receive('warning').never()
+
+    assert module.validate_planned_backup_paths(
+        dry_run=False,
+        create_command=('borg', 'create'),
+        config={'validate_paths_with_borg': False, 'cache_special_files': False},
+        patterns=(
+            module.borgmatic.borg.pattern.Pattern('/dev'),
+            module.borgmatic.borg.pattern.Pattern(
+                '/run/borgmatic/bar', module.borgmatic.borg.pattern.Pattern_type.ROOT
+            ),
+            module.borgmatic.borg.pattern.Pattern('/quux'),
+        ),
+        local_path=None,
+        working_directory=None,
+        borgmatic_runtime_directory='/run/borgmatic',
+        find_special_files=True,
+    ) == ('/dev/foo', '/dev/baz')
+
+
+def test_validate_planned_backup_paths_without_borg_or_anything_to_validate_skips_walk():
+    flexmock(module).should_receive('execute_command_and_capture_output').never()
+    flexmock(module.os.path).should_receive('exists').and_return(True)
+    flexmock(module.borgmatic.borg.plan).should_receive('get_planned_paths').never()
+    flexmock(module.logger).should_receive('warning').never()
+
+    assert (
+        module.validate_planned_backup_paths(
+            dry_run=True,
+            create_command=('borg', 'create'),
+            config={'validate_paths_with_borg': False},
+            patterns=(
+                module.borgmatic.borg.pattern.Pattern('/foo'),
+                module.borgmatic.borg.pattern.Pattern(
+                    '/run/borgmatic/bar', module.borgmatic.borg.pattern.Pattern_type.ROOT
+                ),
+            ),
+            local_path=None,
+            working_directory=None,
+            borgmatic_runtime_directory='/run/borgmatic',
+        )
+        == ()
+    )
@@ -33,6 +33,147 @@ def test_write_patterns_file_appends_to_existing():
     )
 
 
+def test_write_patterns_file_compacts_patterns():
+    temporary_file = flexmock(name='filename', flush=lambda: None)
+    temporary_file.should_receive('write').with_args('R /foo')
+    flexmock(module.tempfile).should_receive('NamedTemporaryFile').and_return(temporary_file)
+    flexmock(module).should_receive('compact_patterns').and_return([Pattern('/foo')])
+
+    module.write_patterns_file(
+        [Pattern('/foo'), Pattern('/foo')],
+        borgmatic_runtime_directory='/run/user/0',
+    )
+
+
+@pytest.mark.parametrize(
+    'pattern,expected_prefix',
+    (
+        (Pattern('/foo/bar', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH), 'foo/bar'),
+        (Pattern('/foo/./bar', Pattern_type.EXCLUDE, Pattern_style.FNMATCH), 'foo/bar'),
+        (Pattern('foo/bar/', Pattern_type.EXCLUDE, Pattern_style.PATH_PREFIX), 'foo/bar'),
+        (Pattern('/foo/bar/', Pattern_type.EXCLUDE, Pattern_style.FNMATCH), None),
+        (Pattern('/foo/b*r', Pattern_type.EXCLUDE, Pattern_style.FNMATCH), None),
+        (Pattern('/foo/b[a]r', Pattern_type.EXCLUDE, Pattern_style.FNMATCH), None),
+        (Pattern('/foo/bar', Pattern_type.EXCLUDE, Pattern_style.SHELL), None),
+        (Pattern('/foo/bar', Pattern_type.EXCLUDE, Pattern_style.PATH_FULL_MATCH), None),
+        (Pattern('/foo/bar', Pattern_type.EXCLUDE), None),
+        (Pattern('/foo/bar', Pattern_type.INCLUDE, Pattern_style.FNMATCH), None),
+        (Pattern('/foo/bar'), None),
+        (Pattern('/', Pattern_type.EXCLUDE, Pattern_style.PATH_PREFIX), None),
+        (Pattern('.', Pattern_type.EXCLUDE, Pattern_style.PATH_PREFIX), None),
+    ),
+)
+def test_get_excluded_prefix_returns_path_only_for_literal_prefix_excludes(
+    pattern, expected_prefix
+):
+    assert module.get_excluded_prefix(pattern) == expected_prefix
+
+
+def test_get_sibling_key_returns_type_and_parent_directory():
+    assert module.get_sibling_key(
+        Pattern('/foo/bar', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH)
+    ) == (Pattern_type.NO_RECURSE, 'foo')
+
+
+def test_get_sibling_key_with_non_prefix_exclude_returns_none():
+    assert module.get_sibling_key(Pattern('/foo/bar')) is None
+
+
+def test_collapse_sibling_excludes_collapses_consecutive_siblings_into_regular_expression():
+    assert module.collapse_sibling_excludes(
+        (
+            Pattern('/foo'),
+            Pattern('/foo/b.r', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH),
+            Pattern('/foo/baz', Pattern_type.NO_RECURSE, Pattern_style.PATH_PREFIX),
+            Pattern('/quux', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH),
+            Pattern('/corge', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH),
+        )
+    ) == [
+        Pattern('/foo'),
+        Pattern(
+            r'^foo/(?:b\.r|baz)(?:/|\Z)',
+            Pattern_type.NO_RECURSE,
+            Pattern_style.REGULAR_EXPRESSION,
+        ),
+        Pattern(
+            r'^(?:quux|corge)(?:/|\Z)', Pattern_type.NO_RECURSE, Pattern_style.REGULAR_EXPRESSION
+        ),
+    ]
+
+
+def test_collapse_sibling_excludes_does_not_collapse_differing_types_or_parents_or_lone_excludes():
+    patterns = (
+        Pattern('/foo/bar', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH),
+        Pattern('/foo/baz', Pattern_type.EXCLUDE, Pattern_style.FNMATCH),
+        Pattern('/quux/bar', Pattern_type.EXCLUDE, Pattern_style.FNMATCH),
+        Pattern('/foo/corge', Pattern_type.EXCLUDE, Pattern_style.FNMATCH),
+    )
+
+    assert module.collapse_sibling_excludes(patterns) == list(patterns)
+
+
+def test_compact_patterns_drops_duplicate_patterns():
+    assert module.compact_patterns(
+        (
+            Pattern('/foo'),
+            Pattern('/foo/bar', Pattern_type.INCLUDE, Pattern_style.SHELL),
+            Pattern('/foo'),
+            Pattern('/foo/bar', Pattern_type.INCLUDE, Pattern_style.SHELL),
+        )
+    ) == [Pattern('/foo'), Pattern('/foo/bar', Pattern_type.INCLUDE, Pattern_style.SHELL)]
+
+
+def test_compact_patterns_keeps_duplicate_patterns_depending_on_default_style():
+    patterns = (
+        Pattern('sh', Pattern_type.PATTERN_STYLE),
+        Pattern('/foo*', Pattern_type.EXCLUDE),
+        Pattern('re', Pattern_type.PATTERN_STYLE),
+        Pattern('sh', Pattern_type.PATTERN_STYLE),
+        Pattern('/foo*', Pattern_type.EXCLUDE),
+    )
+
+    assert module.compact_patterns(patterns) == list(patterns)
+
+
+def test_compact_patterns_keeps_only_last_full_path_pattern_for_a_path():
+    assert module.compact_patterns(
+        (
+            Pattern('/foo', Pattern_type.EXCLUDE, Pattern_style.PATH_FULL_MATCH),
+            Pattern('/bar', Pattern_type.EXCLUDE, Pattern_style.PATH_FULL_MATCH),
+            Pattern('foo/', Pattern_type.INCLUDE, Pattern_style.PATH_FULL_MATCH),
+        )
+    ) == [
+        Pattern('/bar', Pattern_type.EXCLUDE, Pattern_style.PATH_FULL_MATCH),
+        Pattern('foo/', Pattern_type.INCLUDE, Pattern_style.PATH_FULL_MATCH),
+    ]
+
+
+def test_compact_patterns_drops_excludes_shadowed_by_earlier_excludes():
+    assert module.compact_patterns(
+        (
+            Pattern('/foo/bar/baz', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH),
+            Pattern('/foo', Pattern_type.EXCLUDE, Pattern_style.PATH_PREFIX),
+            Pattern('/foo/bar', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH),
+            Pattern('/foo/bar/baz', Pattern_type.NO_RECURSE, Pattern_style.PATH_PREFIX),
+            Pattern('/food', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH),
+            Pattern('/foo/b*', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH),
+        )
+    ) == [
+        Pattern('/foo/bar/baz', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH),
+        Pattern('/foo', Pattern_type.EXCLUDE, Pattern_style.PATH_PREFIX),
+        Pattern('/food', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH),
+        Pattern('/foo/b*', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH),
+    ]
+
+
+def test_compact_patterns_collapses_sibling_excludes():
+    flexmock(module).should_receive('collapse_sibling_excludes').with_args(
+        [Pattern('/foo')]
+    ).and_return([Pattern('/bar')])
+
+    assert module.compact_patterns((Pattern('/foo'),)) == [Pattern('/bar')]
+
+
 def test_check_all_root_patterns_exist_with_existent_pattern_path_does_not_raise():
     flexmock(module.os.path).should_receive('exists').with_args('foo').and_return(True)
 
@@ -0,0 +1,1088 @@
+import stat
+
+import pytest
+from flexmock import flexmock
+
+from borgmatic.borg import plan as module
+from borgmatic.borg.pattern import Pattern, Pattern_style, Pattern_type
+
+
+@pytest.mark.parametrize(
+    'pattern,expected_regular_expression',
+    (
+        ('foo/bar', '(?ms)foo/bar\\Z'),
+        ('foo/*.txt', '(?ms)foo/[^/]*\\.txt\\Z'),
+        ('foo/**/bar', '(?ms)foo/(?:[^/]*/)*bar\\Z'),
+        ('foo/ba?', '(?ms)foo/ba[^/]\\Z'),
+        ('foo/[ab]', '(?ms)foo/[ab]\\Z'),
+        ('foo/[!ab]', '(?ms)foo/[^ab]\\Z'),
+        ('foo/[^ab]', '(?ms)foo/[\\^ab]\\Z'),
+        ('foo/[]]', '(?ms)foo/[]]\\Z'),
+        ('foo/[!]]', '(?ms)foo/[^]]\\Z'),
+        ('foo/[a\\b]', '(?ms)foo/[a\\\\b]\\Z'),
+        ('foo/[ab', '(?ms)foo/\\[ab\\Z'),
+    ),
+)
+def test_translate_shell_pattern_converts_pattern_to_regular_expression(
+    pattern, expected_regular_expression
+):
+    assert module.translate_shell_pattern(pattern) == expected_regular_expression
+
+
+@pytest.mark.parametrize(
+    'pattern_path,pattern_style,path,expected_result',
+    (
+        ('^foo/.*\\.txt$', Pattern_style.REGULAR_EXPRESSION, 'foo/bar.txt', True),
+        ('bar', Pattern_style.REGULAR_EXPRESSION, 'foo/bar.txt', True),
+        ('^bar', Pattern_style.REGULAR_EXPRESSION, 'foo/bar.txt', False),
+        ('/foo', Pattern_style.PATH_PREFIX, 'foo', True),
+        ('/foo/', Pattern_style.PATH_PREFIX, 'foo/bar', True),
+        ('/foo', Pattern_style.PATH_PREFIX, 'foobar', False),
+        ('/', Pattern_style.PATH_PREFIX, 'foo', True),
+        ('/foo/*.txt', Pattern_style.FNMATCH, 'foo/bar.txt', True),
+        ('/foo/*.txt', Pattern_style.FNMATCH, 'foo/bar/baz.txt', True),
+        ('/foo/*.txt', Pattern_style.FNMATCH, 'foo/bar.txt/baz', True),
+        ('/foo/*.txt', Pattern_style.FNMATCH, 'foo/bar.md', False),
+        ('/foo/', Pattern_style.FNMATCH, 'foo', False),
+        ('/foo/', Pattern_style.FNMATCH, 'foo/bar', True),
+        ('/foo/*.txt', Pattern_style.SHELL, 'foo/bar.txt', True),
+        ('/foo/*.txt', Pattern_style.SHELL, 'foo/bar/baz.txt', False),
+        ('/foo/*.txt', Pattern_style.SHELL, 'foo/bar.txt/baz', True),
+        ('/foo/**/*.txt', Pattern_style.SHELL, 'foo/bar/baz.txt', True),
+        ('**/*.txt', Pattern_style.SHELL, 'foo/bar/baz.txt', True),
+        ('/foo/', Pattern_style.SHELL, 'foo', True),
+    ),
+)
+def test_make_path_matcher_follows_borg_semantics_for_pattern_style(
+    pattern_path, pattern_style, path, expected_result
+):
+    assert module.make_path_matcher(pattern_path, pattern_style)(path) is expected_result
+
+
+def test_make_path_matcher_with_unsupported_pattern_style_raises():
+    with pytest.raises(ValueError):
+        module.make_path_matcher('/foo', Pattern_style.PATH_FULL_MATCH)
+
+
+def test_path_matcher_includes_path_matching_no_patterns():
+    matcher = module.Path_matcher(
+        (Pattern('/foo'), Pattern('/foo/bar', Pattern_type.EXCLUDE, Pattern_style.PATH_PREFIX))
+    )
+
+    assert matcher.match('/foo/baz') == (True, True)
+
+
+def test_path_matcher_ignores_root_patterns():
+    matcher = module.Path_matcher((Pattern('/foo'),))
+
+    assert matcher.matchers == []
+    assert matcher.match('/bar') == (True, True)
+
+
+def test_path_matcher_includes_path_matching_include_pattern():
+    matcher = module.Path_matcher(
+        (
+            Pattern('/foo/bar/keep', Pattern_type.INCLUDE, Pattern_style.PATH_PREFIX),
+            Pattern('/foo/bar', Pattern_type.EXCLUDE, Pattern_style.PATH_PREFIX),
+        )
+    )
+
+    assert matcher.match('/foo/bar/keep/baz') == (True, True)
+
+
+def test_path_matcher_uses_first_matching_pattern():
+    matcher = module.Path_matcher(
+        (
+            Pattern('/foo/bar', Pattern_type.EXCLUDE, Pattern_style.PATH_PREFIX),
+            Pattern('/foo/bar/keep', Pattern_type.INCLUDE, Pattern_style.PATH_PREFIX),
+        )
+    )
+
+    assert matcher.match('/foo/bar/keep/baz') == (False, True)
+
+
+def test_path_matcher_with_no_recurse_pattern_excludes_path_without_recursing():
+    matcher = module.Path_matcher(
+        (
+            Pattern('/foo/bar', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH),
+            Pattern('/foo/bar/keep', Pattern_type.INCLUDE, Pattern_style.PATH_PREFIX),
+        )
+    )
+
+    assert matcher.match('/foo/bar') == (False, False)
+
+
+def test_path_matcher_with_prefix_matching_exclude_pattern_and_no_include_patterns_does_not_recurse():
+    matcher = module.Path_matcher(
+        (Pattern('/foo/bar', Pattern_type.EXCLUDE, Pattern_style.PATH_PREFIX),)
+    )
+
+    assert matcher.match('/foo/bar') == (False, False)
+
+
+def test_path_matcher_with_regular_expression_exclude_pattern_recurses():
+    matcher = module.Path_matcher(
+        (Pattern('^foo/bar$', Pattern_type.EXCLUDE, Pattern_style.REGULAR_EXPRESSION),)
+    )
+
+    assert matcher.match('/foo/bar') == (False, True)
+    assert matcher.match('/foo/bar/baz') == (True, True)
+
+
+def test_path_matcher_gives_full_path_patterns_precedence():
+    matcher = module.Path_matcher(
+        (
+            Pattern('/foo', Pattern_type.NO_RECURSE, Pattern_style.PATH_PREFIX),
+            Pattern('/foo/bar', Pattern_type.INCLUDE, Pattern_style.PATH_FULL_MATCH),
+        )
+    )
+
+    assert matcher.match('/foo/bar') == (True, True)
+    assert matcher.match('/foo/baz') == (False, False)
+
+
+def test_path_matcher_with_full_path_exclude_pattern_recurses():
+    matcher = module.Path_matcher(
+        (Pattern('/foo/bar', Pattern_type.EXCLUDE, Pattern_style.PATH_FULL_MATCH),)
+    )
+
+    assert matcher.match('/foo/bar') == (False, True)
+    assert matcher.match('/foo/bar/baz') == (True, True)
+
+
+def test_path_matcher_defaults_to_shell_style():
+    matcher = module.Path_matcher((Pattern('/foo/*.txt', Pattern_type.EXCLUDE),))
+
+    assert matcher.match('/foo/bar.txt') == (False, False)
+    assert matcher.match('/foo/bar/baz.txt') == (True, True)
+
+
+def test_path_matcher_respects_pattern_style_patterns():
+    matcher = module.Path_matcher(
+        (
+            Pattern('fm', Pattern_type.PATTERN_STYLE),
+            Pattern('/foo/*.txt', Pattern_type.EXCLUDE),
+        )
+    )
+
+    assert matcher.match('/foo/bar/baz.txt') == (False, False)
+
+
+@pytest.mark.parametrize(
+    'mode,expected_result',
+    (
+        (stat.S_IFCHR, True),
+        (stat.S_IFBLK, True),
+        (stat.S_IFIFO, True),
+        (stat.S_IFREG, False),
+        (stat.S_IFDIR, False),
+        (stat.S_IFSOCK, False),
+    ),
+)
+def test_special_mode_looks_at_file_type(mode, expected_result):
+    assert module.special_mode(mode) == expected_result
+
+
+def test_special_entry_with_regular_file_skips_stat():
+    entry = flexmock(is_file=lambda follow_symlinks: True)
+    flexmock(module.os).should_receive('stat').never()
+
+    assert module.special_entry(entry) is False
+
+
+def test_special_entry_with_directory_skips_stat():
+    entry = flexmock(is_file=lambda follow_symlinks: False, is_dir=lambda follow_symlinks: True)
+    flexmock(module.os).should_receive('stat').never()
+
+    assert module.special_entry(entry) is False
+
+
+def test_special_entry_with_symlink_follows_it():
+    entry = flexmock(
+        path='/foo/link',
+        is_file=lambda follow_symlinks: False,
+        is_dir=lambda follow_symlinks: False,
+        is_symlink=lambda: True,
+        stat=lambda: flexmock(st_mode=stat.S_IFCHR),
+    )
+
+    assert module.special_entry(entry) is True
+
+
+def test_special_entry_with_other_file_type_stats_it():
+    entry = flexmock(
+        is_file=lambda follow_symlinks: False,
+        is_dir=lambda follow_symlinks: False,
+        is_symlink=lambda: False,
+        stat=lambda follow_symlinks: flexmock(st_mode=stat.S_IFIFO),
+    )
+
+    assert module.special_entry(entry) is True
+
+
+def test_special_entry_with_broken_symlink_treats_it_as_non_special():
+    entry = flexmock(
+        path='/foo/link',
+        is_file=lambda follow_symlinks: False,
+        is_dir=lambda follow_symlinks: False,
+        is_symlink=lambda: True,
+    )
+    entry.should_receive('stat').and_raise(FileNotFoundError)
+
+    assert module.special_entry(entry) is False
+
+
+def test_special_file_status_with_symlink_follows_it():
+    flexmock(module.os).should_receive('stat').with_args('/foo/link').and_return(
+        flexmock(st_mode=stat.S_IFBLK)
+    )
+
+    assert module.special_file_status('/foo/link', flexmock(st_mode=stat.S_IFLNK)) is True
+
+
+def test_special_file_status_with_broken_symlink_treats_it_as_non_special():
+    flexmock(module.os).should_receive('stat').and_raise(FileNotFoundError)
+
+    assert module.special_file_status('/foo/link', flexmock(st_mode=stat.S_IFLNK)) is False
+
+
+def test_special_file_status_without_symlink_uses_given_status():
+    flexmock(module.os).should_receive('stat').never()
+
+    assert module.special_file_status('/foo/pipe', flexmock(st_mode=stat.S_IFIFO)) is True
+
+
+def test_cache_directory_with_valid_tag_returns_true(tmp_path):
+    (tmp_path / 'CACHEDIR.TAG').write_bytes(module.CACHE_DIRECTORY_TAG_SIGNATURE + b'\n# junk')
+
+    assert module.cache_directory(str(tmp_path)) is True
+
+
+def test_cache_directory_with_invalid_tag_returns_false(tmp_path):
+    (tmp_path / 'CACHEDIR.TAG').write_bytes(b'nope')
+
+    assert module.cache_directory(str(tmp_path)) is False
+
+
+def test_cache_directory_without_tag_returns_false(tmp_path):
+    assert module.cache_directory(str(tmp_path)) is False
+
+
+def test_tagged_directory_with_exclude_caches_and_cache_directory_returns_true():
+    flexmock(module).should_receive('cache_directory').and_return(True)
+
+    assert module.tagged_directory('/foo', {'exclude_caches': True}) is True
+
+
+def test_tagged_directory_without_exclude_caches_ignores_cache_directory():
+    flexmock(module).should_receive('cache_directory').never()
+
+    assert module.tagged_directory('/foo', {}) is False
+
+
+def test_tagged_directory_with_exclude_if_present_file_returns_true():
+    flexmock(module.os.path).should_receive('exists').with_args('/foo/.nobackup').and_return(False)
+    flexmock(module.os.path).should_receive('exists').with_args('/foo/.skip').and_return(True)
+
+    assert module.tagged_directory('/foo', {'exclude_if_present': ['.nobackup', '.skip']}) is True
+
+
+def test_tagged_directory_without_exclude_if_present_file_returns_false():
+    flexmock(module.os.path).should_receive('exists').and_return(False)
+
+    assert module.tagged_directory('/foo', {'exclude_if_present': ['.nobackup']}) is False
+
+
+def test_entry_directory_does_not_follow_symlinks():
+    entry = flexmock()
+    entry.should_receive('is_dir').with_args(follow_symlinks=False).and_return(True)
+
+    assert module.entry_directory(entry) is True
+
+
+def test_entry_directory_with_error_returns_false():
+    entry = flexmock()
+    entry.should_receive('is_dir').and_raise(OSError)
+
+    assert module.entry_directory(entry) is False
+
+
+def test_entry_regular_file_follows_symlinks():
+    entry = flexmock()
+    entry.should_receive('is_file').with_args().and_return(True)
+
+    assert module.entry_regular_file(entry) is True
+
+
+def test_entry_regular_file_with_error_returns_false():
+    entry = flexmock()
+    entry.should_receive('is_file').and_raise(OSError)
+
+    assert module.entry_regular_file(entry) is False
+
+
+def test_visit_directory_yields_included_directory_and_queues_it_for_walking():
+    directories = []
+    flexmock(module).should_receive('tagged_directory').and_return(False)
+
+    assert tuple(
+        module.visit_directory(
+            'foo',
+            '/work/foo',
+            flexmock(match=lambda path: (True, True)),
+            {},
+            directories,
+        )
+    ) == (module.Planned_path('foo'),)
+    assert directories == [('foo', '/work/foo')]
+
+
+def test_visit_directory_with_excluded_directory_to_recurse_into_queues_it_for_walking():
+    directories = []
+    flexmock(module).should_receive('tagged_directory').and_return(False)
+
+    assert (
+        tuple(
+            module.visit_directory(
+                'foo',
+                '/work/foo',
+                flexmock(match=lambda path: (False, True)),
+                {},
+                directories,
+            )
+        )
+        == ()
+    )
+    assert directories == [('foo', '/work/foo')]
+
+
+def test_visit_directory_with_excluded_directory_not_to_recurse_into_skips_it():
+    directories = []
+    flexmock(module).should_receive('tagged_directory').never()
+
+    assert (
+        tuple(
+            module.visit_directory(
+                'foo',
+                '/work/foo',
+                flexmock(match=lambda path: (False, False)),
+                {},
+                directories,
+            )
+        )
+        == ()
+    )
+    assert directories == []
+
+
+def test_visit_directory_with_tagged_directory_skips_it():
+    directories = []
+    flexmock(module).should_receive('tagged_directory').and_return(True)
+
+    assert (
+        tuple(
+            module.visit_directory(
+                'foo',
+                '/work/foo',
+                flexmock(match=lambda path: (True, True)),
+                {},
+                directories,
+            )
+        )
+        == ()
+    )
+    assert directories == []
+
+
+def test_visit_directory_with_tagged_directory_and_keep_exclude_tags_yields_it_without_walking_it():
+    directories = []
+    flexmock(module).should_receive('tagged_directory').and_return(True)
+
+    assert tuple(
+        module.visit_directory(
+            'foo',
+            '/work/foo',
+            flexmock(match=lambda path: (True, True)),
+            {'keep_exclude_tags': True},
+            directories,
+        )
+    ) == (module.Planned_path('foo'),)
+    assert directories == []
+
+
+class Scandir_iterator:
+    '''
+    A stand-in for the context manager iterator that os.scandir() returns.
+    '''
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        pass
+
+
+def consume(generator):
+    '''
+    Given a generator, return a tuple of (its yielded values as a tuple, its return value).
+    '''
+    return_values = []
+
+    def capture():
+        return_values.append((yield from generator))
+
+    values = tuple(capture())
+
+    return (values, return_values[0])
+
+
+def test_scan_directory_yields_included_entries_and_returns_subdirectories_and_special_files():
+    directories = []
+    flexmock(module.os).should_receive('scandir').with_args('/work/foo').and_return(
+        Scandir_iterator(
+            (
+                flexmock(name='bar', path='/work/foo/bar'),
+                flexmock(name='pipe', path='/work/foo/pipe'),
+                flexmock(name='file', path='/work/foo/file'),
+                flexmock(name='skip', path='/work/foo/skip'),
+                flexmock(name='skip_pipe', path='/work/foo/skip_pipe'),
+                flexmock(name='link', path='/work/foo/link'),
+                flexmock(name='pipe_link', path='/work/foo/pipe_link'),
+            )
+        )
+    )
+    flexmock(module).should_receive('entry_directory').replace_with(
+        lambda entry: entry.name == 'bar'
+    )
+    flexmock(module).should_receive('entry_symlink').replace_with(
+        lambda entry: 'link' in entry.name
+    )
+    flexmock(module).should_receive('visit_directory').with_args(
+        'foo/bar', '/work/foo/bar', object, {}, directories
+    ).and_return(iter((module.Planned_path('foo/bar'),))).once()
+    flexmock(module).should_receive('special_entry').replace_with(
+        lambda entry: 'pipe' in entry.name
+    )
+    flexmock(module).should_receive('entry_regular_file').replace_with(
+        lambda entry: entry.name == 'file'
+    )
+    matcher = flexmock(match=lambda path: ('skip' not in path, True))
+
+    assert consume(module.scan_directory('foo', '/work/foo', matcher, {}, directories)) == (
+        (
+            module.Planned_path('foo/bar'),
+            module.Planned_path('foo/pipe', True, False),
+            module.Planned_path('foo/file', False, True),
+            module.Planned_path('foo/link', False, False),
+            module.Planned_path('foo/pipe_link', True, False),
+        ),
+        (['bar'], ['pipe', 'skip_pipe'], ['link', 'pipe_link']),
+    )
+
+
+def test_scan_directory_with_unreadable_directory_returns_none():
+    flexmock(module.os).should_receive('scandir').and_raise(PermissionError)
+
+    assert consume(module.scan_directory('foo', '/work/foo', flexmock(), {}, [])) == ((), None)
+
+
+def test_replay_directory_visits_subdirectories_and_yields_included_special_files():
+    directories = []
+    flexmock(module.os).should_receive('scandir').never()
+    flexmock(module).should_receive('visit_directory').with_args(
+        'foo/bar', '/work/foo/bar', object, {}, directories
+    ).and_return(iter((module.Planned_path('foo/bar'),))).once()
+    flexmock(module).should_receive('special_symlink_target').with_args(
+        '/work/foo/link'
+    ).and_return(False)
+    flexmock(module).should_receive('special_symlink_target').with_args(
+        '/work/foo/pipe_link'
+    ).and_return(True)
+    matcher = flexmock(match=lambda path: ('skip' not in path, True))
+
+    assert tuple(
+        module.replay_directory(
+            'foo',
+            '/work/foo',
+            matcher,
+            {},
+            directories,
+            ['bar'],
+            ['pipe', 'skip_pipe'],
+            ['link', 'pipe_link', 'skip_link'],
+        )
+    ) == (
+        module.Planned_path('foo/bar'),
+        module.Planned_path('foo/pipe', True),
+        module.Planned_path('foo/pipe_link', True),
+    )
+
+
+def test_special_symlink_target_with_special_target_returns_true():
+    flexmock(module.os).should_receive('stat').with_args('/foo/link').and_return(
+        flexmock(st_mode=stat.S_IFIFO)
+    )
+
+    assert module.special_symlink_target('/foo/link')
+
+
+def test_special_symlink_target_with_regular_file_target_returns_false():
+    flexmock(module.os).should_receive('stat').with_args('/foo/link').and_return(
+        flexmock(st_mode=stat.S_IFREG)
+    )
+
+    assert not module.special_symlink_target('/foo/link')
+
+
+def test_special_symlink_target_with_broken_symlink_returns_false():
+    flexmock(module.os).should_receive('stat').and_raise(FileNotFoundError)
+
+    assert not module.special_symlink_target('/foo/link')
+
+
+def test_entry_symlink_with_error_returns_false():
+    entry = flexmock()
+    entry.should_receive('is_symlink').and_raise(OSError)
+
+    assert not module.entry_symlink(entry)
+
+
+def test_visit_root_with_missing_root_yields_nothing():
+    flexmock(module.os).should_receive('stat').and_raise(FileNotFoundError)
+    directories = []
+
+    assert consume(module.visit_root(Pattern('/foo'), flexmock(), {}, None, directories)) == (
+        (),
+        None,
+    )
+    assert directories == []
+
+
+def test_visit_root_with_included_non_directory_root_yields_it():
+    flexmock(module.os).should_receive('stat').with_args(
+        '/foo/pipe', follow_symlinks=False
+    ).and_return(flexmock(st_mode=stat.S_IFIFO))
+    flexmock(module).should_receive('special_file_status').and_return(True)
+    flexmock(module.os.path).should_receive('isfile').and_return(False)
+    flexmock(module).should_receive('visit_directory').never()
+
+    assert consume(
+        module.visit_root(
+            Pattern('/foo/pipe'), flexmock(match=lambda path: (True, True)), {}, None, []
+        )
+    ) == ((module.Planned_path('/foo/pipe', True, False),), None)
+
+
+def test_visit_root_with_included_symlink_to_regular_file_root_yields_it_as_regular_file():
+    flexmock(module.os).should_receive('stat').with_args(
+        'work/foo/bar', follow_symlinks=False
+    ).and_return(flexmock(st_mode=stat.S_IFLNK))
+    flexmock(module).should_receive('special_file_status').and_return(False)
+    flexmock(module.os.path).should_receive('isfile').with_args('work/foo/bar').and_return(True)
+
+    assert consume(
+        module.visit_root(
+            Pattern('foo/bar'), flexmock(match=lambda path: (True, True)), {}, 'work', []
+        )
+    ) == ((module.Planned_path('foo/bar', False, True),), None)
+
+
+def test_visit_root_with_excluded_non_directory_root_yields_nothing():
+    flexmock(module.os).should_receive('stat').and_return(flexmock(st_mode=stat.S_IFREG))
+    flexmock(module).should_receive('special_file_status').never()
+
+    assert consume(
+        module.visit_root(
+            Pattern('/foo/bar'), flexmock(match=lambda path: (False, False)), {}, None, []
+        )
+    ) == ((), None)
+
+
+def test_visit_root_with_directory_root_visits_it():
+    directories = []
+    flexmock(module.os).should_receive('stat').with_args(
+        'work/foo', follow_symlinks=False
+    ).and_return(flexmock(st_mode=stat.S_IFDIR, st_dev=1))
+    flexmock(module).should_receive('visit_directory').replace_with(visit_directory)
+
+    assert consume(module.visit_root(Pattern('foo/'), flexmock(), {}, 'work', directories)) == (
+        (module.Planned_path('foo'),),
+        None,
+    )
+    assert directories == [('foo', 'work/foo')]
+
+
+def test_visit_root_with_one_file_system_returns_root_device():
+    flexmock(module.os).should_receive('stat').and_return(flexmock(st_mode=stat.S_IFDIR, st_dev=1))
+    flexmock(module).should_receive('visit_directory').replace_with(visit_directory)
+
+    assert consume(
+        module.visit_root(Pattern('/foo'), flexmock(), {'one_file_system': True}, None, [])
+    ) == ((module.Planned_path('/foo'),), 1)
+
+
+def test_visit_root_with_one_file_system_prefers_pattern_device():
+    flexmock(module.os).should_receive('stat').and_return(flexmock(st_mode=stat.S_IFDIR, st_dev=1))
+    flexmock(module).should_receive('visit_directory').replace_with(visit_directory)
+
+    assert consume(
+        module.visit_root(
+            Pattern('/foo', device=2), flexmock(), {'one_file_system': True}, None, []
+        )
+    ) == ((module.Planned_path('/foo'),), 2)
+
+
+def visit_directory(path, full_path, matcher, config, directories):
+    directories.append((path, full_path))
+    yield module.Planned_path(path)
+
+
+def scan_directory(path, full_path, matcher, config, directories):
+    if path.endswith('bar'):
+        return ([], [], [])
+
+    yield from visit_directory(f'{path}/bar', f'{full_path}/bar', matcher, config, directories)
+    yield module.Planned_path(f'{path}/pipe', True)
+
+    return (['bar'], [], [])
+
+
+def test_walk_directory_scans_directory():
+    directories = []
+    flexmock(module.os).should_receive('stat').never()
+    flexmock(module).should_receive('visit_directory').replace_with(visit_directory)
+    flexmock(module).should_receive('scan_directory').replace_with(scan_directory)
+
+    assert tuple(module.walk_directory('foo', 'work/foo', None, flexmock(), {}, directories)) == (
+        module.Planned_path('foo/bar'),
+        module.Planned_path('foo/pipe', True),
+    )
+    assert directories == [('foo/bar', 'work/foo/bar')]
+
+
+def test_walk_directory_with_device_skips_directory_on_other_device():
+    flexmock(module.os).should_receive('stat').with_args(
+        '/foo/bar', follow_symlinks=False
+    ).and_return(flexmock(st_mode=stat.S_IFDIR, st_dev=2))
+    flexmock(module).should_receive('scan_directory').never()
+
+    assert tuple(module.walk_directory('/foo/bar', '/foo/bar', 1, flexmock(), {}, [])) == ()
+
+
+def test_walk_directory_with_device_scans_directory_on_same_device():
+    flexmock(module.os).should_receive('stat').and_return(flexmock(st_mode=stat.S_IFDIR, st_dev=1))
+    flexmock(module).should_receive('visit_directory').replace_with(visit_directory)
+    flexmock(module).should_receive('scan_directory').replace_with(scan_directory)
+
+    assert tuple(module.walk_directory('/foo', '/foo', 1, flexmock(), {}, [])) == (
+        module.Planned_path('/foo/bar'),
+        module.Planned_path('/foo/pipe', True),
+    )
+
+
+def test_walk_directory_with_special_file_index_skips_directory_that_cannot_be_stated():
+    flexmock(module.os).should_receive('stat').and_raise(FileNotFoundError)
+    flexmock(module).should_receive('scan_directory').never()
+
+    assert (
+        tuple(
+            module.walk_directory(
+                '/foo', '/foo', None, flexmock(), {}, [], special_file_index=flexmock()
+            )
+        )
+        == ()
+    )
+
+
+def test_walk_directory_with_special_file_index_replays_indexed_directory():
+    status = flexmock(st_mode=stat.S_IFDIR, st_dev=1)
+    flexmock(module.os).should_receive('stat').and_return(status)
+    flexmock(module).should_receive('scan_directory').never()
+    special_file_index = flexmock()
+    special_file_index.should_receive('get').with_args('/foo/bar', status).and_return(
+        ([], ['pipe'], ['link'])
+    )
+    special_file_index.should_receive('set').never()
+    flexmock(module).should_receive('replay_directory').with_args(
+        '/foo/bar', '/foo/bar', object, {}, list, [], ['pipe'], ['link']
+    ).and_return(iter((module.Planned_path('/foo/bar/pipe', True),))).once()
+
+    assert tuple(
+        module.walk_directory(
+            '/foo/bar', '/foo/bar', None, flexmock(), {}, [], special_file_index=special_file_index
+        )
+    ) == (module.Planned_path('/foo/bar/pipe', True),)
+
+
+def test_walk_directory_with_special_file_index_indexes_scanned_directory():
+    status = flexmock(st_mode=stat.S_IFDIR, st_dev=1)
+    flexmock(module.os).should_receive('stat').and_return(status)
+    flexmock(module).should_receive('visit_directory').replace_with(visit_directory)
+    flexmock(module).should_receive('scan_directory').replace_with(scan_directory)
+    special_file_index = flexmock()
+    special_file_index.should_receive('get').with_args('/foo', status).and_return(None)
+    special_file_index.should_receive('set').with_args('/foo', status, ['bar'], [], []).once()
+
+    assert tuple(
+        module.walk_directory(
+            '/foo', '/foo', None, flexmock(), {}, [], special_file_index=special_file_index
+        )
+    ) == (module.Planned_path('/foo/bar'), module.Planned_path('/foo/pipe', True))
+
+
+def test_walk_directory_with_special_file_index_skips_indexing_unreadable_directory():
+    flexmock(module.os).should_receive('stat').and_return(flexmock(st_mode=stat.S_IFDIR, st_dev=1))
+    flexmock(module).should_receive('scan_directory').replace_with(
+        lambda path, full_path, matcher, config, directories: (yield from ())
+    )
+    special_file_index = flexmock()
+    special_file_index.should_receive('get').and_return(None)
+    special_file_index.should_receive('set').never()
+
+    assert (
+        tuple(
+            module.walk_directory(
+                '/foo', '/foo', None, flexmock(), {}, [], special_file_index=special_file_index
+            )
+        )
+        == ()
+    )
+
+
+def visit_root(pattern, matcher, config, working_directory, directories):
+    yield from visit_directory(
+        pattern.path, f'{working_directory}/{pattern.path}', matcher, config, directories
+    )
+
+    return pattern.device
+
+
+def walk_directory(path, full_path, device, matcher, config, directories, special_file_index=None):
+    return scan_directory(path, full_path, matcher, config, directories)
+
+
+def test_walk_root_walks_directories_and_yields_included_paths():
+    flexmock(module).should_receive('visit_root').replace_with(visit_root)
+    walked_directories = []
+
+    def record_walk_directory(
+        path, full_path, device, matcher, config, directories, special_file_index=None
+    ):
+        walked_directories.append((path, full_path, device, special_file_index))
+        return walk_directory(path, full_path, device, matcher, config, directories)
+
+    flexmock(module).should_receive('walk_directory').replace_with(record_walk_directory)
+    special_file_index = flexmock()
+
+    assert tuple(
+        module.walk_root(
+            Pattern('foo', device=1),
+            flexmock(),
+            {},
+            working_directory='work',
+            special_file_index=special_file_index,
+        )
+    ) == (
+        module.Planned_path('foo'),
+        module.Planned_path('foo/bar'),
+        module.Planned_path('foo/pipe', True),
+    )
+    assert walked_directories == [
+        ('foo', 'work/foo', 1, special_file_index),
+        ('foo/bar', 'work/foo/bar', 1, special_file_index),
+    ]
+
+
+def test_walk_directory_task_returns_planned_paths_and_subdirectories_with_device():
+    flexmock(module).should_receive('walk_directory').replace_with(walk_directory)
+
+    assert module.walk_directory_task('foo', 'work/foo', 1, flexmock(), {}, None) == (
+        (module.Planned_path('foo/bar'), module.Planned_path('foo/pipe', True)),
+        [('foo/bar', 'work/foo/bar', 1)],
+    )
+
+
+def test_walk_roots_in_parallel_walks_directories_of_all_roots():
+    flexmock(module).should_receive('visit_root').replace_with(visit_root)
+    walked_directories = []
+
+    def record_walk_directory(
+        path, full_path, device, matcher, config, directories, special_file_index=None
+    ):
+        walked_directories.append((path, device))
+        return walk_directory(path, full_path, device, matcher, config, directories)
+
+    flexmock(module).should_receive('walk_directory').replace_with(record_walk_directory)
+
+    assert set(
+        module.walk_roots_in_parallel(
+            (Pattern('foo', device=1), Pattern('baz', device=2)),
+            flexmock(),
+            {},
+            'work',
+            None,
+            workers=1,
+        )
+    ) == {
+        module.Planned_path('foo'),
+        module.Planned_path('foo/bar'),
+        module.Planned_path('foo/pipe', True),
+        module.Planned_path('baz'),
+        module.Planned_path('baz/bar'),
+        module.Planned_path('baz/pipe', True),
+    }
+    assert sorted(walked_directories) == [
+        ('baz', 2),
+        ('baz/bar', 2),
+        ('foo', 1),
+        ('foo/bar', 1),
+    ]
+
+
+def test_walk_roots_in_parallel_stopped_early_cancels_pending_directory_listings():
+    flexmock(module).should_receive('visit_root').replace_with(visit_root)
+    flexmock(module).should_receive('walk_directory').replace_with(walk_directory)
+    flexmock(module.concurrent.futures.ThreadPoolExecutor).should_call('shutdown').with_args(
+        wait=True, cancel_futures=True
+    ).once()
+    planned_paths = module.walk_roots_in_parallel(
+        (Pattern('foo'),), flexmock(), {}, 'work', None, workers=2
+    )
+
+    assert next(planned_paths) == module.Planned_path('foo')
+    assert next(planned_paths) in {
+        module.Planned_path('foo/bar'),
+        module.Planned_path('foo/pipe', True),
+    }
+
+    planned_paths.close()
+
+
+def test_make_special_file_index_path_hashes_root_paths_into_state_directory():
+    flexmock(module.borgmatic.config.paths).should_receive(
+        'get_borgmatic_state_directory'
+    ).and_return('/state')
+
+    path = module.make_special_file_index_path(
+        {},
+        (
+            Pattern('/foo'),
+            Pattern('/bar', Pattern_type.EXCLUDE),
+            Pattern('/baz'),
+        ),
+        '/work',
+    )
+
+    assert path == module.make_special_file_index_path(
+        {}, (Pattern('/baz'), Pattern('/foo')), '/work'
+    )
+    assert path != module.make_special_file_index_path({}, (Pattern('/baz'),), '/work')
+    assert path != module.make_special_file_index_path({}, (Pattern('/baz'), Pattern('/foo')))
+    assert path.startswith('/state/special_files/')
+    assert path.endswith('.json')
+
+
+def test_read_special_file_index_reads_directories_from_file(tmp_path):
+    index_path = tmp_path / 'index.json'
+    index_path.write_text('{"/foo": [1, 2, [], ["pipe"]]}')
+
+    assert module.read_special_file_index(str(index_path)) == {'/foo': [1, 2, [], ['pipe']]}
+
+
+def test_read_special_file_index_with_missing_file_returns_empty_dict(tmp_path):
+    assert module.read_special_file_index(str(tmp_path / 'index.json')) == {}
+
+
+def test_read_special_file_index_with_invalid_json_returns_empty_dict(tmp_path):
+    index_path = tmp_path / 'index.json'
+    index_path.write_text('{nope')
+
+    assert module.read_special_file_index(str(index_path)) == {}
+
+
+def test_read_special_file_index_with_non_dict_json_returns_empty_dict(tmp_path):
+    index_path = tmp_path / 'index.json'
+    index_path.write_text('[]')
+
+    assert module.read_special_file_index(str(index_path)) == {}
+
+
+def test_write_special_file_index_writes_directories_to_file(tmp_path):
+    index_path = tmp_path / 'special_files' / 'abc.json'
+
+    module.write_special_file_index(str(index_path), {'/foo': [1, 2, [], ['pipe']]})
+
+    assert module.json.loads(index_path.read_text()) == {'/foo': [1, 2, [], ['pipe']]}
+    assert [path.name for path in index_path.parent.iterdir()] == ['abc.json']
+
+
+def test_write_special_file_index_with_error_swallows_it(tmp_path):
+    index_path = tmp_path / 'special_files' / 'abc.json'
+    flexmock(module.os).should_receive('replace').and_raise(PermissionError)
+
+    module.write_special_file_index(str(index_path), {})
+
+    assert list(index_path.parent.iterdir()) == []
+
+
+def test_special_file_index_get_with_unchanged_directory_returns_indexed_names():
+    flexmock(module).should_receive('read_special_file_index').and_return(
+        {'/foo': [1, 2, ['bar'], ['pipe'], ['link']]}
+    )
+    special_file_index = module.Special_file_index('/state/index.json')
+
+    assert special_file_index.get('/foo', flexmock(st_mtime_ns=1, st_ctime_ns=2)) == (
+        ['bar'],
+        ['pipe'],
+        ['link'],
+    )
+    assert special_file_index.directories == {'/foo': [1, 2, ['bar'], ['pipe'], ['link']]}
+
+
+@pytest.mark.parametrize(
+    'record',
+    (
+        [1, 2, ['bar'], ['pipe']],
+        'junk',
+    ),
+)
+def test_special_file_index_get_with_record_in_other_format_returns_none(record):
+    flexmock(module).should_receive('read_special_file_index').and_return({'/foo': record})
+    special_file_index = module.Special_file_index('/state/index.json')
+
+    assert special_file_index.get('/foo', flexmock(st_mtime_ns=1, st_ctime_ns=2)) is None
+
+
+@pytest.mark.parametrize(
+    'mtime_ns,ctime_ns',
+    (
+        (3, 2),
+        (1, 3),
+    ),
+)
+def test_special_file_index_get_with_changed_directory_returns_none(mtime_ns, ctime_ns):
+    flexmock(module).should_receive('read_special_file_index').and_return(
+        {'/foo': [1, 2, ['bar'], ['pipe'], []]}
+    )
+    special_file_index = module.Special_file_index('/state/index.json')
+
+    assert (
+        special_file_index.get('/foo', flexmock(st_mtime_ns=mtime_ns, st_ctime_ns=ctime_ns)) is None
+    )
+    assert special_file_index.directories == {}
+
+
+def test_special_file_index_get_with_unindexed_directory_returns_none():
+    flexmock(module).should_receive('read_special_file_index').and_return({})
+    special_file_index = module.Special_file_index('/state/index.json')
+
+    assert special_file_index.get('/foo', flexmock(st_mtime_ns=1, st_ctime_ns=2)) is None
+
+
+def test_special_file_index_set_indexes_directory():
+    flexmock(module).should_receive('read_special_file_index').and_return({})
+    flexmock(module.time).should_receive('time_ns').and_return(10_000_000_000)
+    special_file_index = module.Special_file_index('/state/index.json')
+
+    special_file_index.set(
+        '/foo',
+        flexmock(st_mtime_ns=1_000_000_000, st_ctime_ns=2_000_000_000),
+        ['bar'],
+        [],
+        ['link'],
+    )
+
+    assert special_file_index.directories == {
+        '/foo': [1_000_000_000, 2_000_000_000, ['bar'], [], ['link']]
+    }
+
+
+def test_special_file_index_set_skips_recently_changed_directory():
+    flexmock(module).should_receive('read_special_file_index').and_return({})
+    flexmock(module.time).should_receive('time_ns').and_return(10_000_000_000)
+    special_file_index = module.Special_file_index('/state/index.json')
+
+    special_file_index.set(
+        '/foo', flexmock(st_mtime_ns=1_000_000_000, st_ctime_ns=9_000_000_000), ['bar'], [], []
+    )
+
+    assert special_file_index.directories == {}
+
+
+def test_special_file_index_save_writes_walked_directories():
+    flexmock(module).should_receive('read_special_file_index').and_return(
+        {'/foo': [1, 2, [], [], []], '/gone': [1, 2, [], [], []]}
+    )
+    special_file_index = module.Special_file_index('/state/index.json')
+    special_file_index.get('/foo', flexmock(st_mtime_ns=1, st_ctime_ns=2))
+    flexmock(module).should_receive('write_special_file_index').with_args(
+        '/state/index.json', {'/foo': [1, 2, [], [], []]}
+    ).once()
+
+    special_file_index.save()
+
+
+def test_get_planned_paths_walks_each_root_pattern_serially_with_one_worker():
+    patterns = (
+        Pattern('/foo'),
+        Pattern('/foo/bar', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH),
+        Pattern('/baz'),
+    )
+    config = {'directory_walk_workers': 1}
+    matcher = flexmock()
+    special_file_index = flexmock()
+    flexmock(module).should_receive('Path_matcher').with_args(patterns).and_return(matcher)
+    flexmock(module).should_receive('walk_roots_in_parallel').never()
+    flexmock(module).should_receive('walk_root').with_args(
+        patterns[0], matcher, config, '/work', special_file_index
+    ).and_return(iter((module.Planned_path('/foo'),)))
+    flexmock(module).should_receive('walk_root').with_args(
+        patterns[2], matcher, config, '/work', special_file_index
+    ).and_return(iter((module.Planned_path('/baz', True),)))
+
+    assert tuple(
+        module.get_planned_paths(patterns, config, '/work', special_file_index=special_file_index)
+    ) == (
+        module.Planned_path('/foo'),
+        module.Planned_path('/baz', True),
+    )
+
+
+def test_get_planned_paths_defaults_to_walking_root_patterns_in_parallel():
+    patterns = (
+        Pattern('/foo'),
+        Pattern('/foo/bar', Pattern_type.NO_RECURSE, Pattern_style.FNMATCH),
+        Pattern('/baz'),
+    )
+    matcher = flexmock()
+    flexmock(module).should_receive('Path_matcher').and_return(matcher)
+    flexmock(module).should_receive('walk_root').never()
+    flexmock(module).should_receive('walk_roots_in_parallel').with_args(
+        (patterns[0], patterns[2]),
+        matcher,
+        {},
+        '/work',
+        None,
+        module.DEFAULT_DIRECTORY_WALK_WORKERS,
+    ).and_return(iter((module.Planned_path('/foo'),))).once()
+
+    assert tuple(module.get_planned_paths(patterns, {}, '/work')) == (module.Planned_path('/foo'),)
+
+
+def test_get_planned_paths_with_root_paths_walks_only_those_root_patterns():
+    patterns = (Pattern('/foo'), Pattern('/baz'))
+    config = {'directory_walk_workers': 4}
+    flexmock(module).should_receive('Path_matcher').and_return(flexmock())
+    flexmock(module).should_receive('walk_roots_in_parallel').with_args(
+        (patterns[1],), object, config, None, None, 4
+    ).and_return(iter((module.Planned_path('/baz'),))).once()
+
+    assert tuple(module.get_planned_paths(patterns, config, root_paths={'/baz'})) == (
+        module.Planned_path('/baz'),
+    )
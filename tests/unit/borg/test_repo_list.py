@@ -119,13 +119,13 @@ def test_get_latest_archive_calls_borg_with_flags():
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     flexmock(module.environment).should_receive('make_environment')
     flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(None)
-    flexmock(module).should_receive('execute_command_and_capture_output').with_args(
+    flexmock(module).should_receive('execute_command_and_capture_raw_output').with_args(
         ('borg', 'list', '--log-json', *BORG_LIST_LATEST_ARGUMENTS),
         borg_local_path='borg',
         borg_exit_codes=None,
         environment=None,
         working_directory=None,
-    ).and_yield(json.dumps({'archives': [expected_archive]}))
+    ).and_return(json.dumps({'archives': [expected_archive]}).encode())
     insert_logging_mock(logging.WARNING)
 
     assert (
@@ -150,13 +150,13 @@ def test_get_latest_archive_with_log_info_calls_borg_without_info_flag():
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     flexmock(module.environment).should_receive('make_environment')
     flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(None)
-    flexmock(module).should_receive('execute_command_and_capture_output').with_args(
+    flexmock(module).should_receive('execute_command_and_capture_raw_output').with_args(
         ('borg', 'list', '--log-json', *BORG_LIST_LATEST_ARGUMENTS),
         environment=None,
         working_directory=None,
         borg_local_path='borg',
         borg_exit_codes=None,
-    ).and_yield(json.dumps({'archives': [expected_archive]}))
+    ).and_return(json.dumps({'archives': [expected_archive]}).encode())
     insert_logging_mock(logging.INFO)
 
     assert (
@@ -181,13 +181,13 @@ def test_get_latest_archive_with_log_debug_calls_borg_without_debug_flag():
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     flexmock(module.environment).should_receive('make_environment')
     flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(None)
-    flexmock(module).should_receive('execute_command_and_capture_output').with_args(
+    flexmock(module).should_receive('execute_command_and_capture_raw_output').with_args(
         ('borg', 'list', '--log-json', *BORG_LIST_LATEST_ARGUMENTS),
         environment=None,
         working_directory=None,
         borg_local_path='borg',
         borg_exit_codes=None,
-    ).and_yield(json.dumps({'archives': [expected_archive]}))
+    ).and_return(json.dumps({'archives': [expected_archive]}).encode())
     insert_logging_mock(logging.DEBUG)
 
     assert (
@@ -212,13 +212,13 @@ def test_get_latest_archive_with_local_path_calls_borg_via_local_path():
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     flexmock(module.environment).should_receive('make_environment')
     flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(None)
-    flexmock(module).should_receive('execute_command_and_capture_output').with_args(
+    flexmock(module).should_receive('execute_command_and_capture_raw_output').with_args(
         ('borg1', 'list', '--log-json', *BORG_LIST_LATEST_ARGUMENTS),
         environment=None,
         working_directory=None,
         borg_local_path='borg1',
         borg_exit_codes=None,
-    ).and_yield(json.dumps({'archives': [expected_archive]}))
+    ).and_return(json.dumps({'archives': [expected_archive]}).encode())
     insert_logging_mock(logging.WARNING)
 
     assert (
@@ -245,13 +245,13 @@ def test_get_latest_archive_with_exit_codes_calls_borg_using_them():
     flexmock(module.environment).should_receive('make_environment')
     flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(None)
     borg_exit_codes = flexmock()
-    flexmock(module).should_receive('execute_command_and_capture_output').with_args(
+    flexmock(module).should_receive('execute_command_and_capture_raw_output').with_args(
         ('borg', 'list', '--log-json', *BORG_LIST_LATEST_ARGUMENTS),
         environment=None,
         working_directory=None,
         borg_local_path='borg',
         borg_exit_codes=borg_exit_codes,
-    ).and_yield(json.dumps({'archives': [expected_archive]}))
+    ).and_return(json.dumps({'archives': [expected_archive]}).encode())
     insert_logging_mock(logging.WARNING)
 
     assert (
@@ -279,13 +279,13 @@ def test_get_latest_archive_with_remote_path_calls_borg_with_remote_path_flags()
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     flexmock(module.environment).should_receive('make_environment')
     flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(None)
-    flexmock(module).should_receive('execute_command_and_capture_output').with_args(
+    flexmock(module).should_receive('execute_command_and_capture_raw_output').with_args(
         ('borg', 'list', '--remote-path', 'borg1', '--log-json', *BORG_LIST_LATEST_ARGUMENTS),
         environment=None,
         working_directory=None,
         borg_local_path='borg',
         borg_exit_codes=None,
-    ).and_yield(json.dumps({'archives': [expected_archive]}))
+    ).and_return(json.dumps({'archives': [expected_archive]}).encode())
     insert_logging_mock(logging.WARNING)
 
     assert (
@@ -314,13 +314,13 @@ def test_get_latest_archive_with_umask_calls_borg_with_umask_flags():
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     flexmock(module.environment).should_receive('make_environment')
     flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(None)
-    flexmock(module).should_receive('execute_command_and_capture_output').with_args(
+    flexmock(module).should_receive('execute_command_and_capture_raw_output').with_args(
         ('borg', 'list', '--umask', '077', '--log-json', *BORG_LIST_LATEST_ARGUMENTS),
         environment=None,
         working_directory=None,
         borg_local_path='borg',
         borg_exit_codes=None,
-    ).and_yield(json.dumps({'archives': [expected_archive]}))
+    ).and_return(json.dumps({'archives': [expected_archive]}).encode())
     insert_logging_mock(logging.WARNING)
 
     assert (
@@ -344,13 +344,13 @@ def test_get_latest_archive_without_archives_raises():
     flexmock(module.flags).should_receive('make_match_archives_flags').and_return(())
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(None)
-    flexmock(module).should_receive('execute_command_and_capture_output').with_args(
+    flexmock(module).should_receive('execute_command_and_capture_raw_output').with_args(
         ('borg', 'list', '--log-json', *BORG_LIST_LATEST_ARGUMENTS),
         environment=None,
         working_directory=None,
         borg_local_path='borg',
         borg_exit_codes=None,
-    ).and_yield(json.dumps({'archives': []}))
+    ).and_return(json.dumps({'archives': []}).encode())
     insert_logging_mock(logging.WARNING)
 
     with pytest.raises(ValueError):
@@ -376,13 +376,13 @@ def test_get_latest_archive_with_lock_wait_calls_borg_with_lock_wait_flags():
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     flexmock(module.environment).should_receive('make_environment')
     flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(None)
-    flexmock(module).should_receive('execute_command_and_capture_output').with_args(
+    flexmock(module).should_receive('execute_command_and_capture_raw_output').with_args(
         ('borg', 'list', '--log-json', '--lock-wait', 'okay', *BORG_LIST_LATEST_ARGUMENTS),
         environment=None,
         working_directory=None,
         borg_local_path='borg',
         borg_exit_codes=None,
-    ).and_yield(json.dumps({'archives': [expected_archive]}))
+    ).and_return(json.dumps({'archives': [expected_archive]}).encode())
     insert_logging_mock(logging.WARNING)
 
     assert (
@@ -409,13 +409,13 @@ def test_get_latest_archive_with_match_archives_calls_borg_with_match_archives_f
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     flexmock(module.environment).should_receive('make_environment')
     flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(None)
-    flexmock(module).should_receive('execute_command_and_capture_output').with_args(
+    flexmock(module).should_receive('execute_command_and_capture_raw_output').with_args(
         ('borg', 'list', '--log-json', '--match-archives', 'foo', *BORG_LIST_LATEST_ARGUMENTS),
         environment=None,
         working_directory=None,
         borg_local_path='borg',
         borg_exit_codes=None,
-    ).and_yield(json.dumps({'archives': [expected_archive]}))
+    ).and_return(json.dumps({'archives': [expected_archive]}).encode())
     insert_logging_mock(logging.WARNING)
 
     assert (
@@ -440,7 +440,7 @@ def test_get_latest_archive_calls_borg_with_list_extra_borg_options():
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     flexmock(module.environment).should_receive('make_environment')
     flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(None)
-    flexmock(module).should_receive('execute_command_and_capture_output').with_args(
+    flexmock(module).should_receive('execute_command_and_capture_raw_output').with_args(
         (
             'borg',
             'list',
@@ -454,7 +454,7 @@ def test_get_latest_archive_calls_borg_with_list_extra_borg_options():
         working_directory=None,
         borg_local_path='borg',
         borg_exit_codes=None,
-    ).and_yield(json.dumps({'archives': [expected_archive]}))
+    ).and_return(json.dumps({'archives': [expected_archive]}).encode())
     insert_logging_mock(logging.WARNING)
 
     assert (
@@ -479,7 +479,7 @@ def test_get_latest_archive_with_feature_available_calls_borg_with_repo_list_ext
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     flexmock(module.environment).should_receive('make_environment')
     flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(None)
-    flexmock(module).should_receive('execute_command_and_capture_output').with_args(
+    flexmock(module).should_receive('execute_command_and_capture_raw_output').with_args(
         (
             'borg',
             'repo-list',
@@ -493,7 +493,7 @@ def test_get_latest_archive_with_feature_available_calls_borg_with_repo_list_ext
         working_directory=None,
         borg_local_path='borg',
         borg_exit_codes=None,
-    ).and_yield(json.dumps({'archives': [expected_archive]}))
+    ).and_return(json.dumps({'archives': [expected_archive]}).encode())
     insert_logging_mock(logging.WARNING)
 
     assert (
@@ -521,13 +521,13 @@ def test_get_latest_archive_with_consider_checkpoints_calls_borg_with_consider_c
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('repo',))
     flexmock(module.environment).should_receive('make_environment')
     flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(None)
-    flexmock(module).should_receive('execute_command_and_capture_output').with_args(
+    flexmock(module).should_receive('execute_command_and_capture_raw_output').with_args(
         ('borg', 'list', '--log-json', '--consider-checkpoints', *BORG_LIST_LATEST_ARGUMENTS),
         environment=None,
         working_directory=None,
         borg_local_path='borg',
         borg_exit_codes=None,
-    ).and_yield(json.dumps({'archives': [expected_archive]}))
+    ).and_return(json.dumps({'archives': [expected_archive]}).encode())
     insert_logging_mock(logging.WARNING)
 
     assert (
@@ -556,13 +556,13 @@ def test_get_latest_archive_with_consider_checkpoints_and_feature_available_call
     flexmock(module.flags).should_receive('make_repository_flags').and_return(('--repo', 'repo'))
     flexmock(module.environment).should_receive('make_environment')
     flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(None)
-    flexmock(module).should_receive('execute_command_and_capture_output').with_args(
+    flexmock(module).should_receive('execute_command_and_capture_raw_output').with_args(
         ('borg', 'repo-list', '--log-json', *BORG_REPO_LIST_LATEST_ARGUMENTS),
         environment=None,
         working_directory=None,
         borg_local_path='borg',
         borg_exit_codes=None,
-    ).and_yield(json.dumps({'archives': [expected_archive]}))
+    ).and_return(json.dumps({'archives': [expected_archive]}).encode())
     insert_logging_mock(logging.WARNING)
 
     assert (
@@ -590,13 +590,13 @@ def test_get_latest_archive_calls_borg_with_working_directory():
     flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(
         '/working/dir',
     )
-    flexmock(module).should_receive('execute_command_and_capture_output').with_args(
+    flexmock(module).should_receive('execute_command_and_capture_raw_output').with_args(
         ('borg', 'list', '--log-json', *BORG_LIST_LATEST_ARGUMENTS),
         borg_local_path='borg',
         borg_exit_codes=None,
         environment=None,
         working_directory='/working/dir',
-    ).and_yield(json.dumps({'archives': [expected_archive]}))
+    ).and_return(json.dumps({'archives': [expected_archive]}).encode())
     insert_logging_mock(logging.WARNING)
 
     assert (
@@ -1211,7 +1211,10 @@ def test_list_repository_with_json_calls_borg_json_command_only():
     flexmock(module).should_receive('make_repo_list_command')
     flexmock(module.environment).should_receive('make_environment')
     flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(None)
-    flexmock(module).should_receive('execute_command_and_capture_output').and_yield('{}')
+    flexmock(module).should_receive('execute_command_and_capture_raw_output').and_return(
+        bytearray(b'{}')
+    )
+    flexmock(module).should_receive('execute_command_and_capture_output').never()
     insert_logging_mock(logging.WARNING)
     flexmock(module.flags).should_receive('warn_for_aggressive_archive_flags').never()
 
@@ -1,4 +1,5 @@
 import logging
+import os
 
 import pytest
 from flexmock import flexmock
@@ -10,7 +11,7 @@ from ..test_verbosity import insert_logging_mock
 VERSION = '1.2.3'
 
 
-def insert_execute_command_and_capture_output_mock(
+def insert_execute_command_and_capture_raw_output_mock(
     command,
     working_directory=None,
     borg_local_path='borg',
@@ -21,80 +22,217 @@ def insert_execute_command_and_capture_output_mock(
     flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(
         working_directory,
     )
-    flexmock(module).should_receive('execute_command_and_capture_output').with_args(
+    flexmock(module).should_receive('execute_command_and_capture_raw_output').with_args(
         command,
         environment=None,
         working_directory=working_directory,
         borg_local_path=borg_local_path,
         borg_exit_codes=borg_exit_codes,
-    ).and_yield(version_output).once()
+    ).and_return(version_output.encode()).once()
 
 
-def test_local_borg_version_calls_borg_with_required_parameters():
-    insert_execute_command_and_capture_output_mock(('borg', '--version', '--log-json'))
+def test_probe_local_borg_version_calls_borg_with_required_parameters():
+    insert_execute_command_and_capture_raw_output_mock(('borg', '--version', '--log-json'))
     insert_logging_mock(logging.WARNING)
     flexmock(module.environment).should_receive('make_environment')
 
-    assert module.local_borg_version({}) == VERSION
+    assert module.probe_local_borg_version({}) == VERSION
 
 
-def test_local_borg_version_with_log_info_calls_borg_with_info_parameter():
-    insert_execute_command_and_capture_output_mock(('borg', '--version', '--log-json', '--info'))
+def test_probe_local_borg_version_with_log_info_calls_borg_with_info_parameter():
+    insert_execute_command_and_capture_raw_output_mock(
+        ('borg', '--version', '--log-json', '--info')
+    )
     insert_logging_mock(logging.INFO)
     flexmock(module.environment).should_receive('make_environment')
 
-    assert module.local_borg_version({}) == VERSION
+    assert module.probe_local_borg_version({}) == VERSION
 
 
-def test_local_borg_version_with_log_debug_calls_borg_with_debug_parameters():
-    insert_execute_command_and_capture_output_mock(
+def test_probe_local_borg_version_with_log_debug_calls_borg_with_debug_parameters():
+    insert_execute_command_and_capture_raw_output_mock(
         ('borg', '--version', '--log-json', '--debug', '--show-rc')
     )
     insert_logging_mock(logging.DEBUG)
     flexmock(module.environment).should_receive('make_environment')
 
-    assert module.local_borg_version({}) == VERSION
+    assert module.probe_local_borg_version({}) == VERSION
 
 
-def test_local_borg_version_with_local_borg_path_calls_borg_with_it():
-    insert_execute_command_and_capture_output_mock(
+def test_probe_local_borg_version_with_local_borg_path_calls_borg_with_it():
+    insert_execute_command_and_capture_raw_output_mock(
         ('borg1', '--version', '--log-json'), borg_local_path='borg1'
     )
     insert_logging_mock(logging.WARNING)
     flexmock(module.environment).should_receive('make_environment')
 
-    assert module.local_borg_version({}, 'borg1') == VERSION
+    assert module.probe_local_borg_version({}, 'borg1') == VERSION
 
 
-def test_local_borg_version_with_borg_exit_codes_calls_using_with_them():
+def test_probe_local_borg_version_with_borg_exit_codes_calls_using_with_them():
     borg_exit_codes = flexmock()
-    insert_execute_command_and_capture_output_mock(
+    insert_execute_command_and_capture_raw_output_mock(
         ('borg', '--version', '--log-json'),
         borg_exit_codes=borg_exit_codes,
     )
     insert_logging_mock(logging.WARNING)
     flexmock(module.environment).should_receive('make_environment')
 
-    assert module.local_borg_version({'borg_exit_codes': borg_exit_codes}) == VERSION
+    assert module.probe_local_borg_version({'borg_exit_codes': borg_exit_codes}) == VERSION
 
 
-def test_local_borg_version_with_invalid_version_raises():
-    insert_execute_command_and_capture_output_mock(
+def test_probe_local_borg_version_with_invalid_version_raises():
+    insert_execute_command_and_capture_raw_output_mock(
         ('borg', '--version', '--log-json'), version_output='wtf'
     )
     insert_logging_mock(logging.WARNING)
     flexmock(module.environment).should_receive('make_environment')
 
     with pytest.raises(ValueError):
-        module.local_borg_version({})
+        module.probe_local_borg_version({})
 
 
-def test_local_borg_version_calls_borg_with_working_directory():
-    insert_execute_command_and_capture_output_mock(
+def test_probe_local_borg_version_calls_borg_with_working_directory():
+    insert_execute_command_and_capture_raw_output_mock(
         ('borg', '--version', '--log-json'),
         working_directory='/working/dir',
     )
     insert_logging_mock(logging.WARNING)
     flexmock(module.environment).should_receive('make_environment')
 
-    assert module.local_borg_version({'working_directory': '/working/dir'}) == VERSION
+    assert module.probe_local_borg_version({'working_directory': '/working/dir'}) == VERSION
+
+
+def test_get_binary_signature_includes_resolved_path_inode_size_and_mtime():
+    flexmock(module.shutil).should_receive('which').with_args('borg').and_return('/usr/bin/borg')
+    flexmock(module.os.path).should_receive('realpath').with_args('/usr/bin/borg').and_return(
+        '/opt/borg/bin/borg'
+    )
+    flexmock(module.os).should_receive('stat').with_args('/opt/borg/bin/borg').and_return(
+        flexmock(st_ino=123, st_size=456, st_mtime_ns=789)
+    )
+
+    assert module.get_binary_signature('borg') == '/opt/borg/bin/borg:123:456:789'
+
+
+def test_get_binary_signature_with_missing_binary_returns_none():
+    flexmock(module.shutil).should_receive('which').and_return(None)
+    flexmock(module.os).should_receive('stat').never()
+
+    assert module.get_binary_signature('borg') is None
+
+
+def test_get_binary_signature_with_stat_error_returns_none():
+    flexmock(module.shutil).should_receive('which').and_return('/usr/bin/borg')
+    flexmock(module.os.path).should_receive('realpath').and_return('/usr/bin/borg')
+    flexmock(module.os).should_receive('stat').and_raise(OSError)
+
+    assert module.get_binary_signature('borg') is None
+
+
+def test_make_version_cache_path_hashes_binary_signature_into_state_directory():
+    flexmock(module.borgmatic.config.paths).should_receive(
+        'get_borgmatic_state_directory'
+    ).and_return('/state')
+
+    assert module.make_version_cache_path({}, 'signature') == module.os.path.join(
+        '/state',
+        'borg',
+        'versions',
+        module.hashlib.sha256(b'signature').hexdigest(),
+    )
+
+
+def test_read_cached_version_reads_version_from_file(tmp_path):
+    cache_path = tmp_path / 'version'
+    cache_path.write_text('1.2.3\n')
+
+    assert module.read_cached_version(str(cache_path)) == '1.2.3'
+
+
+def test_read_cached_version_with_empty_file_returns_none(tmp_path):
+    cache_path = tmp_path / 'version'
+    cache_path.write_text('')
+
+    assert module.read_cached_version(str(cache_path)) is None
+
+
+def test_read_cached_version_with_missing_file_returns_none(tmp_path):
+    assert module.read_cached_version(str(tmp_path / 'version')) is None
+
+
+def test_read_cached_version_with_expired_file_returns_none(tmp_path):
+    cache_path = tmp_path / 'version'
+    cache_path.write_text('1.2.3\n')
+    expired_time = module.time.time() - module.MAXIMUM_CACHED_VERSION_AGE_SECONDS - 60
+    os.utime(cache_path, (expired_time, expired_time))
+
+    assert module.read_cached_version(str(cache_path)) is None
+
+
+def test_write_cached_version_writes_version_to_file(tmp_path):
+    cache_path = tmp_path / 'borg' / 'versions' / 'abc'
+
+    module.write_cached_version(str(cache_path), '1.2.3')
+
+    assert cache_path.read_text() == '1.2.3'
+    assert [path.name for path in cache_path.parent.iterdir()] == ['abc']
+
+
+def test_write_cached_version_with_error_swallows_it(tmp_path):
+    cache_path = tmp_path / 'borg' / 'versions' / 'abc'
+    flexmock(module.os).should_receive('replace').and_raise(PermissionError)
+
+    module.write_cached_version(str(cache_path), '1.2.3')
+
+    assert list(cache_path.parent.iterdir()) == []
+
+
+def test_local_borg_version_without_binary_signature_probes_borg():
+    flexmock(module).should_receive('get_binary_signature').and_return(None)
+    flexmock(module).should_receive('read_cached_version').never()
+    flexmock(module).should_receive('probe_local_borg_version').with_args({}, 'borg').and_return(
+        VERSION
+    ).once()
+    flexmock(module).should_receive('write_cached_version').never()
+
+    assert module.local_borg_version({}) == VERSION
+
+
+def test_local_borg_version_with_version_cached_in_memory_uses_it():
+    flexmock(module).should_receive('get_binary_signature').and_return('signature')
+    flexmock(module, version_by_binary_signature={'signature': VERSION})
+    flexmock(module).should_receive('read_cached_version').never()
+    flexmock(module).should_receive('probe_local_borg_version').never()
+
+    assert module.local_borg_version({}) == VERSION
+
+
+def test_local_borg_version_with_version_cached_on_disk_uses_it():
+    flexmock(module).should_receive('get_binary_signature').and_return('signature')
+    flexmock(module, version_by_binary_signature={})
+    flexmock(module).should_receive('make_version_cache_path').and_return('/state/version')
+    flexmock(module).should_receive('read_cached_version').with_args('/state/version').and_return(
+        VERSION
+    )
+    flexmock(module).should_receive('probe_local_borg_version').never()
+    flexmock(module).should_receive('write_cached_version').never()
+
+    assert module.local_borg_version({}) == VERSION
+    assert module.version_by_binary_signature == {'signature': VERSION}
+
+
+def test_local_borg_version_without_cached_version_probes_borg_and_caches_version():
+    flexmock(module).should_receive('get_binary_signature').and_return('signature')
+    flexmock(module, version_by_binary_signature={})
+    flexmock(module).should_receive('make_version_cache_path').and_return('/state/version')
+    flexmock(module).should_receive('read_cached_version').and_return(None)
+    flexmock(module).should_receive('probe_local_borg_version').with_args({}, 'borg1').and_return(
+        VERSION
+    ).once()
+    flexmock(module).should_receive('write_cached_version').with_args(
+        '/state/version', VERSION
+    ).once()
+
+    assert module.local_borg_version({}, 'borg1') == VERSION
+    assert module.version_by_binary_signature == {'signature': VERSION}
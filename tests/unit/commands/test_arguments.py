@@ -999,6 +999,12 @@ def test_add_array_element_arguments_adds_arguments_for_array_index_flags_with_d
     )
 
 
+def test_get_requested_flag_names_returns_long_flags_without_values_or_array_indices():
+    assert module.get_requested_flag_names(
+        ('-v', '2', '--foo', 'bar', '--baz=quux', '--things[3].name', 'x', 'create', '--no-stuff'),
+    ) == {'--foo', '--baz', '--things[0].name', '--no-stuff'}
+
+
 def test_add_arguments_from_schema_with_non_dict_schema_bails():
     arguments_group = flexmock()
     flexmock(module).should_receive('make_argument_description').never()
@@ -1384,3 +1390,128 @@ def test_add_arguments_from_schema_rewrites_option_name_to_flag_name():
         },
         unparsed_arguments=(),
     )
+
+
+def test_add_arguments_from_schema_with_requested_flag_names_only_adds_requested_flags():
+    arguments_group = flexmock()
+    flexmock(module).should_receive('make_argument_description').and_return('help')
+    flexmock(module.borgmatic.config.schema).should_receive('parse_type').and_return(str)
+    arguments_group.should_receive('add_argument').with_args(
+        '--foo',
+        type=str,
+        metavar='FOO',
+        help='help',
+    ).once()
+    arguments_group.should_receive('add_argument').with_args(
+        '-v',
+        '--verbosity',
+        type=str,
+        metavar='VERBOSITY',
+        help='help',
+    ).once()
+    arguments_group.should_receive('add_argument').with_args(
+        '--bar',
+        type=object,
+        metavar=object,
+        help=object,
+    ).never()
+    arguments_group.should_receive('set_defaults').with_args(bar=None).once()
+    flexmock(module).should_receive('add_array_element_arguments')
+
+    module.add_arguments_from_schema(
+        arguments_group=arguments_group,
+        schema={
+            'type': 'object',
+            'properties': {
+                'foo': {
+                    'type': 'string',
+                },
+                'bar': {
+                    'type': 'string',
+                },
+                'verbosity': {
+                    'type': 'string',
+                },
+            },
+        },
+        unparsed_arguments=('--foo', 'value'),
+        requested_flag_names={'--foo'},
+    )
+
+
+def test_add_arguments_from_schema_with_requested_no_flag_name_adds_boolean_flags():
+    arguments_group = flexmock()
+    flexmock(module).should_receive('make_argument_description').and_return('help')
+    flexmock(module.borgmatic.config.schema).should_receive('parse_type').and_return(bool)
+    arguments_group.should_receive('add_argument').with_args(
+        '--foo.bar',
+        action='store_true',
+        default=None,
+        help='help',
+    ).once()
+    arguments_group.should_receive('add_argument').with_args(
+        '--foo.no-bar',
+        dest='foo.bar',
+        action='store_false',
+        default=None,
+        help=object,
+    ).once()
+    arguments_group.should_receive('set_defaults').never()
+    flexmock(module).should_receive('add_array_element_arguments')
+
+    module.add_arguments_from_schema(
+        arguments_group=arguments_group,
+        schema={
+            'type': 'object',
+            'properties': {
+                'foo': {
+                    'type': 'object',
+                    'properties': {
+                        'bar': {
+                            'type': 'boolean',
+                        },
+                    },
+                },
+            },
+        },
+        unparsed_arguments=('--foo.no-bar',),
+        requested_flag_names={'--foo.no-bar'},
+    )
+
+
+def test_add_arguments_from_schema_with_requested_flag_names_passes_them_to_array_items():
+    arguments_group = flexmock()
+    flexmock(module).should_receive('make_argument_description').and_return('help')
+    flexmock(module.borgmatic.config.schema).should_receive('parse_type').and_return(str)
+    arguments_group.should_receive('add_argument').never()
+    arguments_group.should_receive('set_defaults').with_args(foo=None).once()
+    arguments_group.should_receive('set_defaults').with_args(**{'foo[0]': None}).once()
+    flexmock(module).should_receive('add_array_element_arguments')
+
+    module.add_arguments_from_schema(
+        arguments_group=arguments_group,
+        schema={
+            'type': 'object',
+            'properties': {
+                'foo': {
+                    'type': 'array',
+                    'items': {
+                        'type': 'string',
+                    },
+                },
+            },
+        },
+        unparsed_arguments=(),
+        requested_flag_names=set(),
+    )
+
+
+def test_get_requested_action_names_includes_named_actions_aliases_and_defaults():
+    flexmock(module).ACTION_ALIASES = {'action': ['-a'], 'other': ['-o'], 'unused': ['-u']}
+    flexmock(module).DEFAULT_ACTION_NAMES = ('default',)
+
+    assert module.get_requested_action_names(('--verbosity', '1', 'action', 'foo', '-o')) == {
+        'default',
+        'action',
+        'other',
+    }
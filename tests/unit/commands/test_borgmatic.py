@@ -1,5 +1,8 @@
+import collections
+import concurrent.futures
 import logging
 import subprocess
+import threading
 import time
 
 import pytest
@@ -55,9 +58,10 @@ def test_monitoring_hooks_with_non_primary_action_bails():
         pass
 
 
-def test_monitoring_hooks_pings_monitors():
+def test_monitoring_hooks_pings_monitors_within_a_new_monitoring_run():
     flexmock(module).should_receive('get_verbosity').and_return(module.logging.INFO)
     flexmock(module).should_receive('verbosity_to_log_level').and_return(flexmock())
+    monitoring_runs = []
     flexmock(module.dispatch).should_receive('call_hooks').with_args(
         'initialize_monitor',
         object,
@@ -65,6 +69,10 @@ def test_monitoring_hooks_pings_monitors():
         object,
         object,
         object,
+    ).replace_with(
+        lambda *args: monitoring_runs.append(
+            module.borgmatic.hooks.monitoring.logs.MONITORING_RUN.get()
+        )
     ).once()
     flexmock(module.dispatch).should_receive('call_hooks').with_args(
         'ping_monitor',
@@ -108,6 +116,10 @@ def test_monitoring_hooks_pings_monitors():
         object,
         object,
         object,
+    ).replace_with(
+        lambda *args: monitoring_runs.append(
+            module.borgmatic.hooks.monitoring.logs.MONITORING_RUN.get()
+        )
     ).once()
 
     with module.Monitoring_hooks(
@@ -118,6 +130,11 @@ def test_monitoring_hooks_pings_monitors():
     ):
         pass
 
+    assert len(monitoring_runs) == 2
+    assert monitoring_runs[0] is not None
+    assert monitoring_runs[0] is monitoring_runs[1]
+    assert module.borgmatic.hooks.monitoring.logs.MONITORING_RUN.get() is None
+
 
 def test_monitoring_hooks_with_start_ping_error_raises():
     flexmock(module).should_receive('get_verbosity').and_return(module.logging.INFO)
@@ -176,6 +193,8 @@ def test_monitoring_hooks_with_start_ping_error_raises():
     ):
         raise AssertionError()  # This should never get called.
 
+    assert module.borgmatic.hooks.monitoring.logs.MONITORING_RUN.get() is None
+
 
 def test_monitoring_hooks_with_log_ping_error_raises():
     flexmock(module).should_receive('get_verbosity').and_return(module.logging.INFO)
@@ -234,6 +253,8 @@ def test_monitoring_hooks_with_log_ping_error_raises():
     ):
         pass
 
+    assert module.borgmatic.hooks.monitoring.logs.MONITORING_RUN.get() is None
+
 
 def test_monitoring_hooks_with_finish_ping_error_raises():
     flexmock(module).should_receive('get_verbosity').and_return(module.logging.INFO)
@@ -427,6 +448,535 @@ def test_monitoring_hooks_with_fail_ping_error_raise_original_error():
         raise OSError()
 
 
+def test_get_requested_repository_returns_repository_flag_value():
+    arguments = {
+        'global': flexmock(),
+        'create': flexmock(repository=None),
+        'prune': flexmock(repository='repo'),
+    }
+
+    assert module.get_requested_repository(arguments) == 'repo'
+
+
+def test_get_requested_repository_without_repository_flag_returns_none():
+    arguments = {'global': flexmock(), 'create': flexmock(repository=None)}
+
+    assert module.get_requested_repository(arguments) is None
+
+
+@pytest.mark.parametrize(
+    'config,arguments,skip_actions',
+    (
+        (
+            {'repositories': [{'path': 'foo'}, {'path': 'bar'}]},
+            {'global': flexmock(dry_run=False), 'create': flexmock(repository=None)},
+            [],
+        ),
+        (
+            {'fan_out_create': True, 'repositories': [{'path': 'foo'}, {'path': 'bar'}]},
+            {'global': flexmock(dry_run=False), 'prune': flexmock(repository=None)},
+            [],
+        ),
+        (
+            {
+                'fan_out_create': True,
+                'progress': True,
+                'repositories': [{'path': 'foo'}, {'path': 'bar'}],
+            },
+            {'global': flexmock(dry_run=False), 'create': flexmock(repository=None)},
+            [],
+        ),
+        (
+            {'fan_out_create': True, 'repositories': [{'path': 'foo'}, {'path': 'bar'}]},
+            {'global': flexmock(dry_run=False), 'create': flexmock(repository=None)},
+            ['create'],
+        ),
+        (
+            {'fan_out_create': True, 'repositories': [{'path': 'foo'}]},
+            {'global': flexmock(dry_run=False), 'create': flexmock(repository=None)},
+            [],
+        ),
+        (
+            {'fan_out_create': True, 'repositories': [{'path': 'foo'}, {'path': 'bar'}]},
+            {
+                'global': flexmock(dry_run=False),
+                'repo-create': flexmock(repository=None),
+                'create': flexmock(repository=None),
+            },
+            [],
+        ),
+        (
+            {
+                'fan_out_create': True,
+                'repositories': [{'path': 'foo'}, {'path': 'bar'}],
+                'commands': [{'before': 'repository', 'run': ['mount-it']}],
+            },
+            {'global': flexmock(dry_run=False), 'create': flexmock(repository=None)},
+            [],
+        ),
+    ),
+)
+def test_run_fan_out_create_without_multiple_repositories_to_fan_out_to_bails(
+    config, arguments, skip_actions
+):
+    flexmock(module).should_receive('get_skip_actions').and_return(skip_actions)
+    flexmock(module.borgmatic.actions.create).should_receive('run_fan_out_create').never()
+
+    assert (
+        module.run_fan_out_create(
+            'test.yaml', config, ['/tmp/test.yaml'], arguments, '1.2.3', 'borg', None
+        )
+        == {}
+    )
+
+
+def test_run_fan_out_create_runs_create_for_all_repositories_within_command_hooks():
+    flexmock(module).should_receive('get_skip_actions').and_return([])
+    flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(
+        flexmock(),
+    )
+    flexmock(module.command).should_receive('Before_after_hooks').with_args(
+        command_hooks=object,
+        before_after='action',
+        umask=object,
+        working_directory=object,
+        dry_run=False,
+        action_names=('create',),
+        configuration_filename='test.yaml',
+        log_file=object,
+    ).and_return(flexmock()).once()
+    flexmock(module.borgmatic.execute).should_receive('Command_timeouts').and_return(flexmock())
+    config = {'fan_out_create': True, 'repositories': [{'path': 'foo'}, {'path': 'bar'}]}
+    create_arguments = flexmock(repository=None)
+    global_arguments = flexmock(dry_run=False)
+    create_futures = {'foo': flexmock(), 'bar': flexmock()}
+    flexmock(module.borgmatic.actions.create).should_receive('run_fan_out_create').with_args(
+        [{'path': 'foo'}, {'path': 'bar'}],
+        config,
+        ['/tmp/test.yaml'],
+        '1.2.3',
+        create_arguments,
+        global_arguments,
+        '',
+        'borg',
+        None,
+    ).and_return(create_futures).once()
+
+    assert (
+        module.run_fan_out_create(
+            'test.yaml',
+            config,
+            ['/tmp/test.yaml'],
+            {'global': global_arguments, 'create': create_arguments},
+            '1.2.3',
+            'borg',
+            None,
+        )
+        == create_futures
+    )
+
+
+def test_run_fan_out_create_with_skipped_action_before_create_and_other_hooks_fans_out():
+    flexmock(module).should_receive('get_skip_actions').and_return(['repo-create'])
+    flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(
+        flexmock(),
+    )
+    flexmock(module.command).should_receive('Before_after_hooks').and_return(flexmock())
+    flexmock(module.borgmatic.execute).should_receive('Command_timeouts').and_return(flexmock())
+    config = {
+        'fan_out_create': True,
+        'repositories': [{'path': 'foo'}, {'path': 'bar'}],
+        'commands': [
+            {'before': 'action', 'when': ['create'], 'run': ['foo']},
+            {'before': 'repository', 'when': ['prune'], 'run': ['bar']},
+        ],
+    }
+    create_futures = {'foo': flexmock(), 'bar': flexmock()}
+    flexmock(module.borgmatic.actions.create).should_receive('run_fan_out_create').and_return(
+        create_futures
+    ).once()
+
+    assert (
+        module.run_fan_out_create(
+            'test.yaml',
+            config,
+            ['/tmp/test.yaml'],
+            {
+                'global': flexmock(dry_run=False),
+                'repo-create': flexmock(repository=None),
+                'create': flexmock(repository=None),
+            },
+            '1.2.3',
+            'borg',
+            None,
+        )
+        == create_futures
+    )
+
+
+def test_run_fan_out_create_with_repository_flag_fans_out_to_matching_repositories_only():
+    flexmock(module).should_receive('get_skip_actions').and_return([])
+    flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(
+        flexmock(),
+    )
+    flexmock(module.command).should_receive('Before_after_hooks').and_return(flexmock())
+    flexmock(module.borgmatic.execute).should_receive('Command_timeouts').and_return(flexmock())
+    flexmock(module.borgmatic.config.validate).should_receive('repositories_match').with_args(
+        {'path': 'foo'}, 'foo'
+    ).and_return(True)
+    flexmock(module.borgmatic.config.validate).should_receive('repositories_match').with_args(
+        {'path': 'bar'}, 'foo'
+    ).and_return(False)
+    flexmock(module.borgmatic.actions.create).should_receive('run_fan_out_create').never()
+
+    assert (
+        module.run_fan_out_create(
+            'test.yaml',
+            {'fan_out_create': True, 'repositories': [{'path': 'foo'}, {'path': 'bar'}]},
+            ['/tmp/test.yaml'],
+            {'global': flexmock(dry_run=False), 'create': flexmock(repository='foo')},
+            '1.2.3',
+            'borg',
+            None,
+        )
+        == {}
+    )
+
+
+def test_run_fan_out_create_with_dry_run_passes_through_dry_run_label():
+    flexmock(module).should_receive('get_skip_actions').and_return([])
+    flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(
+        flexmock(),
+    )
+    flexmock(module.command).should_receive('Before_after_hooks').and_return(flexmock())
+    flexmock(module.borgmatic.execute).should_receive('Command_timeouts').and_return(flexmock())
+    flexmock(module.borgmatic.actions.create).should_receive('run_fan_out_create').with_args(
+        object,
+        object,
+        object,
+        object,
+        object,
+        object,
+        ' (dry run; not making any changes)',
+        object,
+        object,
+    ).and_return({}).once()
+
+    module.run_fan_out_create(
+        'test.yaml',
+        {'fan_out_create': True, 'repositories': [{'path': 'foo'}, {'path': 'bar'}]},
+        ['/tmp/test.yaml'],
+        {'global': flexmock(dry_run=True), 'create': flexmock(repository=None)},
+        '1.2.3',
+        'borg',
+        None,
+    )
+
+
+def test_run_fan_out_create_holds_repository_locks_in_consistent_order():
+    flexmock(module).should_receive('get_skip_actions').and_return([])
+    flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(
+        flexmock(),
+    )
+    flexmock(module.command).should_receive('Before_after_hooks').and_return(flexmock())
+    flexmock(module.borgmatic.execute).should_receive('Command_timeouts').and_return(flexmock())
+    entered_lock_paths = []
+
+    class Fake_repository_lock:
+        def __init__(self, config, repository, config_filename):
+            self.lock_path = f'/locks/{repository["path"]}.lock'
+
+        def __enter__(self):
+            entered_lock_paths.append(self.lock_path)
+
+        def __exit__(self, *args):
+            pass
+
+    flexmock(module.borgmatic.lock).should_receive('Repository_lock').replace_with(
+        Fake_repository_lock
+    )
+    flexmock(module.borgmatic.actions.create).should_receive('run_fan_out_create').and_return({})
+
+    module.run_fan_out_create(
+        'test.yaml',
+        {'fan_out_create': True, 'repositories': [{'path': 'foo'}, {'path': 'bar'}]},
+        ['/tmp/test.yaml'],
+        {'global': flexmock(dry_run=False), 'create': flexmock(repository=None)},
+        '1.2.3',
+        'borg',
+        None,
+    )
+
+    assert entered_lock_paths == ['/locks/bar.lock', '/locks/foo.lock']
+
+
+def test_run_fan_out_create_with_error_returns_failed_future_for_each_repository():
+    flexmock(module).should_receive('get_skip_actions').and_return([])
+    flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(
+        flexmock(),
+    )
+    flexmock(module.command).should_receive('Before_after_hooks').and_return(flexmock())
+    flexmock(module.borgmatic.execute).should_receive('Command_timeouts').and_return(flexmock())
+    error = ValueError('oops')
+    flexmock(module.borgmatic.actions.create).should_receive('run_fan_out_create').and_raise(error)
+
+    create_futures = module.run_fan_out_create(
+        'test.yaml',
+        {'fan_out_create': True, 'repositories': [{'path': 'foo'}, {'path': 'bar'}]},
+        ['/tmp/test.yaml'],
+        {'global': flexmock(dry_run=False), 'create': flexmock(repository=None)},
+        '1.2.3',
+        'borg',
+        None,
+    )
+
+    assert set(create_futures) == {'foo', 'bar'}
+    assert create_futures['foo'].exception() is error
+    assert create_futures['bar'].exception() is error
+
+
+def test_run_configuration_passes_fanned_out_create_outcome_to_each_repository():
+    flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
+    flexmock(module).should_receive('get_skip_actions').and_return([])
+    flexmock(module).should_receive('Monitoring_hooks').and_return(flexmock())
+    flexmock(module.command).should_receive('Before_after_hooks').and_return(flexmock())
+    flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    foo_future = flexmock()
+    bar_future = flexmock()
+    flexmock(module).should_receive('run_fan_out_create').and_return(
+        {'foo': foo_future, 'bar': bar_future}
+    )
+    flexmock(module).should_receive('Log_prefix').and_return(flexmock())
+    flexmock(module).should_receive('run_actions').with_args(
+        arguments=object,
+        config_filename=object,
+        config=object,
+        config_paths=object,
+        local_path=object,
+        remote_path=object,
+        local_borg_version=object,
+        repository={'path': 'foo'},
+        create_future=foo_future,
+    ).and_return([]).once()
+    flexmock(module).should_receive('run_actions').with_args(
+        arguments=object,
+        config_filename=object,
+        config=object,
+        config_paths=object,
+        local_path=object,
+        remote_path=object,
+        local_borg_version=object,
+        repository={'path': 'bar'},
+        create_future=bar_future,
+    ).and_return([]).once()
+    config = {'repositories': [{'path': 'foo'}, {'path': 'bar'}], 'fan_out_create': True}
+    arguments = {'global': flexmock(monitoring_verbosity=1, dry_run=False)}
+
+    assert list(module.run_configuration('test.yaml', config, ['/tmp/test.yaml'], arguments)) == []
+
+
+def test_log_repository_retry_logs_error_as_warning_and_retry_attempt():
+    error = OSError()
+    flexmock(module).should_receive('log_error_records').with_args(
+        'Error running actions for repository',
+        error,
+        levelno=logging.WARNING,
+        log_command_error_output=True,
+    ).and_return([flexmock()]).once()
+    flexmock(module.logger).should_receive('warning').with_args('Retrying... attempt 2/3').once()
+
+    module.log_repository_retry(error, retry_num=1, retries=3)
+
+
+def test_run_repository_actions_returns_results():
+    flexmock(module).should_receive('Log_prefix').with_args('repo').and_return(flexmock()).once()
+    expected_results = (flexmock(), flexmock())
+
+    def run_actions(**kwargs):
+        assert kwargs == {'repository': {'path': 'repo'}, 'config': {}, 'create_future': None}
+        yield from expected_results
+
+    flexmock(module).should_receive('run_actions').replace_with(run_actions)
+
+    assert module.run_repository_actions({'path': 'repo'}, config={}, create_future=None) == (
+        expected_results,
+        None,
+    )
+
+
+def test_run_repository_actions_with_error_returns_results_so_far_and_error():
+    flexmock(module).should_receive('Log_prefix').with_args('my repo').and_return(flexmock()).once()
+    result = flexmock()
+    error = ValueError()
+
+    def run_actions(**kwargs):
+        yield result
+        raise error
+
+    flexmock(module).should_receive('run_actions').replace_with(run_actions)
+
+    assert module.run_repository_actions({'path': 'repo', 'label': 'my repo'}, config={}) == (
+        (result,),
+        error,
+    )
+
+
+def test_run_repositories_concurrently_runs_actions_for_each_repository():
+    flexmock(module).should_receive('run_repository_actions').with_args(
+        {'path': 'foo'}, create_future=None, config={}
+    ).and_return((('foo result',), None)).once()
+    create_future = flexmock()
+    flexmock(module).should_receive('run_repository_actions').with_args(
+        {'path': 'bar'}, create_future=create_future, config={}
+    ).and_return((('bar result',), None)).once()
+    flexmock(module).should_receive('log_error_records').never()
+
+    generator = module.run_repositories_concurrently(
+        [{'path': 'foo'}, {'path': 'bar'}],
+        concurrency=2,
+        retries=0,
+        retry_wait=0,
+        create_futures={'bar': create_future},
+        config={},
+    )
+    results = []
+
+    with pytest.raises(StopIteration) as stop:
+        while True:
+            results.append(next(generator))
+
+    assert sorted(results) == ['bar result', 'foo result']
+    assert stop.value.value == (None, None)
+
+
+def test_run_repositories_concurrently_limits_repositories_running_at_once():
+    lock = threading.Lock()
+    running_counts = [0]
+    max_running_counts = [0]
+
+    def run_repository_actions(repository, **kwargs):
+        with lock:
+            running_counts[0] += 1
+            max_running_counts[0] = max(max_running_counts[0], running_counts[0])
+
+        time.sleep(0.05)
+
+        with lock:
+            running_counts[0] -= 1
+
+        return ((repository['path'],), None)
+
+    flexmock(module).should_receive('run_repository_actions').replace_with(run_repository_actions)
+
+    results = list(
+        module.run_repositories_concurrently(
+            [{'path': 'foo'}, {'path': 'bar'}, {'path': 'baz'}],
+            concurrency=2,
+            retries=0,
+            retry_wait=0,
+            create_futures={},
+        )
+    )
+
+    assert sorted(results) == ['bar', 'baz', 'foo']
+    assert max_running_counts[0] == 2
+
+
+def test_run_repositories_concurrently_retries_failed_repository_after_wait_without_blocking():
+    clock = [100.0]
+    flexmock(module.time).should_receive('monotonic').replace_with(lambda: clock[0])
+    flexmock(module.time).should_receive('sleep').with_args(10.0).replace_with(
+        lambda seconds: clock.__setitem__(0, clock[0] + seconds)
+    ).once()
+    error = OSError()
+    flexmock(module).should_receive('run_repository_actions').with_args(
+        {'path': 'foo'}, create_future=None
+    ).and_return(((), error)).and_return((('foo result',), None)).twice()
+    flexmock(module).should_receive('run_repository_actions').with_args(
+        {'path': 'bar'}, create_future=None
+    ).and_return((('bar result',), None)).once()
+    flexmock(module).should_receive('log_repository_retry').with_args(error, 0, 1).once()
+    flexmock(module).should_receive('log_error_records').never()
+
+    results = list(
+        module.run_repositories_concurrently(
+            [{'path': 'foo'}, {'path': 'bar'}],
+            concurrency=2,
+            retries=1,
+            retry_wait=10,
+            create_futures={},
+        )
+    )
+
+    assert sorted(results) == ['bar result', 'foo result']
+
+
+def test_run_repositories_concurrently_with_soft_failure_does_not_return_error():
+    error = subprocess.CalledProcessError(module.command.SOFT_FAIL_EXIT_CODE, 'try again')
+    flexmock(module).should_receive('run_repository_actions').and_return(((), error))
+    flexmock(module).should_receive('log_repository_retry').never()
+    flexmock(module).should_receive('log_error_records').never()
+
+    generator = module.run_repositories_concurrently(
+        [{'path': 'foo'}, {'path': 'bar'}],
+        concurrency=2,
+        retries=0,
+        retry_wait=0,
+        create_futures={},
+    )
+
+    with pytest.raises(StopIteration) as stop:
+        next(generator)
+
+    assert stop.value.value == (None, None)
+
+
+def test_run_repositories_concurrently_with_error_logs_it_and_returns_it():
+    error = ValueError()
+    flexmock(module).should_receive('run_repository_actions').with_args(
+        {'path': 'foo'}, create_future=None
+    ).and_return((('foo result',), None))
+    flexmock(module).should_receive('run_repository_actions').with_args(
+        {'path': 'bar'}, create_future=None
+    ).and_return((('bar result',), error))
+    flexmock(module).should_receive('log_repository_retry').never()
+    error_log = flexmock()
+    flexmock(module).should_receive('log_error_records').with_args(
+        'Error running actions for repository', error
+    ).and_return([error_log]).once()
+
+    generator = module.run_repositories_concurrently(
+        [{'path': 'foo'}, {'path': 'bar'}],
+        concurrency=2,
+        retries=0,
+        retry_wait=0,
+        create_futures={},
+    )
+    results = []
+
+    with pytest.raises(StopIteration) as stop:
+        while True:
+            results.append(next(generator))
+
+    assert set(results) == {'foo result', 'bar result', error_log}
+    assert stop.value.value == (error, {'path': 'bar'})
+
+
+def test_run_repositories_concurrently_with_unexpected_exception_raises():
+    flexmock(module).should_receive('run_repository_actions').and_raise(KeyError)
+
+    with pytest.raises(KeyError):
+        list(
+            module.run_repositories_concurrently(
+                [{'path': 'foo'}, {'path': 'bar'}],
+                concurrency=2,
+                retries=0,
+                retry_wait=0,
+                create_futures={},
+            )
+        )
+
+
 def test_run_configuration_runs_actions_for_each_repository():
     flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
     flexmock(module).should_receive('get_skip_actions').and_return([])
@@ -936,6 +1486,117 @@ def test_run_configuration_with_multiple_repositories_retries_with_timeout():
     assert results == error_logs
 
 
+def test_run_configuration_with_repository_concurrency_runs_repositories_concurrently():
+    flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
+    flexmock(module).should_receive('get_skip_actions').and_return([])
+    flexmock(module).should_receive('Monitoring_hooks').and_return(flexmock())
+    flexmock(module.command).should_receive('Before_after_hooks').and_return(flexmock())
+    flexmock(module.borg_version).should_receive('local_borg_version').and_return('1.2.3')
+    create_futures = {'foo': flexmock()}
+    flexmock(module).should_receive('run_fan_out_create').and_return(create_futures)
+    flexmock(module).should_receive('run_actions').never()
+    config = {
+        'repositories': [{'path': 'foo'}, {'path': 'bar'}],
+        'repository_concurrency': 2,
+        'retries': 1,
+        'retry_wait': 10,
+    }
+    arguments = {'global': flexmock(monitoring_verbosity=1, dry_run=False)}
+    expected_results = [flexmock(), flexmock()]
+
+    def run_repositories_concurrently(
+        repositories, concurrency, retries, retry_wait, create_futures_argument, **kwargs
+    ):
+        assert repositories == config['repositories']
+        assert (concurrency, retries, retry_wait) == (2, 1, 10)
+        assert create_futures_argument is create_futures
+        assert 'repository' not in kwargs
+        assert kwargs['local_borg_version'] == '1.2.3'
+        yield from expected_results
+
+        return (None, None)
+
+    flexmock(module).should_receive('run_repositories_concurrently').replace_with(
+        run_repositories_concurrently
+    )
+    flexmock(module.command).should_receive('execute_hooks').never()
+
+    results = list(module.run_configuration('test.yaml', config, ['/tmp/test.yaml'], arguments))
+
+    assert results == expected_results
+
+
+def test_run_configuration_with_repository_concurrency_and_error_runs_error_hooks():
+    flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
+    flexmock(module).should_receive('get_skip_actions').and_return([])
+    flexmock(module).should_receive('Monitoring_hooks').and_return(flexmock())
+    flexmock(module.command).should_receive('Before_after_hooks').and_return(flexmock())
+    flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module).should_receive('run_fan_out_create').and_return({})
+    error = OSError()
+    error_log = flexmock()
+
+    def run_repositories_concurrently(*args, **kwargs):
+        yield error_log
+
+        return (error, {'path': 'bar', 'label': 'Bar'})
+
+    flexmock(module).should_receive('run_repositories_concurrently').replace_with(
+        run_repositories_concurrently
+    )
+    configuration_error_logs = [flexmock()]
+    flexmock(module).should_receive('log_error_records').with_args(
+        'Error running configuration'
+    ).and_return(configuration_error_logs)
+    flexmock(module.command).should_receive('filter_hooks')
+    flexmock(module.command).should_receive('execute_hooks').with_args(
+        object,
+        object,
+        object,
+        False,
+        configuration_filename='test.yaml',
+        log_file='',
+        repository='bar',
+        repository_label='Bar',
+        error=error,
+        output='',
+    ).once()
+    config = {'repositories': [{'path': 'foo'}, {'path': 'bar'}], 'repository_concurrency': 2}
+    arguments = {'global': flexmock(monitoring_verbosity=1, dry_run=False)}
+
+    results = list(module.run_configuration('test.yaml', config, ['/tmp/test.yaml'], arguments))
+
+    assert results == [error_log, *configuration_error_logs]
+
+
+@pytest.mark.parametrize(
+    'config',
+    (
+        {'repositories': [{'path': 'foo'}], 'repository_concurrency': 2},
+        {
+            'repositories': [{'path': 'foo'}, {'path': 'bar'}],
+            'repository_concurrency': 2,
+            'progress': True,
+        },
+    ),
+)
+def test_run_configuration_with_repository_concurrency_but_nothing_to_run_concurrently_runs_serially(
+    config,
+):
+    flexmock(module).should_receive('verbosity_to_log_level').and_return(logging.INFO)
+    flexmock(module).should_receive('get_skip_actions').and_return([])
+    flexmock(module).should_receive('Monitoring_hooks').and_return(flexmock())
+    flexmock(module.command).should_receive('Before_after_hooks').and_return(flexmock())
+    flexmock(module.borg_version).should_receive('local_borg_version').and_return(flexmock())
+    flexmock(module).should_receive('run_fan_out_create').and_return({})
+    flexmock(module).should_receive('run_repositories_concurrently').never()
+    flexmock(module).should_receive('Log_prefix').and_return(flexmock())
+    flexmock(module).should_receive('run_actions').and_return([]).times(len(config['repositories']))
+    arguments = {'global': flexmock(monitoring_verbosity=1, dry_run=False)}
+
+    assert list(module.run_configuration('test.yaml', config, ['/tmp/test.yaml'], arguments)) == []
+
+
 def test_run_actions_runs_repo_create():
     flexmock(module).should_receive('add_custom_log_levels')
     flexmock(module).should_receive('get_skip_actions').and_return([])
@@ -1141,6 +1802,63 @@ def test_run_actions_runs_create():
     assert result == (expected,)
 
 
+def test_run_actions_with_create_future_yields_its_result_instead_of_running_create():
+    flexmock(module).should_receive('add_custom_log_levels')
+    flexmock(module).should_receive('get_skip_actions').and_return([])
+    flexmock(module.borgmatic.config.validate).should_receive('repositories_match').never()
+    flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(
+        flexmock(),
+    )
+    flexmock(module.command).should_receive('Before_after_hooks').and_return(flexmock()).once()
+    flexmock(borgmatic.actions.create).should_receive('run_create').never()
+    expected = flexmock()
+    create_future = concurrent.futures.Future()
+    create_future.set_result((expected,))
+
+    result = tuple(
+        module.run_actions(
+            arguments={'global': flexmock(dry_run=False), 'create': flexmock()},
+            config_filename=flexmock(),
+            config={'repositories': []},
+            config_paths=[],
+            local_path=flexmock(),
+            remote_path=flexmock(),
+            local_borg_version=flexmock(),
+            repository={'path': 'repo'},
+            create_future=create_future,
+        ),
+    )
+    assert result == (expected,)
+
+
+def test_run_actions_with_failed_create_future_raises_its_error():
+    flexmock(module).should_receive('add_custom_log_levels')
+    flexmock(module).should_receive('get_skip_actions').and_return([])
+    flexmock(module.borgmatic.config.validate).should_receive('repositories_match').never()
+    flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(
+        flexmock(),
+    )
+    flexmock(module.command).should_receive('Before_after_hooks').and_return(flexmock())
+    flexmock(borgmatic.actions.create).should_receive('run_create').never()
+    create_future = concurrent.futures.Future()
+    create_future.set_exception(ValueError('oops'))
+
+    with pytest.raises(ValueError):
+        tuple(
+            module.run_actions(
+                arguments={'global': flexmock(dry_run=False), 'create': flexmock()},
+                config_filename=flexmock(),
+                config={'repositories': []},
+                config_paths=[],
+                local_path=flexmock(),
+                remote_path=flexmock(),
+                local_borg_version=flexmock(),
+                repository={'path': 'repo'},
+                create_future=create_future,
+            ),
+        )
+
+
 def test_run_actions_with_skip_actions_does_not_run_action_or_action_command_hooks():
     flexmock(module).should_receive('add_custom_log_levels')
     flexmock(module).should_receive('get_skip_actions').and_return(['create'])
@@ -2176,6 +2894,190 @@ def test_collect_highlander_action_summary_logs_error_on_run_browse_failure():
     assert {log.levelno for log in logs} == {logging.CRITICAL}
 
 
+def test_get_configuration_hosts_returns_remote_repository_hosts():
+    flexmock(module.borgmatic.config.validate).should_receive('get_repository_host').with_args(
+        'ssh://user@foo.example.org/./repo'
+    ).and_return('foo.example.org')
+    flexmock(module.borgmatic.config.validate).should_receive('get_repository_host').with_args(
+        'user@foo.example.org:other'
+    ).and_return('foo.example.org')
+    flexmock(module.borgmatic.config.validate).should_receive('get_repository_host').with_args(
+        '/local/repo'
+    ).and_return(None)
+
+    assert module.get_configuration_hosts(
+        {
+            'repositories': [
+                {'path': 'ssh://user@foo.example.org/./repo'},
+                {'path': 'user@foo.example.org:other'},
+                {'path': '/local/repo'},
+            ]
+        }
+    ) == {'foo.example.org'}
+
+
+def test_get_configuration_hosts_without_repositories_returns_empty_set():
+    assert module.get_configuration_hosts({}) == set()
+
+
+def test_run_configuration_for_results_returns_results_list():
+    flexmock(module).should_receive('Log_prefix').with_args('test.yaml').and_return(
+        flexmock()
+    ).once()
+    expected_results = [flexmock(), flexmock()]
+    flexmock(module).should_receive('run_configuration').with_args(
+        'test.yaml', {}, ['/tmp/test.yaml'], {}
+    ).and_return(iter(expected_results))
+
+    assert (
+        module.run_configuration_for_results('test.yaml', {}, ['/tmp/test.yaml'], {})
+        == expected_results
+    )
+
+
+@pytest.mark.parametrize(
+    'configuration_concurrency,configs',
+    (
+        (1, {'foo.yaml': {}, 'bar.yaml': {}}),
+        (4, {'foo.yaml': {}}),
+    ),
+)
+def test_run_configurations_without_anything_to_run_concurrently_runs_serially(
+    configuration_concurrency, configs
+):
+    flexmock(module.concurrent.futures).should_receive('ThreadPoolExecutor').never()
+
+    for config_filename in configs:
+        flexmock(module).should_receive('run_configuration_for_results').with_args(
+            config_filename, {}, ['/tmp/test.yaml'], {}
+        ).and_return([config_filename]).once()
+
+    assert list(
+        module.run_configurations(
+            configs, ['/tmp/test.yaml'], {}, configuration_concurrency=configuration_concurrency
+        )
+    ) == [[config_filename] for config_filename in configs]
+
+
+def test_run_configurations_runs_configurations_concurrently_and_yields_results_in_order():
+    foo_started = threading.Event()
+    bar_finished = threading.Event()
+
+    def run_configuration_for_results(config_filename, config, config_paths, arguments):
+        if config_filename == 'foo.yaml':
+            foo_started.set()
+            # Finish after bar, to make sure results still come out in configuration order.
+            bar_finished.wait(timeout=5)
+        else:
+            foo_started.wait(timeout=5)
+            bar_finished.set()
+
+        return [config_filename]
+
+    flexmock(module).should_receive('get_configuration_hosts').and_return(set())
+    flexmock(module).should_receive('run_configuration_for_results').replace_with(
+        run_configuration_for_results
+    )
+
+    assert list(
+        module.run_configurations(
+            {'foo.yaml': {}, 'bar.yaml': {}}, ['/tmp/test.yaml'], {}, configuration_concurrency=2
+        )
+    ) == [['foo.yaml'], ['bar.yaml']]
+    assert bar_finished.is_set()
+
+
+def test_run_configurations_limits_configurations_running_at_once_overall_and_per_host():
+    lock = threading.Lock()
+    running = collections.Counter()
+    max_running = collections.Counter()
+    config_hosts = {
+        'a.yaml': {'one'},
+        'b.yaml': {'one'},
+        'c.yaml': {'one', 'two'},
+        'd.yaml': set(),
+        'e.yaml': set(),
+        'f.yaml': {'two'},
+    }
+
+    def run_configuration_for_results(config_filename, config, config_paths, arguments):
+        keys = {'total', *config_hosts[config_filename]}
+
+        with lock:
+            running.update(keys)
+
+            for key in keys:
+                max_running[key] = max(max_running[key], running[key])
+
+        time.sleep(0.02)
+
+        with lock:
+            running.subtract(keys)
+
+        return [config_filename]
+
+    flexmock(module).should_receive('get_configuration_hosts').replace_with(
+        lambda config: config_hosts[config['name']]
+    )
+    flexmock(module).should_receive('run_configuration_for_results').replace_with(
+        run_configuration_for_results
+    )
+    configs = {config_filename: {'name': config_filename} for config_filename in config_hosts}
+
+    assert list(
+        module.run_configurations(
+            configs,
+            ['/tmp/test.yaml'],
+            {},
+            configuration_concurrency=3,
+            host_concurrency=1,
+        )
+    ) == [[config_filename] for config_filename in configs]
+    assert max_running['total'] <= 3
+    assert max_running['one'] == 1
+    assert max_running['two'] == 1
+
+
+def test_run_configurations_with_unexpected_exception_raises():
+    flexmock(module).should_receive('get_configuration_hosts').and_return(set())
+    flexmock(module).should_receive('run_configuration_for_results').and_raise(KeyError)
+
+    with pytest.raises(KeyError):
+        list(
+            module.run_configurations(
+                {'foo.yaml': {}, 'bar.yaml': {}},
+                ['/tmp/test.yaml'],
+                {},
+                configuration_concurrency=2,
+            )
+        )
+
+
+def test_collect_configuration_run_summary_logs_passes_through_concurrency():
+    flexmock(module.validate).should_receive('guard_configuration_contains_repository')
+    flexmock(module.command).should_receive('filter_hooks')
+    flexmock(module.command).should_receive('execute_hooks')
+    flexmock(module).should_receive('Log_prefix').and_return(flexmock())
+    flexmock(module).should_receive('run_configurations').with_args(
+        {'foo.yaml': {}, 'bar.yaml': {}}, ['/tmp/test.yaml'], object, 4, 2
+    ).and_return(iter([[], []])).once()
+    arguments = {'global': flexmock(dry_run=False)}
+
+    logs = tuple(
+        module.collect_configuration_run_summary_logs(
+            {'foo.yaml': {}, 'bar.yaml': {}},
+            config_paths=['/tmp/test.yaml'],
+            arguments=arguments,
+            log_file_path=None,
+            configuration_concurrency=4,
+            host_concurrency=2,
+        ),
+    )
+
+    assert {log.levelno for log in logs} == {logging.INFO}
+    assert len(logs) == 2
+
+
 def test_collect_configuration_run_summary_logs_info_for_success():
     flexmock(module.validate).should_receive('guard_configuration_contains_repository')
     flexmock(module.command).should_receive('filter_hooks').with_args(
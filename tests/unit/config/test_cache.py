@@ -0,0 +1,223 @@
+import hashlib
+import io
+import json
+import logging
+import sys
+
+from flexmock import flexmock
+
+from borgmatic.config import cache as module
+
+
+def test_hash_file_hashes_file_contents():
+    builtins = flexmock(sys.modules['builtins'])
+    builtins.should_receive('open').with_args('/tmp/config.yaml', 'rb').and_return(
+        io.BytesIO(b'foo: bar')
+    )
+
+    assert module.hash_file('/tmp/config.yaml') == hashlib.sha256(b'foo: bar').hexdigest()
+
+
+def test_hash_environment_variables_hashes_set_variables_and_nones_unset_variables():
+    flexmock(module.os, environ={'FOO': 'value'})
+
+    assert module.hash_environment_variables(('FOO', 'BAR')) == {
+        'FOO': hashlib.sha256(b'value').hexdigest(),
+        'BAR': None,
+    }
+
+
+def test_get_referenced_variable_names_finds_variable_names_in_all_texts():
+    assert module.get_referenced_variable_names(
+        ('path: ${FOO}', 'other: ${BAR:-default} and $NOT_A_VARIABLE', 'nothing'),
+    ) == {'FOO', 'BAR'}
+
+
+def mock_configuration_cache():
+    flexmock(module.os.path).should_receive('abspath').and_return('/etc/borgmatic/config.yaml')
+    flexmock(module.os).should_receive('getcwd').and_return('/working')
+    flexmock(module.os.path).should_receive('expanduser').and_return('/root')
+    flexmock(module.importlib.metadata).should_receive('version').and_return('1.2.3')
+    flexmock(module.borgmatic.config.paths).should_receive(
+        'get_borgmatic_state_directory'
+    ).and_return('/state')
+    flexmock(module.time).should_receive('time_ns').and_return(10_000_000_000)
+
+    return module.Configuration_cache(
+        'config.yaml', ((('foo',), 'bar'),), ['baz=quux'], resolve_env=True
+    )
+
+
+def test_configuration_cache_path_is_keyed_by_inputs():
+    configuration_cache = mock_configuration_cache()
+
+    assert configuration_cache.path == (
+        '/state/configuration/'
+        + hashlib.sha256(
+            json.dumps(
+                [
+                    '/etc/borgmatic/config.yaml',
+                    '/working',
+                    '/root',
+                    '1.2.3',
+                    [[['foo'], 'bar']],
+                    ['baz=quux'],
+                    True,
+                ]
+            ).encode('utf-8')
+        ).hexdigest()
+        + '.json'
+    )
+
+
+def mock_cache_file(path, cache):
+    builtins = flexmock(sys.modules['builtins'])
+    builtins.should_receive('open').with_args(path, encoding='utf-8').and_return(
+        io.StringIO(json.dumps(cache))
+    )
+
+
+def test_configuration_cache_load_with_unchanged_files_and_environment_returns_cached_configuration():
+    configuration_cache = mock_configuration_cache()
+    mock_cache_file(
+        configuration_cache.path,
+        {
+            'file_hashes': {'config.yaml': 'hash1', 'common.yaml': 'hash2'},
+            'environment_hashes': {'FOO': 'hash3'},
+            'config': {'foo': 'bar'},
+            'logs': [{'levelno': logging.WARNING, 'levelname': 'WARNING', 'msg': 'Uh oh'}],
+        },
+    )
+    flexmock(module).should_receive('hash_file').with_args('config.yaml').and_return('hash1')
+    flexmock(module).should_receive('hash_file').with_args('common.yaml').and_return('hash2')
+    flexmock(module).should_receive('hash_environment_variables').and_return({'FOO': 'hash3'})
+
+    config, config_paths, logs = configuration_cache.load()
+
+    assert config == {'foo': 'bar'}
+    assert config_paths == {'config.yaml', 'common.yaml'}
+    assert [log.getMessage() for log in logs] == [
+        'Uh oh',
+        f'config.yaml: Using cached configuration from {configuration_cache.path}',
+    ]
+    assert logs[0].levelno == logging.WARNING
+
+
+def test_configuration_cache_load_with_changed_file_returns_none():
+    configuration_cache = mock_configuration_cache()
+    mock_cache_file(
+        configuration_cache.path,
+        {
+            'file_hashes': {'config.yaml': 'hash1', 'common.yaml': 'hash2'},
+            'environment_hashes': {},
+            'config': {'foo': 'bar'},
+            'logs': [],
+        },
+    )
+    flexmock(module).should_receive('hash_file').with_args('config.yaml').and_return('hash1')
+    flexmock(module).should_receive('hash_file').with_args('common.yaml').and_return('changed')
+    flexmock(module).should_receive('hash_environment_variables').never()
+
+    assert configuration_cache.load() is None
+
+
+def test_configuration_cache_load_with_changed_environment_variable_returns_none():
+    configuration_cache = mock_configuration_cache()
+    mock_cache_file(
+        configuration_cache.path,
+        {
+            'file_hashes': {'config.yaml': 'hash1'},
+            'environment_hashes': {'FOO': 'hash3'},
+            'config': {'foo': 'bar'},
+            'logs': [],
+        },
+    )
+    flexmock(module).should_receive('hash_file').and_return('hash1')
+    flexmock(module).should_receive('hash_environment_variables').and_return({'FOO': 'changed'})
+
+    assert configuration_cache.load() is None
+
+
+def test_configuration_cache_load_with_missing_cache_file_returns_none():
+    configuration_cache = mock_configuration_cache()
+    builtins = flexmock(sys.modules['builtins'])
+    builtins.should_receive('open').with_args(configuration_cache.path, encoding='utf-8').and_raise(
+        FileNotFoundError
+    )
+
+    assert configuration_cache.load() is None
+
+
+def test_configuration_cache_load_with_malformed_cache_returns_none():
+    configuration_cache = mock_configuration_cache()
+    mock_cache_file(configuration_cache.path, {'config': {'foo': 'bar'}})
+
+    assert configuration_cache.load() is None
+
+
+def mock_config_files(file_contents, mtime_ns=0):
+    builtins = flexmock(sys.modules['builtins'])
+
+    for path, contents in file_contents.items():
+        flexmock(module.os).should_receive('stat').with_args(path).and_return(
+            flexmock(st_mtime_ns=mtime_ns)
+        )
+        builtins.should_receive('open').with_args(path, 'rb').and_return(io.BytesIO(contents))
+
+
+def test_configuration_cache_save_writes_cache_file_atomically():
+    configuration_cache = mock_configuration_cache()
+    mock_config_files({'config.yaml': b'path: ${FOO}', 'common.yaml': b'keep_daily: 1'})
+    flexmock(module).should_receive('hash_environment_variables').with_args(['FOO']).and_return(
+        {'FOO': 'hash3'}
+    )
+    written = {}
+    flexmock(module.borgmatic.config.paths).should_receive('write_file_atomically').replace_with(
+        lambda path, contents: written.update({path: contents})
+    ).once()
+
+    configuration_cache.save(
+        {'foo': 'bar'},
+        {'config.yaml', 'common.yaml'},
+        (
+            logging.makeLogRecord(
+                dict(levelno=logging.WARNING, levelname='WARNING', msg='Uh oh'),
+            ),
+        ),
+    )
+
+    assert json.loads(written[configuration_cache.path]) == {
+        'file_hashes': {
+            'config.yaml': hashlib.sha256(b'path: ${FOO}').hexdigest(),
+            'common.yaml': hashlib.sha256(b'keep_daily: 1').hexdigest(),
+        },
+        'environment_hashes': {'FOO': 'hash3'},
+        'config': {'foo': 'bar'},
+        'logs': [{'levelno': logging.WARNING, 'levelname': 'WARNING', 'msg': 'Uh oh'}],
+    }
+
+
+def test_configuration_cache_save_with_recently_changed_file_bails():
+    configuration_cache = mock_configuration_cache()
+    mock_config_files({'config.yaml': b'foo: bar'}, mtime_ns=9_000_000_000)
+    flexmock(module.borgmatic.config.paths).should_receive('write_file_atomically').never()
+
+    configuration_cache.save({'foo': 'bar'}, {'config.yaml'}, ())
+
+
+def test_configuration_cache_save_with_configuration_that_changes_through_json_bails():
+    configuration_cache = mock_configuration_cache()
+    mock_config_files({'config.yaml': b'1: bar'})
+    flexmock(module.borgmatic.config.paths).should_receive('write_file_atomically').never()
+
+    configuration_cache.save({1: 'bar'}, {'config.yaml'}, ())
+
+
+def test_configuration_cache_save_with_write_error_swallows_it():
+    configuration_cache = mock_configuration_cache()
+    mock_config_files({'config.yaml': b'foo: bar'})
+    flexmock(module.borgmatic.config.paths).should_receive('write_file_atomically').and_raise(
+        PermissionError
+    )
+
+    configuration_cache.save({'foo': 'bar'}, {'config.yaml'}, ())
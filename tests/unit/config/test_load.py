@@ -4,10 +4,60 @@ from flexmock import flexmock
 from borgmatic.config import load as module
 
 
-def test_probe_and_include_file_with_absolute_path_skips_probing():
+def test_parse_included_configuration_loads_configuration_and_collects_included_paths():
+    module.parse_included_configuration.cache_clear()
+    flexmock(module).should_receive('load_configuration').replace_with(
+        lambda filename, config_paths: (
+            config_paths.update({filename, '/etc/nested.yaml'}) or {'foo': 'bar'}
+        )
+    ).once()
+
+    assert module.parse_included_configuration('/etc/include.yaml', (1, 2, 3, 4, 5)) == (
+        {'foo': 'bar'},
+        frozenset({'/etc/include.yaml', '/etc/nested.yaml'}),
+    )
+    assert module.parse_included_configuration('/etc/include.yaml', (1, 2, 3, 4, 5)) == (
+        {'foo': 'bar'},
+        frozenset({'/etc/include.yaml', '/etc/nested.yaml'}),
+    )
+
+
+def test_load_included_configuration_passes_stat_signature_and_copies_configuration():
+    config = {'foo': ['bar']}
+    config_paths = {'/etc/config.yaml'}
+    flexmock(module.os.path).should_receive('abspath').and_return('/etc/include.yaml')
+    flexmock(module.os).should_receive('stat').with_args('/etc/include.yaml').and_return(
+        flexmock(st_dev=1, st_ino=2, st_size=3, st_mtime_ns=4, st_ctime_ns=5)
+    )
+    flexmock(module).should_receive('parse_included_configuration').with_args(
+        '/etc/include.yaml', (1, 2, 3, 4, 5)
+    ).and_return((config, frozenset({'/etc/include.yaml', '/etc/nested.yaml'})))
+
+    loaded_config = module.load_included_configuration('include.yaml', config_paths)
+
+    assert loaded_config == config
+    assert loaded_config is not config
+    assert loaded_config['foo'] is not config['foo']
+    assert config_paths == {'/etc/config.yaml', '/etc/include.yaml', '/etc/nested.yaml'}
+
+
+def test_load_included_configuration_with_stat_error_loads_configuration_without_cache():
     config = flexmock()
     config_paths = set()
+    flexmock(module.os.path).should_receive('abspath').and_return('/etc/include.yaml')
+    flexmock(module.os).should_receive('stat').and_raise(FileNotFoundError)
+    flexmock(module).should_receive('parse_included_configuration').never()
     flexmock(module).should_receive('load_configuration').with_args(
+        'include.yaml', config_paths
+    ).and_return(config).once()
+
+    assert module.load_included_configuration('include.yaml', config_paths) == config
+
+
+def test_probe_and_include_file_with_absolute_path_skips_probing():
+    config = flexmock()
+    config_paths = set()
+    flexmock(module).should_receive('load_included_configuration').with_args(
         '/etc/include.yaml',
         config_paths,
     ).and_return(config).once()
@@ -26,11 +76,11 @@ def test_probe_and_include_file_with_relative_path_probes_include_directories():
     flexmock(module.os.path).should_receive('exists').with_args('/var/include.yaml').and_return(
         True,
     )
-    flexmock(module).should_receive('load_configuration').with_args(
+    flexmock(module).should_receive('load_included_configuration').with_args(
         '/etc/include.yaml',
         config_paths,
     ).never()
-    flexmock(module).should_receive('load_configuration').with_args(
+    flexmock(module).should_receive('load_included_configuration').with_args(
         '/var/include.yaml',
         config_paths,
     ).and_return(config).once()
@@ -42,7 +92,7 @@ def test_probe_and_include_file_with_relative_path_probes_include_directories():
 
 def test_probe_and_include_file_with_relative_path_and_missing_files_raises():
     flexmock(module.os.path).should_receive('exists').and_return(False)
-    flexmock(module).should_receive('load_configuration').never()
+    flexmock(module).should_receive('load_included_configuration').never()
 
     with pytest.raises(FileNotFoundError):
         module.probe_and_include_file('include.yaml', ['/etc', '/var'], config_paths=set())
@@ -1,3 +1,5 @@
+import os
+
 import pytest
 from flexmock import flexmock
 
@@ -62,6 +64,131 @@ def test_replace_temporary_subdirectory_with_glob_uses_custom_temporary_director
     )
 
 
+@pytest.mark.parametrize(
+    'path,expected_name',
+    (
+        ('/tmp/borgmatic-1234-aet8kn93/./borgmatic/bootstrap', 'borgmatic-1234-aet8kn93'),
+        ('borgmatic-1234-aet8kn93', 'borgmatic-1234-aet8kn93'),
+        ('/run/borgmatic', None),
+    ),
+)
+def test_get_temporary_directory_name_finds_first_temporary_subdirectory(path, expected_name):
+    assert module.get_temporary_directory_name(path) == expected_name
+
+
+@pytest.mark.parametrize(
+    'config,expected_result',
+    (
+        ({}, False),
+        ({'configuration_concurrency': 1, 'repository_concurrency': 1}, False),
+        ({'configuration_concurrency': 2}, True),
+        ({'repository_concurrency': 3}, True),
+    ),
+)
+def test_concurrency_enabled_checks_concurrency_options(config, expected_result):
+    assert module.concurrency_enabled(config) == expected_result
+
+
+@pytest.mark.parametrize(
+    'name,expected_process_id',
+    (
+        ('borgmatic-1234-aet8kn93', 1234),
+        ('borgmatic-aet8kn93', None),
+        ('borgmatic-x-abc', None),
+        ('borgmatic-1234', None),
+    ),
+)
+def test_get_temporary_directory_process_id_parses_process_id(name, expected_process_id):
+    assert module.get_temporary_directory_process_id(name) == expected_process_id
+
+
+@pytest.mark.parametrize(
+    'path,expected_name',
+    (
+        ('/tmp/borgmatic-1234-aet8kn93/./borgmatic', 'borgmatic-1234-aet8kn93'),
+        ('/tmp/borgmatic-aet8kn93/./borgmatic', None),
+        ('/run/borgmatic', None),
+    ),
+)
+def test_get_run_scoped_temporary_directory_name_only_returns_name_with_process_id(
+    path, expected_name
+):
+    assert module.get_run_scoped_temporary_directory_name(path) == expected_name
+
+
+def test_temporary_directory_in_use_elsewhere_without_concurrency_for_current_run_returns_false():
+    flexmock(module.os).should_receive('kill').never()
+
+    assert not module.temporary_directory_in_use_elsewhere(
+        'borgmatic-5678-def', '/tmp/borgmatic-aet8kn93/./borgmatic'
+    )
+
+
+@pytest.mark.parametrize(
+    'path',
+    (
+        '/run/borgmatic/postgresql_databases',
+        '/tmp/borgmatic-1234-abc/./borgmatic/postgresql_databases',
+        '/tmp/borgmatic-aet8kn93/./borgmatic/postgresql_databases',
+        '/tmp/borgmatic-x-abc/./borgmatic/postgresql_databases',
+        'borgmatic-1234',
+    ),
+)
+def test_temporary_directory_in_use_elsewhere_with_current_or_legacy_path_returns_false(path):
+    flexmock(module.os).should_receive('kill').never()
+
+    assert not module.temporary_directory_in_use_elsewhere(
+        path, '/tmp/borgmatic-1234-abc/./borgmatic'
+    )
+
+
+def test_temporary_directory_in_use_elsewhere_with_active_directory_of_this_process_returns_true():
+    flexmock(module.os).should_receive('getpid').and_return(1234)
+    flexmock(module, ACTIVE_TEMPORARY_DIRECTORY_NAMES={'borgmatic-1234-abc', 'borgmatic-1234-def'})
+    flexmock(module.os).should_receive('kill').never()
+
+    assert module.temporary_directory_in_use_elsewhere(
+        '/tmp/borgmatic-1234-def/./borgmatic', '/tmp/borgmatic-1234-abc/./borgmatic'
+    )
+
+
+def test_temporary_directory_in_use_elsewhere_with_inactive_directory_of_this_process_returns_false():
+    flexmock(module.os).should_receive('getpid').and_return(1234)
+    flexmock(module, ACTIVE_TEMPORARY_DIRECTORY_NAMES={'borgmatic-1234-abc'})
+    flexmock(module.os).should_receive('kill').never()
+
+    assert not module.temporary_directory_in_use_elsewhere(
+        'borgmatic-1234-def', '/tmp/borgmatic-1234-abc/./borgmatic'
+    )
+
+
+def test_temporary_directory_in_use_elsewhere_with_live_process_returns_true():
+    flexmock(module.os).should_receive('getpid').and_return(1234)
+    flexmock(module.os).should_receive('kill').with_args(5678, 0).once()
+
+    assert module.temporary_directory_in_use_elsewhere(
+        'borgmatic-5678-def', '/tmp/borgmatic-1234-abc/./borgmatic'
+    )
+
+
+def test_temporary_directory_in_use_elsewhere_with_live_process_of_other_user_returns_true():
+    flexmock(module.os).should_receive('getpid').and_return(1234)
+    flexmock(module.os).should_receive('kill').and_raise(PermissionError)
+
+    assert module.temporary_directory_in_use_elsewhere(
+        'borgmatic-5678-def', '/tmp/borgmatic-1234-abc/./borgmatic'
+    )
+
+
+def test_temporary_directory_in_use_elsewhere_with_dead_process_returns_false():
+    flexmock(module.os).should_receive('getpid').and_return(1234)
+    flexmock(module.os).should_receive('kill').and_raise(ProcessLookupError)
+
+    assert not module.temporary_directory_in_use_elsewhere(
+        'borgmatic-5678-def', '/tmp/borgmatic-1234-abc/./borgmatic'
+    )
+
+
 def test_runtime_directory_uses_config_option():
     flexmock(module).should_receive('expand_user_in_path').replace_with(lambda path: path)
     temporary_directory = flexmock(name='/run/borgmatic-1234')
@@ -75,6 +202,25 @@ def test_runtime_directory_uses_config_option():
 
     with module.Runtime_directory(config) as borgmatic_runtime_directory:
         assert borgmatic_runtime_directory == '/run/borgmatic-1234/./borgmatic'
+        assert 'borgmatic-1234' not in module.ACTIVE_TEMPORARY_DIRECTORY_NAMES
+
+
+def test_runtime_directory_with_concurrency_enabled_includes_process_id_and_tracks_directory():
+    flexmock(module).should_receive('expand_user_in_path').replace_with(lambda path: path)
+    temporary_directory = flexmock(name='/run/borgmatic-1234-abc')
+    temporary_directory.should_receive('cleanup').once()
+    flexmock(module.tempfile).should_receive('TemporaryDirectory').with_args(
+        prefix=f'borgmatic-{module.os.getpid()}-',
+        dir='/run',
+    ).and_return(temporary_directory)
+    flexmock(module.os).should_receive('makedirs')
+    config = {'user_runtime_directory': '/run', 'repository_concurrency': 2}
+
+    with module.Runtime_directory(config) as borgmatic_runtime_directory:
+        assert borgmatic_runtime_directory == '/run/borgmatic-1234-abc/./borgmatic'
+        assert 'borgmatic-1234-abc' in module.ACTIVE_TEMPORARY_DIRECTORY_NAMES
+
+    assert 'borgmatic-1234-abc' not in module.ACTIVE_TEMPORARY_DIRECTORY_NAMES
 
 
 def test_runtime_directory_with_relative_config_option_errors():
@@ -358,3 +504,33 @@ def test_resolve_systemd_directory_multiple():
         module.resolve_systemd_directory(module.Systemd_directories.STATE_DIRECTORY)
         == '/var/lib/borgmatic'
     )
+
+
+def test_write_file_atomically_writes_contents_to_owner_only_file(tmp_path):
+    path = tmp_path / 'state' / 'file.json'
+
+    module.write_file_atomically(str(path), 'contents')
+
+    assert path.read_text() == 'contents'
+    assert oct(os.stat(path).st_mode & 0o777) == '0o600'
+    assert oct(os.stat(path.parent).st_mode & 0o777) == '0o700'
+    assert [entry.name for entry in path.parent.iterdir()] == ['file.json']
+
+
+def test_write_file_atomically_replaces_existing_file(tmp_path):
+    path = tmp_path / 'file.json'
+    path.write_text('old')
+
+    module.write_file_atomically(str(path), 'new')
+
+    assert path.read_text() == 'new'
+
+
+def test_write_file_atomically_with_error_removes_temporary_file_and_raises(tmp_path):
+    path = tmp_path / 'state' / 'file.json'
+    flexmock(module.os).should_receive('replace').and_raise(PermissionError)
+
+    with pytest.raises(PermissionError):
+        module.write_file_atomically(str(path), 'contents')
+
+    assert list(path.parent.iterdir()) == []
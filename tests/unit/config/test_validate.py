@@ -1,3 +1,4 @@
+import json
 import os
 import sys
 from io import StringIO
@@ -30,6 +31,117 @@ def test_schema_filename_raises_filenotfounderror():
         module.schema_filename()
 
 
+def test_precompiled_schema_filename_swaps_extension_for_json():
+    assert module.precompiled_schema_filename('/config/schema.yaml') == '/config/schema.json'
+
+
+def test_hash_schema_hashes_file_contents(tmp_path):
+    schema_path = tmp_path / 'schema.yaml'
+    schema_path.write_text('type: object')
+    other_schema_path = tmp_path / 'other.yaml'
+    other_schema_path.write_text('type: array')
+
+    assert module.hash_schema(str(schema_path)) == module.hash_schema(str(schema_path))
+    assert module.hash_schema(str(schema_path)) != module.hash_schema(str(other_schema_path))
+
+
+def test_load_precompiled_schema_with_up_to_date_precompiled_schema_returns_it(tmp_path):
+    schema_path = tmp_path / 'schema.yaml'
+    schema_path.write_text('type: object')
+    (tmp_path / 'schema.json').write_text(
+        json.dumps(
+            {'schema_sha256': module.hash_schema(str(schema_path)), 'schema': {'type': 'object'}}
+        )
+    )
+
+    assert module.load_precompiled_schema(str(schema_path)) == {'type': 'object'}
+
+
+def test_load_precompiled_schema_with_stale_precompiled_schema_returns_none(tmp_path):
+    schema_path = tmp_path / 'schema.yaml'
+    schema_path.write_text('type: object')
+    (tmp_path / 'schema.json').write_text(
+        json.dumps({'schema_sha256': 'abcd', 'schema': {'type': 'array'}})
+    )
+
+    assert module.load_precompiled_schema(str(schema_path)) is None
+
+
+@pytest.mark.parametrize('precompiled_contents', (None, 'not json', '[]'))
+def test_load_precompiled_schema_with_missing_or_invalid_precompiled_schema_returns_none(
+    tmp_path, precompiled_contents
+):
+    schema_path = tmp_path / 'schema.yaml'
+    schema_path.write_text('type: object')
+
+    if precompiled_contents is not None:
+        (tmp_path / 'schema.json').write_text(precompiled_contents)
+
+    assert module.load_precompiled_schema(str(schema_path)) is None
+
+
+def test_precompile_schema_writes_loadable_precompiled_schema(tmp_path):
+    schema_path = tmp_path / 'schema.yaml'
+    schema_path.write_text('type: object\nproperties:\n    foo:\n        type: string\n')
+
+    assert module.precompile_schema(str(schema_path)) == str(tmp_path / 'schema.json')
+    assert module.load_precompiled_schema(str(schema_path)) == {
+        'type': 'object',
+        'properties': {'foo': {'type': 'string'}},
+    }
+
+
+def test_load_schema_prefers_precompiled_schema():
+    module.load_schema.cache_clear()
+    schema = {'type': 'object'}
+    flexmock(module).should_receive('load_precompiled_schema').with_args('/schema.yaml').and_return(
+        schema
+    )
+    flexmock(module.load).should_receive('load_configuration').never()
+
+    assert module.load_schema('/schema.yaml') is schema
+
+    module.load_schema.cache_clear()
+
+
+def test_load_schema_loads_schema_once_per_path():
+    module.load_schema.cache_clear()
+    schema = {'type': 'object'}
+    flexmock(module).should_receive('load_precompiled_schema').and_return(None).once()
+    flexmock(module.load).should_receive('load_configuration').with_args('/schema.yaml').and_return(
+        schema
+    ).once()
+
+    assert module.load_schema('/schema.yaml') is schema
+    assert module.load_schema('/schema.yaml') is schema
+
+    module.load_schema.cache_clear()
+
+
+def test_load_schema_with_parse_error_raises_validation_error():
+    module.load_schema.cache_clear()
+    flexmock(module).should_receive('load_precompiled_schema').and_return(None)
+    flexmock(module.load).should_receive('load_configuration').and_raise(RecursionError)
+
+    with pytest.raises(module.Validation_error):
+        module.load_schema('/schema.yaml')
+
+
+def test_get_schema_validator_constructs_validator_once_per_path():
+    module.get_schema_validator.cache_clear()
+    schema = {'type': 'object'}
+    flexmock(module).should_receive('load_schema').with_args('/schema.yaml').and_return(schema)
+    validator = flexmock()
+    flexmock(module.jsonschema).should_receive('Draft7Validator').with_args(schema).and_return(
+        validator
+    ).once()
+
+    assert module.get_schema_validator('/schema.yaml') is validator
+    assert module.get_schema_validator('/schema.yaml') is validator
+
+    module.get_schema_validator.cache_clear()
+
+
 def test_format_json_error_path_element_formats_array_index():
     assert module.format_json_error_path_element(3) == '[3]'
 
@@ -164,6 +276,25 @@ def test_normalize_repository_path_resolves_relative_repository_with_base_dir():
     assert module.normalize_repository_path(repository, base) == absolute
 
 
+@pytest.mark.parametrize(
+    'repository_path,expected_host',
+    (
+        ('/var/lib/repo', None),
+        ('relative/repo', None),
+        ('file:///var/lib/repo', None),
+        ('ssh://user@example.org:22/./repo', 'example.org'),
+        ('ssh://example.org/./repo', 'example.org'),
+        ('sftp://user@Example.org/repo', 'example.org'),
+        ('user@example.org:repo', 'example.org'),
+        ('example.org:repo', 'example.org'),
+    ),
+)
+def test_get_repository_host_parses_host_from_remote_repository_path(
+    repository_path, expected_host
+):
+    assert module.get_repository_host(repository_path) == expected_host
+
+
 @pytest.mark.parametrize(
     'first,second,expected_result',
     (
@@ -162,6 +162,30 @@ def test_remove_data_source_dumps_deletes_manifest_and_parent_directory():
     )
 
 
+def test_remove_data_source_dumps_skips_manifest_in_use_by_other_run():
+    flexmock(module.borgmatic.config.paths).should_receive(
+        'replace_temporary_subdirectory_with_glob',
+    ).and_return('/run/borgmatic-*/borgmatic')
+    flexmock(module.glob).should_receive('glob').and_return(
+        ['/run/borgmatic-5678-def/borgmatic/bootstrap']
+    )
+    flexmock(module.borgmatic.config.paths).should_receive(
+        'temporary_directory_in_use_elsewhere'
+    ).with_args(
+        '/run/borgmatic-5678-def/borgmatic/bootstrap', '/run/borgmatic-1234-abc/./borgmatic'
+    ).and_return(True)
+    flexmock(module.os).should_receive('remove').never()
+    flexmock(module.os).should_receive('rmdir').never()
+
+    module.remove_data_source_dumps(
+        hook_config=None,
+        config={},
+        borgmatic_runtime_directory='/run/borgmatic-1234-abc/./borgmatic',
+        patterns=flexmock(),
+        dry_run=False,
+    )
+
+
 def test_remove_data_source_dumps_with_dry_run_bails():
     flexmock(module.borgmatic.config.paths).should_receive(
         'replace_temporary_subdirectory_with_glob',
@@ -147,6 +147,25 @@ def test_remove_data_source_dumps_removes_dump_path():
     module.remove_data_source_dumps('databases', 'SuperDB', dry_run=False)
 
 
+def test_remove_data_source_dumps_skips_dump_paths_in_use_by_other_runs():
+    flexmock(module.borgmatic.config.paths).should_receive(
+        'replace_temporary_subdirectory_with_glob'
+    ).and_return(flexmock())
+    flexmock(module.glob).should_receive('glob').and_return(['databases', 'other'])
+    flexmock(module.borgmatic.config.paths).should_receive(
+        'temporary_directory_in_use_elsewhere'
+    ).with_args('databases', 'databases').and_return(False)
+    flexmock(module.borgmatic.config.paths).should_receive(
+        'temporary_directory_in_use_elsewhere'
+    ).with_args('other', 'databases').and_return(True)
+    flexmock(module.shutil).should_receive('rmtree').with_args(
+        'databases', ignore_errors=True
+    ).once()
+    flexmock(module.shutil).should_receive('rmtree').with_args('other', ignore_errors=True).never()
+
+    module.remove_data_source_dumps('databases', 'SuperDB', dry_run=False)
+
+
 def test_remove_data_source_dumps_with_dry_run_skips_removal():
     flexmock(module.borgmatic.config.paths).should_receive(
         'replace_temporary_subdirectory_with_glob'
@@ -7,9 +7,9 @@ from borgmatic.hooks.data_source import lvm as module
 
 def test_get_logical_volumes_filters_by_patterns():
     flexmock(module.borgmatic.execute).should_receive(
-        'execute_command_and_capture_output',
-    ).and_yield(
-        *'''
+        'execute_command_and_capture_raw_output',
+    ).and_return(
+        b'''
         {
             "blockdevices": [
                 {
@@ -35,7 +35,7 @@ def test_get_logical_volumes_filters_by_patterns():
                 }
             ]
         }
-        '''.splitlines(),
+        ''',
     )
     contained = {
         Pattern('/mnt/lvolume', source=Pattern_source.CONFIG),
@@ -80,9 +80,9 @@ def test_get_logical_volumes_filters_by_patterns():
 
 def test_get_logical_volumes_skips_non_root_patterns():
     flexmock(module.borgmatic.execute).should_receive(
-        'execute_command_and_capture_output',
-    ).and_yield(
-        *'''
+        'execute_command_and_capture_raw_output',
+    ).and_return(
+        b'''
         {
             "blockdevices": [
                 {
@@ -93,7 +93,7 @@ def test_get_logical_volumes_skips_non_root_patterns():
                 }
             ]
         }
-        '''.splitlines(),
+        ''',
     )
     contained = {
         Pattern('/mnt/lvolume', type=Pattern_type.EXCLUDE, source=Pattern_source.CONFIG),
@@ -129,9 +129,9 @@ def test_get_logical_volumes_skips_non_root_patterns():
 
 def test_get_logical_volumes_skips_non_config_patterns():
     flexmock(module.borgmatic.execute).should_receive(
-        'execute_command_and_capture_output',
-    ).and_yield(
-        *'''
+        'execute_command_and_capture_raw_output',
+    ).and_return(
+        b'''
         {
             "blockdevices": [
                 {
@@ -142,7 +142,7 @@ def test_get_logical_volumes_skips_non_config_patterns():
                 }
             ]
         }
-        '''.splitlines(),
+        ''',
     )
     contained = {
         Pattern('/mnt/lvolume', source=Pattern_source.HOOK),
@@ -174,8 +174,8 @@ def test_get_logical_volumes_skips_non_config_patterns():
 
 def test_get_logical_volumes_with_invalid_lsblk_json_errors():
     flexmock(module.borgmatic.execute).should_receive(
-        'execute_command_and_capture_output',
-    ).and_yield('{')
+        'execute_command_and_capture_raw_output',
+    ).and_return(b'{')
 
     flexmock(module.borgmatic.hooks.data_source.snapshot).should_receive(
         'get_contained_patterns',
@@ -190,8 +190,8 @@ def test_get_logical_volumes_with_invalid_lsblk_json_errors():
 
 def test_get_logical_volumes_with_lsblk_json_missing_keys_errors():
     flexmock(module.borgmatic.execute).should_receive(
-        'execute_command_and_capture_output',
-    ).and_yield('{"block_devices": [{}]}')
+        'execute_command_and_capture_raw_output',
+    ).and_return(b'{"block_devices": [{}]}')
 
     flexmock(module.borgmatic.hooks.data_source.snapshot).should_receive(
         'get_contained_patterns',
@@ -390,6 +390,53 @@ def test_dump_data_sources_snapshots_and_mounts_and_replaces_patterns():
     )
 
 
+def test_dump_data_sources_with_run_scoped_runtime_directory_names_snapshots_after_it():
+    config = {'lvm': {}}
+    logical_volume = module.Logical_volume(
+        name='lvolume1',
+        device_path='/dev/lvolume1',
+        mount_point='/mnt/lvolume1',
+        contained_patterns=(Pattern('/mnt/lvolume1/subdir'),),
+    )
+    flexmock(module).should_receive('get_logical_volumes').and_return((logical_volume,))
+    flexmock(module).should_receive('snapshot_logical_volume').with_args(
+        'lvcreate',
+        'lvolume1_borgmatic-1234-abc',
+        '/dev/lvolume1',
+        module.DEFAULT_SNAPSHOT_SIZE,
+    ).once()
+    flexmock(module).should_receive('get_snapshots').with_args(
+        'lvs',
+        snapshot_name='lvolume1_borgmatic-1234-abc',
+    ).and_return(
+        (module.Snapshot(name='lvolume1_borgmatic-1234-abc', device_path='/dev/lvolume1_snap'),),
+    )
+    flexmock(module.hashlib).should_receive('shake_256').and_return(
+        flexmock(hexdigest=lambda length: 'b33f'),
+    )
+    flexmock(module).should_receive('mount_snapshot').with_args(
+        'mount',
+        '/dev/lvolume1_snap',
+        '/run/borgmatic-1234-abc/borgmatic/lvm_snapshots/b33f/mnt/lvolume1',
+    ).once()
+    flexmock(module).should_receive('make_borg_snapshot_pattern').and_return(
+        Pattern('/run/borgmatic-1234-abc/borgmatic/lvm_snapshots/b33f/./mnt/lvolume1/subdir')
+    )
+    flexmock(module.borgmatic.hooks.data_source.config).should_receive('replace_pattern')
+
+    assert (
+        module.dump_data_sources(
+            hook_config=config['lvm'],
+            config=config,
+            config_paths=('test.yaml',),
+            borgmatic_runtime_directory='/run/borgmatic-1234-abc/./borgmatic',
+            patterns=[Pattern('/mnt/lvolume1/subdir')],
+            dry_run=False,
+        )
+        == []
+    )
+
+
 def test_dump_data_sources_with_no_logical_volumes_skips_snapshots():
     config = {'lvm': {}}
     patterns = [Pattern('/mnt/lvolume1/subdir'), Pattern('/mnt/lvolume2')]
@@ -800,9 +847,9 @@ def test_dump_data_sources_with_missing_snapshot_errors():
 
 def test_get_snapshots_lists_all_snapshots():
     flexmock(module.borgmatic.execute).should_receive(
-        'execute_command_and_capture_output',
-    ).and_yield(
-        *'''
+        'execute_command_and_capture_raw_output',
+    ).and_return(
+        b'''
           {
               "report": [
                   {
@@ -815,7 +862,7 @@ def test_get_snapshots_lists_all_snapshots():
               "log": [
               ]
           }
-        '''.splitlines(),
+        ''',
     )
 
     assert module.get_snapshots('lvs') == (
@@ -826,9 +873,9 @@ def test_get_snapshots_lists_all_snapshots():
 
 def test_get_snapshots_with_snapshot_name_lists_just_that_snapshot():
     flexmock(module.borgmatic.execute).should_receive(
-        'execute_command_and_capture_output',
+        'execute_command_and_capture_raw_output',
     ).and_return(
-        *'''
+        b'''
           {
               "report": [
                   {
@@ -841,7 +888,7 @@ def test_get_snapshots_with_snapshot_name_lists_just_that_snapshot():
               "log": [
               ]
           }
-        '''.splitlines(),
+        ''',
     )
 
     assert module.get_snapshots('lvs', snapshot_name='snap2') == (
@@ -851,8 +898,8 @@ def test_get_snapshots_with_snapshot_name_lists_just_that_snapshot():
 
 def test_get_snapshots_with_invalid_lvs_json_errors():
     flexmock(module.borgmatic.execute).should_receive(
-        'execute_command_and_capture_output',
-    ).and_yield('{')
+        'execute_command_and_capture_raw_output',
+    ).and_return(b'{')
 
     with pytest.raises(ValueError):
         assert module.get_snapshots('lvs')
@@ -860,15 +907,15 @@ def test_get_snapshots_with_invalid_lvs_json_errors():
 
 def test_get_snapshots_with_lvs_json_missing_report_errors():
     flexmock(module.borgmatic.execute).should_receive(
-        'execute_command_and_capture_output',
-    ).and_yield(
-        *'''
+        'execute_command_and_capture_raw_output',
+    ).and_return(
+        b'''
           {
               "report": [],
               "log": [
               ]
           }
-        '''.splitlines(),
+        ''',
     )
 
     with pytest.raises(ValueError):
@@ -877,9 +924,9 @@ def test_get_snapshots_with_lvs_json_missing_report_errors():
 
 def test_get_snapshots_with_lvs_json_missing_keys_errors():
     flexmock(module.borgmatic.execute).should_receive(
-        'execute_command_and_capture_output',
-    ).and_yield(
-        *'''
+        'execute_command_and_capture_raw_output',
+    ).and_return(
+        b'''
           {
               "report": [
                   {
@@ -891,7 +938,7 @@ def test_get_snapshots_with_lvs_json_missing_keys_errors():
               "log": [
               ]
           }
-        '''.splitlines(),
+        ''',
     )
 
     with pytest.raises(ValueError):
@@ -956,6 +1003,58 @@ def test_remove_data_source_dumps_unmounts_and_remove_snapshots():
     )
 
 
+def test_remove_data_source_dumps_skips_snapshots_in_use_by_other_runs():
+    config = {'lvm': {}}
+    flexmock(module).should_receive('get_logical_volumes').and_return(
+        (
+            module.Logical_volume(
+                name='lvolume1',
+                device_path='/dev/lvolume1',
+                mount_point='/mnt/lvolume1',
+                contained_patterns=(Pattern('/mnt/lvolume1/subdir'),),
+            ),
+        ),
+    )
+    flexmock(module.borgmatic.config.paths).should_receive(
+        'replace_temporary_subdirectory_with_glob',
+    ).and_return('/run/borgmatic-*/borgmatic')
+    flexmock(module.glob).should_receive('glob').and_return(
+        ['/run/borgmatic-5678-def/borgmatic/lvm_snapshots/b33f']
+    )
+    flexmock(module.os.path).should_receive('isdir').and_return(True)
+    flexmock(module.borgmatic.config.paths).should_receive(
+        'temporary_directory_in_use_elsewhere'
+    ).with_args('/run/borgmatic-5678-def/borgmatic/lvm_snapshots/b33f', object).and_return(True)
+    flexmock(module.borgmatic.config.paths).should_receive(
+        'temporary_directory_in_use_elsewhere'
+    ).with_args('borgmatic-1234-a_b', object).and_return(False)
+    flexmock(module.borgmatic.config.paths).should_receive(
+        'temporary_directory_in_use_elsewhere'
+    ).with_args('borgmatic-5678-def', object).and_return(True)
+    flexmock(module.shutil).should_receive('rmtree').never()
+    flexmock(module).should_receive('unmount_snapshot').never()
+    flexmock(module).should_receive('get_snapshots').and_return(
+        (
+            module.Snapshot('lvolume1_borgmatic-1234-a_b', '/dev/lvolume1-mine'),
+            module.Snapshot('lvolume1_borgmatic-5678-def', '/dev/lvolume1-theirs'),
+        ),
+    )
+    flexmock(module).should_receive('remove_snapshot').with_args(
+        'lvremove', '/dev/lvolume1-mine'
+    ).once()
+    flexmock(module).should_receive('remove_snapshot').with_args(
+        'lvremove', '/dev/lvolume1-theirs'
+    ).never()
+
+    module.remove_data_source_dumps(
+        hook_config=config['lvm'],
+        config=config,
+        borgmatic_runtime_directory='/run/borgmatic-1234-a_b/./borgmatic',
+        patterns=flexmock(),
+        dry_run=False,
+    )
+
+
 def test_remove_data_source_dumps_bails_for_missing_lvm_configuration():
     flexmock(module).should_receive('get_logical_volumes').never()
     flexmock(module.borgmatic.config.paths).should_receive(
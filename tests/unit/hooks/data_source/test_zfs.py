@@ -354,6 +354,43 @@ def test_dump_data_sources_snapshots_and_mounts_and_replaces_patterns():
     )
 
 
+def test_dump_data_sources_with_run_scoped_runtime_directory_names_snapshots_after_it():
+    dataset = flexmock(
+        name='dataset',
+        mount_point='/mnt/dataset',
+        contained_patterns=(Pattern('/mnt/dataset/subdir'),),
+    )
+    flexmock(module).should_receive('get_datasets_to_backup').and_return((dataset,))
+    flexmock(module).should_receive('snapshot_dataset').with_args(
+        'zfs',
+        'dataset@borgmatic-1234-abc',
+    ).once()
+    flexmock(module.hashlib).should_receive('shake_256').and_return(
+        flexmock(hexdigest=lambda length: 'b33f'),
+    )
+    flexmock(module).should_receive('mount_snapshot').with_args(
+        'mount',
+        'dataset@borgmatic-1234-abc',
+        '/run/borgmatic-1234-abc/borgmatic/zfs_snapshots/b33f/mnt/dataset',
+    ).once()
+    flexmock(module).should_receive('make_borg_snapshot_pattern').and_return(
+        Pattern('/run/borgmatic-1234-abc/borgmatic/zfs_snapshots/b33f/./mnt/dataset/subdir')
+    )
+    flexmock(module.borgmatic.hooks.data_source.config).should_receive('replace_pattern')
+
+    assert (
+        module.dump_data_sources(
+            hook_config={},
+            config={'source_directories': '/mnt/dataset', 'zfs': {}},
+            config_paths=('test.yaml',),
+            borgmatic_runtime_directory='/run/borgmatic-1234-abc/./borgmatic',
+            patterns=[Pattern('/mnt/dataset/subdir')],
+            dry_run=False,
+        )
+        == []
+    )
+
+
 def test_dump_data_sources_with_no_datasets_skips_snapshots():
     flexmock(module).should_receive('get_datasets_to_backup').and_return(())
     flexmock(module.os).should_receive('getpid').and_return(1234)
@@ -554,6 +591,50 @@ def test_remove_data_source_dumps_unmounts_and_destroys_snapshots():
     )
 
 
+def test_remove_data_source_dumps_skips_snapshots_in_use_by_other_runs():
+    flexmock(module).should_receive('get_all_dataset_mount_points').and_return(
+        {'dataset': '/mnt/dataset'}
+    )
+    flexmock(module).should_receive('get_all_snapshots').and_return(
+        ('dataset@borgmatic-1234-abc', 'dataset@borgmatic-5678-def'),
+    )
+    flexmock(module.borgmatic.config.paths).should_receive(
+        'replace_temporary_subdirectory_with_glob',
+    ).and_return('/run/borgmatic-*/borgmatic')
+    flexmock(module.hashlib).should_receive('shake_256').and_return(
+        flexmock(hexdigest=lambda length: 'b33f')
+    )
+    flexmock(module.glob).should_receive('glob').and_return(
+        ['/run/borgmatic-5678-def/borgmatic/zfs_snapshots/b33f']
+    )
+    flexmock(module.os.path).should_receive('isdir').and_return(True)
+    flexmock(module.borgmatic.config.paths).should_receive(
+        'temporary_directory_in_use_elsewhere'
+    ).with_args('/run/borgmatic-5678-def/borgmatic/zfs_snapshots/b33f', object).and_return(True)
+    flexmock(module.borgmatic.config.paths).should_receive(
+        'temporary_directory_in_use_elsewhere'
+    ).with_args('borgmatic-1234-abc', object).and_return(False)
+    flexmock(module.borgmatic.config.paths).should_receive(
+        'temporary_directory_in_use_elsewhere'
+    ).with_args('borgmatic-5678-def', object).and_return(True)
+    flexmock(module.shutil).should_receive('rmtree').never()
+    flexmock(module).should_receive('unmount_snapshot').never()
+    flexmock(module).should_receive('destroy_snapshot').with_args(
+        'zfs', 'dataset@borgmatic-1234-abc'
+    ).once()
+    flexmock(module).should_receive('destroy_snapshot').with_args(
+        'zfs', 'dataset@borgmatic-5678-def'
+    ).never()
+
+    module.remove_data_source_dumps(
+        hook_config={},
+        config={'source_directories': '/mnt/dataset', 'zfs': {}},
+        borgmatic_runtime_directory='/run/borgmatic-1234-abc/./borgmatic',
+        patterns=flexmock(),
+        dry_run=False,
+    )
+
+
 def test_remove_data_source_dumps_use_custom_commands():
     flexmock(module).should_receive('get_all_dataset_mount_points').and_return(
         {'dataset': '/mnt/dataset'}
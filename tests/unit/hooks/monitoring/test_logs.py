@@ -1,3 +1,6 @@
+import contextvars
+import logging
+
 import pytest
 from flexmock import flexmock
 
@@ -39,6 +42,35 @@ def test_forgetful_buffering_handler_emit_forgets_log_records_when_capacity_reac
     assert handler.forgot
 
 
+def test_forgetful_buffering_handler_filter_accepts_log_records_from_its_own_monitoring_run():
+    def make_handler_and_filter():
+        module.MONITORING_RUN.set(object())
+        handler = module.Forgetful_buffering_handler(
+            identifier='test', byte_capacity=100, log_level=1
+        )
+
+        return handler.filter(logging.makeLogRecord({'msg': 'foo'}))
+
+    assert contextvars.copy_context().run(make_handler_and_filter)
+
+
+def test_forgetful_buffering_handler_filter_rejects_log_records_from_another_monitoring_run():
+    def make_handler():
+        module.MONITORING_RUN.set(object())
+
+        return module.Forgetful_buffering_handler(identifier='test', byte_capacity=100, log_level=1)
+
+    handler = contextvars.copy_context().run(make_handler)
+
+    def filter_in_other_run():
+        module.MONITORING_RUN.set(object())
+
+        return handler.filter(logging.makeLogRecord({'msg': 'foo'}))
+
+    assert not contextvars.copy_context().run(filter_in_other_run)
+    assert not handler.filter(logging.makeLogRecord({'msg': 'foo'}))
+
+
 def test_add_handler_does_not_raise():
     logger = flexmock(handlers=[flexmock(level=0)])
     flexmock(module.logging).should_receive('getLogger').and_return(logger)
@@ -62,6 +94,21 @@ def test_get_handler_matches_by_identifier():
     assert module.get_handler('test') == handlers[3]
 
 
+def test_get_handler_skips_handler_from_another_monitoring_run():
+    def make_handler():
+        module.MONITORING_RUN.set(object())
+
+        return module.Forgetful_buffering_handler(identifier='test', byte_capacity=100, log_level=1)
+
+    handlers = [
+        contextvars.copy_context().run(make_handler),
+        module.Forgetful_buffering_handler(identifier='test', byte_capacity=100, log_level=1),
+    ]
+    flexmock(module.logging.getLogger(), handlers=handlers)
+
+    assert module.get_handler('test') == handlers[1]
+
+
 def test_get_handler_without_match_raises():
     handlers = [
         flexmock(),
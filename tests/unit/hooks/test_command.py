@@ -205,6 +205,7 @@ def test_execute_hooks_invokes_each_hook_and_command():
             environment={},
             working_directory=None,
             close_fds=True,
+            umask=None,
         ).once()
 
     module.execute_hooks(
@@ -215,14 +216,38 @@ def test_execute_hooks_invokes_each_hook_and_command():
     )
 
 
-def test_execute_hooks_with_umask_sets_that_umask():
+def test_execute_hooks_with_timeouts_executes_commands_with_them():
+    flexmock(module.borgmatic.logger).should_receive('add_custom_log_levels')
+    flexmock(module.logging).ANSWER = LOGGING_ANSWER
+    flexmock(module).should_receive('interpolate_context').replace_with(
+        lambda hook_description, command, context: command,
+    )
+    flexmock(module).should_receive('make_environment').and_return({})
+    flexmock(module.borgmatic.execute).should_receive('execute_command').replace_with(
+        lambda *args, **kwargs: assert_command_timeouts((10, 20)),
+    ).once()
+
+    module.execute_hooks(
+        [{'before': 'create', 'run': ['foo'], 'timeouts': {'soft': 10, 'hard': 20}}],
+        umask=None,
+        working_directory=None,
+        dry_run=False,
+    )
+
+    assert module.borgmatic.execute.COMMAND_TIMEOUTS.get() == (None, None)
+
+
+def assert_command_timeouts(expected_timeouts):
+    assert module.borgmatic.execute.COMMAND_TIMEOUTS.get() == expected_timeouts
+
+
+def test_execute_hooks_with_umask_runs_command_with_that_umask():
     flexmock(module.borgmatic.logger).should_receive('add_custom_log_levels')
     flexmock(module.logging).ANSWER = LOGGING_ANSWER
     flexmock(module).should_receive('interpolate_context').replace_with(
         lambda hook_description, command, context: command,
     )
-    flexmock(module.os).should_receive('umask').with_args(0o77).and_return(0o22).once()
-    flexmock(module.os).should_receive('umask').with_args(0o22).once()
+    flexmock(module.os).should_receive('umask').never()
     flexmock(module).should_receive('make_environment').and_return({})
     flexmock(module.borgmatic.execute).should_receive('execute_command').with_args(
         ['foo'],
@@ -231,7 +256,8 @@ def test_execute_hooks_with_umask_sets_that_umask():
         environment={},
         working_directory=None,
         close_fds=True,
-    )
+        umask=0o77,
+    ).once()
 
     module.execute_hooks(
         [{'before': 'create', 'run': ['foo']}],
@@ -255,6 +281,7 @@ def test_execute_hooks_with_working_directory_executes_command_with_it():
         environment={},
         working_directory='/working',
         close_fds=True,
+        umask=None,
     )
 
     module.execute_hooks(
@@ -300,6 +327,7 @@ def test_execute_hooks_with_error_logs_as_error():
         environment={},
         working_directory=None,
         close_fds=True,
+        umask=None,
     ).once()
 
     module.execute_hooks(
@@ -345,6 +373,7 @@ def test_execute_hooks_without_commands_to_run_does_not_raise():
             environment={},
             working_directory=None,
             close_fds=True,
+            umask=None,
         ).once()
 
     module.execute_hooks(
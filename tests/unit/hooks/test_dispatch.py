@@ -12,21 +12,88 @@ def hook_function(hook_config, config, thing, value):
     '''
 
 
+@pytest.fixture(autouse=True)
+def clear_hook_registry_caches():
+    for function in (module.get_hook_names, module.get_hook_type, module.get_hook_module):
+        function.cache_clear()
+
+
+def test_get_hook_names_returns_submodule_names_of_hook_package():
+    flexmock(module.importlib).should_receive('import_module').with_args(
+        'borgmatic.hooks.monitoring'
+    ).and_return(flexmock(__path__=['/hooks/monitoring']))
+    flexmock(module).should_receive('get_submodule_names').and_return(
+        ('super_hook', 'other_hook'),
+    ).once()
+
+    assert module.get_hook_names(module.Hook_type.MONITORING) == ('super_hook', 'other_hook')
+    assert module.get_hook_names(module.Hook_type.MONITORING) == ('super_hook', 'other_hook')
+
+
+def test_get_hook_names_with_function_name_returns_only_hooks_implementing_it():
+    flexmock(module).should_receive('get_submodule_names').and_return(
+        ('super_hook', 'other_hook', 'not_a_hook'),
+    ).once()
+    flexmock(module).should_receive('get_hook_module').with_args(
+        module.Hook_type.MONITORING, 'super_hook'
+    ).and_return(flexmock(do_stuff=lambda: None))
+    flexmock(module).should_receive('get_hook_module').with_args(
+        module.Hook_type.MONITORING, 'other_hook'
+    ).and_return(flexmock())
+    flexmock(module).should_receive('get_hook_module').with_args(
+        module.Hook_type.MONITORING, 'not_a_hook'
+    ).and_return(None)
+
+    assert module.get_hook_names(module.Hook_type.MONITORING, 'do_stuff') == ('super_hook',)
+    assert module.get_hook_names(module.Hook_type.MONITORING, 'other_stuff') == ()
+
+
+def test_get_hook_type_returns_type_of_first_hook_package_containing_module():
+    flexmock(module).should_receive('get_hook_names').with_args(
+        module.Hook_type.CREDENTIAL
+    ).and_return(('other_hook',))
+    flexmock(module).should_receive('get_hook_names').with_args(
+        module.Hook_type.DATA_SOURCE
+    ).and_return(('super_hook',))
+    flexmock(module).should_receive('get_hook_names').with_args(
+        module.Hook_type.MONITORING
+    ).and_return(('super_hook',))
+
+    assert module.get_hook_type('super_hook') == module.Hook_type.DATA_SOURCE
+
+
+def test_get_hook_type_without_corresponding_module_raises():
+    flexmock(module).should_receive('get_hook_names').and_return(('other_hook',))
+
+    with pytest.raises(ValueError):
+        module.get_hook_type('super_hook')
+
+
+def test_get_hook_module_imports_and_returns_module():
+    test_module = flexmock()
+    flexmock(module.importlib).should_receive('import_module').with_args(
+        'borgmatic.hooks.monitoring.super_hook',
+    ).and_return(test_module).once()
+
+    assert module.get_hook_module(module.Hook_type.MONITORING, 'super_hook') == test_module
+    assert module.get_hook_module(module.Hook_type.MONITORING, 'super_hook') == test_module
+
+
+def test_get_hook_module_with_non_hook_module_returns_none():
+    flexmock(module.importlib).should_receive('import_module').and_return(flexmock(IS_A_HOOK=False))
+
+    assert module.get_hook_module(module.Hook_type.MONITORING, 'not_a_hook') is None
+
+
 def test_call_hook_invokes_module_function_with_arguments_and_returns_value():
     config = {'super_hook': flexmock(), 'other_hook': flexmock()}
     expected_return_value = flexmock()
     test_module = sys.modules[__name__]
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.credential,
-    ).and_return(['other_hook'])
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.data_source,
-    ).and_return(['other_hook'])
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.monitoring,
-    ).and_return(['super_hook', 'third_hook'])
-    flexmock(module.importlib).should_receive('import_module').with_args(
-        'borgmatic.hooks.monitoring.super_hook',
+    flexmock(module).should_receive('get_hook_type').with_args('super_hook').and_return(
+        module.Hook_type.MONITORING
+    )
+    flexmock(module).should_receive('get_hook_module').with_args(
+        module.Hook_type.MONITORING, 'super_hook'
     ).and_return(test_module)
     flexmock(test_module).should_receive('hook_function').with_args(
         config['super_hook'],
@@ -44,17 +111,11 @@ def test_call_hook_probes_config_with_databases_suffix():
     config = {'super_hook_databases': flexmock(), 'other_hook': flexmock()}
     expected_return_value = flexmock()
     test_module = sys.modules[__name__]
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.credential,
-    ).and_return(['other_hook'])
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.data_source,
-    ).and_return(['other_hook'])
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.monitoring,
-    ).and_return(['super_hook', 'third_hook'])
-    flexmock(module.importlib).should_receive('import_module').with_args(
-        'borgmatic.hooks.monitoring.super_hook',
+    flexmock(module).should_receive('get_hook_type').with_args('super_hook').and_return(
+        module.Hook_type.MONITORING
+    )
+    flexmock(module).should_receive('get_hook_module').with_args(
+        module.Hook_type.MONITORING, 'super_hook'
     ).and_return(test_module)
     flexmock(test_module).should_receive('hook_function').with_args(
         config['super_hook_databases'],
@@ -72,17 +133,11 @@ def test_call_hook_strips_databases_suffix_from_hook_name():
     config = {'super_hook_databases': flexmock(), 'other_hook_databases': flexmock()}
     expected_return_value = flexmock()
     test_module = sys.modules[__name__]
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.credential,
-    ).and_return(['other_hook'])
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.data_source,
-    ).and_return(['other_hook'])
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.monitoring,
-    ).and_return(['super_hook', 'third_hook'])
-    flexmock(module.importlib).should_receive('import_module').with_args(
-        'borgmatic.hooks.monitoring.super_hook',
+    flexmock(module).should_receive('get_hook_type').with_args('super_hook').and_return(
+        module.Hook_type.MONITORING
+    )
+    flexmock(module).should_receive('get_hook_module').with_args(
+        module.Hook_type.MONITORING, 'super_hook'
     ).and_return(test_module)
     flexmock(test_module).should_receive('hook_function').with_args(
         config['super_hook_databases'],
@@ -100,17 +155,11 @@ def test_call_hook_without_hook_config_invokes_module_function_with_arguments_an
     config = {'other_hook': flexmock()}
     expected_return_value = flexmock()
     test_module = sys.modules[__name__]
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.credential,
-    ).and_return(['other_hook'])
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.data_source,
-    ).and_return(['other_hook'])
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.monitoring,
-    ).and_return(['super_hook', 'third_hook'])
-    flexmock(module.importlib).should_receive('import_module').with_args(
-        'borgmatic.hooks.monitoring.super_hook',
+    flexmock(module).should_receive('get_hook_type').with_args('super_hook').and_return(
+        module.Hook_type.MONITORING
+    )
+    flexmock(module).should_receive('get_hook_module').with_args(
+        module.Hook_type.MONITORING, 'super_hook'
     ).and_return(test_module)
     flexmock(test_module).should_receive('hook_function').with_args(
         None,
@@ -126,20 +175,8 @@ def test_call_hook_without_hook_config_invokes_module_function_with_arguments_an
 
 def test_call_hook_without_corresponding_module_raises():
     config = {'super_hook': flexmock(), 'other_hook': flexmock()}
-    test_module = sys.modules[__name__]
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.credential,
-    ).and_return(['other_hook'])
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.data_source,
-    ).and_return(['other_hook'])
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.monitoring,
-    ).and_return(['some_hook'])
-    flexmock(module.importlib).should_receive('import_module').with_args(
-        'borgmatic.hooks.monitoring.super_hook',
-    ).and_return(test_module)
-    flexmock(test_module).should_receive('hook_function').never()
+    flexmock(module).should_receive('get_hook_type').and_raise(ValueError)
+    flexmock(module).should_receive('get_hook_module').never()
 
     with pytest.raises(ValueError):
         module.call_hook('hook_function', config, 'super_hook', 55, value=66)
@@ -147,19 +184,8 @@ def test_call_hook_without_corresponding_module_raises():
 
 def test_call_hook_skips_non_hook_modules():
     config = {'not_a_hook': flexmock(), 'other_hook': flexmock()}
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.credential,
-    ).and_return(['other_hook'])
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.data_source,
-    ).and_return(['other_hook'])
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.monitoring,
-    ).and_return(['not_a_hook', 'third_hook'])
-    not_a_hook_module = flexmock(IS_A_HOOK=False)
-    flexmock(module.importlib).should_receive('import_module').with_args(
-        'borgmatic.hooks.monitoring.not_a_hook',
-    ).and_return(not_a_hook_module)
+    flexmock(module).should_receive('get_hook_type').and_return(module.Hook_type.MONITORING)
+    flexmock(module).should_receive('get_hook_module').and_return(None)
 
     return_value = module.call_hook('hook_function', config, 'not_a_hook', 55, value=66)
 
@@ -169,12 +195,9 @@ def test_call_hook_skips_non_hook_modules():
 def test_call_hooks_calls_each_hook_and_collects_return_values():
     config = {'super_hook': flexmock(), 'other_hook': flexmock()}
     expected_return_values = {'super_hook': flexmock(), 'other_hook': flexmock()}
-    flexmock(module.importlib).should_receive('import_module').with_args(
-        'borgmatic.hooks.monitoring',
-    ).and_return(module.borgmatic.hooks.monitoring)
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.monitoring,
-    ).and_return(['super_hook', 'other_hook'])
+    flexmock(module).should_receive('get_hook_names').with_args(
+        module.Hook_type.MONITORING
+    ).and_return(('super_hook', 'other_hook'))
     flexmock(module).should_receive('call_hook').and_return(
         expected_return_values['super_hook'],
     ).and_return(expected_return_values['other_hook'])
@@ -187,12 +210,9 @@ def test_call_hooks_calls_each_hook_and_collects_return_values():
 def test_call_hooks_calls_skips_return_values_for_unconfigured_hooks():
     config = {'super_hook': flexmock()}
     expected_return_values = {'super_hook': flexmock()}
-    flexmock(module.importlib).should_receive('import_module').with_args(
-        'borgmatic.hooks.monitoring',
-    ).and_return(module.borgmatic.hooks.monitoring)
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.monitoring,
-    ).and_return(['super_hook', 'other_hook'])
+    flexmock(module).should_receive('get_hook_names').with_args(
+        module.Hook_type.MONITORING
+    ).and_return(('super_hook', 'other_hook'))
     flexmock(module).should_receive('call_hook').and_return(expected_return_values['super_hook'])
 
     return_values = module.call_hooks('do_stuff', config, module.Hook_type.MONITORING, 55)
@@ -203,12 +223,9 @@ def test_call_hooks_calls_skips_return_values_for_unconfigured_hooks():
 def test_call_hooks_calls_treats_null_hook_as_optionless():
     config = {'super_hook': flexmock(), 'other_hook': None}
     expected_return_values = {'super_hook': flexmock(), 'other_hook': flexmock()}
-    flexmock(module.importlib).should_receive('import_module').with_args(
-        'borgmatic.hooks.monitoring',
-    ).and_return(module.borgmatic.hooks.monitoring)
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.monitoring,
-    ).and_return(['super_hook', 'other_hook'])
+    flexmock(module).should_receive('get_hook_names').with_args(
+        module.Hook_type.MONITORING
+    ).and_return(('super_hook', 'other_hook'))
     flexmock(module).should_receive('call_hook').and_return(
         expected_return_values['super_hook'],
     ).and_return(expected_return_values['other_hook'])
@@ -221,12 +238,9 @@ def test_call_hooks_calls_treats_null_hook_as_optionless():
 def test_call_hooks_calls_looks_up_databases_suffix_in_config():
     config = {'super_hook_databases': flexmock(), 'other_hook': flexmock()}
     expected_return_values = {'super_hook': flexmock(), 'other_hook': flexmock()}
-    flexmock(module.importlib).should_receive('import_module').with_args(
-        'borgmatic.hooks.monitoring',
-    ).and_return(module.borgmatic.hooks.monitoring)
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.monitoring,
-    ).and_return(['super_hook', 'other_hook'])
+    flexmock(module).should_receive('get_hook_names').with_args(
+        module.Hook_type.MONITORING
+    ).and_return(('super_hook', 'other_hook'))
     flexmock(module).should_receive('call_hook').and_return(
         expected_return_values['super_hook'],
     ).and_return(expected_return_values['other_hook'])
@@ -239,12 +253,9 @@ def test_call_hooks_calls_looks_up_databases_suffix_in_config():
 def test_call_hooks_even_if_unconfigured_calls_each_hook_and_collects_return_values():
     config = {'super_hook': flexmock(), 'other_hook': flexmock()}
     expected_return_values = {'super_hook': flexmock(), 'other_hook': flexmock()}
-    flexmock(module.importlib).should_receive('import_module').with_args(
-        'borgmatic.hooks.monitoring',
-    ).and_return(module.borgmatic.hooks.monitoring)
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.monitoring,
-    ).and_return(['super_hook', 'other_hook'])
+    flexmock(module).should_receive('get_hook_names').with_args(
+        module.Hook_type.MONITORING, 'do_stuff'
+    ).and_return(('super_hook', 'other_hook'))
     flexmock(module).should_receive('call_hook').and_return(
         expected_return_values['super_hook'],
     ).and_return(expected_return_values['other_hook'])
@@ -262,12 +273,9 @@ def test_call_hooks_even_if_unconfigured_calls_each_hook_and_collects_return_val
 def test_call_hooks_even_if_unconfigured_calls_each_hook_configured_or_not_and_collects_return_values():
     config = {'other_hook': flexmock()}
     expected_return_values = {'super_hook': flexmock(), 'other_hook': flexmock()}
-    flexmock(module.importlib).should_receive('import_module').with_args(
-        'borgmatic.hooks.monitoring',
-    ).and_return(module.borgmatic.hooks.monitoring)
-    flexmock(module).should_receive('get_submodule_names').with_args(
-        module.borgmatic.hooks.monitoring,
-    ).and_return(['super_hook', 'other_hook'])
+    flexmock(module).should_receive('get_hook_names').with_args(
+        module.Hook_type.MONITORING, 'do_stuff'
+    ).and_return(('super_hook', 'other_hook'))
     flexmock(module).should_receive('call_hook').and_return(
         expected_return_values['super_hook'],
     ).and_return(expected_return_values['other_hook'])
@@ -116,6 +116,13 @@ def test_output_buffers_for_process_returns_stderr_only_when_stdout_excluded():
     )
 
 
+def test_output_buffers_for_process_skips_missing_stderr():
+    stdout = flexmock()
+    process = flexmock(stdout=stdout, stderr=None)
+
+    assert module.output_buffers_for_process(process, exclude_stdouts=()) == (stdout,)
+
+
 def test_borg_json_log_line_to_record_parses_log_message_line():
     line = '{"type": "log_message", "levelname": "INFO", "time": 12345, "message": "All done", "name": "borg.something"}'
 
@@ -240,6 +247,126 @@ def test_borg_json_log_line_to_record_handles_json_dict_without_type():
     assert module.borg_json_log_line_to_record(line, module.logging.INFO) is None
 
 
+@pytest.mark.parametrize(
+    'borg_log_level,log_level,expected_result',
+    (
+        (module.logging.INFO, None, module.logging.INFO),
+        (module.logging.INFO, module.logging.INFO, module.logging.INFO),
+        (module.logging.INFO, 25, 25),
+        (module.logging.INFO, module.logging.ERROR, module.logging.INFO),
+        (module.logging.WARNING, module.logging.INFO, module.logging.WARNING),
+    ),
+)
+def test_elevate_borg_log_level_elevates_only_for_small_jump_in_log_level(
+    borg_log_level, log_level, expected_result
+):
+    assert module.elevate_borg_log_level(borg_log_level, log_level) == expected_result
+
+
+@pytest.mark.parametrize(
+    'line,expected_result',
+    (
+        ('{"type": "file_status", "status": "-", "path": "/foo/bar"}', 25),
+        (
+            '{"type": "log_message", "levelname": "DEBUG", "time": 12345, "message": "Hi", "name": "borg"}',
+            module.logging.DEBUG,
+        ),
+        (
+            '{"type": "log_message", "levelname": "INFO", "time": 12345, "message": "Hi", "name": "borg"}',
+            25,
+        ),
+        (
+            '{"type": "log_message", "levelname": "ERROR", "time": 12345, "message": "Hi", "name": "borg"}',
+            module.logging.ERROR,
+        ),
+        ('{"type": "log_message", "time": 12345, "message": "Hi", "name": "borg"}', None),
+        ('{"type": "log_message", "levelname": "BOGUS", "message": "Hi", "name": "borg"}', None),
+        (
+            '{"type": "log_message", "levelname": "INFO", "message": "\\"type\\": \\"file_status\\""}',
+            25,
+        ),
+        ('{"type": "progress_percent", "finished": false}', None),
+        ('not json', None),
+        ('', None),
+    ),
+)
+def test_peek_borg_json_log_line_level_determines_log_level_without_parsing_json(
+    line, expected_result
+):
+    flexmock(module).should_receive('load_json').never()
+
+    assert module.peek_borg_json_log_line_level(line, 25) == expected_result
+
+
+def test_unparsed_borg_json_log_line_str_parses_line_into_message():
+    flexmock(module).should_receive('borg_json_log_line_to_record').with_args(
+        '{"message": "hi"}', module.logging.INFO
+    ).and_return(flexmock(getMessage=lambda: 'hi'))
+
+    assert str(module.Unparsed_borg_json_log_line('{"message": "hi"}', module.logging.INFO)) == 'hi'
+
+
+def test_unparsed_borg_json_log_line_str_with_unparseable_line_returns_it_as_is():
+    flexmock(module).should_receive('borg_json_log_line_to_record').and_return(None)
+
+    assert str(module.Unparsed_borg_json_log_line('{"oops', module.logging.INFO)) == '{"oops'
+
+
+def test_discard_borg_json_log_line_with_non_borg_command_does_not_discard():
+    flexmock(module).should_receive('command_is_borg').and_return(False)
+    flexmock(module).should_receive('peek_borg_json_log_line_level').never()
+
+    assert not module.discard_borg_json_log_line(
+        'line', module.logging.INFO, 'borg', ('foo',), capture=False
+    )
+
+
+def test_discard_borg_json_log_line_with_unknown_log_level_does_not_discard():
+    flexmock(module).should_receive('command_is_borg').and_return(True)
+    flexmock(module).should_receive('peek_borg_json_log_line_level').and_return(None)
+    flexmock(module.logger).should_receive('isEnabledFor').never()
+
+    assert not module.discard_borg_json_log_line(
+        'line', module.logging.INFO, 'borg', ('borg',), capture=False
+    )
+
+
+def test_discard_borg_json_log_line_with_captured_output_log_level_does_not_discard():
+    flexmock(module).should_receive('command_is_borg').and_return(True)
+    flexmock(module).should_receive('peek_borg_json_log_line_level').and_return(module.logging.INFO)
+    flexmock(module.logger).should_receive('isEnabledFor').never()
+
+    assert not module.discard_borg_json_log_line(
+        'line', module.logging.INFO, 'borg', ('borg',), capture=True
+    )
+
+
+def test_discard_borg_json_log_line_with_enabled_log_level_does_not_discard():
+    flexmock(module).should_receive('command_is_borg').and_return(True)
+    flexmock(module).should_receive('peek_borg_json_log_line_level').and_return(
+        module.logging.DEBUG
+    )
+    flexmock(module.logger).should_receive('isEnabledFor').with_args(
+        module.logging.DEBUG
+    ).and_return(True)
+
+    assert not module.discard_borg_json_log_line(
+        'line', module.logging.INFO, 'borg', ('borg',), capture=True
+    )
+
+
+def test_discard_borg_json_log_line_with_disabled_log_level_discards():
+    flexmock(module).should_receive('command_is_borg').and_return(True)
+    flexmock(module).should_receive('peek_borg_json_log_line_level').and_return(module.logging.INFO)
+    flexmock(module.logger).should_receive('isEnabledFor').with_args(
+        module.logging.INFO
+    ).and_return(False)
+
+    assert module.discard_borg_json_log_line(
+        'line', module.logging.INFO, 'borg', ('borg',), capture=False
+    )
+
+
 def test_log_line_to_record_makes_log_record():
     line = 'All done'
 
@@ -325,87 +452,732 @@ def test_parse_log_line_with_elevate_stderr_makes_error_record():
         'All done', module.logging.ERROR
     ).and_return(record).once()
 
-    assert (
-        module.parse_log_line(
-            'All done',
-            module.logging.INFO,
-            elevate_stderr=True,
-            borg_local_path='borg',
-            command=['totally-not-borg', 'do-stuff'],
-        )
-        == record
+    assert (
+        module.parse_log_line(
+            'All done',
+            module.logging.INFO,
+            elevate_stderr=True,
+            borg_local_path='borg',
+            command=['totally-not-borg', 'do-stuff'],
+        )
+        == record
+    )
+
+
+def test_parse_log_line_with_elevate_stderr_and_warning_prefix_makes_warning_record():
+    record = flexmock()
+    flexmock(module).should_receive('borg_json_log_line_to_record').never()
+    flexmock(module).should_receive('log_line_to_record').with_args(
+        'warning: All done', module.logging.WARNING
+    ).and_return(record).once()
+
+    assert (
+        module.parse_log_line(
+            'warning: All done',
+            module.logging.INFO,
+            elevate_stderr=True,
+            borg_local_path='borg',
+            command=['totally-not-borg', 'do-stuff'],
+        )
+        == record
+    )
+
+
+def test_handle_log_record_with_process_metadata_appends_line():
+    process_metadata = module.Process_metadata(last_lines=['last'])
+    flexmock(module.logger).should_receive('handle').once()
+    log_record = flexmock(levelno=module.logging.INFO, getMessage=lambda: 'line')
+
+    assert (
+        module.handle_log_record(
+            log_record,
+            process_metadata,
+        )
+        == log_record
+    )
+
+    assert list(process_metadata.last_lines) == ['last', 'line']
+    assert not process_metadata.truncated
+
+
+def test_handle_log_record_with_none_level_appends_line_without_handling():
+    process_metadata = module.Process_metadata()
+    flexmock(module.logger).should_receive('handle').never()
+    log_record = flexmock(levelno=None, getMessage=lambda: 'line')
+
+    assert module.handle_log_record(log_record, process_metadata) == log_record
+
+    assert list(process_metadata.last_lines) == ['line']
+
+
+def test_handle_log_record_without_process_metadata_just_handles():
+    flexmock(module.logger).should_receive('handle').once()
+    log_record = flexmock(levelno=module.logging.INFO, getMessage=lambda: 'line')
+
+    assert module.handle_log_record(log_record) == log_record
+
+
+def test_make_process_group_options_without_process_group_support_returns_no_options():
+    flexmock(module).PROCESS_GROUP_SUPPORTED = False
+
+    assert module.make_process_group_options(shell=True) == {}
+
+
+def test_make_process_group_options_without_shell_returns_no_options():
+    flexmock(module).PROCESS_GROUP_SUPPORTED = True
+
+    assert module.make_process_group_options(shell=False) == {}
+
+
+def test_make_process_group_options_with_do_not_capture_returns_no_options():
+    flexmock(module).PROCESS_GROUP_SUPPORTED = True
+
+    assert module.make_process_group_options(shell=True, do_not_capture=True) == {}
+
+
+def test_make_process_group_options_with_terminal_stdin_returns_no_options():
+    flexmock(module).PROCESS_GROUP_SUPPORTED = True
+    flexmock(module.sys).should_receive('stdin').and_return(flexmock(isatty=lambda: True))
+
+    assert module.make_process_group_options(shell=True) == {}
+
+
+def test_make_process_group_options_with_terminal_stdin_and_input_file_returns_process_group_option():
+    flexmock(module).PROCESS_GROUP_SUPPORTED = True
+    flexmock(module.sys).should_receive('stdin').and_return(flexmock(isatty=lambda: True))
+
+    assert module.make_process_group_options(shell=True, input_file=flexmock()) == {
+        'process_group': 0
+    }
+
+
+def test_make_process_group_options_with_non_terminal_stdin_returns_process_group_option():
+    flexmock(module).PROCESS_GROUP_SUPPORTED = True
+    flexmock(module.sys).should_receive('stdin').and_return(flexmock(isatty=lambda: False))
+
+    assert module.make_process_group_options(shell=True) == {'process_group': 0}
+
+
+def test_make_process_group_options_without_stdin_returns_process_group_option():
+    flexmock(module).PROCESS_GROUP_SUPPORTED = True
+    flexmock(module.sys).should_receive('stdin').and_return(None)
+
+    assert module.make_process_group_options(shell=True) == {'process_group': 0}
+
+
+def test_register_process_group_with_process_group_options_registers_process():
+    process = flexmock()
+    flexmock(module.borgmatic.signals).child_process_groups = set()
+
+    module.register_process_group(process, {'process_group': 0})
+
+    assert module.borgmatic.signals.child_process_groups == {process}
+
+
+def test_register_process_group_without_process_group_options_does_not_register_process():
+    flexmock(module.borgmatic.signals).child_process_groups = set()
+
+    module.register_process_group(flexmock(), {})
+
+    assert module.borgmatic.signals.child_process_groups == set()
+
+
+def test_unregister_process_groups_unregisters_only_exited_processes():
+    exited_process = flexmock(returncode=0)
+    running_process = flexmock(returncode=None)
+    flexmock(module.borgmatic.signals).child_process_groups = {exited_process, running_process}
+
+    module.unregister_process_groups((exited_process, running_process, flexmock(returncode=1)))
+
+    assert module.borgmatic.signals.child_process_groups == {running_process}
+
+
+def test_send_signal_to_process_without_process_group_signals_process():
+    process = flexmock()
+    process.should_receive('send_signal').with_args(module.signal.SIGTERM).once()
+    flexmock(module.borgmatic.signals).child_process_groups = set()
+    flexmock(module.os).should_receive('killpg').never()
+
+    module.send_signal_to_process(process, module.signal.SIGTERM)
+
+
+def test_send_signal_to_process_with_process_group_signals_process_group():
+    process = flexmock(pid=123)
+    process.should_receive('send_signal').never()
+    flexmock(module.borgmatic.signals).child_process_groups = {process}
+    flexmock(module.os).should_receive('killpg').with_args(123, module.signal.SIGTERM).once()
+
+    module.send_signal_to_process(process, module.signal.SIGTERM)
+
+
+def test_send_signal_to_process_with_already_exited_process_group_swallows_error():
+    process = flexmock(pid=123)
+    flexmock(module.borgmatic.signals).child_process_groups = {process}
+    flexmock(module.os).should_receive('killpg').and_raise(ProcessLookupError)
+
+    module.send_signal_to_process(process, module.signal.SIGTERM)
+
+
+def test_kill_process_without_process_group_kills_process():
+    process = flexmock()
+    process.should_receive('kill').once()
+    flexmock(module.borgmatic.signals).child_process_groups = set()
+    flexmock(module).should_receive('send_signal_to_process').never()
+
+    module.kill_process(process)
+
+
+def test_kill_process_with_process_group_kills_process_group():
+    process = flexmock()
+    process.should_receive('kill').never()
+    flexmock(module.borgmatic.signals).child_process_groups = {process}
+    flexmock(module).should_receive('send_signal_to_process').with_args(
+        process, module.signal.SIGKILL
+    ).once()
+
+    module.kill_process(process)
+
+
+def test_command_timeouts_sets_merges_and_restores_timeouts():
+    assert module.COMMAND_TIMEOUTS.get() == (None, None)
+
+    with module.Command_timeouts(soft=10, hard=20):
+        assert module.COMMAND_TIMEOUTS.get() == (10, 20)
+
+        with module.Command_timeouts(soft=5):
+            assert module.COMMAND_TIMEOUTS.get() == (5, 20)
+
+        assert module.COMMAND_TIMEOUTS.get() == (10, 20)
+
+    assert module.COMMAND_TIMEOUTS.get() == (None, None)
+
+
+def test_command_deadline_seconds_remaining_without_timeouts_returns_none():
+    assert module.Command_deadline(()).seconds_remaining() is None
+
+
+def test_command_deadline_seconds_remaining_returns_time_until_soft_timeout():
+    flexmock(module.time).should_receive('monotonic').and_return(100).and_return(103)
+
+    assert module.Command_deadline((), soft_timeout=10, hard_timeout=20).seconds_remaining() == 7
+
+
+def test_command_deadline_seconds_remaining_after_termination_returns_time_until_hard_timeout():
+    flexmock(module.time).should_receive('monotonic').and_return(100).and_return(103)
+    deadline = module.Command_deadline((), soft_timeout=10, hard_timeout=20)
+    deadline.terminated = True
+
+    assert deadline.seconds_remaining() == 17
+
+
+def test_command_deadline_seconds_remaining_after_deadline_returns_zero():
+    flexmock(module.time).should_receive('monotonic').and_return(100).and_return(150)
+
+    assert module.Command_deadline((), hard_timeout=20).seconds_remaining() == 0
+
+
+def test_command_deadline_enforce_before_deadlines_does_not_stop_processes():
+    process = flexmock()
+    process.should_receive('poll').never()
+    flexmock(module.time).should_receive('monotonic').and_return(100).and_return(105)
+    flexmock(module).should_receive('send_signal_to_process').never()
+    flexmock(module).should_receive('kill_process').never()
+
+    module.Command_deadline((process,), soft_timeout=10, hard_timeout=20).enforce()
+
+
+def test_command_deadline_enforce_without_timeouts_does_not_stop_processes():
+    process = flexmock()
+    process.should_receive('poll').never()
+    flexmock(module).should_receive('send_signal_to_process').never()
+    flexmock(module).should_receive('kill_process').never()
+
+    module.Command_deadline((process,)).enforce()
+
+
+def test_command_deadline_enforce_after_soft_timeout_terminates_running_processes():
+    process = flexmock(poll=lambda: None)
+    exited_process = flexmock(poll=lambda: 0)
+    flexmock(module.time).should_receive('monotonic').and_return(100).and_return(112)
+    flexmock(module).should_receive('command_for_process').and_return('foo')
+    flexmock(module.logger).should_receive('warning').once()
+    flexmock(module).should_receive('send_signal_to_process').with_args(
+        process, signal_number=module.signal.SIGTERM
+    ).once()
+    flexmock(module).should_receive('send_signal_to_process').with_args(
+        exited_process, signal_number=module.signal.SIGTERM
+    ).never()
+    flexmock(module).should_receive('kill_process').never()
+    deadline = module.Command_deadline((process, exited_process), soft_timeout=10, hard_timeout=20)
+
+    deadline.enforce()
+
+    assert deadline.terminated
+    assert not deadline.killed
+
+
+def test_command_deadline_enforce_after_soft_timeout_already_enforced_does_not_terminate_again():
+    process = flexmock(poll=lambda: None)
+    flexmock(module.time).should_receive('monotonic').and_return(100).and_return(112)
+    flexmock(module).should_receive('send_signal_to_process').never()
+    flexmock(module).should_receive('kill_process').never()
+    deadline = module.Command_deadline((process,), soft_timeout=10, hard_timeout=20)
+    deadline.terminated = True
+
+    deadline.enforce()
+
+
+def test_command_deadline_enforce_after_hard_timeout_kills_running_processes():
+    process = flexmock(poll=lambda: None)
+    flexmock(module.time).should_receive('monotonic').and_return(100).and_return(125)
+    flexmock(module).should_receive('command_for_process').and_return('foo')
+    flexmock(module.logger).should_receive('warning').once()
+    flexmock(module).should_receive('send_signal_to_process').never()
+    flexmock(module).should_receive('kill_process').with_args(process).once()
+    deadline = module.Command_deadline((process,), soft_timeout=10, hard_timeout=20)
+
+    deadline.enforce()
+
+    assert deadline.terminated
+    assert deadline.killed
+
+
+def test_command_usage_add_bytes_read_counts_stdout_and_stderr_separately():
+    usage = module.Command_usage(('foo',))
+
+    usage.add_bytes_read(5)
+    usage.add_bytes_read(7)
+    usage.add_bytes_read(3, stderr=True)
+
+    assert usage.stdout_bytes == 12
+    assert usage.stderr_bytes == 3
+
+
+def test_command_usage_finish_without_rusage_records_wall_time_and_exit_code():
+    flexmock(module.time).should_receive('monotonic').and_return(100).and_return(102.5)
+    usage = module.Command_usage(('foo',))
+
+    usage.finish(exit_code=1)
+
+    assert usage.wall_seconds == 2.5
+    assert usage.exit_code == 1
+    assert usage.user_cpu_seconds is None
+    assert usage.system_cpu_seconds is None
+    assert usage.peak_rss_bytes is None
+
+
+def test_command_usage_finish_with_rusage_records_cpu_time_and_peak_rss_in_bytes():
+    flexmock(module.time).should_receive('monotonic').and_return(100).and_return(102.5)
+    flexmock(module.sys).platform = 'linux'
+    usage = module.Command_usage(('foo',))
+
+    usage.finish(exit_code=0, rusage=flexmock(ru_utime=1.5, ru_stime=0.5, ru_maxrss=2))
+
+    assert usage.wall_seconds == 2.5
+    assert usage.exit_code == 0
+    assert usage.user_cpu_seconds == 1.5
+    assert usage.system_cpu_seconds == 0.5
+    assert usage.peak_rss_bytes == 2048
+
+
+def test_command_usage_finish_on_macos_records_peak_rss_as_is():
+    flexmock(module.sys).platform = 'darwin'
+    usage = module.Command_usage(('foo',))
+
+    usage.finish(exit_code=0, rusage=flexmock(ru_utime=1.5, ru_stime=0.5, ru_maxrss=2048))
+
+    assert usage.peak_rss_bytes == 2048
+
+
+def test_command_usage_to_dict_masks_secrets_in_command():
+    usage = module.Command_usage(('foo', '--password', 'secret'))
+
+    assert usage.to_dict() == {
+        'command': 'foo --password ***',
+        'wall_seconds': None,
+        'user_cpu_seconds': None,
+        'system_cpu_seconds': None,
+        'peak_rss_bytes': None,
+        'stdout_bytes': 0,
+        'stderr_bytes': 0,
+        'exit_code': None,
+    }
+
+
+def test_command_usage_to_dict_with_shell_command_string_uses_it_as_is():
+    usage = module.Command_usage('foo | bar')
+
+    assert usage.to_dict()['command'] == 'foo | bar'
+
+
+def test_record_command_usage_within_report_context_records_usage():
+    usages = []
+    usage = flexmock()
+    module.COMMAND_USAGES.set(usages)
+
+    try:
+        module.record_command_usage(usage)
+    finally:
+        module.COMMAND_USAGES.set(None)
+
+    assert usages == [usage]
+
+
+def test_record_command_usage_outside_report_context_does_not_raise():
+    module.record_command_usage(flexmock())
+
+
+def test_log_command_usage_summary_logs_totals_and_longest_command():
+    usages = (
+        flexmock(
+            wall_seconds=1.0,
+            user_cpu_seconds=0.5,
+            system_cpu_seconds=0.25,
+            to_dict=lambda: {'command': 'foo'},
+        ),
+        flexmock(
+            wall_seconds=3.0,
+            user_cpu_seconds=None,
+            system_cpu_seconds=None,
+            to_dict=lambda: {'command': 'bar'},
+        ),
+    )
+    flexmock(module.logger).should_receive('info').with_args(
+        'Ran 2 commands in 4.0 seconds (0.8 seconds of CPU time); the longest was bar at 3.0 seconds'
+    ).once()
+
+    module.log_command_usage_summary(usages)
+
+
+def test_log_command_usage_summary_without_usages_does_not_log():
+    flexmock(module.logger).should_receive('info').never()
+
+    module.log_command_usage_summary(())
+
+
+def test_make_command_usage_report_path_hashes_config_filename_within_state_directory():
+    flexmock(module.borgmatic.config.paths).should_receive(
+        'get_borgmatic_state_directory'
+    ).and_return('/state')
+
+    assert module.make_command_usage_report_path('test.yaml', {}) == (
+        '/state/command_usage/' + module.hashlib.sha256(b'test.yaml').hexdigest() + '.json'
+    )
+
+
+def test_write_command_usage_report_writes_json_report(tmp_path):
+    report_path = tmp_path / 'command_usage' / 'abc.json'
+    flexmock(module.time).should_receive('time').and_return(1234)
+
+    module.write_command_usage_report(
+        str(report_path), 'test.yaml', (flexmock(to_dict=lambda: {'command': 'foo'}),)
+    )
+
+    assert module.json.loads(report_path.read_text()) == {
+        'configuration_filename': 'test.yaml',
+        'finished_time': 1234,
+        'commands': [{'command': 'foo'}],
+    }
+    assert [path.name for path in report_path.parent.iterdir()] == ['abc.json']
+
+
+def test_write_command_usage_report_with_error_swallows_it(tmp_path):
+    report_path = tmp_path / 'command_usage' / 'abc.json'
+    flexmock(module.os).should_receive('replace').and_raise(PermissionError)
+
+    module.write_command_usage_report(str(report_path), 'test.yaml', ())
+
+    assert list(report_path.parent.iterdir()) == []
+
+
+def test_command_usage_report_collects_usages_and_reports_them_upon_exit():
+    usage = flexmock()
+    flexmock(module).should_receive('log_command_usage_summary').with_args([usage]).once()
+    flexmock(module).should_receive('make_command_usage_report_path').with_args(
+        'test.yaml', {}
+    ).and_return('/state/report.json')
+    flexmock(module).should_receive('write_command_usage_report').with_args(
+        '/state/report.json', 'test.yaml', [usage]
+    ).once()
+
+    with module.Command_usage_report('test.yaml', {}):
+        module.record_command_usage(usage)
+
+    assert module.COMMAND_USAGES.get() is None
+
+
+def test_command_usage_report_without_usages_does_not_report():
+    flexmock(module).should_receive('log_command_usage_summary').never()
+    flexmock(module).should_receive('write_command_usage_report').never()
+
+    with module.Command_usage_report('test.yaml', {}):
+        pass
+
+
+def test_error_output_line_count_sets_and_restores_line_count():
+    assert module.ERROR_OUTPUT_LINE_COUNT.get() is None
+
+    with module.Error_output_line_count(5):
+        assert module.ERROR_OUTPUT_LINE_COUNT.get() == 5
+
+        with module.Error_output_line_count(None):
+            assert module.ERROR_OUTPUT_LINE_COUNT.get() is None
+
+        assert module.ERROR_OUTPUT_LINE_COUNT.get() == 5
+
+    assert module.ERROR_OUTPUT_LINE_COUNT.get() is None
+
+
+def test_process_metadata_defaults_to_default_max_line_count():
+    process_metadata = module.Process_metadata()
+
+    assert process_metadata.last_lines.maxlen == module.ERROR_OUTPUT_MAX_LINE_COUNT
+    assert not process_metadata.capture
+    assert not process_metadata.truncated
+
+
+def test_process_metadata_uses_context_max_line_count():
+    with module.Error_output_line_count(3):
+        process_metadata = module.Process_metadata()
+
+    assert process_metadata.last_lines.maxlen == 3
+
+
+def test_process_metadata_prefers_explicit_max_line_count():
+    with module.Error_output_line_count(3):
+        process_metadata = module.Process_metadata(max_line_count=7)
+
+    assert process_metadata.last_lines.maxlen == 7
+
+
+def test_process_metadata_append_line_under_max_line_count_does_not_truncate():
+    process_metadata = module.Process_metadata(last_lines=['hi'], max_line_count=2)
+
+    process_metadata.append_line('there')
+
+    assert list(process_metadata.last_lines) == ['hi', 'there']
+    assert not process_metadata.truncated
+
+
+def test_process_metadata_append_line_over_max_line_count_discards_oldest_and_truncates():
+    process_metadata = module.Process_metadata(last_lines=['hi', 'there'], max_line_count=2)
+
+    process_metadata.append_line('friend')
+
+    assert list(process_metadata.last_lines) == ['there', 'friend']
+    assert process_metadata.truncated
+
+
+def test_process_metadata_with_zero_max_line_count_truncates_everything():
+    process_metadata = module.Process_metadata(max_line_count=0)
+
+    process_metadata.append_line('hi')
+
+    assert list(process_metadata.last_lines) == []
+    assert process_metadata.truncated
+
+
+def test_output_selector_registers_pidfd_for_each_process():
+    flexmock(module.os).should_receive('pidfd_open').with_args(123).and_return(5)
+    flexmock(module.os).should_receive('pidfd_open').with_args(456).and_return(6)
+    flexmock(module.selectors.DefaultSelector).should_receive('register').with_args(
+        5, module.selectors.EVENT_READ, data=object
+    ).once()
+    flexmock(module.selectors.DefaultSelector).should_receive('register').with_args(
+        6, module.selectors.EVENT_READ, data=object
+    ).once()
+
+    selector = module.Output_selector((flexmock(pid=123), flexmock(pid=456)))
+
+    assert selector.pidfds_supported
+    assert sorted(selector.process_to_pidfd.values()) == [5, 6]
+
+
+def test_output_selector_without_pidfd_support_falls_back_to_polling():
+    flexmock(module.os).should_receive('pidfd_open').and_raise(OSError)
+    flexmock(module.selectors.DefaultSelector).should_receive('register').never()
+
+    selector = module.Output_selector((flexmock(pid=123),))
+
+    assert not selector.pidfds_supported
+    assert selector.process_to_pidfd == {}
+
+
+def test_output_selector_register_buffer_registers_for_reading():
+    buffer = flexmock()
+    flexmock(module.selectors.DefaultSelector).should_receive('register').with_args(
+        buffer, module.selectors.EVENT_READ
+    ).once()
+
+    module.Output_selector(()).register_buffer(buffer)
+
+
+def test_output_selector_unregister_buffer_unregisters_it():
+    buffer = flexmock()
+    flexmock(module.selectors.DefaultSelector).should_receive('unregister').with_args(buffer).once()
+
+    module.Output_selector(()).unregister_buffer(buffer)
+
+
+def test_output_selector_unregister_buffer_ignores_unregistered_buffer():
+    buffer = flexmock()
+    flexmock(module.selectors.DefaultSelector).should_receive('unregister').and_raise(KeyError)
+
+    module.Output_selector(()).unregister_buffer(buffer)
+
+
+def test_output_selector_select_returns_ready_buffers_and_handles_process_exits():
+    flexmock(module.selectors.DefaultSelector).should_receive('get_map').and_return({5: flexmock()})
+    process = flexmock(pid=123)
+    buffer = flexmock()
+    flexmock(module.os).should_receive('pidfd_open').and_return(5)
+    flexmock(module.selectors.DefaultSelector).should_receive('register')
+    flexmock(module.selectors.DefaultSelector).should_receive('select').with_args(None).and_return(
+        (
+            (flexmock(fileobj=buffer, data=None), module.selectors.EVENT_READ),
+            (flexmock(fileobj=5, data=process), module.selectors.EVENT_READ),
+        )
+    )
+    flexmock(module.selectors.DefaultSelector).should_receive('unregister').with_args(5).once()
+    flexmock(module.os).should_receive('close').with_args(5).once()
+    selector = module.Output_selector((process,))
+    flexmock(selector).should_receive('reap_process').with_args(process).once()
+
+    assert selector.select() == (buffer,)
+    assert selector.process_to_pidfd == {}
+
+
+def test_output_selector_select_with_nothing_registered_bails():
+    flexmock(module.os).should_receive('pidfd_open').and_raise(AttributeError)
+    flexmock(module.selectors.DefaultSelector).should_receive('select').never()
+
+    assert module.Output_selector((flexmock(pid=123),)).select() == ()
+
+
+def test_output_selector_reap_process_records_exit_code_and_resource_usage():
+    process = flexmock(pid=123, returncode=None)
+    rusage = flexmock()
+    flexmock(module.os).should_receive('pidfd_open').and_raise(AttributeError)
+    flexmock(module.os).should_receive('wait4').with_args(123, module.os.WNOHANG).and_return(
+        (123, 256, rusage)
+    )
+    selector = module.Output_selector((process,))
+
+    selector.reap_process(process)
+
+    assert process.returncode == 1
+    assert selector.process_to_rusage == {process: rusage}
+
+
+def test_output_selector_reap_process_with_process_still_running_does_not_record_anything():
+    process = flexmock(pid=123, returncode=None)
+    flexmock(module.os).should_receive('pidfd_open').and_raise(AttributeError)
+    flexmock(module.os).should_receive('wait4').and_return((0, 0, flexmock()))
+    selector = module.Output_selector((process,))
+
+    selector.reap_process(process)
+
+    assert process.returncode is None
+    assert selector.process_to_rusage == {}
+
+
+def test_output_selector_reap_process_with_process_already_reaped_does_not_record_anything():
+    process = flexmock(pid=123, returncode=0)
+    flexmock(module.os).should_receive('pidfd_open').and_raise(AttributeError)
+    flexmock(module.os).should_receive('wait4').and_raise(ChildProcessError)
+    selector = module.Output_selector((process,))
+
+    selector.reap_process(process)
+
+    assert process.returncode == 0
+    assert selector.process_to_rusage == {}
+
+
+def test_output_selector_select_without_pidfd_support_uses_timeout():
+    flexmock(module.selectors.DefaultSelector).should_receive('get_map').and_return({5: flexmock()})
+    buffer = flexmock()
+    flexmock(module.os).should_receive('pidfd_open').and_raise(AttributeError)
+    flexmock(module.selectors.DefaultSelector).should_receive('select').with_args(
+        module.EXIT_POLL_INTERVAL_SECONDS
+    ).and_return(((flexmock(fileobj=buffer, data=None), module.selectors.EVENT_READ),))
+
+    assert module.Output_selector((flexmock(pid=123),)).select() == (buffer,)
+
+
+def test_output_selector_select_with_timeout_passes_it_through():
+    flexmock(module.selectors.DefaultSelector).should_receive('get_map').and_return({5: flexmock()})
+    buffer = flexmock()
+    flexmock(module.os).should_receive('pidfd_open').and_return(5)
+    flexmock(module.selectors.DefaultSelector).should_receive('register')
+    flexmock(module.selectors.DefaultSelector).should_receive('select').with_args(3).and_return(
+        ((flexmock(fileobj=buffer, data=None), module.selectors.EVENT_READ),)
     )
 
+    assert module.Output_selector((flexmock(pid=123),)).select(3) == (buffer,)
 
-def test_parse_log_line_with_elevate_stderr_and_warning_prefix_makes_warning_record():
-    record = flexmock()
-    flexmock(module).should_receive('borg_json_log_line_to_record').never()
-    flexmock(module).should_receive('log_line_to_record').with_args(
-        'warning: All done', module.logging.WARNING
-    ).and_return(record).once()
 
-    assert (
-        module.parse_log_line(
-            'warning: All done',
-            module.logging.INFO,
-            elevate_stderr=True,
-            borg_local_path='borg',
-            command=['totally-not-borg', 'do-stuff'],
-        )
-        == record
-    )
+def test_output_selector_select_without_pidfd_support_and_with_longer_timeout_uses_poll_interval():
+    flexmock(module.selectors.DefaultSelector).should_receive('get_map').and_return({5: flexmock()})
+    flexmock(module.os).should_receive('pidfd_open').and_raise(AttributeError)
+    flexmock(module.selectors.DefaultSelector).should_receive('select').with_args(
+        module.EXIT_POLL_INTERVAL_SECONDS
+    ).and_return(()).once()
 
+    assert module.Output_selector((flexmock(pid=123),)).select(60) == ()
 
-def test_handle_log_record_under_max_line_count_appends():
-    last_lines = ['last']
-    flexmock(module.logger).should_receive('handle').once()
-    log_record = flexmock(levelno=module.logging.INFO, getMessage=lambda: 'line')
 
-    assert (
-        module.handle_log_record(
-            log_record,
-            last_lines,
-        )
-        == log_record
-    )
+def test_output_selector_select_without_pidfd_support_and_with_shorter_timeout_uses_timeout():
+    flexmock(module.selectors.DefaultSelector).should_receive('get_map').and_return({5: flexmock()})
+    flexmock(module.os).should_receive('pidfd_open').and_raise(AttributeError)
+    flexmock(module.selectors.DefaultSelector).should_receive('select').with_args(0).and_return(
+        ()
+    ).once()
 
-    assert last_lines == ['last', 'line']
+    assert module.Output_selector((flexmock(pid=123),)).select(0) == ()
 
 
-def test_handle_log_record_over_max_line_count_trims_and_appends():
-    original_last_lines = [str(number) for number in range(module.ERROR_OUTPUT_MAX_LINE_COUNT)]
-    last_lines = list(original_last_lines)
-    flexmock(module.logger).should_receive('handle').once()
-    log_record = flexmock(levelno=module.logging.INFO, getMessage=lambda: 'line')
+def test_output_selector_process_exited_with_pending_pidfd_skips_poll():
+    process = flexmock(pid=123)
+    process.should_receive('poll').never()
+    flexmock(module.os).should_receive('pidfd_open').and_return(5)
+    flexmock(module.selectors.DefaultSelector).should_receive('register')
 
-    assert (
-        module.handle_log_record(
-            log_record,
-            last_lines,
-        )
-        == log_record
-    )
+    assert not module.Output_selector((process,)).process_exited(process)
 
-    assert last_lines == [*original_last_lines[1:], 'line']
 
+def test_output_selector_process_exited_without_pidfd_polls():
+    process = flexmock(pid=123)
+    process.should_receive('poll').and_return(0).once()
+    flexmock(module.os).should_receive('pidfd_open').and_raise(OSError)
 
-def test_handle_log_record_without_last_lines_just_handles():
-    flexmock(module.logger).should_receive('handle').once()
-    log_record = flexmock(levelno=module.logging.INFO, getMessage=lambda: 'line')
+    assert module.Output_selector((process,)).process_exited(process)
 
-    assert module.handle_log_record(log_record) == log_record
 
+def test_output_selector_close_closes_pidfds_and_selector():
+    flexmock(module.os).should_receive('pidfd_open').and_return(5)
+    flexmock(module.selectors.DefaultSelector).should_receive('register')
+    flexmock(module.os).should_receive('close').with_args(5).once()
+    flexmock(module.selectors.DefaultSelector).should_receive('close').once()
+    selector = module.Output_selector((flexmock(pid=123),))
+
+    selector.close()
+
+    assert selector.process_to_pidfd == {}
 
-def test_log_buffer_lines_without_buffer_readers_bails():
-    flexmock(module.select).should_receive('select').never()
+
+def test_log_buffer_lines_without_buffer_readers_waits_and_bails():
+    selector = flexmock()
+    selector.should_receive('select').with_args(5).and_return(()).once()
 
     assert (
         tuple(
             module.log_buffer_lines(
+                selector=selector,
                 buffer_readers={},
                 process_metadatas={},
                 output_log_level=flexmock(),
                 borg_local_path=flexmock(),
+                timeout=5,
             )
         )
         == ()
@@ -414,13 +1186,13 @@ def test_log_buffer_lines_without_buffer_readers_bails():
 
 def test_log_buffer_lines_without_ready_buffers_bails():
     buffer_readers = {flexmock(): flexmock()}
-    flexmock(module.select).should_receive('select').with_args(
-        buffer_readers.keys(), [], []
-    ).and_return([], [], []).once()
+    selector = flexmock()
+    selector.should_receive('select').and_return(()).once()
 
     assert (
         tuple(
             module.log_buffer_lines(
+                selector=selector,
                 buffer_readers=buffer_readers,
                 process_metadatas={},
                 output_log_level=flexmock(),
@@ -437,15 +1209,18 @@ def test_log_buffer_lines_with_ready_buffer_and_running_process_handles_each_log
         flexmock(): module.Buffer_reader(lines=iter((('hi', 'there'),)), process=process)
     }
     process_metadatas = {process: module.Process_metadata(last_lines=[], capture=False)}
-    flexmock(module.select).should_receive('select').with_args(
-        buffer_readers.keys(), [], []
-    ).and_return(list(buffer_readers.keys()), [], [])
+    selector = flexmock(
+        select=lambda timeout=None: tuple(buffer_readers.keys()),
+        process_exited=lambda process: process.poll() is not None,
+    )
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').and_return(flexmock())
     flexmock(module).should_receive('handle_log_record').and_return(flexmock(levelno=10)).twice()
 
     assert (
         tuple(
             module.log_buffer_lines(
+                selector=selector,
                 buffer_readers=buffer_readers,
                 process_metadatas=process_metadatas,
                 output_log_level=module.logging.INFO,
@@ -462,9 +1237,11 @@ def test_log_buffer_lines_with_ready_buffer_and_capture_process_yields_each_line
         flexmock(): module.Buffer_reader(lines=iter((('hi', 'there'),)), process=process)
     }
     process_metadatas = {process: module.Process_metadata(last_lines=[], capture=True)}
-    flexmock(module.select).should_receive('select').with_args(
-        buffer_readers.keys(), [], []
-    ).and_return(list(buffer_readers.keys()), [], [])
+    selector = flexmock(
+        select=lambda timeout=None: tuple(buffer_readers.keys()),
+        process_exited=lambda process: process.poll() is not None,
+    )
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').and_return(flexmock())
     flexmock(module).should_receive('handle_log_record').and_return(
         flexmock(levelno=None, getMessage=lambda: 'message')
@@ -472,6 +1249,7 @@ def test_log_buffer_lines_with_ready_buffer_and_capture_process_yields_each_line
 
     assert tuple(
         module.log_buffer_lines(
+            selector=selector,
             buffer_readers=buffer_readers,
             process_metadatas=process_metadatas,
             output_log_level=flexmock(),
@@ -486,9 +1264,11 @@ def test_log_buffer_lines_with_ready_buffer_and_same_log_level_and_capture_proce
         flexmock(): module.Buffer_reader(lines=iter((('hi', 'there'),)), process=process)
     }
     process_metadatas = {process: module.Process_metadata(last_lines=[], capture=True)}
-    flexmock(module.select).should_receive('select').with_args(
-        buffer_readers.keys(), [], []
-    ).and_return(list(buffer_readers.keys()), [], [])
+    selector = flexmock(
+        select=lambda timeout=None: tuple(buffer_readers.keys()),
+        process_exited=lambda process: process.poll() is not None,
+    )
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').and_return(flexmock())
     flexmock(module).should_receive('handle_log_record').and_return(
         flexmock(levelno=module.logging.INFO, getMessage=lambda: 'message')
@@ -496,6 +1276,7 @@ def test_log_buffer_lines_with_ready_buffer_and_same_log_level_and_capture_proce
 
     assert tuple(
         module.log_buffer_lines(
+            selector=selector,
             buffer_readers=buffer_readers,
             process_metadatas=process_metadatas,
             output_log_level=module.logging.INFO,
@@ -510,9 +1291,11 @@ def test_log_buffer_lines_with_ready_buffer_and_higher_log_level_and_capture_pro
         flexmock(): module.Buffer_reader(lines=iter((('hi', 'there'),)), process=process)
     }
     process_metadatas = {process: module.Process_metadata(last_lines=[], capture=True)}
-    flexmock(module.select).should_receive('select').with_args(
-        buffer_readers.keys(), [], []
-    ).and_return(list(buffer_readers.keys()), [], [])
+    selector = flexmock(
+        select=lambda timeout=None: tuple(buffer_readers.keys()),
+        process_exited=lambda process: process.poll() is not None,
+    )
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').and_return(flexmock())
     flexmock(module).should_receive('handle_log_record').and_return(
         flexmock(levelno=module.logging.DEBUG, getMessage=lambda: 'message')
@@ -521,6 +1304,7 @@ def test_log_buffer_lines_with_ready_buffer_and_higher_log_level_and_capture_pro
     assert (
         tuple(
             module.log_buffer_lines(
+                selector=selector,
                 buffer_readers=buffer_readers,
                 process_metadatas=process_metadatas,
                 output_log_level=module.logging.INFO,
@@ -537,9 +1321,11 @@ def test_log_buffer_lines_with_ready_buffer_and_log_level_equal_to_output_log_le
         flexmock(): module.Buffer_reader(lines=iter((('hi', 'there'),)), process=process)
     }
     process_metadatas = {process: module.Process_metadata(last_lines=[], capture=True)}
-    flexmock(module.select).should_receive('select').with_args(
-        buffer_readers.keys(), [], []
-    ).and_return(list(buffer_readers.keys()), [], [])
+    selector = flexmock(
+        select=lambda timeout=None: tuple(buffer_readers.keys()),
+        process_exited=lambda process: process.poll() is not None,
+    )
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').and_return(flexmock())
     flexmock(module).should_receive('handle_log_record').and_return(
         flexmock(levelno=module.logging.INFO, getMessage=lambda: 'message')
@@ -547,6 +1333,7 @@ def test_log_buffer_lines_with_ready_buffer_and_log_level_equal_to_output_log_le
 
     assert tuple(
         module.log_buffer_lines(
+            selector=selector,
             buffer_readers=buffer_readers,
             process_metadatas=process_metadatas,
             output_log_level=module.logging.INFO,
@@ -566,16 +1353,20 @@ def test_log_buffer_lines_with_ready_buffer_and_finished_process_vents_other_pro
         process: module.Process_metadata(last_lines=[], capture=False),
         other_process: module.Process_metadata(last_lines=[], capture=False),
     }
-    flexmock(module.select).should_receive('select').with_args(
-        buffer_readers.keys(), [], []
-    ).and_return(list(buffer_readers.keys()), [], [])
+    selector = flexmock(
+        select=lambda timeout=None: tuple(buffer_readers.keys()),
+        process_exited=lambda process: process.poll() is not None,
+    )
+    selector.should_receive('register_buffer').with_args(other_process.stdout).once()
     flexmock(module).should_receive('read_lines').and_return(iter((('there',),))).once()
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').and_return(flexmock())
     flexmock(module).should_receive('handle_log_record').and_return(flexmock(levelno=10)).once()
 
     assert (
         tuple(
             module.log_buffer_lines(
+                selector=selector,
                 buffer_readers=buffer_readers,
                 process_metadatas=process_metadatas,
                 output_log_level=module.logging.INFO,
@@ -603,16 +1394,20 @@ def test_log_buffer_lines_with_ready_buffer_and_finished_process_does_not_vent_o
         process: module.Process_metadata(last_lines=[], capture=False),
         other_process: module.Process_metadata(last_lines=[], capture=False),
     }
-    flexmock(module.select).should_receive('select').with_args(
-        buffer_readers.keys(), [], []
-    ).and_return(list(buffer_readers.keys()), [], [])
+    selector = flexmock(
+        select=lambda timeout=None: tuple(buffer_readers.keys()),
+        process_exited=lambda process: process.poll() is not None,
+    )
+    selector.should_receive('register_buffer').never()
     flexmock(module).should_receive('read_lines').never()
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').and_return(flexmock())
     flexmock(module).should_receive('handle_log_record').and_return(flexmock(levelno=10)).once()
 
     assert (
         tuple(
             module.log_buffer_lines(
+                selector=selector,
                 buffer_readers=buffer_readers,
                 process_metadatas=process_metadatas,
                 output_log_level=module.logging.INFO,
@@ -626,19 +1421,59 @@ def test_log_buffer_lines_with_ready_buffer_and_finished_process_does_not_vent_o
     assert tuple(buffer_readers[process_stdout].lines) == ()
 
 
-def test_log_buffer_lines_with_ready_eof_buffer_and_running_process_skips_it():
+def test_log_buffer_lines_with_ready_eof_buffer_and_running_process_unregisters_and_skips_it():
     process = flexmock(poll=lambda: None, stderr=flexmock(), args=flexmock())
-    buffer_readers = {flexmock(): module.Buffer_reader(lines=iter(()), process=process)}
+    buffer = flexmock()
+    buffer_readers = {buffer: module.Buffer_reader(lines=iter(()), process=process)}
     process_metadatas = {process: module.Process_metadata(last_lines=[], capture=False)}
-    flexmock(module.select).should_receive('select').with_args(
-        buffer_readers.keys(), [], []
-    ).and_return(list(buffer_readers.keys()), [], [])
+    selector = flexmock(
+        select=lambda timeout=None: tuple(buffer_readers.keys()),
+        process_exited=lambda process: process.poll() is not None,
+    )
+    selector.should_receive('unregister_buffer').with_args(buffer).once()
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').never()
     flexmock(module).should_receive('handle_log_record').never()
 
     assert (
         tuple(
             module.log_buffer_lines(
+                selector=selector,
+                buffer_readers=buffer_readers,
+                process_metadatas=process_metadatas,
+                output_log_level=module.logging.INFO,
+                borg_local_path=flexmock(),
+            )
+        )
+        == ()
+    )
+
+
+def test_log_buffer_lines_with_ready_buffer_skips_discardable_lines():
+    process = flexmock(poll=lambda: None, stderr=flexmock(), args=flexmock())
+    buffer_readers = {
+        flexmock(): module.Buffer_reader(lines=iter((('hi', 'there'),)), process=process)
+    }
+    process_metadatas = {process: module.Process_metadata(last_lines=[], capture=False)}
+    selector = flexmock(
+        select=lambda timeout=None: tuple(buffer_readers.keys()),
+        process_exited=lambda process: process.poll() is not None,
+    )
+    flexmock(module).should_receive('discard_borg_json_log_line').with_args(
+        'hi', object, object, object, object
+    ).and_return(True)
+    flexmock(module).should_receive('discard_borg_json_log_line').with_args(
+        'there', object, object, object, object
+    ).and_return(False)
+    flexmock(module).should_receive('parse_log_line').with_args(
+        line='there', log_level=object, elevate_stderr=False, borg_local_path=object, command=object
+    ).and_return(flexmock()).once()
+    flexmock(module).should_receive('handle_log_record').and_return(flexmock(levelno=10)).once()
+
+    assert (
+        tuple(
+            module.log_buffer_lines(
+                selector=selector,
                 buffer_readers=buffer_readers,
                 process_metadatas=process_metadatas,
                 output_log_level=module.logging.INFO,
@@ -647,21 +1482,25 @@ def test_log_buffer_lines_with_ready_eof_buffer_and_running_process_skips_it():
         )
         == ()
     )
+    assert [line.line for line in process_metadatas[process].last_lines] == ['hi']
 
 
 def test_log_buffer_lines_with_ready_buffer_with_empty_line_skips_it():
     process = flexmock(poll=lambda: None, stderr=flexmock(), args=flexmock())
     buffer_readers = {flexmock(): module.Buffer_reader(lines=iter((('',),)), process=process)}
     process_metadatas = {process: module.Process_metadata(last_lines=[], capture=False)}
-    flexmock(module.select).should_receive('select').with_args(
-        buffer_readers.keys(), [], []
-    ).and_return(list(buffer_readers.keys()), [], [])
+    selector = flexmock(
+        select=lambda timeout=None: tuple(buffer_readers.keys()),
+        process_exited=lambda process: process.poll() is not None,
+    )
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').never()
     flexmock(module).should_receive('handle_log_record').never()
 
     assert (
         tuple(
             module.log_buffer_lines(
+                selector=selector,
                 buffer_readers=buffer_readers,
                 process_metadatas=process_metadatas,
                 output_log_level=module.logging.INFO,
@@ -683,15 +1522,18 @@ def test_log_buffer_lines_with_multiple_ready_buffers_and_running_processes_hand
         process: module.Process_metadata(last_lines=[], capture=False),
         other_process: module.Process_metadata(last_lines=[], capture=False),
     }
-    flexmock(module.select).should_receive('select').with_args(
-        buffer_readers.keys(), [], []
-    ).and_return(list(buffer_readers.keys()), [], [])
+    selector = flexmock(
+        select=lambda timeout=None: tuple(buffer_readers.keys()),
+        process_exited=lambda process: process.poll() is not None,
+    )
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').and_return(flexmock())
     flexmock(module).should_receive('handle_log_record').and_return(flexmock(levelno=10)).times(4)
 
     assert (
         tuple(
             module.log_buffer_lines(
+                selector=selector,
                 buffer_readers=buffer_readers,
                 process_metadatas=process_metadatas,
                 output_log_level=module.logging.INFO,
@@ -711,15 +1553,18 @@ def test_log_buffer_lines_with_multiple_ready_buffers_from_same_running_process_
     process_metadatas = {
         process: module.Process_metadata(last_lines=[], capture=False),
     }
-    flexmock(module.select).should_receive('select').with_args(
-        buffer_readers.keys(), [], []
-    ).and_return(list(buffer_readers.keys()), [], [])
+    selector = flexmock(
+        select=lambda timeout=None: tuple(buffer_readers.keys()),
+        process_exited=lambda process: process.poll() is not None,
+    )
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').and_return(flexmock())
     flexmock(module).should_receive('handle_log_record').and_return(flexmock(levelno=10)).times(4)
 
     assert (
         tuple(
             module.log_buffer_lines(
+                selector=selector,
                 buffer_readers=buffer_readers,
                 process_metadatas=process_metadatas,
                 output_log_level=module.logging.INFO,
@@ -737,9 +1582,11 @@ def test_log_buffer_lines_with_ready_stderr_buffer_and_running_process_elevates_
         process_stderr: module.Buffer_reader(lines=iter((('hi', 'there'),)), process=process)
     }
     process_metadatas = {process: module.Process_metadata(last_lines=[], capture=False)}
-    flexmock(module.select).should_receive('select').with_args(
-        buffer_readers.keys(), [], []
-    ).and_return(list(buffer_readers.keys()), [], [])
+    selector = flexmock(
+        select=lambda timeout=None: tuple(buffer_readers.keys()),
+        process_exited=lambda process: process.poll() is not None,
+    )
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').with_args(
         line=str, log_level=object, elevate_stderr=True, borg_local_path=object, command=object
     ).and_return(flexmock()).twice()
@@ -748,6 +1595,7 @@ def test_log_buffer_lines_with_ready_stderr_buffer_and_running_process_elevates_
     assert (
         tuple(
             module.log_buffer_lines(
+                selector=selector,
                 buffer_readers=buffer_readers,
                 process_metadatas=process_metadatas,
                 output_log_level=module.logging.INFO,
@@ -765,9 +1613,11 @@ def test_log_buffer_lines_with_ready_stdout_buffer_and_running_process_does_not_
         process_stdout: module.Buffer_reader(lines=iter((('hi', 'there'),)), process=process)
     }
     process_metadatas = {process: module.Process_metadata(last_lines=[], capture=False)}
-    flexmock(module.select).should_receive('select').with_args(
-        buffer_readers.keys(), [], []
-    ).and_return(list(buffer_readers.keys()), [], [])
+    selector = flexmock(
+        select=lambda timeout=None: tuple(buffer_readers.keys()),
+        process_exited=lambda process: process.poll() is not None,
+    )
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').with_args(
         line=str, log_level=object, elevate_stderr=False, borg_local_path=object, command=object
     ).and_return(flexmock()).twice()
@@ -776,6 +1626,7 @@ def test_log_buffer_lines_with_ready_stdout_buffer_and_running_process_does_not_
     assert (
         tuple(
             module.log_buffer_lines(
+                selector=selector,
                 buffer_readers=buffer_readers,
                 process_metadatas=process_metadatas,
                 output_log_level=module.logging.INFO,
@@ -793,9 +1644,11 @@ def test_log_buffer_lines_with_ready_stderr_buffer_and_capture_stderr_does_not_e
         process_stderr: module.Buffer_reader(lines=iter((('hi', 'there'),)), process=process)
     }
     process_metadatas = {process: module.Process_metadata(last_lines=[], capture=False)}
-    flexmock(module.select).should_receive('select').with_args(
-        buffer_readers.keys(), [], []
-    ).and_return(list(buffer_readers.keys()), [], [])
+    selector = flexmock(
+        select=lambda timeout=None: tuple(buffer_readers.keys()),
+        process_exited=lambda process: process.poll() is not None,
+    )
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').with_args(
         line=str, log_level=object, elevate_stderr=False, borg_local_path=object, command=object
     ).and_return(flexmock()).twice()
@@ -804,6 +1657,7 @@ def test_log_buffer_lines_with_ready_stderr_buffer_and_capture_stderr_does_not_e
     assert (
         tuple(
             module.log_buffer_lines(
+                selector=selector,
                 buffer_readers=buffer_readers,
                 process_metadatas=process_metadatas,
                 output_log_level=module.logging.INFO,
@@ -849,6 +1703,50 @@ def test_raise_for_process_errors_with_running_process_bails():
     )
 
 
+def test_raise_for_process_errors_with_selector_and_unexited_process_skips_poll():
+    process = flexmock()
+    process.should_receive('poll').never()
+    buffer_readers = {flexmock(): module.Buffer_reader(lines=flexmock(), process=process)}
+    process_metadatas = {process: module.Process_metadata(last_lines=[], capture=False)}
+    selector = flexmock()
+    selector.should_receive('process_exited').with_args(process).and_return(False)
+    flexmock(module).should_receive('interpret_exit_code').never()
+
+    assert (
+        module.raise_for_process_errors(
+            buffer_readers,
+            process_metadatas,
+            output_log_level=None,
+            borg_local_path=flexmock(),
+            borg_exit_codes=flexmock(),
+            selector=selector,
+        )
+        is None
+    )
+
+
+def test_raise_for_process_errors_with_selector_and_exited_process_polls():
+    process = flexmock(args=flexmock())
+    process.should_receive('poll').and_return(0).once()
+    buffer_readers = {flexmock(): module.Buffer_reader(lines=flexmock(), process=process)}
+    process_metadatas = {process: module.Process_metadata(last_lines=[], capture=False)}
+    selector = flexmock()
+    selector.should_receive('process_exited').with_args(process).and_return(True)
+    flexmock(module).should_receive('interpret_exit_code').and_return(module.Exit_status.SUCCESS)
+
+    assert (
+        module.raise_for_process_errors(
+            buffer_readers,
+            process_metadatas,
+            output_log_level=None,
+            borg_local_path=flexmock(),
+            borg_exit_codes=flexmock(),
+            selector=selector,
+        )
+        is None
+    )
+
+
 def test_raise_for_process_errors_with_running_process_and_no_buffer_readers_waits_and_bails():
     process = flexmock()
     process.should_receive('poll').never()
@@ -867,6 +1765,28 @@ def test_raise_for_process_errors_with_running_process_and_no_buffer_readers_wai
     )
 
 
+def test_raise_for_process_errors_with_no_buffer_readers_waits_until_deadline():
+    process = flexmock()
+    process.should_receive('poll').never()
+    process.should_receive('wait').with_args(timeout=5).and_raise(
+        module.subprocess.TimeoutExpired('foo', 5)
+    ).once()
+    process_metadatas = {process: module.Process_metadata(last_lines=[], capture=False)}
+    flexmock(module).should_receive('interpret_exit_code').never()
+
+    assert (
+        module.raise_for_process_errors(
+            buffer_readers={},
+            process_metadatas=process_metadatas,
+            output_log_level=None,
+            borg_local_path=flexmock(),
+            borg_exit_codes=flexmock(),
+            deadline=flexmock(seconds_remaining=lambda: 5),
+        )
+        is None
+    )
+
+
 def test_raise_for_process_errors_with_successful_process_bails():
     process = flexmock(poll=lambda: 0, args=flexmock())
     buffer_readers = {flexmock(): module.Buffer_reader(lines=flexmock(), process=process)}
@@ -1054,16 +1974,16 @@ def test_raise_for_process_errors_with_error_process_and_running_process_kills_a
 def test_raise_for_process_errors_with_warning_process_and_long_output_raises_with_truncated_output():
     process = flexmock(poll=lambda: 3, args=flexmock())
     buffer_readers = {flexmock(): module.Buffer_reader(lines=flexmock(), process=process)}
-    process_metadatas = {
-        process: module.Process_metadata(last_lines=['hi', 'there'], capture=False)
-    }
+    process_metadata = module.Process_metadata(last_lines=['hi', 'there'], max_line_count=2)
+    process_metadata.truncated = True
+    process_metadatas = {process: process_metadata}
     flexmock(module).should_receive('interpret_exit_code').and_return(module.Exit_status.ERROR)
     flexmock(module).should_receive('log_remaining_buffer_lines').and_return(())
     command = flexmock()
     flexmock(module).should_receive('command_for_process').and_return(command)
 
     with pytest.raises(module.subprocess.CalledProcessError) as error:
-        flexmock(module, ERROR_OUTPUT_MAX_LINE_COUNT=2).raise_for_process_errors(
+        module.raise_for_process_errors(
             buffer_readers,
             process_metadatas,
             output_log_level=None,
@@ -1078,6 +1998,7 @@ def test_raise_for_process_errors_with_warning_process_and_long_output_raises_wi
 
 def test_log_remaining_buffer_lines_without_buffer_readers_bails():
     process_metadatas = {flexmock(): module.Process_metadata(last_lines=[], capture=False)}
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').never()
 
     assert (
@@ -1096,6 +2017,7 @@ def test_log_remaining_buffer_lines_without_buffer_readers_bails():
 def test_log_remaining_buffer_lines_without_reader_process_bails():
     buffer_readers = {flexmock(): module.Buffer_reader(lines=flexmock(), process=None)}
     process_metadatas = {flexmock(): module.Process_metadata(last_lines=[], capture=False)}
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').never()
 
     assert (
@@ -1120,6 +2042,7 @@ def test_log_remaining_buffer_lines_logs_each_line():
         )
     }
     process_metadatas = {process: module.Process_metadata(last_lines=[], capture=False)}
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').with_args(
         line=str, log_level=object, elevate_stderr=False, borg_local_path=object, command=object
     ).and_return(flexmock()).times(4)
@@ -1138,6 +2061,40 @@ def test_log_remaining_buffer_lines_logs_each_line():
     )
 
 
+def test_log_remaining_buffer_lines_skips_discardable_lines():
+    process = flexmock(stderr=flexmock(), args=flexmock())
+    buffer_readers = {
+        flexmock(): module.Buffer_reader(
+            lines=(('hi', 'there'),),
+            process=process,
+        )
+    }
+    process_metadatas = {process: module.Process_metadata(last_lines=[], capture=False)}
+    flexmock(module).should_receive('discard_borg_json_log_line').with_args(
+        'hi', object, object, object, object
+    ).and_return(True)
+    flexmock(module).should_receive('discard_borg_json_log_line').with_args(
+        'there', object, object, object, object
+    ).and_return(False)
+    flexmock(module).should_receive('parse_log_line').with_args(
+        line='there', log_level=object, elevate_stderr=False, borg_local_path=object, command=object
+    ).and_return(flexmock()).once()
+    flexmock(module).should_receive('handle_log_record').and_return(flexmock(levelno=10)).once()
+
+    assert (
+        tuple(
+            module.log_remaining_buffer_lines(
+                buffer_readers,
+                process_metadatas,
+                output_log_level=module.logging.INFO,
+                borg_local_path=flexmock(),
+            )
+        )
+        == ()
+    )
+    assert [line.line for line in process_metadatas[process].last_lines] == ['hi']
+
+
 def test_log_remaining_buffer_lines_with_multiple_buffers_logs_lines_from_each():
     process = flexmock(stderr=flexmock(), args=flexmock())
     buffer_readers = {
@@ -1151,6 +2108,7 @@ def test_log_remaining_buffer_lines_with_multiple_buffers_logs_lines_from_each()
         ),
     }
     process_metadatas = {process: module.Process_metadata(last_lines=[], capture=False)}
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').with_args(
         line=str, log_level=object, elevate_stderr=False, borg_local_path=object, command=object
     ).and_return(flexmock()).times(4)
@@ -1183,6 +2141,7 @@ def test_log_remaining_buffer_lines_with_stderr_buffer_elevates_stderr():
         ),
     }
     process_metadatas = {process: module.Process_metadata(last_lines=[], capture=False)}
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').with_args(
         line=str, log_level=object, elevate_stderr=True, borg_local_path=object, command=object
     ).and_return(flexmock()).twice()
@@ -1218,6 +2177,7 @@ def test_log_remaining_buffer_lines_with_stderr_buffer_and_capture_stderr_does_n
         ),
     }
     process_metadatas = {process: module.Process_metadata(last_lines=[], capture=False)}
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').with_args(
         line=str, log_level=object, elevate_stderr=False, borg_local_path=object, command=object
     ).and_return(flexmock()).times(4)
@@ -1246,6 +2206,7 @@ def test_log_remaining_buffer_lines_with_capture_process_yields_each_line():
         )
     }
     process_metadatas = {process: module.Process_metadata(last_lines=[], capture=True)}
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').with_args(
         line=str, log_level=object, elevate_stderr=False, borg_local_path=object, command=object
     ).and_return(flexmock()).twice()
@@ -1272,6 +2233,7 @@ def test_log_remaining_buffer_lines_with_same_log_level_and_capture_process_yiel
         )
     }
     process_metadatas = {process: module.Process_metadata(last_lines=[], capture=True)}
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').with_args(
         line=str, log_level=object, elevate_stderr=False, borg_local_path=object, command=object
     ).and_return(flexmock()).twice()
@@ -1298,6 +2260,7 @@ def test_log_remaining_buffer_lines_with_higher_log_level_and_capture_process_do
         )
     }
     process_metadatas = {process: module.Process_metadata(last_lines=[], capture=True)}
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').with_args(
         line=str, log_level=object, elevate_stderr=False, borg_local_path=object, command=object
     ).and_return(flexmock()).twice()
@@ -1327,6 +2290,7 @@ def test_log_remaining_buffer_lines_with_log_level_equal_to_output_log_level_and
         )
     }
     process_metadatas = {process: module.Process_metadata(last_lines=[], capture=True)}
+    flexmock(module).should_receive('discard_borg_json_log_line').and_return(False)
     flexmock(module).should_receive('parse_log_line').with_args(
         line=str, log_level=object, elevate_stderr=False, borg_local_path=object, command=object
     ).and_return(flexmock()).twice()
@@ -1432,6 +2396,28 @@ def test_execute_command_calls_full_command():
     assert output is None
 
 
+def test_execute_command_with_umask_passes_it_to_the_command():
+    full_command = ['foo', 'bar']
+    flexmock(module).should_receive('log_command')
+    flexmock(module.subprocess).should_receive('Popen').with_args(
+        full_command,
+        stdin=None,
+        stdout=module.subprocess.PIPE,
+        stderr=module.subprocess.PIPE,
+        shell=False,
+        env=None,
+        cwd=None,
+        close_fds=False,
+        umask=0o77,
+    ).and_return(flexmock(stdout=None)).once()
+    flexmock(module.borgmatic.logger).should_receive('Log_prefix').and_return(flexmock())
+    flexmock(module).should_receive('log_outputs').and_yield()
+
+    output = module.execute_command(full_command, umask=0o77)
+
+    assert output is None
+
+
 def test_execute_command_calls_full_command_with_output_file():
     full_command = ['foo', 'bar']
     output_file = flexmock(name='test')
@@ -1501,6 +2487,10 @@ def test_execute_command_calls_full_command_with_input_file():
 def test_execute_command_calls_full_command_with_shell():
     full_command = ['foo', 'bar']
     flexmock(module).should_receive('log_command')
+    flexmock(module).should_receive('make_process_group_options').with_args(
+        True, None, False
+    ).and_return({'process_group': 0})
+    process = flexmock(stdout=None)
     flexmock(module.subprocess).should_receive('Popen').with_args(
         ' '.join(full_command),
         stdin=None,
@@ -1510,7 +2500,11 @@ def test_execute_command_calls_full_command_with_shell():
         env=None,
         cwd=None,
         close_fds=False,
-    ).and_return(flexmock(stdout=None)).once()
+        process_group=0,
+    ).and_return(process).once()
+    flexmock(module).should_receive('register_process_group').with_args(
+        process, {'process_group': 0}
+    ).once()
     flexmock(module.borgmatic.logger).should_receive('Log_prefix').and_return(flexmock())
     flexmock(module).should_receive('log_outputs').and_yield()
 
@@ -1703,6 +2697,7 @@ def test_execute_command_and_capture_output_raises_when_command_errors():
 def test_execute_command_and_capture_output_with_shell_returns_output():
     full_command = ['foo', 'bar']
     flexmock(module).should_receive('log_command')
+    flexmock(module).should_receive('make_process_group_options').and_return({})
     flexmock(module).should_receive('command_is_borg').and_return(False)
     process = flexmock()
     flexmock(module.subprocess).should_receive('Popen').with_args(
@@ -1781,6 +2776,85 @@ def test_execute_command_and_capture_output_returns_output_with_working_director
     assert output_lines == ('out',)
 
 
+def fake_log_outputs(*args, capture_buffer, **kwargs):
+    capture_buffer.extend(b'{"out": true}\n')
+
+    yield from ()
+
+
+def test_execute_command_and_capture_raw_output_returns_raw_stdout():
+    full_command = ['foo', 'bar']
+    flexmock(module).should_receive('log_command')
+    flexmock(module).should_receive('command_is_borg').and_return(False)
+    process = flexmock()
+    flexmock(module.subprocess).should_receive('Popen').with_args(
+        full_command,
+        stdin=None,
+        stdout=subprocess.PIPE,
+        stderr=None,
+        shell=False,
+        env=None,
+        cwd=None,
+        close_fds=False,
+    ).and_return(process).once()
+    flexmock(module.borgmatic.logger).should_receive('Log_prefix').and_return(flexmock())
+    flexmock(module).should_receive('log_outputs').replace_with(fake_log_outputs)
+
+    assert module.execute_command_and_capture_raw_output(full_command) == b'{"out": true}\n'
+
+
+def test_execute_command_and_capture_raw_output_with_borg_command_popens_stderr():
+    full_command = ['borg', 'list']
+    flexmock(module).should_receive('log_command')
+    flexmock(module).should_receive('command_is_borg').and_return(True)
+    process = flexmock()
+    flexmock(module.subprocess).should_receive('Popen').with_args(
+        full_command,
+        stdin=None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        shell=False,
+        env=None,
+        cwd=None,
+        close_fds=False,
+    ).and_return(process).once()
+    flexmock(module.borgmatic.logger).should_receive('Log_prefix').and_return(flexmock())
+    flexmock(module).should_receive('log_outputs').replace_with(fake_log_outputs)
+
+    assert module.execute_command_and_capture_raw_output(full_command) == b'{"out": true}\n'
+
+
+def test_execute_command_and_capture_raw_output_with_shell_environment_and_working_directory_passes_them_through():
+    full_command = ['foo', 'bar']
+    flexmock(module).should_receive('log_command')
+    flexmock(module).should_receive('make_process_group_options').and_return({})
+    flexmock(module).should_receive('command_is_borg').and_return(False)
+    process = flexmock()
+    flexmock(module.subprocess).should_receive('Popen').with_args(
+        'foo bar',
+        stdin=None,
+        stdout=subprocess.PIPE,
+        stderr=None,
+        shell=True,
+        env={'a': 'b'},
+        cwd='/working',
+        close_fds=True,
+    ).and_return(process).once()
+    flexmock(module.borgmatic.logger).should_receive('Log_prefix').and_return(flexmock())
+    flexmock(module).should_receive('log_outputs').replace_with(fake_log_outputs)
+
+    assert (
+        module.execute_command_and_capture_raw_output(
+            full_command,
+            shell=True,
+            environment={'a': 'b'},
+            working_directory='/working',
+            close_fds=True,
+        )
+        == b'{"out": true}\n'
+    )
+
+
 def test_execute_command_with_processes_calls_full_command():
     full_command = ['foo', 'bar']
     processes = (flexmock(),)
@@ -1911,6 +2985,7 @@ def test_execute_command_with_processes_calls_full_command_with_shell():
     full_command = ['foo', 'bar']
     processes = (flexmock(),)
     flexmock(module).should_receive('log_command')
+    flexmock(module).should_receive('make_process_group_options').and_return({})
     flexmock(module.subprocess).should_receive('Popen').with_args(
         ' '.join(full_command),
         stdin=None,
@@ -2003,3 +3078,20 @@ def test_execute_command_with_processes_kills_processes_on_error():
 
     with pytest.raises(subprocess.CalledProcessError):
         tuple(module.execute_command_with_processes(full_command, processes))
+
+
+def test_get_command_pool_returns_same_pool_each_time():
+    assert module.get_command_pool() is module.get_command_pool()
+
+
+def test_submit_runs_function_on_command_pool_and_returns_future():
+    future = module.submit(lambda first, second: first + second, 1, second=2)
+
+    assert future.result() == 3
+
+
+def test_submit_carries_log_prefix_into_command_pool_thread():
+    with module.borgmatic.logger.Log_prefix('myprefix'):
+        future = module.submit(module.borgmatic.logger.get_log_prefix)
+
+    assert future.result() == 'myprefix'
@@ -0,0 +1,94 @@
+import fcntl
+
+import pytest
+from flexmock import flexmock
+
+from borgmatic import lock as module
+
+
+def test_make_lock_path_hashes_normalized_repository_path():
+    flexmock(module.borgmatic.config.paths).should_receive('get_working_directory').and_return(
+        '/working'
+    )
+    flexmock(module.borgmatic.config.validate).should_receive(
+        'normalize_repository_path'
+    ).with_args('repo', '/working').and_return('/working/repo')
+    flexmock(module.borgmatic.config.paths).should_receive(
+        'get_borgmatic_state_directory'
+    ).and_return('/home/user/.local/state/borgmatic')
+    flexmock(module.hashlib).should_receive('sha256').with_args(b'/working/repo').and_return(
+        flexmock(hexdigest=lambda: 'abcd')
+    )
+
+    assert module.make_lock_path({}, 'repo') == '/home/user/.local/state/borgmatic/locks/abcd.lock'
+
+
+def test_file_locked_by_someone_else_with_missing_file_returns_false():
+    flexmock(module.os).should_receive('open').and_raise(FileNotFoundError)
+
+    assert module.file_locked_by_someone_else('/locks/ticket') is False
+
+
+def test_file_locked_by_someone_else_with_locked_file_returns_true():
+    flexmock(module.os).should_receive('open').and_return(3)
+    flexmock(module.fcntl).should_receive('flock').with_args(
+        3, fcntl.LOCK_SH | fcntl.LOCK_NB
+    ).and_raise(BlockingIOError)
+    flexmock(module.os).should_receive('close').with_args(3).once()
+
+    assert module.file_locked_by_someone_else('/locks/ticket') is True
+
+
+def test_file_locked_by_someone_else_with_unlocked_file_returns_false():
+    flexmock(module.os).should_receive('open').and_return(3)
+    flexmock(module.fcntl).should_receive('flock')
+    flexmock(module.os).should_receive('close').with_args(3).once()
+
+    assert module.file_locked_by_someone_else('/locks/ticket') is False
+
+
+def test_read_lock_holder_parses_lock_file(tmp_path):
+    lock_path = tmp_path / 'test.lock'
+    lock_path.write_text('{"pid": 1234}')
+
+    assert module.read_lock_holder(str(lock_path)) == {'pid': 1234}
+
+
+@pytest.mark.parametrize('contents', (None, '', '{invalid'))
+def test_read_lock_holder_with_missing_or_invalid_lock_file_returns_none(tmp_path, contents):
+    lock_path = tmp_path / 'test.lock'
+
+    if contents is not None:
+        lock_path.write_text(contents)
+
+    assert module.read_lock_holder(str(lock_path)) is None
+
+
+def test_describe_lock_holder_without_holder_describes_generically():
+    assert module.describe_lock_holder(None) == 'another borgmatic run'
+
+
+def test_describe_lock_holder_describes_holder():
+    flexmock(module.time).should_receive('localtime').with_args(1000).and_return(
+        module.time.gmtime(0)
+    )
+
+    assert (
+        module.describe_lock_holder(
+            {
+                'configuration_filename': 'test.yaml',
+                'pid': 1234,
+                'hostname': 'myhost',
+                'acquired_time': 1000,
+            }
+        )
+        == 'test.yaml (process 1234 on myhost) since 1970-01-01 00:00:00'
+    )
+
+
+def test_repository_lock_without_repository_locks_enabled_does_nothing():
+    flexmock(module).should_receive('make_lock_path').never()
+    flexmock(module.os).should_receive('open').never()
+
+    with module.Repository_lock({}, {'path': 'repo'}, 'test.yaml'):
+        pass
@@ -1,5 +1,6 @@
 import logging
 import sys
+import threading
 
 import pytest
 from flexmock import flexmock
@@ -314,106 +315,41 @@ def test_add_logging_level_skips_global_setting_if_already_set():
     module.add_logging_level('PLAID', 99)
 
 
-def test_get_log_prefix_gets_prefix_from_first_handler_formatter_with_prefix():
-    flexmock(module.logging).should_receive('getLogger').and_return(
-        flexmock(
-            handlers=[
-                flexmock(formatter=flexmock()),
-                flexmock(formatter=flexmock(prefix='myprefix')),
-            ],
-            removeHandler=lambda handler: None,
-        ),
-    )
-
-    assert module.get_log_prefix() == 'myprefix'
-
-
-def test_get_log_prefix_with_no_handlers_does_not_raise():
-    flexmock(module.logging).should_receive('getLogger').and_return(
-        flexmock(
-            handlers=[],
-            removeHandler=lambda handler: None,
-        ),
-    )
-
-    assert module.get_log_prefix() is None
-
-
-def test_get_log_prefix_with_no_formatters_does_not_raise():
-    flexmock(module.logging).should_receive('getLogger').and_return(
-        flexmock(
-            handlers=[
-                flexmock(formatter=None),
-                flexmock(formatter=None),
-            ],
-            removeHandler=lambda handler: None,
-        ),
-    )
-
-    assert module.get_log_prefix() is None
-
-
-def test_get_log_prefix_with_no_prefix_does_not_raise():
-    flexmock(module.logging).should_receive('getLogger').and_return(
-        flexmock(
-            handlers=[
-                flexmock(
-                    formatter=flexmock(),
-                ),
-            ],
-            removeHandler=lambda handler: None,
-        ),
-    )
+def test_get_log_prefix_gets_prefix_set_by_set_log_prefix():
+    original_prefix = module.get_log_prefix()
+    module.set_log_prefix('myprefix')
 
-    assert module.get_log_prefix() is None
+    try:
+        assert module.get_log_prefix() == 'myprefix'
+    finally:
+        module.set_log_prefix(original_prefix)
 
 
-def test_set_log_prefix_updates_all_handler_formatters():
-    formatters = (
-        flexmock(prefix=None),
-        flexmock(prefix=None),
-    )
+def test_set_log_prefix_only_affects_current_thread():
+    original_prefix = module.get_log_prefix()
+    module.set_log_prefix('myprefix')
+    thread_prefixes = []
 
-    flexmock(module.logging).should_receive('getLogger').and_return(
-        flexmock(
-            handlers=[
-                flexmock(
-                    formatter=formatters[0],
-                ),
-                flexmock(
-                    formatter=formatters[1],
-                ),
-            ],
-            removeHandler=lambda handler: None,
-        ),
-    )
+    try:
+        thread = threading.Thread(target=lambda: thread_prefixes.append(module.get_log_prefix()))
+        thread.start()
+        thread.join()
+    finally:
+        module.set_log_prefix(original_prefix)
 
-    module.set_log_prefix('myprefix')
+    assert thread_prefixes == [None]
 
-    for formatter in formatters:
-        assert formatter.prefix == 'myprefix'
 
+def test_format_log_prefix_formats_prefix():
+    flexmock(module).should_receive('get_log_prefix').and_return('myprefix')
 
-def test_set_log_prefix_skips_handlers_without_a_formatter():
-    formatter = flexmock(prefix=None)
+    assert module.format_log_prefix() == 'myprefix: '
 
-    flexmock(module.logging).should_receive('getLogger').and_return(
-        flexmock(
-            handlers=[
-                flexmock(
-                    formatter=None,
-                ),
-                flexmock(
-                    formatter=formatter,
-                ),
-            ],
-            removeHandler=lambda handler: None,
-        ),
-    )
 
-    module.set_log_prefix('myprefix')
+def test_format_log_prefix_without_prefix_returns_empty_string():
+    flexmock(module).should_receive('get_log_prefix').and_return(None)
 
-    assert formatter.prefix == 'myprefix'
+    assert module.format_log_prefix() == ''
 
 
 def test_log_prefix_sets_prefix_and_then_restores_no_prefix_after():
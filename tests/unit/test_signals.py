@@ -4,12 +4,31 @@ from flexmock import flexmock
 from borgmatic import signals as module
 
 
+def test_forward_signal_to_child_process_groups_signals_each_process_group():
+    flexmock(module).child_process_groups = {flexmock(pid=123), flexmock(pid=456)}
+    flexmock(module.os).should_receive('killpg').with_args(123, 100).once()
+    flexmock(module.os).should_receive('killpg').with_args(456, 100).once()
+
+    module.forward_signal_to_child_process_groups(100)
+
+
+def test_forward_signal_to_child_process_groups_swallows_error_for_exited_process_group():
+    flexmock(module).child_process_groups = {flexmock(pid=123), flexmock(pid=456)}
+    flexmock(module.os).should_receive('killpg').with_args(123, 100).and_raise(ProcessLookupError)
+    flexmock(module.os).should_receive('killpg').with_args(456, 100).once()
+
+    module.forward_signal_to_child_process_groups(100)
+
+
 def test_handle_signal_forwards_to_subprocesses():
     signal_number = 100
     frame = flexmock(f_back=flexmock(f_code=flexmock(co_name='something')))
     process_group = flexmock()
     flexmock(module.os).should_receive('getpgrp').and_return(process_group)
     flexmock(module.os).should_receive('killpg').with_args(process_group, signal_number).once()
+    flexmock(module).should_receive('forward_signal_to_child_process_groups').with_args(
+        signal_number
+    ).once()
 
     module.handle_signal(signal_number, frame)
 
@@ -42,6 +61,12 @@ def test_handle_signal_raises_on_sigint():
     flexmock(module.os).should_receive('getpgrp').and_return(process_group)
     flexmock(module.os).should_receive('killpg').with_args(process_group, module.signal.SIGINT)
     flexmock(module.os).should_receive('killpg').with_args(process_group, module.signal.SIGTERM)
+    flexmock(module).should_receive('forward_signal_to_child_process_groups').with_args(
+        module.signal.SIGINT
+    ).once()
+    flexmock(module).should_receive('forward_signal_to_child_process_groups').with_args(
+        module.signal.SIGTERM
+    ).once()
     flexmock(module.sys).should_receive('exit').never()
 
     with pytest.raises(KeyboardInterrupt):